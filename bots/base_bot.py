@@ -2,17 +2,36 @@
 Bot giao dịch cơ sở với các chức năng chung.
 """
 import time
-import asyncio
 import signal
 import sys
+import asyncio
 from asyncio import gather
 import ccxt.pro
 from colorama import Fore, Style
 
+from utils import clock
 from utils.logger import log_info, log_error, log_warning, log_profit, log_opportunity
 from utils.exceptions import ArbitrageError, ExchangeError, InsufficientBalanceError, OrderError
 from utils.helpers import show_time, extract_base_asset
-from configs import PROFIT_CRITERIA_PCT, PROFIT_CRITERIA_USD, ENABLE_CTRL_C_HANDLING
+from utils.status_renderer import StatusRenderer
+from utils.fee_thresholds import BreakEvenTable
+from utils.circuit_breaker import CircuitBreaker
+from utils import metrics
+from configs import ENABLE_CTRL_C_HANDLING, STATUS_RENDER_FPS
+
+
+ORDERBOOK_UPDATES = metrics.counter('arb_orderbook_updates_total', 'Số cập nhật sách lệnh đã xử lý', ['exchange'])
+DECISION_LATENCY = metrics.histogram(
+    'arb_decision_seconds', 'Thời gian từ khi nhận sách lệnh tới khi quyết định giao dịch',
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+)
+PREFILTER = metrics.counter(
+    'arb_prefilter_total', 'Kết quả kiểm tra ngưỡng hòa vốn tính trước (rejected = bỏ qua không tính lợi nhuận)',
+    ['result']
+)
+PREFILTER_REJECTED = PREFILTER.labels('rejected')
+PREFILTER_EVALUATED = PREFILTER.labels('evaluated')
+BREAKER_TRIPS = metrics.counter('arb_circuit_breaker_trips_total', 'Số lần ngắt kết nối tới sàn', ['exchange'])
 
 
 class BaseBot:
@@ -20,7 +39,10 @@ class BaseBot:
     Lớp bot giao dịch cơ sở với các chức năng chung.
     """
     
-    def __init__(self, exchange_service, balance_service, order_service, notification_service, config=None):
+    mode = None  # Tên chế độ bot (dùng cho nhật ký phiên)
+    
+    def __init__(self, exchange_service, balance_service, order_service, notification_service, config=None,
+                 journal_service=None):
         """
         Khởi tạo bot giao dịch.
         
@@ -30,11 +52,13 @@ class BaseBot:
             order_service (OrderService): Dịch vụ quản lý lệnh
             notification_service (NotificationService): Dịch vụ thông báo
             config (dict, optional): Cấu hình cho bot
+            journal_service (JournalService, optional): Dịch vụ ghi nhật ký giao dịch
         """
         self.exchange_service = exchange_service
         self.balance_service = balance_service
         self.order_service = order_service
         self.notification_service = notification_service
+        self.journal_service = journal_service
         self.config = config or {}
         
         # Các biến chung
@@ -59,6 +83,22 @@ class BaseBot:
         self.crypto = {}  # Số dư crypto trên mỗi sàn
         self.crypto_per_transaction = 0  # Số lượng crypto mỗi giao dịch
         
+        # Ngưỡng hòa vốn sau phí tính trước cho từng cặp sàn
+        self.fee_table = BreakEvenTable(fees=self.config.get('fees', {}))
+        
+        # Lệnh được gửi trong luồng riêng để không chặn event loop dùng chung;
+        # chỉ cho phép một giao dịch đang thực hiện tại một thời điểm
+        self.trade_in_flight = False
+        
+        # Cầu dao kết nối theo sàn: sàn bị ngắt được xóa khỏi bid_prices/ask_prices
+        self.circuit_breakers = {}
+        
+        # Trạng thái hiển thị (được vẽ bởi StatusRenderer, không in trong vòng lặp xử lý)
+        self.best_opportunity = None  # (sàn mua, sàn bán, lợi nhuận sau phí USD hoặc None nếu chưa tính)
+        self.update_counts = {}  # Số lần cập nhật sách lệnh trên mỗi sàn
+        self.status_renderer = None
+        self.status_render_fps = STATUS_RENDER_FPS  # 0 = không vẽ bảng trạng thái
+        
         # Khởi tạo bắt CTRL+C
         if ENABLE_CTRL_C_HANDLING:
             signal.signal(signal.SIGINT, self._handle_interrupt)
@@ -76,12 +116,35 @@ class BaseBot:
         """
         self.symbol = symbol
         self.exchanges = exchanges
-        self.timeout = time.time() + timeout
+        self.timeout = clock.time() + timeout
         self.howmuchusd = float(amount_usd)
         self.indicatif = indicatif or symbol
+        self.fee_table = BreakEvenTable(
+            exchanges, self.config.get('fees', {}), self.fee_table.profit_pct, self.fee_table.profit_usd
+        )
         
         log_info(f"Cấu hình bot với: {symbol}, {exchanges}, {timeout}s, {amount_usd} USDT")
     
+    def set_fees(self, fees, profit_pct=None, profit_usd=None):
+        """
+        Cập nhật bảng phí (và tiêu chí lợi nhuận) rồi dựng lại bảng ngưỡng hòa vốn.
+        
+        Bảng mới được thay vào trong một phép gán nên vòng lặp xử lý sách lệnh không
+        bao giờ thấy bảng đang dựng dở.
+        
+        Args:
+            fees (dict): Phí theo sàn {'sàn': {'give': phí mua, 'receive': phí bán}}
+            profit_pct (float, optional): Lợi nhuận tối thiểu sau phí (%) (mặc định: giữ nguyên)
+            profit_usd (float, optional): Lợi nhuận tối thiểu sau phí (USD) (mặc định: giữ nguyên)
+        """
+        fee_table = self.fee_table
+        self.config['fees'] = fees
+        self.fee_table = BreakEvenTable(
+            self.exchanges, fees,
+            fee_table.profit_pct if profit_pct is None else profit_pct,
+            fee_table.profit_usd if profit_usd is None else profit_usd
+        )
+    
     async def start(self):
         """
         Bắt đầu chạy bot giao dịch.
@@ -102,7 +165,10 @@ class BaseBot:
             float: Tổng lợi nhuận (phần trăm)
         """
         # Cập nhật số dư với lợi nhuận
-        final_balance = self.balance_service.update_balance_with_profit(self.total_absolute_profit_pct)
+        final_balance = self.balance_service.update_balance_with_profit(self.total_absolute_profit_pct, self.howmuchusd)
+        
+        # Phiên kết thúc bình thường: phiên sau không khôi phục sổ cái này
+        self.balance_service.clear_ledgers(self.symbol)
         
         # Gửi thông báo kết thúc phiên
         message = (
@@ -116,6 +182,14 @@ class BaseBot:
         if self.notification_service:
             self.notification_service.send_message(message)
         
+        # Ghi nhật ký tổng kết phiên
+        if self.journal_service:
+            self.journal_service.record_session(
+                self.symbol, self.mode, self.exchanges, self.start_time, self.howmuchusd, final_balance,
+                self.total_absolute_profit_pct, (self.total_absolute_profit_pct / 100) * self.howmuchusd,
+                self.opportunity_count
+            )
+        
         return self.total_absolute_profit_pct
     
     def _handle_interrupt(self, sig, frame):
@@ -164,7 +238,11 @@ class BaseBot:
                 exchange_loops.append(self._exchange_loop(exchange_id))
                 
             # Chạy tất cả các vòng lặp
-            await gather(*exchange_loops)
+            self._start_status_renderer()
+            try:
+                await gather(*exchange_loops)
+            finally:
+                await self._stop_status_renderer()
             
             return self.total_absolute_profit_pct
             
@@ -172,16 +250,32 @@ class BaseBot:
             log_error(f"Lỗi trong vòng lặp theo dõi sách lệnh: {str(e)}")
             raise
     
-    async def _exchange_loop(self, exchange_id):
+    def _start_status_renderer(self):
+        """Khởi động tác vụ vẽ bảng trạng thái nếu được kích hoạt."""
+        if self.status_render_fps > 0 and self.status_renderer is None:
+            self.status_renderer = StatusRenderer(self, self.status_render_fps)
+            self.status_renderer.start()
+    
+    async def _stop_status_renderer(self):
+        """Dừng tác vụ vẽ bảng trạng thái."""
+        if self.status_renderer is not None:
+            await self.status_renderer.stop()
+            self.status_renderer = None
+    
+    async def _exchange_loop(self, exchange_id, symbol=None, handler=None):
         """
         Vòng lặp theo dõi sách lệnh cho một sàn giao dịch cụ thể.
         
         Args:
             exchange_id (str): ID của sàn giao dịch
+            symbol (str, optional): Cặp cần theo dõi (mặc định: self.symbol)
+            handler (callable, optional): Coroutine xử lý sách lệnh (mặc định: process_orderbook)
             
         Returns:
             None
         """
+        symbol = symbol or self.symbol
+        handler = handler or self.process_orderbook
         pro_exchange = None
         try:
             # Tạo đối tượng sàn giao dịch ccxt.pro
@@ -189,40 +283,93 @@ class BaseBot:
             pro_exchange = await self.exchange_service.get_pro_exchange(exchange_id)
             
             # Theo dõi sách lệnh cho đến khi hết thời gian
-            while time.time() <= self.timeout:
+            while clock.time() <= self.timeout:
                 try:
                     # Lấy thông tin sách lệnh mới nhất
-                    orderbook = await pro_exchange.watch_order_book(self.symbol)
-                    
+                    orderbook = await pro_exchange.watch_order_book(symbol)
+                except Exception as feed_error:
+                    pro_exchange = await self._on_feed_error(exchange_id, pro_exchange, feed_error)
+                    continue
+                
+                self._on_feed_success(exchange_id)
+                
+                try:
                     # Xử lý dữ liệu sách lệnh
-                    await self.process_orderbook(exchange_id, orderbook)
-                    
-                except ccxt.pro.NetworkError as network_error:
-                    log_warning(f"Lỗi kết nối với {exchange_id}: {str(network_error)}")
-                    await asyncio.sleep(1)  # Đợi một chút trước khi thử lại
-                    
+                    await handler(exchange_id, orderbook)
                 except Exception as loop_error:
-                    log_error(f"Lỗi trong vòng lặp {exchange_id}: {str(loop_error)}")
-                    await asyncio.sleep(1)  # Đợi một chút trước khi thử lại
+                    log_error(f"Lỗi trong vòng lặp {exchange_id}: {str(loop_error)}", key=f"loop:{exchange_id}")
                 
                 # Đợi một chút để giảm tải cho CPU
-                await asyncio.sleep(0.1)
+                await clock.async_sleep(0.1)
             
-            # Đóng kết nối với sàn giao dịch
+            # Kết nối được giữ lại để dùng cho phiên tiếp theo
             log_info(f"Kết thúc theo dõi sách lệnh trên sàn {exchange_id}")
-            if pro_exchange:
-                await pro_exchange.close()
                 
         except Exception as e:
             log_error(f"Lỗi khi khởi tạo vòng lặp cho {exchange_id}: {str(e)}")
             
-            # Đảm bảo kết nối được đóng đúng cách
+            # Tạo lại kết nối dùng chung có thể đã bị hỏng
             if pro_exchange:
                 try:
-                    await pro_exchange.close()
+                    await self.exchange_service.reset_pro_exchange(exchange_id)
                 except Exception:
                     pass
     
+    def _circuit_breaker(self, exchange_id):
+        """Lấy (hoặc tạo) cầu dao kết nối của một sàn."""
+        breaker = self.circuit_breakers.get(exchange_id)
+        if breaker is None:
+            breaker = self.circuit_breakers[exchange_id] = CircuitBreaker()
+        return breaker
+    
+    async def _on_feed_error(self, exchange_id, pro_exchange, error):
+        """
+        Xử lý lỗi khi nhận sách lệnh: chờ theo cầu dao của sàn và ngắt sàn khi lỗi lặp lại.
+        
+        Khi cầu dao ngắt, giá của sàn bị xóa khỏi bid_prices/ask_prices nên việc chọn
+        cơ hội bỏ qua sàn mà không cần kiểm tra thêm; giá được thêm lại khi yêu cầu
+        thăm dò nhận được sách lệnh mới.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            pro_exchange (object): Kết nối ccxt.pro hiện tại
+            error (Exception): Lỗi nhận được
+        
+        Returns:
+            object: Kết nối ccxt.pro dùng cho lần thử tiếp theo
+        """
+        breaker = self._circuit_breaker(exchange_id)
+        was_open = breaker.is_open
+        delay = breaker.record_failure()
+        
+        if isinstance(error, ccxt.pro.NetworkError):
+            log_warning(f"Lỗi kết nối với {exchange_id} (lần {breaker.failures}): {str(error)}")
+        else:
+            log_error(f"Lỗi khi nhận sách lệnh từ {exchange_id} (lần {breaker.failures}): {str(error)}", key=f"feed:{exchange_id}")
+        
+        if breaker.is_open:
+            self.bid_prices.pop(exchange_id, None)
+            self.ask_prices.pop(exchange_id, None)
+            if not was_open:
+                BREAKER_TRIPS.labels(exchange_id).inc()
+                log_warning(f"Ngắt sàn {exchange_id} sau {breaker.failures} lỗi liên tiếp, thử lại sau {delay:.1f}s")
+                
+                # Tạo lại kết nối dùng chung có thể đã bị hỏng
+                try:
+                    pro_exchange = await self.exchange_service.reset_pro_exchange(exchange_id)
+                except Exception as reset_error:
+                    log_error(f"Không thể tạo lại kết nối với {exchange_id}: {str(reset_error)}")
+        
+        await clock.async_sleep(delay)
+        breaker.allow_request()  # Hết thời gian chờ: lần thử tiếp theo là yêu cầu thăm dò
+        return pro_exchange
+    
+    def _on_feed_success(self, exchange_id):
+        """Đóng cầu dao của sàn sau khi nhận được sách lệnh."""
+        breaker = self.circuit_breakers.get(exchange_id)
+        if breaker is not None and breaker.failures and breaker.record_success():
+            log_info(f"Kết nối lại thành công với {exchange_id}")
+    
     async def process_orderbook(self, exchange_id, orderbook):
         """
         Xử lý dữ liệu sách lệnh nhận được từ sàn giao dịch.
@@ -234,7 +381,11 @@ class BaseBot:
         Returns:
             bool: True nếu phát hiện cơ hội giao dịch, ngược lại False
         """
+        started = time.perf_counter()
+        
         # Cập nhật giá mua và bán tốt nhất
+        self.update_counts[exchange_id] = self.update_counts.get(exchange_id, 0) + 1
+        ORDERBOOK_UPDATES.labels(exchange_id).inc()
         self.bid_prices[exchange_id] = orderbook["bids"][0][0]  # Giá mua cao nhất
         self.ask_prices[exchange_id] = orderbook["asks"][0][0]  # Giá bán thấp nhất
         
@@ -242,8 +393,11 @@ class BaseBot:
         min_ask_ex = min(self.ask_prices, key=self.ask_prices.get)
         max_bid_ex = max(self.bid_prices, key=self.bid_prices.get)
         
-        # Điều chỉnh lựa chọn sàn dựa trên số dư
+        # Điều chỉnh lựa chọn sàn dựa trên số dư (bỏ qua sàn chưa có giá hoặc đã bị ngắt)
         for exchange in self.exchanges:
+            if exchange not in self.ask_prices:
+                continue
+            
             # Nếu không đủ crypto, chọn sàn này để mua
             if exchange in self.crypto and self.crypto[exchange] < self.crypto_per_transaction:
                 min_ask_ex = exchange
@@ -262,63 +416,49 @@ class BaseBot:
         if total_usd_amount <= 0:
             return False
         
-        # Tính lợi nhuận trước phí
-        crypto_amount = self.crypto_per_transaction
-        profit_usd = crypto_amount * (self.max_bid_price - self.min_ask_price)
-        profit_pct = (profit_usd / total_usd_amount) * 100
-        
-        # Tính phí giao dịch
-        fees = self.config.get('fees', {})
-        fee_rate_buy = fees.get(min_ask_ex, {}).get('give', 0.001)
-        fee_rate_sell = fees.get(max_bid_ex, {}).get('receive', 0.001)
-        
-        fee_buy = crypto_amount * self.min_ask_price * fee_rate_buy
-        fee_sell = crypto_amount * self.max_bid_price * fee_rate_sell
-        total_fees = fee_buy + fee_sell
+        # Kiểm tra nhanh ngưỡng hòa vốn sau phí; chỉ tính lợi nhuận đầy đủ cho ứng viên
+        fee_table = self.fee_table
+        if fee_table.prefilter and self.max_bid_price <= self.min_ask_price * fee_table.ratio(min_ask_ex, max_bid_ex):
+            self.best_opportunity = (min_ask_ex, max_bid_ex, None)
+            PREFILTER_REJECTED.inc()
+            DECISION_LATENCY.observe(time.perf_counter() - started)
+            # Vẫn ghi nhật ký cơ hội, không có lợi nhuận vì chưa được tính
+            if self.journal_service:
+                self.journal_service.record_opportunity(
+                    self.symbol, min_ask_ex, max_bid_ex, self.min_ask_price, self.max_bid_price,
+                    self.crypto_per_transaction, None, None, False, reason='below_break_even'
+                )
+            return False
         
         # Tính lợi nhuận sau phí
-        profit_with_fees_usd = profit_usd - total_fees
+        crypto_amount = self.crypto_per_transaction
+        profit_with_fees_usd = fee_table.net_profit_usd(
+            min_ask_ex, max_bid_ex, self.min_ask_price, self.max_bid_price, crypto_amount
+        )
         profit_with_fees_pct = (profit_with_fees_usd / total_usd_amount) * 100
         
-        # Hiển thị thông tin về cơ hội tốt nhất
-        self._display_best_opportunity(min_ask_ex, max_bid_ex, profit_with_fees_usd)
+        # Ghi nhận cơ hội tốt nhất để bảng trạng thái hiển thị
+        self.best_opportunity = (min_ask_ex, max_bid_ex, profit_with_fees_usd)
         
         # Kiểm tra điều kiện để thực hiện giao dịch
-        if self._should_execute_trade(min_ask_ex, max_bid_ex, profit_with_fees_usd, profit_with_fees_pct):
+        should_execute = self._should_execute_trade(min_ask_ex, max_bid_ex, profit_with_fees_usd, profit_with_fees_pct)
+        PREFILTER_EVALUATED.inc()
+        DECISION_LATENCY.observe(time.perf_counter() - started)
+        
+        # Ghi nhật ký cơ hội đã đánh giá
+        if self.journal_service:
+            self.journal_service.record_opportunity(
+                self.symbol, min_ask_ex, max_bid_ex, self.min_ask_price, self.max_bid_price,
+                crypto_amount, profit_with_fees_usd, profit_with_fees_pct, should_execute
+            )
+        
+        if should_execute:
             # Thực hiện giao dịch
             await self._execute_trade(min_ask_ex, max_bid_ex, profit_with_fees_pct, profit_with_fees_usd)
             return True
             
         return False
     
-    def _display_best_opportunity(self, min_ask_ex, max_bid_ex, profit_with_fees_usd):
-        """
-        Hiển thị thông tin về cơ hội giao dịch tốt nhất hiện tại.
-        
-        Args:
-            min_ask_ex (str): Tên sàn có giá mua thấp nhất
-            max_bid_ex (str): Tên sàn có giá bán cao nhất
-            profit_with_fees_usd (float): Lợi nhuận sau phí tính theo USD
-        """
-        # Xác định màu hiển thị dựa trên lợi nhuận
-        if profit_with_fees_usd < 0:
-            color = Fore.RED
-        elif profit_with_fees_usd > 0:
-            color = Fore.GREEN
-        else:
-            color = Fore.WHITE
-        
-        # Hiển thị thông tin
-        for count in range(0, 1):
-            sys.stdout.write("\033[F")
-            sys.stdout.write("\033[K")
-            
-        print(
-            f"{Style.DIM}[{show_time()}]{Style.RESET_ALL} "
-            f"Cơ hội tốt nhất: {color}{round(profit_with_fees_usd, 4)} USD {Style.RESET_ALL}(sau phí)       "
-            f"mua: {min_ask_ex} ở {self.min_ask_price}     bán: {max_bid_ex} ở {self.max_bid_price}"
-        )
-    
     def _should_execute_trade(self, min_ask_ex, max_bid_ex, profit_with_fees_usd, profit_with_fees_pct):
         """
         Kiểm tra xem có nên thực hiện giao dịch hay không.
@@ -337,10 +477,7 @@ class BaseBot:
             return False
         
         # Kiểm tra điều kiện lợi nhuận
-        if profit_with_fees_usd <= float(PROFIT_CRITERIA_USD):
-            return False
-            
-        if profit_with_fees_pct <= float(PROFIT_CRITERIA_PCT):
+        if not self.fee_table.meets_criteria(profit_with_fees_usd, profit_with_fees_pct):
             return False
         
         # Kiểm tra xem giá có thay đổi so với giao dịch trước đó không
@@ -370,6 +507,11 @@ class BaseBot:
         Returns:
             bool: True nếu giao dịch thành công, ngược lại False
         """
+        # Bỏ qua cơ hội mới khi giao dịch trước chưa hoàn tất
+        if self.trade_in_flight:
+            return False
+        
+        self.trade_in_flight = True
         try:
             # Tăng số lượng cơ hội đã phát hiện
             self.opportunity_count += 1
@@ -378,9 +520,8 @@ class BaseBot:
             self._update_balances_after_trade(min_ask_ex, max_bid_ex)
             
             # Tính toán phí giao dịch
-            fees = self.config.get('fees', {})
-            fee_rate_buy = fees.get(min_ask_ex, {}).get('give', 0.001)
-            fee_rate_sell = fees.get(max_bid_ex, {}).get('receive', 0.001)
+            fee_rate_buy = self.fee_table.buy_fee[min_ask_ex]
+            fee_rate_sell = self.fee_table.sell_fee[max_bid_ex]
             
             fee_crypto = self.crypto_per_transaction * (fee_rate_buy + fee_rate_sell)
             fee_usd = (self.crypto_per_transaction * self.max_bid_price * fee_rate_sell) + (self.crypto_per_transaction * self.min_ask_price * fee_rate_buy)
@@ -391,17 +532,23 @@ class BaseBot:
             # Tạo báo cáo giao dịch
             self._display_trade_report(min_ask_ex, max_bid_ex, profit_with_fees_pct, profit_with_fees_usd, fee_usd, fee_crypto)
             
+            # Giữ lại giá và số lượng vì các vòng lặp khác vẫn cập nhật trong lúc chờ lệnh
+            amount = self.crypto_per_transaction
+            min_ask_price = self.min_ask_price
+            max_bid_price = self.max_bid_price
+            
+            # Cập nhật giá trước đó ngay để cùng mức giá không mở thêm giao dịch
+            self.prec_ask_price = min_ask_price
+            self.prec_bid_price = max_bid_price
+            
             # Đặt lệnh giao dịch
-            self.order_service.place_arbitrage_orders(
+            await asyncio.to_thread(
+                self.order_service.place_arbitrage_orders,
                 min_ask_ex, max_bid_ex, self.symbol,
-                self.crypto_per_transaction, self.min_ask_price, self.max_bid_price,
+                amount, min_ask_price, max_bid_price,
                 self.notification_service
             )
             
-            # Cập nhật giá trước đó
-            self.prec_ask_price = self.min_ask_price
-            self.prec_bid_price = self.max_bid_price
-            
             # Cập nhật số lượng crypto mỗi giao dịch
             self._update_transaction_amount()
             
@@ -410,6 +557,8 @@ class BaseBot:
         except Exception as e:
             log_error(f"Lỗi khi thực hiện giao dịch: {str(e)}")
             return False
+        finally:
+            self.trade_in_flight = False
     
     def _update_balances_after_trade(self, min_ask_ex, max_bid_ex):
         """
@@ -420,9 +569,8 @@ class BaseBot:
             max_bid_ex (str): Tên sàn có giá bán cao nhất
         """
         # Cập nhật số dư trên sàn mua
-        fees = self.config.get('fees', {})
-        buy_fee_rate = fees.get(min_ask_ex, {}).get('give', 0.001)
-        sell_fee_rate = fees.get(max_bid_ex, {}).get('receive', 0.001)
+        buy_fee_rate = self.fee_table.buy_fee[min_ask_ex]
+        sell_fee_rate = self.fee_table.sell_fee[max_bid_ex]
         
         # Tăng số dư crypto trên sàn mua
         self.crypto[min_ask_ex] += self.crypto_per_transaction * (1 - buy_fee_rate)
@@ -435,6 +583,25 @@ class BaseBot:
         
         # Tăng số dư USDT trên sàn bán
         self.usd[max_bid_ex] += self.crypto_per_transaction * self.max_bid_price * (1 - sell_fee_rate)
+        
+        # Lưu sổ cái ảo để có thể khôi phục sau khi khởi động lại
+        self.balance_service.save_ledgers(self.symbol, self.usd, self.crypto, self.mode)
+    
+    def _restore_ledgers(self):
+        """
+        Khôi phục sổ cái ảo của phiên trước bị dừng đột ngột (cùng chế độ, cùng các sàn).
+        
+        Returns:
+            bool: True nếu đã khôi phục, False nếu cần khởi tạo số dư mới
+        """
+        ledgers = self.balance_service.load_ledgers(self.symbol, self.mode)
+        if not ledgers or set(ledgers['usd']) != set(self.exchanges) or set(ledgers['crypto']) != set(self.exchanges):
+            return False
+        
+        self.usd = dict(ledgers['usd'])
+        self.crypto = dict(ledgers['crypto'])
+        log_warning(f"Đã khôi phục sổ cái ảo {self.symbol} của phiên trước bị dừng đột ngột.")
+        return True
     
     def _update_transaction_amount(self):
         """
@@ -458,9 +625,9 @@ class BaseBot:
             fee_usd (float): Phí tính theo USD
             fee_crypto (float): Phí tính theo crypto
         """
-        # Xóa dòng hiện tại
-        sys.stdout.write("\033[F")
-        sys.stdout.write("\033[K")
+        # Xóa bảng trạng thái để in báo cáo
+        if self.status_renderer:
+            self.status_renderer.clear()
         
         # In đường phân cách
         print("-----------------------------------------------------\n")
@@ -471,7 +638,7 @@ class BaseBot:
             ex_balances += f"\n➝ {exchange}: {round(self.crypto[exchange], 3)} {extract_base_asset(self.symbol)} / {round(self.usd[exchange], 2)} USDT"
         
         # In thông tin giao dịch
-        elapsed_time = time.strftime('%H:%M:%S', time.gmtime(time.time() - self.start_time))
+        elapsed_time = time.strftime('%H:%M:%S', time.gmtime(clock.time() - self.start_time))
         current_worth = round((self.howmuchusd * (1 + (self.total_absolute_profit_pct / 100))), 3)
         
         print(
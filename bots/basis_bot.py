@@ -0,0 +1,490 @@
+"""
+Bot chênh lệch giá spot–perp: mua spot và short hợp đồng vĩnh viễn khi basis đủ lớn.
+"""
+import time
+import asyncio
+from asyncio import gather
+import traceback
+
+from utils import clock
+from utils.logger import log_info, log_error, log_warning, log_debug, log_critical
+from utils.exceptions import InsufficientBalanceError
+from utils.helpers import extract_base_asset
+from utils.circuit_breaker import CircuitBreaker
+from bots.base_bot import BaseBot, ORDERBOOK_UPDATES, DECISION_LATENCY
+from services.funding_monitor import HOURS_PER_YEAR
+from configs import (
+    EXCHANGE_FEES, DEFAULT_FUTURES_EXCHANGE, DEFAULT_LEVERAGE, MIN_FUTURES_QUANTITY,
+    BASIS_ENTRY_PCT, BASIS_EXIT_PCT, BASIS_HOLD_HOURS
+)
+
+
+class BasisBot(BaseBot):
+    """
+    Bot chênh lệch giá spot–perp (cash-and-carry).
+
+    Theo dõi sách lệnh spot trên các sàn đã cấu hình và sách lệnh hợp đồng vĩnh viễn
+    trên sàn futures trong cùng một vòng lặp. Khi giá bid của hợp đồng cao hơn giá ask
+    spot rẻ nhất đủ để bù phí hai chiều của cả hai chân (cộng funding dự kiến nhận được
+    khi short), bot mua spot và short hợp đồng cùng lúc; vị thế được đóng khi basis hội tụ
+    hoặc khi phiên kết thúc. Mỗi lúc chỉ giữ một vị thế.
+    """
+
+    mode = 'basis'
+
+    def __init__(self, exchange_service, balance_service, order_service, notification_service, journal_service=None):
+        """
+        Khởi tạo bot chênh lệch giá spot–perp.
+
+        Args:
+            exchange_service (ExchangeService): Dịch vụ sàn giao dịch
+            balance_service (BalanceService): Dịch vụ quản lý số dư
+            order_service (OrderService): Dịch vụ quản lý lệnh
+            notification_service (NotificationService): Dịch vụ thông báo
+            journal_service (JournalService, optional): Dịch vụ ghi nhật ký giao dịch
+        """
+        super().__init__(
+            exchange_service,
+            balance_service,
+            order_service,
+            notification_service,
+            {'fees': EXCHANGE_FEES},
+            journal_service=journal_service
+        )
+
+        self.futures_exchange = DEFAULT_FUTURES_EXCHANGE  # Sàn hợp đồng vĩnh viễn
+        self.funding_monitor = None  # Bộ theo dõi funding rate dùng chung của môi trường chạy
+        self.perp_symbol = None  # Ký hiệu hợp nhất của hợp đồng (vd: BTC/USDT:USDT)
+        self.perp_bid = None
+        self.perp_ask = None
+        self.contract_size = 1.0  # Số crypto mỗi hợp đồng
+        self.leverage = DEFAULT_LEVERAGE
+        self.position_usd = 0  # Giá trị spot của mỗi vị thế
+        self.position = None  # Vị thế đang mở
+        self.close_breaker = CircuitBreaker()  # Thời gian chờ tăng dần giữa các lần đóng vị thế thất bại
+        self.close_retry_at = 0.0  # Thời điểm (monotonic) được thử đóng lại
+
+        self.stats = {
+            'opportunities_found': 0,
+            'trades_executed': 0,
+            'failed_trades': 0,
+            'total_volume': 0
+        }
+
+    def configure(self, symbol, exchanges, timeout, amount_usd, indicatif=None):
+        """
+        Cấu hình bot giao dịch (xem BaseBot.configure).
+        """
+        super().configure(symbol, exchanges, timeout, amount_usd, indicatif)
+        self.perp_symbol = f"{extract_base_asset(symbol)}/USDT:USDT"
+
+    async def start(self):
+        """
+        Bắt đầu chạy bot chênh lệch giá spot–perp.
+
+        Returns:
+            float: Tổng lợi nhuận (phần trăm)
+        """
+        try:
+            log_info(f"Bắt đầu phiên giao dịch basis với tham số: {self.symbol}, {self.exchanges}, {self.howmuchusd} USDT")
+            self.start_time = clock.time()
+
+            # Chọn sàn hợp đồng có funding tốt nhất cho vị thế short
+            if self.funding_monitor is not None:
+                try:
+                    await self.funding_monitor.start([self.symbol])
+                    self.futures_exchange = self.funding_monitor.select_venue(self.symbol, self.futures_exchange)
+                except Exception as e:
+                    log_warning(f"Không thể chọn sàn hợp đồng theo funding rate: {str(e)}")
+
+            # Một nửa số tiền cho chân spot, một nửa làm ký quỹ cho chân futures
+            self.position_usd = self.howmuchusd / 2
+            try:
+                await asyncio.to_thread(self.balance_service.check_balances, self.exchanges, 'USDT', self.position_usd, self.notification_service)
+            except InsufficientBalanceError as e:
+                log_error(f"Không đủ số dư: {str(e)}")
+                return 0
+
+            futures_balance = await asyncio.to_thread(self.balance_service.get_balance, self.futures_exchange, 'USDT')
+            if futures_balance < self.position_usd / self.leverage:
+                log_error(f"Số dư trên {self.futures_exchange} không đủ: {futures_balance} USDT")
+                return 0
+
+            await self._load_contract_size()
+
+            self.usd = self.balance_service.initialize_balances(self.exchanges, self.symbol, self.position_usd)
+            self.crypto = {exchange: 0 for exchange in self.exchanges}
+
+            await self._start_orderbook_loop()
+
+            return await self.stop()
+
+        except Exception as e:
+            log_error(f"Lỗi khi chạy bot basis: {str(e)}")
+            log_debug(f"Chi tiết lỗi: {traceback.format_exc()}")
+
+            if self.position is not None:
+                try:
+                    await self._close_position()
+                except Exception as cleanup_error:
+                    log_error(f"Lỗi khi đóng vị thế basis: {str(cleanup_error)}")
+
+            return 0
+
+    async def _load_contract_size(self):
+        """Lấy kích thước hợp đồng từ thông tin thị trường của sàn futures."""
+        try:
+            exchange = self.exchange_service.get_exchange(self.futures_exchange)
+            await asyncio.to_thread(exchange.load_markets)
+            market = exchange.market(self.perp_symbol)
+            if market.get('contractSize'):
+                self.contract_size = float(market['contractSize'])
+        except Exception as e:
+            log_warning(f"Không thể lấy kích thước hợp đồng {self.perp_symbol} trên {self.futures_exchange}: {str(e)}")
+
+    async def _start_orderbook_loop(self):
+        """
+        Theo dõi sách lệnh spot trên các sàn và sách lệnh hợp đồng trên sàn futures.
+
+        Returns:
+            float: Tổng lợi nhuận (phần trăm)
+        """
+        try:
+            exchange_loops = [self._exchange_loop(exchange_id) for exchange_id in self.exchanges]
+            exchange_loops.append(
+                self._exchange_loop(self.futures_exchange, self.perp_symbol, self.process_perp_orderbook)
+            )
+
+            self._start_status_renderer()
+            try:
+                await gather(*exchange_loops)
+            finally:
+                await self._stop_status_renderer()
+
+            return self.total_absolute_profit_pct
+
+        except Exception as e:
+            log_error(f"Lỗi trong vòng lặp theo dõi sách lệnh: {str(e)}")
+            raise
+
+    async def process_orderbook(self, exchange_id, orderbook):
+        """
+        Xử lý sách lệnh spot.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            orderbook (dict): Dữ liệu sách lệnh
+
+        Returns:
+            bool: True nếu đã mở hoặc đóng vị thế, ngược lại False
+        """
+        started = time.perf_counter()
+        self.update_counts[exchange_id] = self.update_counts.get(exchange_id, 0) + 1
+        ORDERBOOK_UPDATES.labels(exchange_id).inc()
+        self.bid_prices[exchange_id] = orderbook["bids"][0][0]
+        self.ask_prices[exchange_id] = orderbook["asks"][0][0]
+        return await self._evaluate(started)
+
+    async def process_perp_orderbook(self, exchange_id, orderbook):
+        """
+        Xử lý sách lệnh của hợp đồng vĩnh viễn.
+
+        Args:
+            exchange_id (str): ID của sàn futures
+            orderbook (dict): Dữ liệu sách lệnh
+
+        Returns:
+            bool: True nếu đã mở hoặc đóng vị thế, ngược lại False
+        """
+        started = time.perf_counter()
+        ORDERBOOK_UPDATES.labels(f"{exchange_id}:perp").inc()
+        self.perp_bid = orderbook["bids"][0][0]
+        self.perp_ask = orderbook["asks"][0][0]
+        return await self._evaluate(started)
+
+    def expected_funding(self):
+        """
+        Funding dự kiến nhận được khi short trong BASIS_HOLD_HOURS.
+
+        Returns:
+            float: Tỷ lệ trên giá trị vị thế (âm nếu vị thế short phải trả funding)
+        """
+        if self.funding_monitor is None:
+            return 0.0
+        carry = self.funding_monitor.carry(self.symbol).get(self.futures_exchange)
+        if carry is None:
+            return 0.0
+        return carry['funding_apr'] * BASIS_HOLD_HOURS / HOURS_PER_YEAR
+
+    def entry_edge_pct(self, spot_exchange, spot_ask, perp_bid):
+        """
+        Lợi nhuận kỳ vọng của một vị thế mới sau phí hai chiều và funding.
+
+        Giả định basis hội tụ về BASIS_EXIT_PCT khi đóng vị thế.
+
+        Args:
+            spot_exchange (str): Sàn mua spot
+            spot_ask (float): Giá ask spot
+            perp_bid (float): Giá bid của hợp đồng
+
+        Returns:
+            float: Lợi nhuận kỳ vọng (phần trăm trên giá trị vị thế)
+        """
+        fee_table = self.fee_table
+        fee_table.ratio(spot_exchange, self.futures_exchange)  # Thêm phí của sàn nếu chưa có
+        fees = (
+            fee_table.buy_fee[spot_exchange] + fee_table.sell_fee[spot_exchange]
+            + fee_table.sell_fee[self.futures_exchange] + fee_table.buy_fee[self.futures_exchange]
+        )
+        entry_basis = perp_bid / spot_ask - 1
+        return (entry_basis - BASIS_EXIT_PCT / 100 - fees + self.expected_funding()) * 100
+
+    def _position_contracts(self, spot_ask):
+        """Số hợp đồng của một vị thế mới (0 nếu dưới mức tối thiểu)."""
+        contracts = int(self.position_usd / spot_ask / self.contract_size)
+        return contracts if contracts >= MIN_FUTURES_QUANTITY else 0
+
+    async def _evaluate(self, started):
+        """
+        Đánh giá basis hiện tại: mở vị thế mới hoặc đóng vị thế đang giữ.
+
+        Args:
+            started (float): Thời điểm nhận sách lệnh (perf_counter)
+
+        Returns:
+            bool: True nếu đã mở hoặc đóng vị thế, ngược lại False
+        """
+        if self.perp_bid is None or not self.ask_prices or self.trade_in_flight:
+            return False
+
+        if self.position is not None:
+            if clock.monotonic() < self.close_retry_at:
+                # Lần đóng trước thất bại: chờ hết thời gian chờ thay vì thử lại ở mỗi cập nhật
+                return False
+            if self.position.get('unwind'):
+                # Chân còn sót của một vị thế không mở được: đóng lại, không chờ basis hội tụ
+                return await self._close_position()
+            return await self._check_exit()
+
+        spot_exchange = min(self.ask_prices, key=self.ask_prices.get)
+        spot_ask = self.ask_prices[spot_exchange]
+        perp_bid = self.perp_bid
+
+        contracts = self._position_contracts(spot_ask)
+        quantity = contracts * self.contract_size
+        edge_pct = self.entry_edge_pct(spot_exchange, spot_ask, perp_bid)
+        edge_usd = edge_pct / 100 * quantity * spot_ask
+
+        # Trạng thái hiển thị: mua spot, bán hợp đồng
+        self.min_ask_price = spot_ask
+        self.max_bid_price = perp_bid
+        self.crypto_per_transaction = quantity
+        self.best_opportunity = (spot_exchange, self.futures_exchange, edge_usd)
+
+        should_open = contracts > 0 and edge_pct >= BASIS_ENTRY_PCT
+        DECISION_LATENCY.observe(time.perf_counter() - started)
+
+        if edge_pct > 0 and self.journal_service:
+            self.journal_service.record_opportunity(
+                self.symbol, spot_exchange, self.futures_exchange, spot_ask, perp_bid,
+                quantity, edge_usd, edge_usd / self.howmuchusd * 100, should_open
+            )
+
+        if not should_open:
+            return False
+
+        self.stats['opportunities_found'] += 1
+        return await self._open_position(spot_exchange, spot_ask, perp_bid, contracts)
+
+    async def _check_exit(self):
+        """Đóng vị thế khi basis đã hội tụ về BASIS_EXIT_PCT."""
+        spot_bid = self.bid_prices.get(self.position['spot_exchange'])
+        if spot_bid is None or self.perp_ask is None:
+            return False
+
+        exit_basis_pct = (self.perp_ask / spot_bid - 1) * 100
+        if exit_basis_pct > BASIS_EXIT_PCT:
+            return False
+
+        return await self._close_position()
+
+    async def _open_position(self, spot_exchange, spot_ask, perp_bid, contracts):
+        """
+        Mua spot và short hợp đồng đồng thời (lệnh thị trường, trong luồng riêng).
+
+        Nếu chỉ một chân thành công, chân đó được đóng lại ngay; nếu không đóng được, chân
+        đó được giữ làm vị thế (đánh dấu 'unwind') để thử lại sau thời gian chờ hoặc khi stop().
+
+        Returns:
+            bool: True nếu cả hai chân đều thành công
+        """
+        self.trade_in_flight = True
+        self.opportunity_count += 1
+        quantity = contracts * self.contract_size
+        try:
+            spot_result, perp_result = await gather(
+                asyncio.to_thread(self.order_service.place_market_order, spot_exchange, self.symbol, 'buy', quantity),
+                asyncio.to_thread(
+                    self.order_service.place_futures_short_order,
+                    self.futures_exchange, self.perp_symbol, contracts, self.leverage
+                ),
+                return_exceptions=True
+            )
+
+            failed = [leg for leg, result in (('spot', spot_result), ('perp', perp_result)) if isinstance(result, Exception)]
+            if failed:
+                self.stats['failed_trades'] += 1
+                for leg, result in (('spot', spot_result), ('perp', perp_result)):
+                    if isinstance(result, Exception):
+                        log_error(f"Không thể mở chân {leg} của vị thế basis: {str(result)}")
+                remaining = await self._close_legs(spot_exchange, quantity, contracts, {'spot', 'perp'} - set(failed))
+                if remaining:
+                    # Không bỏ quên chân đang mở: giữ lại để thử đóng ở lần cập nhật sau
+                    self.position = {
+                        'spot_exchange': spot_exchange,
+                        'quantity': quantity,
+                        'contracts': contracts,
+                        'spot_price': spot_ask,
+                        'perp_price': perp_bid,
+                        'opened_at': clock.time(),
+                        'legs': remaining,
+                        'unwind': True,
+                    }
+                    log_critical(f"Chân {', '.join(sorted(remaining))} của vị thế basis chưa đóng được, sẽ thử lại.", telegram=self.notification_service)
+                    self._defer_close(remaining)
+                return False
+
+            buy_fee = self.fee_table.buy_fee[spot_exchange]
+            self.crypto[spot_exchange] = self.crypto.get(spot_exchange, 0) + quantity * (1 - buy_fee)
+            self.usd[spot_exchange] = self.usd.get(spot_exchange, 0) - quantity * spot_ask
+            self.position = {
+                'spot_exchange': spot_exchange,
+                'quantity': quantity,
+                'contracts': contracts,
+                'spot_price': spot_ask,
+                'perp_price': perp_bid,
+                'opened_at': clock.time(),
+            }
+            self.stats['trades_executed'] += 1
+            self.stats['total_volume'] += quantity * spot_ask
+
+            message = (
+                f"Mở vị thế basis #{self.opportunity_count}: mua {quantity} {extract_base_asset(self.symbol)} "
+                f"trên {spot_exchange} ở giá {spot_ask}, short {contracts} hợp đồng trên {self.futures_exchange} "
+                f"ở giá {perp_bid} (basis {(perp_bid / spot_ask - 1) * 100:.4f}%)"
+            )
+            log_info(message)
+            if self.notification_service:
+                self.notification_service.send_message(message)
+            return True
+        finally:
+            self.trade_in_flight = False
+
+    async def _close_legs(self, spot_exchange, quantity, contracts, legs):
+        """
+        Đóng các chân còn mở (bán spot, mua lại hợp đồng) đồng thời.
+
+        Returns:
+            set: Các chân chưa đóng được
+        """
+        calls = {}
+        if 'spot' in legs:
+            calls['spot'] = asyncio.to_thread(
+                self.order_service.place_market_order, spot_exchange, self.symbol, 'sell', quantity
+            )
+        if 'perp' in legs:
+            calls['perp'] = asyncio.to_thread(
+                self.order_service.close_futures_short_order,
+                self.futures_exchange, self.perp_symbol, contracts, self.leverage
+            )
+
+        results = await gather(*calls.values(), return_exceptions=True)
+        remaining = set()
+        for leg, result in zip(calls, results):
+            if isinstance(result, Exception):
+                log_error(f"Không thể đóng chân {leg} của vị thế basis: {str(result)}")
+                remaining.add(leg)
+        return remaining
+
+    def _defer_close(self, legs):
+        """Hoãn lần đóng tiếp theo theo thời gian chờ tăng dần của close_breaker."""
+        delay = self.close_breaker.record_failure()
+        self.close_retry_at = clock.monotonic() + delay
+        log_warning(f"Thử đóng lại chân {', '.join(sorted(legs))} của vị thế basis sau {delay:.1f} giây.")
+
+    async def _close_position(self):
+        """
+        Đóng vị thế đang giữ và ghi nhận lợi nhuận.
+
+        Returns:
+            bool: True nếu cả hai chân đã được đóng
+        """
+        position = self.position
+        self.trade_in_flight = True
+        try:
+            spot_exchange = position['spot_exchange']
+            quantity = position['quantity']
+            spot_bid = self.bid_prices.get(spot_exchange, position['spot_price'])
+            perp_ask = self.perp_ask or position['perp_price']
+
+            legs = position.get('legs', {'spot', 'perp'})
+            remaining = await self._close_legs(spot_exchange, quantity, position['contracts'], legs)
+            if remaining:
+                # Giữ các chân chưa đóng để thử lại sau thời gian chờ
+                position['legs'] = remaining
+                self.stats['failed_trades'] += 1
+                self._defer_close(remaining)
+                return False
+            self.close_breaker.record_success()
+            self.close_retry_at = 0.0
+
+            if position.get('unwind'):
+                # Vị thế chưa từng mở đủ hai chân: không có lợi nhuận để ghi nhận
+                self.position = None
+                log_warning(f"Đã đóng chân {', '.join(sorted(position['legs']))} còn sót của vị thế basis không mở được.")
+                return True
+
+            fee_table = self.fee_table
+            spot_pnl = quantity * (
+                spot_bid * (1 - fee_table.sell_fee[spot_exchange])
+                - position['spot_price'] * (1 + fee_table.buy_fee[spot_exchange])
+            )
+            perp_pnl = quantity * (
+                position['perp_price'] * (1 - fee_table.sell_fee[self.futures_exchange])
+                - perp_ask * (1 + fee_table.buy_fee[self.futures_exchange])
+            )
+            profit_usd = spot_pnl + perp_pnl
+            profit_pct = profit_usd / self.howmuchusd * 100
+            self.total_absolute_profit_pct += profit_pct
+
+            self.crypto[spot_exchange] = 0
+            self.usd[spot_exchange] = self.usd.get(spot_exchange, 0) + quantity * spot_bid * (1 - fee_table.sell_fee[spot_exchange])
+            self.position = None
+
+            held = time.strftime('%H:%M:%S', time.gmtime(clock.time() - position['opened_at']))
+            message = (
+                f"Đóng vị thế basis sau {held}: bán spot trên {spot_exchange} ở giá {spot_bid}, "
+                f"mua lại hợp đồng trên {self.futures_exchange} ở giá {perp_ask}. "
+                f"Lợi nhuận: {profit_pct:.4f}% ({profit_usd:.4f} USD, chưa tính funding)"
+            )
+            log_info(message)
+            if self.notification_service:
+                self.notification_service.send_message(message)
+            return True
+        finally:
+            self.trade_in_flight = False
+
+    async def stop(self):
+        """
+        Đóng vị thế đang giữ và kết thúc phiên.
+
+        Returns:
+            float: Tổng lợi nhuận (phần trăm)
+        """
+        if self.position is not None:
+            try:
+                await self._close_position()
+            except Exception as e:
+                log_error(f"Lỗi khi đóng vị thế basis: {str(e)}")
+
+        return await super().stop()
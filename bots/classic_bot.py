@@ -4,9 +4,9 @@ Bot giao dịch chênh lệch giá cổ điển, mua ở sàn giá thấp và b
 import time
 import asyncio
 from asyncio import gather
-import ccxt.pro
 import traceback
 
+from utils import clock
 from utils.logger import log_info, log_error, log_warning, log_debug
 from utils.exceptions import ArbitrageError, ExchangeError, InsufficientBalanceError, OrderError
 from utils.helpers import calculate_average
@@ -19,7 +19,9 @@ class ClassicBot(BaseBot):
     Bot giao dịch chênh lệch giá cổ điển, mua ở sàn giá thấp và bán ở sàn giá cao.
     """
     
-    def __init__(self, exchange_service, balance_service, order_service, notification_service):
+    mode = 'classic'
+    
+    def __init__(self, exchange_service, balance_service, order_service, notification_service, journal_service=None):
         """
         Khởi tạo bot giao dịch chênh lệch giá cổ điển.
         
@@ -28,13 +30,15 @@ class ClassicBot(BaseBot):
             balance_service (BalanceService): Dịch vụ quản lý số dư
             order_service (OrderService): Dịch vụ quản lý lệnh
             notification_service (NotificationService): Dịch vụ thông báo
+            journal_service (JournalService, optional): Dịch vụ ghi nhật ký giao dịch
         """
         super().__init__(
             exchange_service, 
             balance_service, 
             order_service, 
             notification_service,
-            {'fees': EXCHANGE_FEES}
+            {'fees': EXCHANGE_FEES},
+            journal_service=journal_service
         )
         
         # Thêm biến theo dõi số lần thử lại và thống kê
@@ -62,11 +66,11 @@ class ClassicBot(BaseBot):
         """
         try:
             log_info(f"Bắt đầu phiên giao dịch với tham số: {self.symbol}, {self.exchanges}, {self.howmuchusd} USDT")
-            self.start_time = time.time()
+            self.start_time = clock.time()
             
             # Kiểm tra số dư
             try:
-                self.balance_service.check_balances(self.exchanges, 'USDT', self.howmuchusd, self.notification_service)
+                await asyncio.to_thread(self.balance_service.check_balances, self.exchanges, 'USDT', self.howmuchusd, self.notification_service)
             except InsufficientBalanceError as e:
                 log_error(f"Không đủ số dư: {str(e)}")
                 self.error_counts['balance'] += 1
@@ -86,7 +90,7 @@ class ClassicBot(BaseBot):
                     prices = []
                     for exchange_id in self.exchanges:
                         try:
-                            ticker = self.exchange_service.get_ticker(exchange_id, self.symbol)
+                            ticker = await asyncio.to_thread(self.exchange_service.get_ticker, exchange_id, self.symbol)
                             prices.append((ticker['bid'] + ticker['ask']) / 2)
                         except Exception:
                             continue
@@ -115,7 +119,8 @@ class ClassicBot(BaseBot):
             for attempt in range(self.max_retries):
                 try:
                     log_info(f"Lần thử {attempt+1}/{self.max_retries} đặt lệnh mua ban đầu")
-                    success = self.order_service.place_initial_orders(
+                    success = await asyncio.to_thread(
+                        self.order_service.place_initial_orders,
                         self.exchanges, self.symbol, crypto_per_exchange, average_price, self.notification_service
                     )
                     if success:
@@ -123,7 +128,7 @@ class ClassicBot(BaseBot):
                 except OrderError as e:
                     log_error(f"Lỗi khi đặt lệnh mua ban đầu (lần thử {attempt+1}): {str(e)}")
                     self.error_counts['order'] += 1
-                    await asyncio.sleep(2)  # Đợi một chút trước khi thử lại
+                    await clock.async_sleep(2)  # Đợi một chút trước khi thử lại
             
             if not success:
                 log_warning("Không thể đặt lệnh mua ban đầu sau nhiều lần thử. Dừng bot.")
@@ -152,7 +157,7 @@ class ClassicBot(BaseBot):
             
             # Thực hiện bán khẩn cấp nếu có lỗi
             try:
-                self.balance_service.emergency_convert_all(self.symbol, self.exchanges)
+                await asyncio.to_thread(self.balance_service.emergency_convert_all, self.symbol, self.exchanges)
             except Exception as cleanup_error:
                 log_error(f"Lỗi khi bán khẩn cấp: {str(cleanup_error)}")
                 
@@ -173,7 +178,11 @@ class ClassicBot(BaseBot):
                 exchange_loops.append(self._exchange_loop(exchange_id))
                 
             # Chạy tất cả các vòng lặp
-            await gather(*exchange_loops)
+            self._start_status_renderer()
+            try:
+                await gather(*exchange_loops)
+            finally:
+                await self._stop_status_renderer()
             
             return self.total_absolute_profit_pct
             
@@ -198,70 +207,48 @@ class ClassicBot(BaseBot):
             log_info(f"Bắt đầu theo dõi sách lệnh trên sàn {exchange_id}")
             pro_exchange = await self.exchange_service.get_pro_exchange(exchange_id)
             
-            connection_errors = 0
-            max_connection_errors = 5
-            reconnect_delay = 5  # giây
-            
             # Theo dõi sách lệnh cho đến khi hết thời gian
-            while time.time() <= self.timeout:
+            while clock.time() <= self.timeout:
                 try:
                     # Lấy thông tin sách lệnh mới nhất
                     orderbook = await pro_exchange.watch_order_book(self.symbol)
-                    
-                    # Đặt lại bộ đếm lỗi kết nối khi thành công
-                    if connection_errors > 0:
-                        log_info(f"Kết nối lại thành công với {exchange_id}")
-                        connection_errors = 0
-                    
+                except Exception as feed_error:
+                    # Chờ theo cầu dao của sàn (tăng dần có nhiễu), ngắt sàn khi lỗi lặp lại
+                    pro_exchange = await self._on_feed_error(exchange_id, pro_exchange, feed_error)
+                    continue
+                
+                self._on_feed_success(exchange_id)
+                
+                try:
                     # Xử lý dữ liệu sách lệnh
                     opportunity_found = await self.process_orderbook(exchange_id, orderbook)
                     
                     if opportunity_found:
                         self.stats['opportunities_found'] += 1
                     
-                except ccxt.pro.NetworkError as network_error:
-                    connection_errors += 1
-                    log_warning(f"Lỗi kết nối với {exchange_id} (lần {connection_errors}/{max_connection_errors}): {str(network_error)}")
-                    
-                    if connection_errors >= max_connection_errors:
-                        log_error(f"Đã vượt quá số lần thử kết nối với {exchange_id}. Đang khởi động lại kết nối...")
-                        
-                        # Đóng kết nối hiện tại
-                        await pro_exchange.close()
-                        
-                        # Tạo kết nối mới
-                        pro_exchange = await self.exchange_service.get_pro_exchange(exchange_id)
-                        connection_errors = 0
-                        log_info(f"Đã khởi động lại kết nối với {exchange_id}")
-                    
-                    # Đợi trước khi thử lại
-                    await asyncio.sleep(reconnect_delay)
-                    
                 except Exception as loop_error:
-                    log_error(f"Lỗi trong vòng lặp {exchange_id}: {str(loop_error)}")
+                    log_error(f"Lỗi trong vòng lặp {exchange_id}: {str(loop_error)}", key=f"loop:{exchange_id}")
                     log_debug(f"Chi tiết lỗi: {traceback.format_exc()}")
                     
                     # Đợi một chút trước khi tiếp tục
-                    await asyncio.sleep(1)
+                    await clock.async_sleep(1)
                     
                     # Không thoát vòng lặp, tiếp tục thử lại
                 
                 # Đợi một chút để giảm tải cho CPU
-                await asyncio.sleep(0.1)
+                await clock.async_sleep(0.1)
             
-            # Đóng kết nối với sàn giao dịch
+            # Kết nối được giữ lại để dùng cho phiên tiếp theo
             log_info(f"Kết thúc theo dõi sách lệnh trên sàn {exchange_id}")
-            if pro_exchange:
-                await pro_exchange.close()
                 
         except Exception as e:
             log_error(f"Lỗi khi khởi tạo vòng lặp cho {exchange_id}: {str(e)}")
             log_debug(f"Chi tiết lỗi: {traceback.format_exc()}")
             
-            # Đảm bảo kết nối được đóng đúng cách
+            # Tạo lại kết nối dùng chung có thể đã bị hỏng
             if pro_exchange:
                 try:
-                    await pro_exchange.close()
+                    await self.exchange_service.reset_pro_exchange(exchange_id)
                 except Exception:
                     pass
     
@@ -278,6 +265,11 @@ class ClassicBot(BaseBot):
         Returns:
             bool: True nếu giao dịch thành công, ngược lại False
         """
+        # Bỏ qua cơ hội mới khi giao dịch trước chưa hoàn tất
+        if self.trade_in_flight:
+            return False
+        
+        self.trade_in_flight = True
         try:
             # Tăng số lượng cơ hội đã phát hiện
             self.opportunity_count += 1
@@ -294,9 +286,8 @@ class ClassicBot(BaseBot):
             self._update_balances_after_trade(min_ask_ex, max_bid_ex)
             
             # Tính toán phí giao dịch
-            fees = self.config.get('fees', {})
-            fee_rate_buy = fees.get(min_ask_ex, {}).get('give', 0.001)
-            fee_rate_sell = fees.get(max_bid_ex, {}).get('receive', 0.001)
+            fee_rate_buy = self.fee_table.buy_fee[min_ask_ex]
+            fee_rate_sell = self.fee_table.sell_fee[max_bid_ex]
             
             fee_crypto = self.crypto_per_transaction * (fee_rate_buy + fee_rate_sell)
             fee_usd = (self.crypto_per_transaction * self.max_bid_price * fee_rate_sell) + (self.crypto_per_transaction * self.min_ask_price * fee_rate_buy)
@@ -304,17 +295,27 @@ class ClassicBot(BaseBot):
             # Cập nhật tổng lợi nhuận
             self.total_absolute_profit_pct += profit_with_fees_pct
             
-            # Thực hiện giao dịch thực tế
-            trade_success = self.order_service.place_arbitrage_orders(
+            # Giữ lại giá và số lượng vì các vòng lặp khác vẫn cập nhật trong lúc chờ lệnh
+            amount = self.crypto_per_transaction
+            min_ask_price = self.min_ask_price
+            max_bid_price = self.max_bid_price
+            
+            # Cập nhật giá trước đó ngay để cùng mức giá không mở thêm giao dịch
+            self.prec_ask_price = min_ask_price
+            self.prec_bid_price = max_bid_price
+            
+            # Thực hiện giao dịch thực tế (trong luồng riêng)
+            trade_success = await asyncio.to_thread(
+                self.order_service.place_arbitrage_orders,
                 min_ask_ex, max_bid_ex, self.symbol,
-                self.crypto_per_transaction, self.min_ask_price, self.max_bid_price,
+                amount, min_ask_price, max_bid_price,
                 self.notification_service
             )
             
             # Cập nhật thống kê
             if trade_success:
                 self.stats['trades_executed'] += 1
-                self.stats['total_volume'] += self.crypto_per_transaction * self.min_ask_price
+                self.stats['total_volume'] += amount * min_ask_price
                 
                 # Tạo báo cáo giao dịch
                 self._display_trade_report(min_ask_ex, max_bid_ex, profit_with_fees_pct, profit_with_fees_usd, fee_usd, fee_crypto)
@@ -322,10 +323,6 @@ class ClassicBot(BaseBot):
                 self.stats['failed_trades'] += 1
                 log_warning(f"Giao dịch #{self.opportunity_count} thất bại")
             
-            # Cập nhật giá trước đó
-            self.prec_ask_price = self.min_ask_price
-            self.prec_bid_price = self.max_bid_price
-            
             # Cập nhật số lượng crypto mỗi giao dịch
             self._update_transaction_amount()
             
@@ -336,10 +333,12 @@ class ClassicBot(BaseBot):
             log_error(f"Lỗi khi thực hiện giao dịch: {str(e)}")
             log_debug(f"Chi tiết lỗi: {traceback.format_exc()}")
             return False
+        finally:
+            self.trade_in_flight = False
     
     def _display_stats(self):
         """Hiển thị thống kê về phiên giao dịch."""
-        elapsed_time = time.strftime('%H:%M:%S', time.gmtime(time.time() - self.start_time))
+        elapsed_time = time.strftime('%H:%M:%S', time.gmtime(clock.time() - self.start_time))
         
         log_info("\n" + "="*50)
         log_info(f"THỐNG KÊ PHIÊN GIAO DỊCH - {self.symbol}")
@@ -385,7 +384,7 @@ class ClassicBot(BaseBot):
         # Bán tất cả crypto trên tất cả sàn
         try:
             log_info(f"Bán tất cả {self.symbol} trên {self.exchanges}")
-            self.balance_service.emergency_convert_all(self.symbol, self.exchanges)
+            await asyncio.to_thread(self.balance_service.emergency_convert_all, self.symbol, self.exchanges)
             log_info("Đã bán tất cả crypto thành công")
         except Exception as e:
             log_error(f"Lỗi khi bán crypto: {str(e)}")
@@ -7,11 +7,13 @@ from asyncio import gather
 import sys
 import traceback
 
+from utils import clock
 from utils.logger import log_info, log_error, log_warning, log_debug
 from utils.exceptions import ArbitrageError, ExchangeError, InsufficientBalanceError, OrderError
 from utils.helpers import calculate_average, extract_base_asset
 from bots.base_bot import BaseBot
-from configs import EXCHANGE_FEES
+from services.hedge_engine import HedgeEngine
+from configs import EXCHANGE_FEES, ENABLE_HEDGE_ENGINE, DEFAULT_FUTURES_EXCHANGE, FUTURES_EXCHANGES, FUTURES_TRANSFERS
 
 
 class DeltaNeutralBot(BaseBot):
@@ -20,7 +22,9 @@ class DeltaNeutralBot(BaseBot):
     Mua vào tiền điện tử trên các sàn spot và mở vị thế short trên futures.
     """
     
-    def __init__(self, exchange_service, balance_service, order_service, notification_service):
+    mode = 'delta-neutral'
+    
+    def __init__(self, exchange_service, balance_service, order_service, notification_service, journal_service=None):
         """
         Khởi tạo bot giao dịch delta-neutral.
         
@@ -29,20 +33,25 @@ class DeltaNeutralBot(BaseBot):
             balance_service (BalanceService): Dịch vụ quản lý số dư
             order_service (OrderService): Dịch vụ quản lý lệnh
             notification_service (NotificationService): Dịch vụ thông báo
+            journal_service (JournalService, optional): Dịch vụ ghi nhật ký giao dịch
         """
         super().__init__(
             exchange_service,
             balance_service,
             order_service,
             notification_service,
-            {'fees': EXCHANGE_FEES}
+            {'fees': EXCHANGE_FEES},
+            journal_service=journal_service
         )
         
         # Biến cho chiến lược delta-neutral
-        self.futures_exchange = 'kucoinfutures'  # Sàn futures mặc định
+        self.futures_exchange = DEFAULT_FUTURES_EXCHANGE  # Sàn futures (có thể được FundingMonitor thay đổi)
+        self.futures_symbol = None  # Ký hiệu hợp đồng vĩnh viễn trên sàn futures
+        self.funding_monitor = None  # Bộ theo dõi funding rate dùng chung của môi trường chạy
         self.futures_amount = 0  # Số lượng tiền điện tử đã short
         self.leverage = 1  # Đòn bẩy
         self.short_amount_ratio = 1/3  # Tỷ lệ số tiền để mở vị thế short (1/3 tổng số tiền)
+        self.hedge_engine = None  # Bộ cân bằng vị thế short theo lượng crypto spot
         
         # Thêm biến thống kê
         self.stats = {
@@ -61,7 +70,18 @@ class DeltaNeutralBot(BaseBot):
         """
         try:
             log_info(f"Bắt đầu phiên giao dịch delta-neutral với tham số: {self.symbol}, {self.exchanges}, {self.howmuchusd} USDT")
-            self.start_time = time.time()
+            self.start_time = clock.time()
+            
+            # Chọn sàn phòng hộ có chi phí funding thấp nhất trong các sàn futures đã cấu hình tài khoản
+            venues = [exchange_id for exchange_id in FUTURES_EXCHANGES if exchange_id in self.exchange_service.exchanges]
+            if self.funding_monitor is not None and venues:
+                try:
+                    await self.funding_monitor.start([self.symbol])
+                    self.futures_exchange = self.funding_monitor.select_venue(
+                        self.symbol, self.futures_exchange, venues
+                    )
+                except Exception as e:
+                    log_warning(f"Không thể chọn sàn phòng hộ theo funding rate: {str(e)}")
             
             # Tính toán số tiền để mở vị thế delta-neutral
             spot_investment = self.howmuchusd * (2/3)  # 2/3 số tiền cho giao dịch spot
@@ -69,7 +89,8 @@ class DeltaNeutralBot(BaseBot):
             
             # Kiểm tra số dư trên các sàn spot
             try:
-                self.balance_service.check_balances(
+                await asyncio.to_thread(
+                    self.balance_service.check_balances,
                     self.exchanges, 
                     'USDT', 
                     spot_investment, 
@@ -81,31 +102,33 @@ class DeltaNeutralBot(BaseBot):
             
             # Kiểm tra số dư trên sàn futures
             try:
-                futures_balance = self.balance_service.get_balance(self.futures_exchange, 'USDT')
+                futures_balance = await asyncio.to_thread(self.balance_service.get_balance, self.futures_exchange, 'USDT')
                 
                 # Nếu số dư trên sàn futures không đủ, chuyển tiền từ spot sang futures
                 if futures_balance < futures_investment:
                     log_info(f"Số dư trên {self.futures_exchange} không đủ. Cần chuyển thêm {round(futures_investment - futures_balance, 3)} USDT.")
                     
-                    # Chuyển tiền từ sàn spot (sàn đầu tiên trong danh sách) sang futures
-                    if 'kucoin' in self.exchanges and self.futures_exchange == 'kucoinfutures':
+                    # Chuyển tiền từ tài khoản spot cùng sàn sang futures (sàn có tài khoản riêng cho futures)
+                    transfer = FUTURES_TRANSFERS.get(self.futures_exchange)
+                    if transfer and transfer[0] in self.exchanges:
+                        spot_exchange, from_account, to_account = transfer
                         transfer_amount = round(futures_investment - futures_balance, 3)
                         
                         if transfer_amount > 1:  # Đảm bảo số tiền chuyển > 1 USDT
-                            self.balance_service.transfer_between_accounts(
-                                'kucoin', 
+                            await asyncio.to_thread(
+                                self.balance_service.transfer_between_accounts,
+                                spot_exchange, 
                                 'USDT', 
                                 transfer_amount, 
-                                'spot', 
-                                'future'
+                                from_account, 
+                                to_account
                             )
                             
-                            log_info(f"{transfer_amount} USDT đã được chuyển từ KuCoin Spot sang KuCoin Futures thành công.")
+                            message = f"{transfer_amount} USDT đã được chuyển từ {spot_exchange} ({from_account}) sang {self.futures_exchange} ({to_account}) thành công."
+                            log_info(message)
                             
                             if self.notification_service:
-                                self.notification_service.send_message(
-                                    f"{transfer_amount} USDT đã được chuyển từ KuCoin Spot sang KuCoin Futures thành công."
-                                )
+                                self.notification_service.send_message(message)
             except Exception as e:
                 log_error(f"Lỗi khi kiểm tra số dư futures: {str(e)}")
                 return 0
@@ -123,7 +146,8 @@ class DeltaNeutralBot(BaseBot):
             self.crypto = {exchange: 0 for exchange in self.exchanges}  # Khởi tạo số dư crypto bằng 0
             
             # Đặt lệnh mua ban đầu trên các sàn spot
-            success = self.order_service.place_initial_orders(
+            success = await asyncio.to_thread(
+                self.order_service.place_initial_orders,
                 self.exchanges, 
                 self.symbol, 
                 (spot_investment / 2) / (len(self.exchanges) * average_price), 
@@ -153,20 +177,20 @@ class DeltaNeutralBot(BaseBot):
             try:
                 # Tính số lượng cần short
                 min_futures_quantity = 1  # Số lượng tối thiểu
-                futures_symbol = f"{extract_base_asset(self.symbol)}:USDT"  # Đảm bảo đúng định dạng của futures
                 
-                # Lấy cặp giao dịch futures
-                futures_symbol = self.symbol.replace('/', ':') if '/' in self.symbol else self.symbol
-                if not futures_symbol.endswith(':USDT'):
-                    futures_symbol = f"{extract_base_asset(self.symbol)}:USDT"
+                # Lấy ký hiệu hợp đồng futures trên sàn phòng hộ
+                self.futures_symbol = await asyncio.to_thread(
+                    self.exchange_service.get_futures_symbol, self.futures_exchange, self.symbol
+                )
                 
                 # Tính số lượng cần short dựa trên giá trung bình và số tiền đầu tư
                 quantity_to_short = max(min_futures_quantity, round(futures_investment / average_price, 3))
                 
                 # Đặt lệnh short
-                self.order_service.place_futures_short_order(
+                await asyncio.to_thread(
+                    self.order_service.place_futures_short_order,
                     self.futures_exchange, 
-                    futures_symbol, 
+                    self.futures_symbol, 
                     quantity_to_short, 
                     self.leverage
                 )
@@ -185,9 +209,10 @@ class DeltaNeutralBot(BaseBot):
                 log_info("Đang đợi 120 giây để lệnh short được thực hiện...")
                 
                 # Kiểm tra trạng thái lệnh short
-                short_filled = self.order_service.wait_for_futures_order_fill(
+                short_filled = await asyncio.to_thread(
+                    self.order_service.wait_for_futures_order_fill,
                     self.futures_exchange, 
-                    futures_symbol, 
+                    self.futures_symbol, 
                     120
                 )
                 
@@ -200,6 +225,14 @@ class DeltaNeutralBot(BaseBot):
                 log_debug(f"Chi tiết lỗi: {traceback.format_exc()}")
                 return 0
             
+            # Cân bằng vị thế short theo lượng crypto spot trong suốt phiên
+            if ENABLE_HEDGE_ENGINE:
+                self.hedge_engine = HedgeEngine(
+                    self.exchange_service, self.order_service, self.futures_exchange, self.symbol, self.leverage
+                )
+                self.hedge_engine.set_positions(total_crypto, self.futures_amount)
+                await self.hedge_engine.start()
+            
             # Bắt đầu vòng lặp theo dõi sách lệnh
             await self._start_orderbook_loop()
             
@@ -228,10 +261,12 @@ class DeltaNeutralBot(BaseBot):
         Returns:
             float: Tổng lợi nhuận (phần trăm)
         """
+        await self._stop_hedge_engine()
+        
         # Bán tất cả crypto trên tất cả sàn
         try:
             log_info(f"Bán tất cả {self.symbol} trên {self.exchanges}")
-            self.balance_service.emergency_convert_all(self.symbol, self.exchanges)
+            await asyncio.to_thread(self.balance_service.emergency_convert_all, self.symbol, self.exchanges)
             log_info("Đã bán tất cả crypto thành công")
         except Exception as e:
             log_error(f"Lỗi khi bán crypto: {str(e)}")
@@ -239,15 +274,11 @@ class DeltaNeutralBot(BaseBot):
         # Đóng vị thế short
         try:
             if self.futures_amount > 0:
-                # Lấy cặp giao dịch futures
-                futures_symbol = self.symbol.replace('/', ':') if '/' in self.symbol else self.symbol
-                if not futures_symbol.endswith(':USDT'):
-                    futures_symbol = f"{extract_base_asset(self.symbol)}:USDT"
-                
                 # Đóng vị thế short
-                self.order_service.close_futures_short_order(
+                await asyncio.to_thread(
+                    self.order_service.close_futures_short_order,
                     self.futures_exchange, 
-                    futures_symbol, 
+                    self.futures_symbol, 
                     self.futures_amount, 
                     self.leverage
                 )
@@ -271,24 +302,22 @@ class DeltaNeutralBot(BaseBot):
         Returns:
             float: Tổng lợi nhuận (phần trăm)
         """
+        await self._stop_hedge_engine()
+        
         # Bán tất cả crypto trên các sàn spot
         try:
-            self.balance_service.emergency_convert_all(self.symbol, self.exchanges)
+            await asyncio.to_thread(self.balance_service.emergency_convert_all, self.symbol, self.exchanges)
         except Exception as e:
             log_error(f"Lỗi khi bán khẩn cấp crypto: {str(e)}")
         
         # Đóng vị thế short nếu đã mở
         try:
             if self.futures_amount > 0:
-                # Lấy cặp giao dịch futures
-                futures_symbol = self.symbol.replace('/', ':') if '/' in self.symbol else self.symbol
-                if not futures_symbol.endswith(':USDT'):
-                    futures_symbol = f"{extract_base_asset(self.symbol)}:USDT"
-                
                 # Đóng vị thế short
-                self.order_service.close_futures_short_order(
+                await asyncio.to_thread(
+                    self.order_service.close_futures_short_order,
                     self.futures_exchange, 
-                    futures_symbol, 
+                    self.futures_symbol, 
                     self.futures_amount, 
                     self.leverage
                 )
@@ -297,9 +326,32 @@ class DeltaNeutralBot(BaseBot):
         
         return 0
     
+    def _update_balances_after_trade(self, min_ask_ex, max_bid_ex):
+        """
+        Cập nhật số dư sau khi thực hiện giao dịch và báo thay đổi lượng crypto cho bộ cân bằng.
+        
+        Args:
+            min_ask_ex (str): Tên sàn có giá mua thấp nhất
+            max_bid_ex (str): Tên sàn có giá bán cao nhất
+        """
+        super()._update_balances_after_trade(min_ask_ex, max_bid_ex)
+        
+        if self.hedge_engine is not None:
+            # Mua q*(1 - phí mua) và bán q*(1 + phí bán): lượng crypto giảm đúng bằng phí
+            fees = self.fee_table.buy_fee[min_ask_ex] + self.fee_table.sell_fee[max_bid_ex]
+            self.hedge_engine.on_spot_fill(-self.crypto_per_transaction * fees)
+    
+    async def _stop_hedge_engine(self):
+        """Dừng bộ cân bằng và lấy số hợp đồng short hiện tại để đóng vị thế."""
+        if self.hedge_engine is None:
+            return
+        await self.hedge_engine.stop()
+        self.futures_amount = self.hedge_engine.short_contracts
+        self.hedge_engine = None
+    
     def _display_stats(self):
         """Hiển thị thống kê về phiên giao dịch."""
-        elapsed_time = time.strftime('%H:%M:%S', time.gmtime(time.time() - self.start_time))
+        elapsed_time = time.strftime('%H:%M:%S', time.gmtime(clock.time() - self.start_time))
         
         log_info("\n" + "="*50)
         log_info(f"THỐNG KÊ PHIÊN GIAO DỊCH DELTA-NEUTRAL - {self.symbol}")
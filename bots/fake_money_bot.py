@@ -1,11 +1,10 @@
 """
 Bot mô phỏng giao dịch với tiền ảo, không thực hiện giao dịch thực tế.
 """
-import time
-import asyncio
 from asyncio import gather
 import ccxt.pro
 
+from utils import clock
 from utils.logger import log_info, log_error, log_warning
 from utils.exceptions import ArbitrageError
 from utils.helpers import calculate_average
@@ -18,7 +17,9 @@ class FakeMoneyBot(BaseBot):
     Bot mô phỏng giao dịch với tiền ảo, không thực hiện giao dịch thực tế.
     """
     
-    def __init__(self, exchange_service, balance_service, order_service, notification_service):
+    mode = 'fake-money'
+    
+    def __init__(self, exchange_service, balance_service, order_service, notification_service, journal_service=None):
         """
         Khởi tạo bot mô phỏng.
         
@@ -27,13 +28,15 @@ class FakeMoneyBot(BaseBot):
             balance_service (BalanceService): Dịch vụ quản lý số dư
             order_service (OrderService): Dịch vụ quản lý lệnh
             notification_service (NotificationService): Dịch vụ thông báo
+            journal_service (JournalService, optional): Dịch vụ ghi nhật ký giao dịch
         """
         super().__init__(
             exchange_service, 
             balance_service, 
             order_service, 
             notification_service,
-            {'fees': EXCHANGE_FEES}
+            {'fees': EXCHANGE_FEES},
+            journal_service=journal_service
         )
     
     async def start(self):
@@ -45,7 +48,7 @@ class FakeMoneyBot(BaseBot):
         """
         try:
             log_info(f"Bắt đầu phiên mô phỏng với tham số: {self.symbol}, {self.exchanges}, {self.howmuchusd} USDT")
-            self.start_time = time.time()
+            self.start_time = clock.time()
             
             # Lấy giá trung bình toàn cầu
             average_price = await self.exchange_service.get_global_average_price(self.exchanges, self.symbol)
@@ -59,11 +62,12 @@ class FakeMoneyBot(BaseBot):
                 f"{round(total_crypto / len(self.exchanges), 3)} {self.symbol.split('/')[0]} ở giá {average_price}."
             )
             
-            # Khởi tạo số dư ảo
-            self.usd = self.balance_service.initialize_balances(self.exchanges, self.symbol, self.howmuchusd)
-            self.crypto = self.balance_service.initialize_crypto_balances(
-                self.exchanges, self.symbol, average_price, self.howmuchusd
-            )
+            # Khởi tạo số dư ảo (hoặc tiếp tục sổ cái của phiên trước bị dừng đột ngột)
+            if not self._restore_ledgers():
+                self.usd = self.balance_service.initialize_balances(self.exchanges, self.symbol, self.howmuchusd)
+                self.crypto = self.balance_service.initialize_crypto_balances(
+                    self.exchanges, self.symbol, average_price, self.howmuchusd
+                )
             
             # Cập nhật số lượng crypto mỗi giao dịch
             self.crypto_per_transaction = total_crypto / len(self.exchanges)
@@ -93,7 +97,11 @@ class FakeMoneyBot(BaseBot):
                 exchange_loops.append(self._exchange_loop(exchange_id))
                 
             # Chạy tất cả các vòng lặp
-            await gather(*exchange_loops)
+            self._start_status_renderer()
+            try:
+                await gather(*exchange_loops)
+            finally:
+                await self._stop_status_renderer()
             
             return self.total_absolute_profit_pct
             
@@ -116,20 +124,24 @@ class FakeMoneyBot(BaseBot):
             pro_exchange = await self.exchange_service.get_pro_exchange(exchange_id)
             
             # Theo dõi sách lệnh cho đến khi hết thời gian
-            while time.time() <= self.timeout:
+            while clock.time() <= self.timeout:
                 try:
                     # Lấy thông tin sách lệnh mới nhất
                     orderbook = await pro_exchange.watch_order_book(self.symbol)
-                    
+                except Exception as feed_error:
+                    pro_exchange = await self._on_feed_error(exchange_id, pro_exchange, feed_error)
+                    continue
+                
+                self._on_feed_success(exchange_id)
+                
+                try:
                     # Xử lý dữ liệu sách lệnh
                     await self.process_orderbook(exchange_id, orderbook)
-                    
                 except Exception as loop_error:
-                    log_error(f"Lỗi trong vòng lặp {exchange_id}: {str(loop_error)}")
+                    log_error(f"Lỗi trong vòng lặp {exchange_id}: {str(loop_error)}", key=f"loop:{exchange_id}")
                     break
             
-            # Đóng kết nối với sàn giao dịch
-            await pro_exchange.close()
+            # Kết nối được giữ lại để dùng cho phiên tiếp theo, không đóng ở đây
             
         except Exception as e:
             log_error(f"Lỗi khi khởi tạo vòng lặp cho {exchange_id}: {str(e)}")
@@ -155,9 +167,8 @@ class FakeMoneyBot(BaseBot):
             self._update_balances_after_trade(min_ask_ex, max_bid_ex)
             
             # Tính toán phí giao dịch
-            fees = self.config.get('fees', {})
-            fee_rate_buy = fees.get(min_ask_ex, {}).get('give', 0.001)
-            fee_rate_sell = fees.get(max_bid_ex, {}).get('receive', 0.001)
+            fee_rate_buy = self.fee_table.buy_fee[min_ask_ex]
+            fee_rate_sell = self.fee_table.sell_fee[max_bid_ex]
             
             fee_crypto = self.crypto_per_transaction * (fee_rate_buy + fee_rate_sell)
             fee_usd = (self.crypto_per_transaction * self.max_bid_price * fee_rate_sell) + (self.crypto_per_transaction * self.min_ask_price * fee_rate_buy)
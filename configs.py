@@ -12,13 +12,87 @@ PYTHON_COMMAND = os.getenv('PYTHON_COMMAND', 'python')
 ENABLE_TELEGRAM = os.getenv('ENABLE_TELEGRAM', 'false').lower() == 'true'
 ENABLE_CTRL_C_HANDLING = os.getenv('ENABLE_CTRL_C_HANDLING', 'false').lower() == 'true'
 
+# Hiển thị bảng trạng thái trên console
+STATUS_RENDER_FPS = float(os.getenv('STATUS_RENDER_FPS', '2'))  # Số khung hình mỗi giây (0 = tắt)
+
+# Nhật ký giao dịch (SQLite)
+ENABLE_JOURNAL = os.getenv('ENABLE_JOURNAL', 'true').lower() == 'true'
+JOURNAL_DB_FILE = os.getenv('JOURNAL_DB_FILE', 'journal.db')  # Tệp cơ sở dữ liệu nhật ký
+JOURNAL_BATCH_SIZE = 500  # Số bản ghi tối đa mỗi lần ghi
+JOURNAL_FLUSH_INTERVAL = 1.0  # Khoảng thời gian giữa các lần ghi (giây)
+JOURNAL_MAX_PENDING = 100000  # Số bản ghi tối đa trong hàng đợi; khi đầy, bản ghi cũ nhất bị bỏ
+
 # Tiêu chí lợi nhuận
 PROFIT_CRITERIA_PCT = 0  # % lợi nhuận tối thiểu
 PROFIT_CRITERIA_USD = 0  # Lợi nhuận USD tối thiểu
 
+# Phí giao dịch thực tế của tài khoản (lấy qua fetch_trading_fees, ghi đè EXCHANGE_FEES)
+ENABLE_FEE_SERVICE = os.getenv('ENABLE_FEE_SERVICE', 'true').lower() == 'true'
+FEE_CACHE_FILE = os.getenv('FEE_CACHE_FILE', 'state/fees.json')  # Tệp lưu đệm phí
+FEE_REFRESH_INTERVAL = 6 * 3600  # Khoảng thời gian làm mới phí (giây)
+
+# Giới hạn tốc độ gọi REST theo sàn: {'nhóm endpoint': (token mỗi giây, số token tối đa)}
+# 'total' là giới hạn chung của sàn; 'order' = đặt/hủy lệnh, 'account' = số dư/lệnh, 'market' = ticker/thị trường
+ENABLE_RATE_LIMITER = os.getenv('ENABLE_RATE_LIMITER', 'true').lower() == 'true'
+RATE_LIMIT_DEFAULT = {
+    'total': (10, 20),
+    'order': (5, 10),
+    'account': (5, 10),
+    'market': (5, 10),
+}
+RATE_LIMITS = {
+    'binance': {'total': (20, 40), 'order': (10, 20), 'account': (10, 20), 'market': (10, 20)},
+    'kucoin': {'total': (10, 20), 'order': (5, 10), 'account': (5, 10), 'market': (5, 10)},
+    'okx': {'total': (10, 20), 'order': (5, 10), 'account': (5, 10), 'market': (10, 20)},
+    'bybit': {'total': (10, 20), 'order': (5, 10), 'account': (5, 10), 'market': (10, 20)},
+    'kucoinfutures': {'total': (10, 20), 'order': (5, 10), 'account': (5, 10), 'market': (5, 10)},
+}
+
+# Cầu dao kết nối websocket theo sàn (thời gian chờ tăng dần có nhiễu)
+BREAKER_FAILURE_THRESHOLD = 3  # Số lỗi liên tiếp trước khi ngắt sàn
+BREAKER_BASE_DELAY = 0.5  # Thời gian chờ sau lỗi đầu tiên (giây)
+BREAKER_MAX_DELAY = 60  # Thời gian chờ tối đa (giây)
+
+# Metric Prometheus qua HTTP cục bộ (0 = tắt)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_LAG_INTERVAL = 0.5  # Chu kỳ đo độ trễ vòng lặp sự kiện (giây)
+
+# Điều khiển khi đang chạy: Unix socket nhận lệnh (để trống = tắt) và lấy mẫu CPU (cũng bật được bằng SIGUSR1)
+CONTROL_SOCKET = os.getenv('CONTROL_SOCKET', '')
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')  # Thư mục ghi kết quả lấy mẫu (.folded)
+PROFILE_DURATION = 30  # Thời gian lấy mẫu mặc định (giây)
+PROFILE_INTERVAL = 0.005  # Chu kỳ lấy mẫu (giây)
+
+# Cấu hình nạp lại khi đang chạy: tệp JSON ghi đè tiêu chí lợi nhuận, phí, thời gian chờ lệnh, đòn bẩy
+CONFIG_FILE = os.getenv('CONFIG_FILE', 'state/config.json')
+CONFIG_POLL_INTERVAL = 2.0  # Chu kỳ kiểm tra tệp thay đổi (giây, 0 = không theo dõi)
+
+# Giao dịch giấy (--paper): khớp lệnh mô phỏng trên sách lệnh thực hoặc phát lại
+PAPER_LATENCY = float(os.getenv('PAPER_LATENCY', '0.05'))  # Độ trễ mỗi lời gọi REST (giây)
+PAPER_BOOK_DEPTH = 20  # Số mức giá mỗi phía được giữ để khớp lệnh
+PAPER_QUOTE_BALANCE = float(os.getenv('PAPER_QUOTE_BALANCE', '10000'))  # Số dư USDT ban đầu trên mỗi sàn
+PAPER_REPLAY_IDLE = 1.0  # Khi hết dữ liệu phát lại, trả lại sách lệnh cuối sau mỗi khoảng này (giây)
+
+# Kho sách lệnh nén (.bka): khối zstd độc lập, mở đầu bằng sách lệnh đầy đủ, kèm chỉ mục thời gian
+ARCHIVE_CHUNK_SECONDS = 60  # Khoảng thời gian dữ liệu tối đa của một khối (giây)
+ARCHIVE_CHUNK_RECORDS = 5000  # Số bản ghi tối đa của một khối
+ARCHIVE_ZSTD_LEVEL = 3  # Mức nén zstd
+
+# Tệp log: xoay vòng theo ngày và kích thước, nén gzip tệp cũ; giới hạn tần suất thông điệp lặp lại
+LOG_DIR = os.getenv('LOG_DIR', 'logs')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(50 * 1024 * 1024)))  # Kích thước tối đa một tệp (0 = chỉ xoay theo ngày)
+LOG_BACKUP_COUNT = 30  # Số tệp đã xoay vòng được giữ lại (0 = giữ tất cả)
+LOG_COMPRESS = True  # Nén gzip tệp đã xoay vòng trên luồng nền
+LOG_SAMPLE_RATE = 5  # Số dòng tối đa mỗi giây cho một khóa thông điệp (0 = không giới hạn)
+
 # Thông số giao dịch
 BETTER_FILL_LESS_PROFITS = True  # Điều chỉnh fill để giảm lợi nhuận
 FIRST_ORDERS_FILL_TIMEOUT = 3600  # Thời gian chờ tối đa để fill đơn hàng đầu tiên (giây)
+ARBITRAGE_FILL_TIMEOUT = 180  # Thời gian chờ tối đa để fill hai lệnh chênh lệch giá (giây)
+ARBITRAGE_POLL_INTERVAL = 0.5  # Chu kỳ kiểm tra trạng thái hai lệnh chênh lệch giá theo ID (giây)
+ARBITRAGE_POLL_MAX_INTERVAL = 5  # Chu kỳ kiểm tra tối đa: chu kỳ tăng gấp đôi sau mỗi lần hai lệnh không thay đổi (giây)
+ARBITRAGE_MIN_HEDGE_USD = 10  # Giá trị chênh lệch tối thiểu giữa hai chân (USD) để cân bằng khi cả hai lệnh còn mở
 
 # Danh sách các sàn giao dịch hỗ trợ
 SUPPORTED_EXCHANGES = ['kucoin', 'binance', 'bybit', 'okx', 'kucoinfutures']
@@ -35,14 +109,52 @@ EXCHANGE_FEES = {
 
 # Cấu hình Delta-Neutral
 DEFAULT_FUTURES_EXCHANGE = 'kucoinfutures'  # Sàn futures mặc định
+# Chuyển USDT từ spot sang futures trước khi mở vị thế short: {sàn futures: (sàn spot, tài khoản nguồn, tài khoản đích)}.
+# Sàn không có trong bảng (okx, bybit: tài khoản hợp nhất) dùng chung số dư spot và futures
+FUTURES_TRANSFERS = {'kucoinfutures': ('kucoin', 'spot', 'future')}
 DEFAULT_LEVERAGE = 1  # Đòn bẩy mặc định
 SHORT_AMOUNT_RATIO = 1/3  # Tỷ lệ số tiền để mở vị thế short (1/3 tổng số tiền)
 MIN_FUTURES_QUANTITY = 1  # Số lượng tối thiểu cho giao dịch futures
 
+# Cân bằng vị thế phòng hộ liên tục (delta-neutral)
+ENABLE_HEDGE_ENGINE = os.getenv('ENABLE_HEDGE_ENGINE', 'true').lower() == 'true'
+HEDGE_RATIO = 1.0  # Tỷ lệ phòng hộ mục tiêu (1 = trung hòa hoàn toàn lượng crypto spot)
+HEDGE_BAND_USD = 25  # Độ lệch delta tối đa (USD theo giá mark) trước khi điều chỉnh
+HEDGE_BATCH_INTERVAL = 2.0  # Thời gian gom các lần khớp lệnh trước khi gửi lệnh điều chỉnh (giây)
+HEDGE_POLL_INTERVAL = 5  # Chu kỳ hỏi vị thế qua REST khi sàn không hỗ trợ watch_positions (giây)
+
+# Theo dõi funding rate và basis để chọn sàn phòng hộ
+ENABLE_FUNDING_MONITOR = os.getenv('ENABLE_FUNDING_MONITOR', 'true').lower() == 'true'
+FUTURES_EXCHANGES = ['kucoinfutures', 'okx', 'bybit']  # Các sàn có hợp đồng vĩnh viễn USDT
+FUNDING_POLL_INTERVAL = 300  # Chu kỳ lấy funding rate (giây)
+FUNDING_HISTORY_SIZE = 288  # Số mẫu giữ cho mỗi sàn (288 mẫu x 5 phút = 24 giờ)
+FUNDING_SWITCH_THRESHOLD = 0.02  # Chênh lệch lãi suất năm tối thiểu (2%) để đổi sàn phòng hộ
+
+# Chênh lệch giá spot–perp (chế độ basis)
+BASIS_ENTRY_PCT = 0.15  # Lợi nhuận kỳ vọng tối thiểu sau phí và funding để mở vị thế (phần trăm)
+BASIS_EXIT_PCT = 0.02  # Mở vị thế giả định basis hội tụ về mức này; đóng khi basis xuống dưới (phần trăm)
+BASIS_HOLD_HOURS = 8  # Thời gian giữ vị thế dự kiến để tính funding (giờ)
+
 # Chế độ bot
-BOT_MODES = ['fake-money', 'classic', 'delta-neutral']
+BOT_MODES = ['fake-money', 'classic', 'delta-neutral', 'basis']
+
+# Kho trạng thái phiên (bản chụp nguyên tử + nhật ký ghi thêm)
+STATE_SNAPSHOT_FILE = os.getenv('STATE_SNAPSHOT_FILE', 'state/state.json')
+STATE_LOG_FILE = os.getenv('STATE_LOG_FILE', 'state/state.log')
+STATE_COMPACT_EVERY = 1000  # Số giao dịch trong nhật ký trước khi tạo bản chụp mới
+
+# Chế độ nhiều tiến trình (sharded): bộ điều phối vốn qua Unix socket
+CAPITAL_COORDINATOR_ADDRESS = os.getenv('CAPITAL_COORDINATOR_ADDRESS', 'state/capital.sock')
+
+# Daemon dữ liệu thị trường dùng chung (để trống = mỗi tiến trình tự kết nối tới sàn)
+MARKET_DATA_SOCKET = os.getenv('MARKET_DATA_SOCKET', '')  # Đường dẫn Unix socket của daemon
+MARKET_DATA_DEPTH = 10  # Số mức giá mỗi phía được phát
+MARKET_DATA_MAX_BUFFER = 1024 * 1024  # Số byte chờ gửi tối đa cho một bot đọc chậm
+MARKET_DATA_SHM = os.getenv('MARKET_DATA_SHM', '')  # Tên vùng nhớ dùng chung chứa sách lệnh (để trống = tắt)
+MARKET_DATA_SHM_SLOTS = 64  # Số (sàn, cặp) tối đa trong vùng nhớ dùng chung
+MARKET_DATA_SHM_POLL = 0.001  # Khoảng thời gian kiểm tra cập nhật trong vùng nhớ dùng chung (giây)
 
-# Đường dẫn tệp tin
+# Đường dẫn tệp tin cũ (chỉ dùng để nhập trạng thái vào kho trạng thái)
 BALANCE_FILE = 'balance.txt'
 START_BALANCE_FILE = 'start_balance.txt'
 SYMBOL_FILE = 'symbol.txt'
\ No newline at end of file
@@ -10,7 +10,9 @@ import time
 import asyncio
 import argparse
 import logging
+import logging.handlers
 import concurrent.futures
+import multiprocessing
 from colorama import Style, Fore, init
 from dotenv import load_dotenv
 
@@ -18,44 +20,42 @@ from dotenv import load_dotenv
 init()
 
 # Import các dịch vụ
-from services.exchange_service import ExchangeService
-from services.balance_service import BalanceService
-from services.order_service import OrderService
-from services.notification_service import NotificationService
+from services.runtime import BotRuntime
+from services.orchestrator import MultiSymbolOrchestrator
+from services.capital_coordinator import CapitalCoordinator, CapitalClient
+from services.state_store import StateStore
+from services.paper_exchange import PaperExchangeService, ReplayBookSource, load_records
 
 # Import các bot
+from bots.basis_bot import BasisBot
 from bots.classic_bot import ClassicBot
 from bots.delta_neutral_bot import DeltaNeutralBot
 from bots.fake_money_bot import FakeMoneyBot
 
 # Import các module tiện ích
-from utils.logger import log_info, log_error, log_warning, logger
+from utils.logger import log_info, log_error, log_warning, setup_file_logging
 from utils.helpers import show_time
-from configs import PYTHON_COMMAND, ENABLE_TELEGRAM, BOT_MODES
+from configs import PYTHON_COMMAND, BOT_MODES, METRICS_PORT, CONTROL_SOCKET
 
 
-def setup_logging(level=logging.INFO):
+def setup_logging(level=logging.INFO, log_queue=None):
     """
     Thiết lập cấu hình logging nâng cao.
     
     Args:
         level: Cấp độ logging (mặc định là INFO)
+        log_queue (multiprocessing.Queue, optional): Hàng đợi log tới tiến trình chính (worker)
     """
-    # Tạo thư mục logs nếu chưa tồn tại
-    os.makedirs('logs', exist_ok=True)
-    
-    # Định dạng thời gian cho tên file log
-    log_filename = f"logs/arbitrage_bot_{time.strftime('%Y-%m-%d')}.log"
-    
     # Định dạng cho các message log
     log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     
-    # Cấu hình logging
+    # Cấu hình logging: dùng chung tệp log xoay vòng của utils.logger thay vì mở thêm
+    # một FileHandler thứ hai trên cùng tệp
     logging.basicConfig(
         level=level,
         format=log_format,
         handlers=[
-            logging.FileHandler(log_filename),
+            setup_file_logging(log_queue),
             logging.StreamHandler()
         ]
     )
@@ -87,7 +87,7 @@ def parse_arguments():
     parser = argparse.ArgumentParser(description='Arbitrage Bot - Giao dịch chênh lệch giá crypto')
     
     # Tham số bắt buộc
-    parser.add_argument('mode', choices=BOT_MODES, help='Chế độ bot (fake-money, classic, delta-neutral)')
+    parser.add_argument('mode', choices=BOT_MODES, help='Chế độ bot (fake-money, classic, delta-neutral, basis)')
     parser.add_argument('renew_time', type=int, help='Thời gian làm mới (phút)')
     parser.add_argument('usdt_amount', type=float, help='Số lượng USDT để giao dịch')
     
@@ -103,6 +103,12 @@ def parse_arguments():
     parser.add_argument('--debug', action='store_true', help='Kích hoạt chế độ debug')
     parser.add_argument('--no-banner', action='store_true', help='Không hiển thị banner')
     parser.add_argument('--dry-run', action='store_true', help='Chạy mà không thực hiện giao dịch thực tế')
+    parser.add_argument('--symbols', help='Chạy đồng thời nhiều cặp giao dịch, phân cách bằng dấu phẩy (VD: BTC/USDT,ETH/USDT)')
+    parser.add_argument('--shards', type=int, default=1, help='Số tiến trình worker chia nhau các cặp trong --symbols')
+    parser.add_argument('--paper', action='store_true', help='Giao dịch giấy: khớp lệnh mô phỏng trên sách lệnh thực')
+    parser.add_argument('--replay', metavar='PATH', help='Giao dịch giấy trên sách lệnh phát lại từ tệp JSONL hoặc kho nén .bka')
+    parser.add_argument('--replay-start', type=float, metavar='TS', help='Phát lại từ thời điểm này (giây, epoch)')
+    parser.add_argument('--replay-speed', type=float, default=1.0, help='Tốc độ phát lại (1 = thời gian thực, 0 = không chờ giữa các bản ghi)')
     
     return parser.parse_args()
 
@@ -118,7 +124,7 @@ def get_user_input():
     
     # Danh sách các thông tin cần nhập
     input_list = [
-        ("mode", "mode (fake-money, classic, delta-neutral)"),
+        ("mode", "mode (fake-money, classic, delta-neutral, basis)"),
         ("renew", "renew time (in minutes)"),
         ("balance", "balance to use (USDT)"),
         ("exchange_1", "exchange 1"),
@@ -137,13 +143,26 @@ def get_user_input():
     return inputs
 
 
-async def find_best_symbol(exchange_service, exchanges):
+def save_symbol(state_store, symbol):
+    """
+    Lưu cặp giao dịch đang hoạt động vào kho trạng thái.
+    
+    Args:
+        state_store (StateStore): Kho lưu trạng thái phiên
+        symbol (str): Ký hiệu của cặp giao dịch
+    """
+    if state_store:
+        state_store.set('symbol', symbol)
+
+
+async def find_best_symbol(exchange_service, exchanges, state_store=None):
     """
     Tìm cặp giao dịch tốt nhất cho arbitrage.
     
     Args:
         exchange_service (ExchangeService): Dịch vụ sàn giao dịch
         exchanges (list): Danh sách tên các sàn giao dịch
+        state_store (StateStore, optional): Kho lưu trạng thái phiên
     
     Returns:
         str: Ký hiệu của cặp giao dịch tốt nhất
@@ -196,9 +215,8 @@ async def find_best_symbol(exchange_service, exchanges):
             best_pair = pair_spreads[0][0]
             log_info(f"Đã tìm thấy cặp giao dịch tốt nhất: {best_pair} với chênh lệch giá {pair_spreads[0][1]:.4f}%")
             
-            # Lưu cặp giao dịch vào tệp
-            with open('symbol.txt', 'w') as f:
-                f.write(best_pair)
+            # Lưu cặp giao dịch vào kho trạng thái
+            save_symbol(state_store, best_pair)
             
             return best_pair
         else:
@@ -206,8 +224,7 @@ async def find_best_symbol(exchange_service, exchanges):
             default_pair = "BTC/USDT"
             log_warning(f"Không tìm thấy cặp giao dịch phù hợp. Sử dụng mặc định: {default_pair}")
             
-            with open('symbol.txt', 'w') as f:
-                f.write(default_pair)
+            save_symbol(state_store, default_pair)
             
             return default_pair
             
@@ -218,33 +235,35 @@ async def find_best_symbol(exchange_service, exchanges):
         default_pair = "BTC/USDT"
         log_warning(f"Sử dụng cặp giao dịch mặc định: {default_pair}")
         
-        with open('symbol.txt', 'w') as f:
-            f.write(default_pair)
+        save_symbol(state_store, default_pair)
         
         return default_pair
 
 
-async def run_bot(mode, symbol, usdt_amount, renew_time, exchanges, dry_run=False):
+async def run_bot(mode, symbol, usdt_amount, renew_time, exchanges, dry_run=False, runtime=None):
     """
     Chạy bot giao dịch với các tham số đã cho.
     
     Args:
-        mode (str): Chế độ bot (fake-money, classic, delta-neutral)
+        mode (str): Chế độ bot (fake-money, classic, delta-neutral, basis)
         symbol (str): Ký hiệu của cặp giao dịch
         usdt_amount (float): Số lượng USDT để giao dịch
         renew_time (int): Thời gian làm mới (phút)
         exchanges (list): Danh sách tên các sàn giao dịch
         dry_run (bool): Nếu True, bot sẽ không thực hiện giao dịch thực tế
+        runtime (BotRuntime, optional): Môi trường chạy dùng chung giữa các phiên.
+            Nếu bỏ trống, một môi trường tạm thời được tạo và đóng sau phiên.
         
     Returns:
         float: Tổng lợi nhuận (phần trăm)
     """
+    owns_runtime = runtime is None
     try:
-        # Khởi tạo các dịch vụ
-        exchange_service = ExchangeService()
-        balance_service = BalanceService(exchange_service)
-        order_service = OrderService(exchange_service)
-        notification_service = NotificationService(ENABLE_TELEGRAM)
+        # Dùng lại các dịch vụ và kết nối của môi trường chạy
+        if owns_runtime:
+            runtime = BotRuntime()
+        await runtime.start(exchanges)
+        runtime.begin_session()
         
         # Log thông tin khởi động
         log_info(f"Khởi động bot với chế độ: {mode}, số tiền: {usdt_amount} USDT, thời gian làm mới: {renew_time} phút")
@@ -252,27 +271,29 @@ async def run_bot(mode, symbol, usdt_amount, renew_time, exchanges, dry_run=Fals
             log_info("Chế độ dry-run được kích hoạt - không thực hiện giao dịch thực tế")
         
         # Khởi tạo balance files
-        balance_service.initialize_balance_files(usdt_amount)
+        runtime.balance_service.initialize_balance_files(usdt_amount)
         
         # Tìm cặp giao dịch nếu không được chỉ định
         if not symbol:
-            symbol = await find_best_symbol(exchange_service, exchanges)
+            symbol = await find_best_symbol(runtime.exchange_service, exchanges, runtime.state_store)
         else:
             log_info(f"Sử dụng cặp giao dịch đã chỉ định: {symbol}")
+            save_symbol(runtime.state_store, symbol)
         
-        # Khởi tạo bot dựa trên chế độ
-        if mode == "fake-money" or dry_run:
-            bot = FakeMoneyBot(exchange_service, balance_service, order_service, notification_service)
+        # Khởi tạo bot mới (chỉ trạng thái chiến lược được làm mới)
+        bot = runtime.create_bot(mode, dry_run)
+        if bot is None:
+            log_error(f"Chế độ không hợp lệ: {mode}")
+            return 0
+        
+        if isinstance(bot, FakeMoneyBot):
             log_info("Sử dụng bot mô phỏng (không thực hiện giao dịch thực tế)")
-        elif mode == "classic":
-            bot = ClassicBot(exchange_service, balance_service, order_service, notification_service)
+        elif isinstance(bot, ClassicBot):
             log_info("Sử dụng bot arbitrage cổ điển")
-        elif mode == "delta-neutral":
-            bot = DeltaNeutralBot(exchange_service, balance_service, order_service, notification_service)
+        elif isinstance(bot, DeltaNeutralBot):
             log_info("Sử dụng bot delta-neutral")
-        else:
-            log_error(f"Chế độ không hợp lệ: {mode}")
-            return 0
+        elif isinstance(bot, BasisBot):
+            log_info("Sử dụng bot chênh lệch giá spot–perp")
         
         # Cấu hình bot
         timeout = renew_time * 60  # Chuyển đổi phút sang giây
@@ -292,10 +313,145 @@ async def run_bot(mode, symbol, usdt_amount, renew_time, exchanges, dry_run=Fals
     except Exception as e:
         log_error(f"Lỗi khi chạy bot: {str(e)}")
         return 0
+    
+    finally:
+        if runtime:
+            runtime.end_session()
+        
+        # Đóng môi trường tạm thời
+        if owns_runtime and runtime:
+            await runtime.close()
+
+
+def split_symbols(symbols, shards):
+    """
+    Chia các cặp giao dịch cho các worker (xoay vòng).
+    
+    Args:
+        symbols (list): Danh sách các cặp giao dịch
+        shards (int): Số worker
+        
+    Returns:
+        list: Danh sách các nhóm cặp giao dịch (không có nhóm rỗng)
+    """
+    groups = [symbols[i::shards] for i in range(max(shards, 1))]
+    return [group for group in groups if group]
+
+
+def run_shard(shard_index, mode, symbols, share, renew_time, exchanges, dry_run, address, authkey, log_queue=None):
+    """
+    Điểm chạy của một tiến trình worker.
+    
+    Args:
+        shard_index (int): Số thứ tự worker
+        mode (str): Chế độ bot
+        symbols (list): Các cặp giao dịch của worker
+        share (float): Tỷ lệ vốn của worker trên tổng số dư
+        renew_time (int): Thời gian làm mới (phút)
+        exchanges (list): Danh sách tên các sàn giao dịch
+        dry_run (bool): Nếu True, dùng bot mô phỏng
+        address (str): Địa chỉ bộ điều phối vốn
+        authkey (bytes): Khóa xác thực với bộ điều phối vốn
+        log_queue (multiprocessing.Queue, optional): Hàng đợi log tới tiến trình chính
+    """
+    load_dotenv()
+    setup_logging(log_queue=log_queue)
+    try:
+        asyncio.run(_run_shard(shard_index, mode, symbols, share, renew_time, exchanges, dry_run, address, authkey))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _run_shard(shard_index, mode, symbols, share, renew_time, exchanges, dry_run, address, authkey):
+    """Vòng lặp phiên của một worker: xin vốn, chạy phiên, trả vốn kèm lợi nhuận."""
+    worker = f"shard-{shard_index}"
+    state_dir = os.path.join('state', worker)
+    
+    # Mỗi worker có kho trạng thái và socket điều khiển riêng; số dư chung do bộ điều phối giữ.
+    # Metric được xuất trên cổng riêng, ngay sau cổng của tiến trình chính
+    metrics_port = METRICS_PORT + shard_index + 1 if METRICS_PORT else 0
+    control_socket = os.path.join(state_dir, 'control.sock') if CONTROL_SOCKET else ''
+    runtime = BotRuntime(
+        StateStore(os.path.join(state_dir, 'state.json'), os.path.join(state_dir, 'state.log')),
+        metrics_port=metrics_port,
+        control_socket=control_socket
+    )
+    orchestrator = MultiSymbolOrchestrator(runtime)
+    client = CapitalClient(worker, address, authkey)
+    
+    try:
+        log_info(f"Worker {worker} (PID {os.getpid()}) phụ trách: {', '.join(symbols)}")
+        while True:
+            status = client.status()
+            reservation = client.reserve(status['balance'] * share)
+            if not reservation:
+                log_error(f"Worker {worker} không được cấp vốn. Dừng worker.")
+                break
+            
+            amount = reservation['amount']
+            profit_pct = 0
+            try:
+                profit_pct = await orchestrator.run_session(mode, symbols, amount, renew_time, exchanges, dry_run)
+            finally:
+                client.release(reservation['id'], profit_pct / 100 * amount)
+    finally:
+        client.close()
+        await runtime.close()
+
+
+async def run_sharded(runtime, mode, symbols, shards, usdt_amount, renew_time, exchanges, dry_run=False):
+    """
+    Chạy nhiều tiến trình worker, mỗi worker phụ trách một nhóm cặp giao dịch.
+    
+    Tiến trình chính giữ sổ cái số dư và cấp vốn cho các worker qua bộ điều phối vốn.
+    
+    Args:
+        runtime (BotRuntime): Môi trường chạy của tiến trình chính (giữ số dư)
+        mode (str): Chế độ bot
+        symbols (list): Danh sách các cặp giao dịch
+        shards (int): Số tiến trình worker
+        usdt_amount (float): Tổng số USDT để giao dịch
+        renew_time (int): Thời gian làm mới (phút)
+        exchanges (list): Danh sách tên các sàn giao dịch
+        dry_run (bool): Nếu True, dùng bot mô phỏng
+    """
+    runtime.balance_service.initialize_balance_files(usdt_amount)
+    coordinator = CapitalCoordinator(runtime.state_store)
+    coordinator.start()
+    
+    context = multiprocessing.get_context('spawn')
+    groups = split_symbols(symbols, shards)
+    processes = []
+    # Chỉ tiến trình chính ghi và xoay vòng tệp log; worker gửi bản ghi qua hàng đợi
+    log_queue = context.Queue()
+    log_listener = logging.handlers.QueueListener(log_queue, setup_file_logging(), respect_handler_level=True)
+    log_listener.start()
+    try:
+        for index, group in enumerate(groups):
+            share = len(group) / len(symbols)
+            process = context.Process(
+                target=run_shard,
+                args=(index, mode, group, share, renew_time, exchanges, dry_run, coordinator.address, coordinator.authkey, log_queue),
+                name=f"shard-{index}",
+                daemon=True
+            )
+            process.start()
+            processes.append(process)
+        
+        log_info(f"Đã khởi động {len(processes)} worker cho {len(symbols)} cặp giao dịch")
+        for process in processes:
+            await asyncio.to_thread(process.join)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        log_listener.stop()
+        coordinator.stop()
 
 
 async def main():
     """Hàm chính của ứng dụng."""
+    runtime = None
     try:
         # Thiết lập logging
         setup_logging()
@@ -319,6 +475,12 @@ async def main():
             exchanges = [args.exchange1, args.exchange2, args.exchange3]
             symbol = args.symbol
             dry_run = args.dry_run
+            symbols = [s.strip() for s in args.symbols.split(',') if s.strip()] if args.symbols else []
+            shards = args.shards
+            paper = args.paper or bool(args.replay)
+            replay = args.replay
+            replay_speed = args.replay_speed
+            replay_start = args.replay_start
             
         # Nếu không có tham số dòng lệnh, lấy thông tin từ người dùng
         else:
@@ -333,21 +495,48 @@ async def main():
             exchanges = [inputs["exchange_1"], inputs["exchange_2"], inputs["exchange_3"]]
             symbol = inputs["crypto"] if inputs["crypto"] else None
             dry_run = False  # Mặc định không phải dry run khi nhập thủ công
+            symbols = []
+            shards = 1
+            paper = False
+            replay = None
+            replay_speed = 1.0
+            replay_start = None
         
         # Kiểm tra chế độ
         if mode not in BOT_MODES:
             log_error(f"Chế độ không hợp lệ: {mode}. Các chế độ hợp lệ: {', '.join(BOT_MODES)}")
             sys.exit(1)
             
+        # Giao dịch giấy: mọi lệnh được khớp mô phỏng, chạy trong một tiến trình
+        exchange_service = None
+        if paper:
+            source = ReplayBookSource(load_records(replay, replay_start), replay_speed) if replay else None
+            exchange_service = PaperExchangeService(exchanges, source)
+            shards = 1
+        
+        # Tạo môi trường chạy dài hạn: dịch vụ và kết nối được giữ qua các phiên
+        runtime = BotRuntime(exchange_service=exchange_service)
+        
+        # Chế độ nhiều tiến trình: các worker tự chạy vòng lặp phiên của mình
+        if shards > 1 and len(symbols) > 1:
+            await run_sharded(runtime, mode, symbols, shards, usdt_amount, renew_time, exchanges, dry_run)
+            return
+        
+        orchestrator = MultiSymbolOrchestrator(runtime) if len(symbols) > 1 else None
+        if len(symbols) == 1:
+            symbol = symbols[0]
+        
         # Chạy bot
         i = 0
         while True:
             # Chạy bot với các tham số đã cho
-            profit_pct = await run_bot(mode, symbol, usdt_amount, renew_time, exchanges, dry_run)
+            if orchestrator:
+                profit_pct = await orchestrator.run_session(mode, symbols, usdt_amount, renew_time, exchanges, dry_run)
+            else:
+                profit_pct = await run_bot(mode, symbol, usdt_amount, renew_time, exchanges, dry_run, runtime)
             
-            # Đọc số dư mới từ tệp
-            with open('balance.txt', 'r') as f:
-                usdt_amount = float(f.read().strip())
+            # Đọc số dư mới từ kho trạng thái
+            usdt_amount = float(runtime.balance_service.get_current_balance(usdt_amount))
             
             # Tăng số lần chạy
             i += 1
@@ -362,6 +551,8 @@ async def main():
     except Exception as e:
         log_error(f"Lỗi không xác định: {str(e)}")
     finally:
+        if runtime:
+            await runtime.close()
         log_info("Chương trình kết thúc.")
 
 
@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Đo vòng đời lệnh của OrderService trên một sàn giả lập theo kịch bản khớp lệnh.
+
+Mỗi kịch bản quy định lệnh mua/bán được khớp thế nào theo thời gian (ngay lập tức,
+một phần, chậm, bị từ chối). Mỗi đường đi của OrderService (place_initial_orders,
+place_arbitrage_orders, emergency_sell/emergency_convert) được chạy trên đồng hồ ảo
+(utils.clock), nên các khoảng chờ dài xong ngay. Với mỗi cặp (đường đi, kịch bản),
+báo cáo gồm:
+
+* elapsed_s: thời gian (ảo) từ khi gọi tới khi hàm trả về
+* detect_s: độ trễ phát hiện, từ khi lệnh cuối cùng tới trạng thái cuối (khớp hết,
+  bị hủy, bị từ chối) tới khi hàm trả về; để trống nếu hàm trả về khi còn lệnh chưa xong
+* unsettled: số lệnh chưa tới trạng thái cuối khi hàm trả về
+* rest_calls: số lời gọi REST (chi tiết theo phương thức trong cột calls)
+* wall_ms: thời gian thực của lần chạy (chi phí xử lý, không gồm thời gian chờ)
+
+Thay OrderService bằng một cách theo dõi lệnh khác (vd: theo dõi qua websocket) bằng
+--service module:Lớp để so sánh trên cùng kịch bản.
+
+Chạy:
+    python order_benchmark.py
+    python order_benchmark.py --paths arbitrage --scenarios partial,delayed --out bench.csv
+"""
+import csv
+import sys
+import time
+import argparse
+import importlib
+from collections import Counter
+
+import ccxt
+
+from services.exchange_service import ExchangeService
+from services.order_service import OrderService
+from utils import clock
+from utils.helpers import extract_base_asset
+from utils.logger import log_info, log_error
+
+REJECTED = 'rejected'
+# Kịch bản: {phía lệnh: các bước (giây sau khi đặt lệnh, phần đã khớp cộng dồn) hoặc REJECTED}
+SCENARIOS = {
+    'immediate': {'buy': ((0, 1.0),), 'sell': ((0, 1.0),)},
+    'partial': {'buy': ((0, 0.4),), 'sell': ((0, 1.0),)},
+    'delayed': {'buy': ((20, 0.5), (45, 1.0)), 'sell': ((30, 1.0),)},
+    'rejected': {'buy': REJECTED, 'sell': ((0, 1.0),)},
+}
+DEFAULT_EXCHANGES = ['binance', 'okx']
+DEFAULT_SYMBOL = 'BTC/USDT'
+DEFAULT_AMOUNT = 0.1
+DEFAULT_PRICE = 100.0
+DEFAULT_BASE_BALANCE = 1.0
+
+
+class ScriptedExchange:
+    """
+    Sàn giả lập theo giao diện ccxt: lệnh được khớp theo kịch bản, theo thời gian
+    của utils.clock. Mỗi lời gọi được đếm như một lời gọi REST.
+    """
+
+    def __init__(self, exchange_id, scenario, symbol=DEFAULT_SYMBOL, price=DEFAULT_PRICE,
+                 base_balance=DEFAULT_BASE_BALANCE):
+        """
+        Args:
+            exchange_id (str): ID của sàn
+            scenario (dict): Kịch bản khớp lệnh theo phía (xem SCENARIOS)
+            symbol (str): Cặp giao dịch
+            price (float): Giá của ticker
+            base_balance (float): Số dư tài sản cơ sở ban đầu
+        """
+        self.id = exchange_id
+        self.scenario = scenario
+        self.base_asset = extract_base_asset(symbol)
+        self.price = price
+        self.base_balance = base_balance
+        self.orders = {}
+        self.calls = Counter()
+        self._next_id = 0
+
+    def _order_view(self, order):
+        """Trạng thái của lệnh tại thời điểm hiện tại."""
+        now = clock.time()
+        if order['status'] == 'open':
+            fraction = max([f for delay, f in order['script'] if order['timestamp'] + delay <= now], default=0)
+            order['filled'] = order['amount'] * fraction
+            if fraction >= 1:
+                order['status'] = 'closed'
+                order['settled_at'] = order['timestamp'] + max(delay for delay, _ in order['script'])
+        order['remaining'] = order['amount'] - order['filled']
+        return {key: value for key, value in order.items() if key != 'script'}
+
+    def _create(self, symbol, order_type, side, amount, price=None):
+        script = self.scenario[side]
+        if script == REJECTED:
+            raise ccxt.InvalidOrder(f"{self.id}: lệnh {side} {symbol} bị từ chối (kịch bản)")
+        self._next_id += 1
+        order = {
+            'id': f"{self.id}-{self._next_id}", 'symbol': symbol, 'type': order_type, 'side': side,
+            'price': price or self.price, 'amount': amount, 'filled': 0.0, 'status': 'open',
+            'timestamp': clock.time(), 'settled_at': None, 'script': script,
+        }
+        self.orders[order['id']] = order
+        return self._order_view(order)
+
+    def create_limit_buy_order(self, symbol, amount, price):
+        self.calls['create_order'] += 1
+        return self._create(symbol, 'limit', 'buy', amount, price)
+
+    def create_limit_sell_order(self, symbol, amount, price):
+        self.calls['create_order'] += 1
+        return self._create(symbol, 'limit', 'sell', amount, price)
+
+    def create_market_buy_order(self, symbol, amount, params=None):
+        self.calls['create_order'] += 1
+        return self._create(symbol, 'market', 'buy', amount)
+
+    def create_market_sell_order(self, symbol, amount, params=None):
+        self.calls['create_order'] += 1
+        return self._create(symbol, 'market', 'sell', amount)
+
+    def fetch_order(self, order_id, symbol=None):
+        self.calls['fetch_order'] += 1
+        if order_id not in self.orders:
+            raise ccxt.OrderNotFound(f"{self.id}: không có lệnh {order_id}")
+        return self._order_view(self.orders[order_id])
+
+    def fetch_open_orders(self, symbol=None):
+        self.calls['fetch_open_orders'] += 1
+        views = [self._order_view(order) for order in self.orders.values()]
+        return [view for view in views if view['status'] == 'open' and symbol in (None, view['symbol'])]
+
+    def fetch_closed_orders(self, symbol=None):
+        self.calls['fetch_closed_orders'] += 1
+        views = [self._order_view(order) for order in self.orders.values()]
+        return [view for view in views if view['status'] != 'open' and symbol in (None, view['symbol'])]
+
+    def _cancel(self, order):
+        self._order_view(order)
+        if order['status'] != 'open':
+            raise ccxt.OrderNotFound(f"{self.id}: lệnh {order['id']} không còn mở")
+        order['status'] = 'canceled'
+        order['settled_at'] = clock.time()
+        return self._order_view(order)
+
+    def cancel_order(self, order_id, symbol=None):
+        self.calls['cancel_order'] += 1
+        if order_id not in self.orders:
+            raise ccxt.OrderNotFound(f"{self.id}: không có lệnh {order_id}")
+        return self._cancel(self.orders[order_id])
+
+    def cancel_all_orders(self, symbol=None):
+        self.calls['cancel_all_orders'] += 1
+        return [
+            self._cancel(order) for order in list(self.orders.values())
+            if self._order_view(order)['status'] == 'open' and symbol in (None, order['symbol'])
+        ]
+
+    def fetch_balance(self):
+        self.calls['fetch_balance'] += 1
+        base = self.base_balance
+        for order in self.orders.values():
+            filled = self._order_view(order)['filled']
+            base += filled if order['side'] == 'buy' else -filled
+        balances = {'USDT': 1_000_000.0, self.base_asset: base}
+        return {'free': balances, 'total': dict(balances)}
+
+    def fetch_ticker(self, symbol):
+        self.calls['fetch_ticker'] += 1
+        return {'symbol': symbol, 'last': self.price, 'bid': self.price, 'ask': self.price}
+
+
+class ScriptedExchangeService(ExchangeService):
+    """ExchangeService trên các sàn giả lập theo kịch bản (không kết nối mạng)."""
+
+    def __init__(self, exchanges, scenario, symbol=DEFAULT_SYMBOL, price=DEFAULT_PRICE,
+                 base_balance=DEFAULT_BASE_BALANCE):
+        """
+        Args:
+            exchanges (list): Các sàn giả lập
+            scenario (dict): Kịch bản khớp lệnh theo phía (xem SCENARIOS)
+            symbol (str): Cặp giao dịch
+            price (float): Giá của ticker
+            base_balance (float): Số dư tài sản cơ sở ban đầu mỗi sàn
+        """
+        # Không gọi ExchangeService.__init__: không tạo kết nối ccxt có xác thực
+        self.rate_limiter = None
+        self.market_data_client = None
+        self.exchanges = {exchange_id: {} for exchange_id in exchanges}
+        self.exchange_instances = {
+            exchange_id: ScriptedExchange(exchange_id, scenario, symbol, price, base_balance)
+            for exchange_id in exchanges
+        }
+        self.pro_exchange_instances = {}
+
+    def calls(self):
+        """Số lời gọi REST theo phương thức, cộng trên mọi sàn."""
+        total = Counter()
+        for exchange in self.exchange_instances.values():
+            total.update(exchange.calls)
+        return total
+
+    def orders(self):
+        """Mọi lệnh đã đặt (kèm thời điểm tới trạng thái cuối)."""
+        return [order for exchange in self.exchange_instances.values() for order in exchange.orders.values()]
+
+
+def _initial(order_service, exchanges, symbol, amount, price):
+    return order_service.place_initial_orders(exchanges, symbol, amount, price)
+
+
+def _arbitrage(order_service, exchanges, symbol, amount, price):
+    return order_service.place_arbitrage_orders(exchanges[0], exchanges[1], symbol, amount, price, price * 1.01)
+
+
+def _emergency(order_service, exchanges, symbol, amount, price):
+    return order_service.emergency_sell(symbol, exchanges)
+
+
+# Các đường đi của OrderService được đo
+PATHS = {
+    'initial': _initial,
+    'arbitrage': _arbitrage,
+    'emergency': _emergency,
+}
+
+
+def run_case(path, scenario, order_service_class=OrderService, exchanges=None, symbol=DEFAULT_SYMBOL,
+             amount=DEFAULT_AMOUNT, price=DEFAULT_PRICE):
+    """
+    Chạy một đường đi của OrderService với một kịch bản trên đồng hồ ảo.
+
+    Args:
+        path (str): Đường đi (xem PATHS)
+        scenario (str): Kịch bản (xem SCENARIOS)
+        order_service_class (type): Lớp dịch vụ lệnh được đo (nhận exchange_service)
+        exchanges (list, optional): Các sàn (mặc định: DEFAULT_EXCHANGES)
+        symbol (str): Cặp giao dịch
+        amount (float): Số lượng mỗi lệnh
+        price (float): Giá
+
+    Returns:
+        dict: Kết quả đo (xem docstring của module)
+    """
+    exchanges = exchanges or DEFAULT_EXCHANGES
+    exchange_service = ScriptedExchangeService(exchanges, SCENARIOS[scenario], symbol, price)
+    order_service = order_service_class(exchange_service)
+
+    virtual = clock.VirtualClock()
+    previous = clock.set_clock(virtual)
+    wall_started = time.perf_counter()
+    try:
+        try:
+            outcome = str(PATHS[path](order_service, exchanges, symbol, amount, price))
+        except Exception as e:
+            outcome = type(e).__name__
+        ended = virtual.time()
+        # Cập nhật trạng thái các lệnh tại thời điểm hàm trả về
+        for exchange in exchange_service.exchange_instances.values():
+            for order in exchange.orders.values():
+                exchange._order_view(order)
+    finally:
+        clock.set_clock(previous)
+    wall_ms = (time.perf_counter() - wall_started) * 1000
+
+    orders = exchange_service.orders()
+    unsettled = sum(1 for order in orders if order['settled_at'] is None)
+    # Không có lệnh nào được đặt (vd: bị từ chối ngay): kết quả được biết từ lúc bắt đầu
+    settled_at = max((order['settled_at'] or ended for order in orders), default=virtual.start)
+    calls = exchange_service.calls()
+    return {
+        'path': path,
+        'scenario': scenario,
+        'outcome': outcome,
+        'elapsed_s': ended - virtual.start,
+        'detect_s': None if unsettled else ended - settled_at,
+        'unsettled': unsettled,
+        'rest_calls': sum(calls.values()),
+        'calls': dict(sorted(calls.items())),
+        'wall_ms': wall_ms,
+    }
+
+
+def run_benchmark(paths=None, scenarios=None, order_service_class=OrderService):
+    """
+    Chạy mọi cặp (đường đi, kịch bản).
+
+    Returns:
+        list: Kết quả của từng cặp
+    """
+    return [
+        run_case(path, scenario, order_service_class)
+        for path in paths or PATHS for scenario in scenarios or SCENARIOS
+    ]
+
+
+def load_class(spec):
+    """Nạp lớp từ chuỗi 'module:Lớp'."""
+    module_name, _, class_name = spec.partition(':')
+    if not class_name:
+        raise ValueError(f"Cần dạng module:Lớp, nhận được {spec}")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def write_report(results, path):
+    """Ghi kết quả ra tệp CSV."""
+    fields = ['path', 'scenario', 'outcome', 'elapsed_s', 'detect_s', 'unsettled', 'rest_calls', 'calls', 'wall_ms']
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for result in results:
+            writer.writerow({**result, 'calls': ' '.join(f"{name}={count}" for name, count in result['calls'].items())})
+
+
+def print_report(results):
+    """In bảng kết quả."""
+    print(f"{'path':<10} {'scenario':<10} {'outcome':<16} {'elapsed_s':>10} {'detect_s':>9} {'unsettled':>9} {'rest':>6} {'wall_ms':>8}  calls")
+    for result in results:
+        detect = '-' if result['detect_s'] is None else f"{result['detect_s']:.1f}"
+        calls = ' '.join(f"{name}={count}" for name, count in result['calls'].items())
+        print(
+            f"{result['path']:<10} {result['scenario']:<10} {result['outcome']:<16} {result['elapsed_s']:>10.1f} "
+            f"{detect:>9} {result['unsettled']:>9} {result['rest_calls']:>6} {result['wall_ms']:>8.1f}  {calls}"
+        )
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description='Đo vòng đời lệnh của OrderService trên sàn giả lập theo kịch bản')
+    parser.add_argument('--paths', default=','.join(PATHS), help=f"Các đường đi ({', '.join(PATHS)})")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"Các kịch bản ({', '.join(SCENARIOS)})")
+    parser.add_argument('--service', default='services.order_service:OrderService', help='Lớp dịch vụ lệnh (module:Lớp)')
+    parser.add_argument('--out', help='Ghi kết quả ra tệp CSV')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    paths = [p.strip() for p in args.paths.split(',') if p.strip()]
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = [p for p in paths if p not in PATHS] + [s for s in scenarios if s not in SCENARIOS]
+    try:
+        if unknown:
+            raise ValueError(f"Không hỗ trợ: {', '.join(unknown)}")
+        order_service_class = load_class(args.service)
+    except (ValueError, ImportError, AttributeError) as e:
+        log_error(str(e))
+        sys.exit(2)
+
+    log_info(f"Đo {len(paths)} đường đi x {len(scenarios)} kịch bản với {args.service}")
+    results = run_benchmark(paths, scenarios, order_service_class)
+    print_report(results)
+    if args.out:
+        write_report(results, args.out)
+        log_info(f"Đã ghi kết quả vào {args.out}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,11 @@
 Service quản lý số dư trên các sàn giao dịch.
 """
 import os
-import time
+import threading
+from utils import clock
 from utils.logger import log_info, log_error, log_warning
 from utils.exceptions import InsufficientBalanceError
-from utils.helpers import read_file_content, update_balance_file, extract_base_asset
-from configs import START_BALANCE_FILE, BALANCE_FILE
+from utils.helpers import extract_base_asset
 
 
 class BalanceService:
@@ -14,17 +14,23 @@ class BalanceService:
     Lớp dịch vụ quản lý số dư trên các sàn giao dịch.
     """
     
-    def __init__(self, exchange_service):
+    def __init__(self, exchange_service, state_store):
         """
         Khởi tạo dịch vụ quản lý số dư.
         
         Args:
             exchange_service (ExchangeService): Dịch vụ sàn giao dịch
+            state_store (StateStore): Kho lưu trạng thái phiên
         """
         self.exchange_service = exchange_service
+        self.state_store = state_store
         self.cache = {}  # Cache số dư để giảm số lượng request
         self.cache_time = {}  # Thời gian cache
         self.cache_timeout = 10  # Thời gian hết hạn cache (giây)
+        self._pending_ledgers = {}  # Bản chụp sổ cái mới nhất chưa ghi, theo cặp
+        self._ledger_condition = threading.Condition()
+        self._ledger_write_lock = threading.Lock()
+        self._ledger_thread = None
     
     def check_balances(self, exchanges, symbol, total_amount, notification_service=None):
         """
@@ -88,7 +94,7 @@ class BalanceService:
         cache_key = f"{exchange_id}_{asset}"
         
         # Sử dụng cache nếu chưa hết hạn
-        current_time = time.time()
+        current_time = clock.time()
         if cache_key in self.cache and current_time - self.cache_time.get(cache_key, 0) < self.cache_timeout:
             return self.cache[cache_key]
         
@@ -147,42 +153,132 @@ class BalanceService:
     
     def initialize_balance_files(self, amount):
         """
-        Khởi tạo các tệp tin lưu trữ số dư.
+        Khởi tạo số dư ban đầu của phiên trong kho trạng thái.
         
         Args:
             amount (float): Số dư ban đầu
         """
-        # Ghi số dư ban đầu vào tệp
-        with open(START_BALANCE_FILE, 'w') as f:
-            f.write(str(amount))
+        # Ghi số dư ban đầu và số dư hiện tại trong cùng một giao dịch
+        self.state_store.update({'start_balance': amount, 'balance': amount})
+    
+    def get_current_balance(self, default=0):
+        """
+        Lấy số dư hiện tại đã lưu trong kho trạng thái.
+        
+        Args:
+            default (float): Giá trị mặc định nếu chưa có số dư
+            
+        Returns:
+            float: Số dư hiện tại
+        """
+        return self.state_store.get('balance', default)
+    
+    def save_ledgers(self, symbol, usd, crypto, mode=None):
+        """
+        Lưu sổ cái ảo usd/crypto trên mỗi sàn vào kho trạng thái.
+        
+        Hàm được gọi sau mỗi giao dịch trong vòng lặp sự kiện nên chỉ ghi nhận bản chụp
+        mới nhất; một luồng nền ghi nó vào kho trạng thái (có fsync). Các bản chụp liên
+        tiếp của cùng một cặp chưa kịp ghi được gộp lại.
+        
+        Args:
+            symbol (str): Ký hiệu của cặp giao dịch
+            usd (dict): Số dư USDT ảo trên mỗi sàn
+            crypto (dict): Số dư crypto ảo trên mỗi sàn
+            mode (str, optional): Chế độ của bot sở hữu sổ cái
+        """
+        with self._ledger_condition:
+            self._pending_ledgers[symbol] = (dict(usd), dict(crypto), mode)
+            if self._ledger_thread is None:
+                self._ledger_thread = threading.Thread(
+                    target=self._ledger_writer, name='ledger-writer', daemon=True
+                )
+                self._ledger_thread.start()
+            self._ledger_condition.notify()
+    
+    def flush_ledgers(self):
+        """
+        Ghi ngay các sổ cái ảo đang chờ vào kho trạng thái (gọi khi kết thúc phiên).
+        """
+        with self._ledger_write_lock:
+            with self._ledger_condition:
+                pending, self._pending_ledgers = self._pending_ledgers, {}
+            
+            for symbol, (usd, crypto, mode) in pending.items():
+                try:
+                    self.state_store.set_ledgers(symbol, usd, crypto, mode)
+                except Exception as e:
+                    log_error(f"Lỗi khi lưu sổ cái ảo: {str(e)}")
+    
+    def load_ledgers(self, symbol, mode):
+        """
+        Lấy sổ cái ảo đã lưu của một cặp giao dịch (phiên trước bị dừng đột ngột).
+        
+        Args:
+            symbol (str): Ký hiệu của cặp giao dịch
+            mode (str): Chế độ của bot; sổ cái của chế độ khác bị bỏ qua
+            
+        Returns:
+            dict: {'usd': {...}, 'crypto': {...}} hoặc None nếu không có
+        """
+        self.flush_ledgers()
+        ledgers = self.state_store.get_ledgers(symbol)
+        if not ledgers or ledgers.get('mode') != mode:
+            return None
+        return ledgers
+    
+    def clear_ledgers(self, symbol):
+        """
+        Xóa sổ cái ảo của một cặp giao dịch khi phiên kết thúc bình thường.
         
-        with open(BALANCE_FILE, 'w') as f:
-            f.write(str(amount))
+        Args:
+            symbol (str): Ký hiệu của cặp giao dịch
+        """
+        with self._ledger_write_lock:
+            with self._ledger_condition:
+                self._pending_ledgers.pop(symbol, None)
+            try:
+                self.state_store.delete_ledgers(symbol)
+            except Exception as e:
+                log_error(f"Lỗi khi xóa sổ cái ảo: {str(e)}")
+    
+    def _ledger_writer(self):
+        """
+        Luồng nền ghi các sổ cái ảo đang chờ.
+        """
+        while True:
+            with self._ledger_condition:
+                while not self._pending_ledgers:
+                    self._ledger_condition.wait()
+            self.flush_ledgers()
     
-    def update_balance_with_profit(self, profit_pct):
+    def update_balance_with_profit(self, profit_pct, amount=None):
         """
         Cập nhật số dư với lợi nhuận.
         
         Args:
             profit_pct (float): Phần trăm lợi nhuận
+            amount (float, optional): Số vốn mà lợi nhuận được tính trên đó. Nếu bỏ
+                trống, lợi nhuận được tính trên toàn bộ số dư hiện tại.
             
         Returns:
             float: Số dư mới
         """
         try:
-            # Đọc số dư hiện tại từ tệp
-            with open(BALANCE_FILE, 'r+') as f:
-                balance = float(f.read().strip())
-                
-                # Tính số dư mới
-                new_balance = round(balance * (1 + (profit_pct / 100)), 3)
-                
-                # Ghi số dư mới vào tệp
-                f.seek(0)
-                f.write(str(new_balance))
-                f.truncate()
-                
-                return new_balance
+            # Nhiều bot có thể dùng chung số dư, mỗi bot chỉ cộng lợi nhuận trên vốn của mình
+            if amount is not None:
+                return self.state_store.adjust('balance', amount * profit_pct / 100)
+            
+            # Đọc số dư hiện tại từ kho trạng thái
+            balance = float(self.state_store.get('balance', 0))
+            
+            # Tính số dư mới
+            new_balance = round(balance * (1 + (profit_pct / 100)), 3)
+            
+            # Ghi số dư mới (nguyên tử)
+            self.state_store.set('balance', new_balance)
+            
+            return new_balance
                 
         except Exception as e:
             log_error(f"Lỗi khi cập nhật số dư với lợi nhuận: {str(e)}")
@@ -0,0 +1,309 @@
+"""
+Kho lưu sách lệnh nén, tua được theo thời gian (thay cho JSONL khi dữ liệu lớn).
+
+Tệp dữ liệu (.bka) là chuỗi các khối, mỗi khối là một frame zstd độc lập đứng sau 4 byte
+độ dài. Trong một khối, bản ghi đầu tiên của mỗi (sàn, cặp) là sách lệnh đầy đủ, các bản
+ghi sau chỉ chứa các mức giá thay đổi so với bản ghi trước ([giá, lượng], lượng 0 = xóa
+mức giá), nên mỗi khối giải nén được riêng. Khối được đóng sau ARCHIVE_CHUNK_SECONDS giây
+dữ liệu hoặc ARCHIVE_CHUNK_RECORDS bản ghi.
+
+Tệp chỉ mục đi kèm (.bka.idx) có một dòng JSON cho mỗi khối {"ts", "ts_end", "offset",
+"length", "records"}: để đọc từ một thời điểm, chỉ các khối từ khối chứa thời điểm đó trở
+đi được giải nén. Thiếu chỉ mục thì chỉ mục được dựng lại bằng cách quét độ dài các khối.
+
+Chạy:
+    python -m services.book_archive pack data/books.jsonl data/books.bka
+    python -m services.book_archive cat data/books.bka --start 1700000000 --end 1700003600
+    python -m services.book_archive info data/books.bka
+"""
+import os
+import sys
+import json
+import struct
+import bisect
+import argparse
+
+import zstandard
+
+from utils import clock
+from utils.logger import log_info, log_error
+from configs import PAPER_BOOK_DEPTH, ARCHIVE_CHUNK_SECONDS, ARCHIVE_CHUNK_RECORDS, ARCHIVE_ZSTD_LEVEL
+
+ARCHIVE_SUFFIX = '.bka'
+INDEX_SUFFIX = '.idx'
+_LENGTH = struct.Struct('<I')
+
+
+def is_archive(path):
+    """Kiểm tra đường dẫn có phải kho sách lệnh nén hay không (theo phần mở rộng)."""
+    return str(path).endswith(ARCHIVE_SUFFIX)
+
+
+def _levels(levels, depth):
+    return {float(price): float(amount) for price, amount in (level[:2] for level in levels[:depth])}
+
+
+def _diff(previous, current):
+    """Các mức giá thay đổi giữa hai phía sách lệnh ({giá: lượng})."""
+    changes = [[price, amount] for price, amount in current.items() if previous.get(price) != amount]
+    changes.extend([price, 0] for price in previous if price not in current)
+    return changes
+
+
+def _apply(side, changes):
+    for price, amount in changes:
+        if amount:
+            side[price] = amount
+        else:
+            side.pop(price, None)
+
+
+class BookArchiveWriter:
+    """Ghi thêm sách lệnh vào kho nén (cùng cách dùng với BookRecorder)."""
+
+    def __init__(self, path, depth=PAPER_BOOK_DEPTH, chunk_seconds=ARCHIVE_CHUNK_SECONDS,
+                 chunk_records=ARCHIVE_CHUNK_RECORDS, level=ARCHIVE_ZSTD_LEVEL):
+        """
+        Args:
+            path (str): Đường dẫn tệp dữ liệu (được ghi thêm; chỉ mục là path + '.idx')
+            depth (int): Số mức giá mỗi phía được ghi
+            chunk_seconds (float): Khoảng thời gian dữ liệu tối đa của một khối (giây)
+            chunk_records (int): Số bản ghi tối đa của một khối
+            level (int): Mức nén zstd
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.depth = depth
+        self.chunk_seconds = chunk_seconds
+        self.chunk_records = chunk_records
+        self.count = 0
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._file = open(path, 'ab')
+        self._index = open(path + INDEX_SUFFIX, 'a', encoding='utf-8')
+        self._lines = []  # Các bản ghi (JSON) của khối đang mở
+        self._books = {}  # {(sàn, cặp): (bids, asks)} trong khối đang mở
+        self._first_ts = None
+        self._last_ts = None
+
+    def record(self, exchange_id, symbol, orderbook, ts=None):
+        """
+        Ghi một sách lệnh.
+
+        Args:
+            exchange_id (str): ID của sàn
+            symbol (str): Cặp giao dịch
+            orderbook (dict): Sách lệnh dạng ccxt
+            ts (float, optional): Thời điểm (giây, mặc định: hiện tại)
+        """
+        ts = clock.time() if ts is None else ts
+        if self._lines and (ts - self._first_ts >= self.chunk_seconds or len(self._lines) >= self.chunk_records):
+            self.flush()
+
+        key = (exchange_id, symbol)
+        bids, asks = _levels(orderbook['bids'], self.depth), _levels(orderbook['asks'], self.depth)
+        previous = self._books.get(key)
+        if previous is None:
+            # Bản ghi đầu tiên của cặp trong khối: sách lệnh đầy đủ
+            record = {'ts': ts, 'exchange': exchange_id, 'symbol': symbol,
+                      'bids': [[p, a] for p, a in bids.items()], 'asks': [[p, a] for p, a in asks.items()]}
+        else:
+            record = {'ts': ts, 'exchange': exchange_id, 'symbol': symbol,
+                      'b': _diff(previous[0], bids), 'a': _diff(previous[1], asks)}
+        self._books[key] = (bids, asks)
+        self._lines.append(json.dumps(record, separators=(',', ':')))
+        if self._first_ts is None:
+            self._first_ts = ts
+        self._last_ts = ts if self._last_ts is None else max(self._last_ts, ts)
+        self.count += 1
+
+    def flush(self):
+        """Nén và ghi khối đang mở cùng dòng chỉ mục của nó."""
+        if not self._lines:
+            return
+        frame = self._compressor.compress('\n'.join(self._lines).encode('utf-8'))
+        offset = self._file.seek(0, os.SEEK_END)
+        self._file.write(_LENGTH.pack(len(frame)) + frame)
+        self._file.flush()
+        entry = {'ts': self._first_ts, 'ts_end': self._last_ts, 'offset': offset,
+                 'length': len(frame), 'records': len(self._lines)}
+        self._index.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        self._index.flush()
+        self._lines = []
+        self._books = {}
+        self._first_ts = self._last_ts = None
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+            self._index.close()
+
+
+class BookArchiveReader:
+    """Đọc kho sách lệnh nén từ một thời điểm bất kỳ, giải nén từng khối một."""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Đường dẫn tệp dữ liệu
+        """
+        self.path = path
+        self._decompressor = zstandard.ZstdDecompressor()
+        self.index = self._load_index()
+        # Thời điểm bắt đầu của các khối (không giảm) và thời điểm kết thúc lớn nhất tới từng khối
+        self._starts = [entry['ts'] for entry in self.index]
+        self._reach = []
+        for entry in self.index:
+            self._reach.append(max(entry['ts_end'], self._reach[-1]) if self._reach else entry['ts_end'])
+
+    def _load_index(self):
+        """Đọc chỉ mục; dựng lại nếu thiếu hoặc không khớp với tệp dữ liệu."""
+        size = os.path.getsize(self.path)
+        try:
+            with open(self.path + INDEX_SUFFIX, encoding='utf-8') as f:
+                index = [json.loads(line) for line in f if line.strip()]
+            if all(entry['offset'] + _LENGTH.size + entry['length'] <= size for entry in index) and \
+                    (not index or index[-1]['offset'] + _LENGTH.size + index[-1]['length'] == size):
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+        log_info(f"Dựng lại chỉ mục cho {self.path}")
+        return self.rebuild_index()
+
+    def rebuild_index(self):
+        """
+        Dựng lại chỉ mục bằng cách quét độ dài các khối (và ghi lại tệp chỉ mục).
+
+        Returns:
+            list: Các dòng chỉ mục
+        """
+        index = []
+        with open(self.path, 'rb') as f:
+            while True:
+                offset = f.tell()
+                header = f.read(_LENGTH.size)
+                if len(header) < _LENGTH.size:
+                    break
+                (length,) = _LENGTH.unpack(header)
+                frame = f.read(length)
+                if len(frame) < length:
+                    log_error(f"Khối cuối của {self.path} bị cắt ngang, bỏ qua")
+                    break
+                records = self._decode(frame)
+                index.append({'ts': records[0]['ts'], 'ts_end': max(r['ts'] for r in records),
+                              'offset': offset, 'length': length, 'records': len(records)})
+        with open(self.path + INDEX_SUFFIX, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry, separators=(',', ':')) + '\n' for entry in index)
+        return index
+
+    def _decode(self, frame):
+        data = self._decompressor.decompress(frame)
+        return [json.loads(line) for line in data.decode('utf-8').split('\n') if line]
+
+    def _chunk(self, f, entry):
+        """Giải nén một khối thành các sách lệnh đầy đủ."""
+        f.seek(entry['offset'] + _LENGTH.size)
+        books = {}
+        for raw in self._decode(f.read(entry['length'])):
+            key = (raw['exchange'], raw['symbol'])
+            if 'bids' in raw:
+                books[key] = ({p: a for p, a in raw['bids']}, {p: a for p, a in raw['asks']})
+            else:
+                _apply(books[key][0], raw['b'])
+                _apply(books[key][1], raw['a'])
+            bids, asks = books[key]
+            yield {
+                'ts': raw['ts'], 'exchange': raw['exchange'], 'symbol': raw['symbol'],
+                'bids': [[p, bids[p]] for p in sorted(bids, reverse=True)],
+                'asks': [[p, asks[p]] for p in sorted(asks)],
+            }
+
+    def time_range(self):
+        """Thời điểm đầu và cuối của dữ liệu (None nếu kho rỗng)."""
+        if not self.index:
+            return None
+        return self.index[0]['ts'], self._reach[-1]
+
+    def read(self, start=None, end=None):
+        """
+        Đọc các sách lệnh có start <= ts < end theo thứ tự trong kho.
+
+        Chỉ các khối có thể chứa dữ liệu trong khoảng được giải nén, lần lượt từng khối.
+
+        Args:
+            start (float, optional): Thời điểm bắt đầu (giây, mặc định: đầu kho)
+            end (float, optional): Thời điểm kết thúc (giây, không gồm, mặc định: cuối kho)
+
+        Yields:
+            dict: Bản ghi {"ts", "exchange", "symbol", "bids", "asks"} (như load_records)
+        """
+        first = 0
+        if start is not None:
+            # Khối đầu tiên có dữ liệu tới `start` (các khối trước đó kết thúc sớm hơn)
+            first = bisect.bisect_left(self._reach, start)
+        with open(self.path, 'rb') as f:
+            for entry in self.index[first:]:
+                if end is not None and entry['ts'] >= end:
+                    break
+                for record in self._chunk(f, entry):
+                    if (start is None or record['ts'] >= start) and (end is None or record['ts'] < end):
+                        yield record
+
+
+def pack(source, path, depth=PAPER_BOOK_DEPTH):
+    """
+    Chuyển tệp JSONL (xem BookRecorder) thành kho nén.
+
+    Returns:
+        int: Số bản ghi đã ghi
+    """
+    writer = BookArchiveWriter(path, depth)
+    try:
+        with open(source, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    writer.record(record['exchange'], record['symbol'], record, record['ts'])
+    finally:
+        writer.close()
+    return writer.count
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description='Kho sách lệnh nén, tua được theo thời gian')
+    commands = parser.add_subparsers(dest='command', required=True)
+    pack_parser = commands.add_parser('pack', help='Chuyển tệp JSONL thành kho nén')
+    pack_parser.add_argument('source', help='Tệp JSONL')
+    pack_parser.add_argument('path', help=f'Tệp kho nén ({ARCHIVE_SUFFIX})')
+    pack_parser.add_argument('--depth', type=int, default=PAPER_BOOK_DEPTH, help='Số mức giá mỗi phía')
+    cat_parser = commands.add_parser('cat', help='In các bản ghi dạng JSONL')
+    cat_parser.add_argument('path', help='Tệp kho nén')
+    cat_parser.add_argument('--start', type=float, help='Từ thời điểm (giây)')
+    cat_parser.add_argument('--end', type=float, help='Tới thời điểm (giây, không gồm)')
+    info_parser = commands.add_parser('info', help='Thông tin kho nén')
+    info_parser.add_argument('path', help='Tệp kho nén')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    if args.command == 'pack':
+        count = pack(args.source, args.path, args.depth)
+        size = os.path.getsize(args.path)
+        log_info(f"Đã ghi {count} sách lệnh vào {args.path} ({size / max(os.path.getsize(args.source), 1):.1%} kích thước JSONL)")
+    elif args.command == 'cat':
+        for record in BookArchiveReader(args.path).read(args.start, args.end):
+            sys.stdout.write(json.dumps(record, separators=(',', ':')) + '\n')
+    else:
+        reader = BookArchiveReader(args.path)
+        time_range = reader.time_range()
+        records = sum(entry['records'] for entry in reader.index)
+        print(f"{len(reader.index)} khối, {records} bản ghi, {os.path.getsize(args.path)} byte")
+        if time_range:
+            print(f"Từ {time_range[0]} tới {time_range[1]}")
+
+
+if __name__ == "__main__":
+    main()
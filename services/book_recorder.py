@@ -0,0 +1,112 @@
+"""
+Ghi sách lệnh L2 ra tệp JSONL để phát lại (--replay) và quét tham số (sweep.py).
+
+Mỗi dòng là một bản ghi {"ts", "exchange", "symbol", "bids", "asks"}, đọc lại bằng
+services.paper_exchange.load_records. Tệp ra có phần mở rộng .bka được ghi thành kho
+nén tua được theo thời gian (xem services.book_archive).
+
+Chạy: python -m services.book_recorder --exchanges binance,okx --symbols BTC/USDT --out data/books.jsonl
+"""
+import os
+import json
+import asyncio
+import argparse
+
+from services.paper_exchange import LiveBookSource
+from services.book_archive import BookArchiveWriter, is_archive
+from utils import clock
+from utils.logger import log_info, log_error
+from configs import PAPER_BOOK_DEPTH
+
+
+class BookRecorder:
+    """Ghi thêm các bản ghi sách lệnh vào tệp JSONL."""
+
+    def __init__(self, path, depth=PAPER_BOOK_DEPTH):
+        """
+        Args:
+            path (str): Đường dẫn tệp (được ghi thêm)
+            depth (int): Số mức giá mỗi phía được ghi
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.depth = depth
+        self.count = 0
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def record(self, exchange_id, symbol, orderbook, ts=None):
+        """
+        Ghi một sách lệnh.
+
+        Args:
+            exchange_id (str): ID của sàn
+            symbol (str): Cặp giao dịch
+            orderbook (dict): Sách lệnh dạng ccxt
+            ts (float, optional): Thời điểm (giây, mặc định: hiện tại)
+        """
+        record = {
+            'ts': clock.time() if ts is None else ts,
+            'exchange': exchange_id,
+            'symbol': symbol,
+            'bids': [level[:2] for level in orderbook['bids'][:self.depth]],
+            'asks': [level[:2] for level in orderbook['asks'][:self.depth]],
+        }
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.count += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+async def _record_loop(source, recorder, exchange_id, symbol, deadline):
+    """Ghi mọi cập nhật sách lệnh của một (sàn, cặp) cho tới hạn."""
+    while clock.time() < deadline:
+        try:
+            orderbook = await source.watch_order_book(exchange_id, symbol)
+        except Exception as e:
+            log_error(f"Lỗi khi nhận sách lệnh {symbol} từ {exchange_id}: {str(e)}")
+            await clock.async_sleep(1)
+            continue
+        recorder.record(exchange_id, symbol, orderbook)
+
+
+async def main(path, exchanges, symbols, duration, depth=PAPER_BOOK_DEPTH):
+    """Ghi sách lệnh của các cặp trên các sàn trong `duration` giây."""
+    source = LiveBookSource()
+    recorder = BookArchiveWriter(path, depth) if is_archive(path) else BookRecorder(path, depth)
+    deadline = clock.time() + duration
+    log_info(f"Ghi sách lệnh {', '.join(symbols)} trên {', '.join(exchanges)} vào {path}")
+    try:
+        loops = [
+            _record_loop(source, recorder, exchange_id, symbol, deadline)
+            for exchange_id in exchanges for symbol in symbols
+        ]
+        await asyncio.gather(*loops)
+    finally:
+        recorder.close()
+        await source.close()
+        log_info(f"Đã ghi {recorder.count} sách lệnh vào {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Ghi sách lệnh L2 ra tệp JSONL')
+    parser.add_argument('--exchanges', required=True, help='Các sàn, phân cách bằng dấu phẩy')
+    parser.add_argument('--symbols', required=True, help='Các cặp giao dịch, phân cách bằng dấu phẩy')
+    parser.add_argument('--out', required=True, help='Tệp JSONL hoặc kho nén .bka (được ghi thêm)')
+    parser.add_argument('--duration', type=float, default=3600, help='Thời gian ghi (giây)')
+    parser.add_argument('--depth', type=int, default=PAPER_BOOK_DEPTH, help='Số mức giá mỗi phía')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(
+            args.out, [e.strip() for e in args.exchanges.split(',') if e.strip()],
+            [s.strip() for s in args.symbols.split(',') if s.strip()], args.duration, args.depth
+        ))
+    except KeyboardInterrupt:
+        log_info("Đã dừng ghi sách lệnh.")
@@ -0,0 +1,270 @@
+"""
+Điều phối vốn giữa các tiến trình worker khi chạy nhiều tiến trình (sharded).
+
+Tiến trình điều phối giữ sổ cái số dư duy nhất và cấp phát phần vốn (reservation)
+cho các worker qua kênh IPC cục bộ (Unix domain socket của multiprocessing).
+Mỗi worker phải giữ một reservation trước khi giao dịch và trả lại kèm lợi nhuận
+khi kết thúc phiên, nên tổng vốn được cấp không bao giờ vượt quá số dư.
+"""
+import os
+import uuid
+import threading
+from multiprocessing.connection import Listener, Client
+
+from utils.logger import log_info, log_error, log_warning
+from configs import CAPITAL_COORDINATOR_ADDRESS
+
+
+class CapitalLedger:
+    """
+    Sổ cái vốn: số dư (lưu trong kho trạng thái) và các reservation đang mở.
+    """
+
+    def __init__(self, state_store):
+        """
+        Khởi tạo sổ cái vốn.
+
+        Args:
+            state_store (StateStore): Kho lưu trạng thái của tiến trình điều phối
+        """
+        self.state_store = state_store
+        self.reservations = {}  # {reservation_id: {'worker': tên worker, 'amount': số vốn}}
+        self._lock = threading.Lock()
+
+    @property
+    def balance(self):
+        """Tổng số dư (USDT)."""
+        return float(self.state_store.get('balance', 0))
+
+    @property
+    def reserved(self):
+        """Tổng số vốn đang được cấp cho các worker."""
+        return sum(reservation['amount'] for reservation in self.reservations.values())
+
+    @property
+    def available(self):
+        """Số vốn còn có thể cấp."""
+        return max(self.balance - self.reserved, 0)
+
+    def reserve(self, worker, amount):
+        """
+        Cấp một phần vốn cho worker.
+
+        Args:
+            worker (str): Tên worker
+            amount (float): Số vốn yêu cầu
+
+        Returns:
+            dict: {'id': reservation_id, 'amount': số vốn được cấp}, hoặc None nếu hết vốn.
+                Số vốn được cấp có thể nhỏ hơn yêu cầu nếu vốn còn lại không đủ.
+        """
+        with self._lock:
+            granted = round(min(float(amount), self.available), 8)
+            if granted <= 0:
+                return None
+
+            reservation_id = uuid.uuid4().hex
+            self.reservations[reservation_id] = {'worker': worker, 'amount': granted}
+            return {'id': reservation_id, 'amount': granted}
+
+    def release(self, reservation_id, profit_usd=0):
+        """
+        Trả lại vốn đã cấp và ghi nhận lợi nhuận vào số dư.
+
+        Args:
+            reservation_id (str): ID của reservation
+            profit_usd (float): Lợi nhuận (USD) đạt được trên phần vốn này
+
+        Returns:
+            float: Số dư mới, hoặc None nếu reservation không tồn tại
+        """
+        with self._lock:
+            if self.reservations.pop(reservation_id, None) is None:
+                return None
+            return self.state_store.adjust('balance', float(profit_usd))
+
+    def release_worker(self, worker):
+        """Thu hồi tất cả reservation của một worker (khi worker ngắt kết nối)."""
+        with self._lock:
+            for reservation_id in [
+                key for key, reservation in self.reservations.items() if reservation['worker'] == worker
+            ]:
+                del self.reservations[reservation_id]
+
+
+class CapitalCoordinator:
+    """
+    Máy chủ IPC cấp phát vốn cho các worker, chạy trong tiến trình chính.
+
+    Mỗi yêu cầu là một dict {'op': ..., ...}; mỗi kết nối được phục vụ bởi một luồng.
+    """
+
+    def __init__(self, state_store, address=CAPITAL_COORDINATOR_ADDRESS, authkey=None):
+        """
+        Khởi tạo máy chủ điều phối vốn.
+
+        Args:
+            state_store (StateStore): Kho lưu trạng thái chứa số dư
+            address (str): Đường dẫn Unix socket
+            authkey (bytes, optional): Khóa xác thực dùng chung với các worker
+        """
+        self.ledger = CapitalLedger(state_store)
+        self.address = address
+        self.authkey = authkey or os.urandom(32)
+        self._listener = None
+        self._thread = None
+
+    def start(self):
+        """Mở socket và bắt đầu nhận kết nối trong luồng nền."""
+        if self._listener is not None:
+            return
+
+        directory = os.path.dirname(self.address)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # Socket cũ từ lần chạy trước
+
+        self._listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey)
+        self._thread = threading.Thread(target=self._accept_loop, name='capital-coordinator', daemon=True)
+        self._thread.start()
+        log_info(f"Bộ điều phối vốn đang lắng nghe tại {self.address} (số dư {self.ledger.balance} USDT)")
+
+    def stop(self):
+        """Đóng socket."""
+        if self._listener is None:
+            return
+        listener, self._listener = self._listener, None
+        try:
+            listener.close()
+        except OSError:
+            pass
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def _accept_loop(self):
+        """Nhận kết nối từ các worker."""
+        while self._listener is not None:
+            try:
+                conn = self._listener.accept()
+            except Exception as e:
+                if self._listener is not None:
+                    log_error(f"Lỗi khi nhận kết nối worker: {str(e)}")
+                    continue
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        """Phục vụ các yêu cầu của một worker cho tới khi worker ngắt kết nối."""
+        worker = None
+        try:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    break
+                worker = request.get('worker', worker)
+                conn.send(self.handle(request))
+        finally:
+            conn.close()
+            if worker is not None:
+                # Worker bị dừng: vốn chưa trả lại được thu hồi (lợi nhuận không được ghi nhận)
+                self.ledger.release_worker(worker)
+
+    def handle(self, request):
+        """
+        Xử lý một yêu cầu.
+
+        Args:
+            request (dict): Yêu cầu từ worker
+
+        Returns:
+            dict: Phản hồi
+        """
+        op = request.get('op')
+        try:
+            if op == 'reserve':
+                reservation = self.ledger.reserve(request['worker'], request['amount'])
+                if reservation:
+                    log_info(f"Cấp {reservation['amount']} USDT cho {request['worker']}")
+                else:
+                    log_warning(f"Hết vốn để cấp cho {request['worker']}")
+                return {'ok': reservation is not None, 'reservation': reservation}
+            if op == 'release':
+                balance = self.ledger.release(request['id'], request.get('profit_usd', 0))
+                return {'ok': balance is not None, 'balance': balance}
+            if op == 'status':
+                return {
+                    'ok': True, 'balance': self.ledger.balance,
+                    'reserved': self.ledger.reserved, 'available': self.ledger.available
+                }
+            return {'ok': False, 'error': f"Yêu cầu không hợp lệ: {op}"}
+        except Exception as e:
+            log_error(f"Lỗi khi xử lý yêu cầu {op}: {str(e)}")
+            return {'ok': False, 'error': str(e)}
+
+
+class CapitalClient:
+    """
+    Client của worker để xin và trả vốn từ bộ điều phối.
+    """
+
+    def __init__(self, worker, address=CAPITAL_COORDINATOR_ADDRESS, authkey=None):
+        """
+        Khởi tạo client.
+
+        Args:
+            worker (str): Tên worker
+            address (str): Đường dẫn Unix socket của bộ điều phối
+            authkey (bytes): Khóa xác thực dùng chung
+        """
+        self.worker = worker
+        self.address = address
+        self.authkey = authkey
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _request(self, op, **kwargs):
+        """Gửi một yêu cầu và chờ phản hồi."""
+        with self._lock:
+            if self._conn is None:
+                self._conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+            self._conn.send({'op': op, 'worker': self.worker, **kwargs})
+            return self._conn.recv()
+
+    def reserve(self, amount):
+        """
+        Xin cấp vốn.
+
+        Args:
+            amount (float): Số vốn yêu cầu
+
+        Returns:
+            dict: {'id': reservation_id, 'amount': số vốn được cấp}, hoặc None nếu hết vốn
+        """
+        return self._request('reserve', amount=amount).get('reservation')
+
+    def release(self, reservation_id, profit_usd=0):
+        """
+        Trả lại vốn kèm lợi nhuận.
+
+        Returns:
+            float: Số dư mới của bộ điều phối
+        """
+        return self._request('release', id=reservation_id, profit_usd=profit_usd).get('balance')
+
+    def status(self):
+        """
+        Lấy tình trạng sổ cái.
+
+        Returns:
+            dict: balance, reserved, available
+        """
+        return self._request('status')
+
+    def close(self):
+        """Đóng kết nối."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,241 @@
+"""
+Cấu hình nạp lại khi đang chạy (không cần khởi động lại phiên).
+"""
+import os
+import json
+import copy
+import asyncio
+from types import MappingProxyType
+
+import configs
+from utils import clock
+from utils.logger import log_info, log_error
+from utils.exceptions import ConfigError
+from configs import CONFIG_FILE, CONFIG_POLL_INTERVAL
+
+
+def _number(minimum=None, maximum=None, integer=False):
+    """Tạo hàm kiểm tra một giá trị số trong khoảng [minimum, maximum]."""
+    def validate(name, value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ConfigError(f"{name} phải là số")
+        if integer and value != int(value):
+            raise ConfigError(f"{name} phải là số nguyên")
+        if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+            raise ConfigError(f"{name} phải nằm trong khoảng [{minimum}, {maximum}]")
+        return int(value) if integer else float(value)
+    return validate
+
+
+def _fees(name, value):
+    """Kiểm tra bảng phí {'sàn': {'give': phí mua, 'receive': phí bán}}."""
+    if not isinstance(value, dict):
+        raise ConfigError(f"{name} phải có dạng {{'sàn': {{'give': phí mua, 'receive': phí bán}}}}")
+    fees = {}
+    for exchange, rates in value.items():
+        if not isinstance(rates, dict) or set(rates) != {'give', 'receive'}:
+            raise ConfigError(f"{name}.{exchange} phải có đúng hai khóa 'give' và 'receive'")
+        fees[exchange] = {side: _number(0, 0.05)(f"{name}.{exchange}.{side}", rate) for side, rate in rates.items()}
+    return fees
+
+
+# Các cấu hình được nạp lại khi đang chạy và hàm kiểm tra của chúng
+RELOADABLE = {
+    'PROFIT_CRITERIA_PCT': _number(),
+    'PROFIT_CRITERIA_USD': _number(),
+    'EXCHANGE_FEES': _fees,
+    'FIRST_ORDERS_FILL_TIMEOUT': _number(1),
+    'ARBITRAGE_FILL_TIMEOUT': _number(1),
+    'ARBITRAGE_POLL_INTERVAL': _number(0.05, 60),
+    'ARBITRAGE_POLL_MAX_INTERVAL': _number(0.05, 300),
+    'ARBITRAGE_MIN_HEDGE_USD': _number(0),
+    'DEFAULT_LEVERAGE': _number(1, 125, integer=True),
+}
+# Cấu hình dạng bảng: giá trị mới được gộp theo khóa vào giá trị hiện tại
+MERGED = {'EXCHANGE_FEES'}
+
+
+class ConfigService:
+    """
+    Dịch vụ cấu hình: giá trị mặc định lấy từ configs.py, được ghi đè bởi tệp JSON
+    CONFIG_FILE (theo dõi thay đổi) và bởi lệnh điều khiển config_set.
+
+    Mọi thay đổi được kiểm tra trước khi áp dụng; một thay đổi không hợp lệ bị từ chối
+    toàn bộ. Bảng cấu hình mới được thay vào trong một phép gán nên các luồng đọc
+    (vòng lặp xử lý sách lệnh, luồng gửi lệnh) luôn thấy một bảng nhất quán.
+    """
+
+    def __init__(self, path=CONFIG_FILE, poll_interval=CONFIG_POLL_INTERVAL):
+        """
+        Khởi tạo dịch vụ cấu hình.
+
+        Args:
+            path (str): Tệp JSON ghi đè cấu hình (không bắt buộc tồn tại)
+            poll_interval (float): Chu kỳ kiểm tra tệp thay đổi (giây)
+        """
+        self.path = path
+        self.poll_interval = poll_interval
+        self.defaults = {name: copy.deepcopy(getattr(configs, name)) for name in RELOADABLE}
+        self.file_values = {}  # Giá trị từ tệp cấu hình
+        self.overrides = {}  # Giá trị từ lệnh điều khiển (ưu tiên hơn tệp)
+        self.values = MappingProxyType(copy.deepcopy(self.defaults))
+        self.listeners = []  # Các hàm được gọi với (bảng cấu hình mới, các khóa đã đổi)
+        self._mtime = None
+        self._task = None
+
+    def add_listener(self, callback):
+        """
+        Đăng ký hàm nhận bảng cấu hình mới.
+
+        Args:
+            callback (callable): Hàm nhận (bảng cấu hình, tập các khóa đã đổi)
+        """
+        self.listeners.append(callback)
+
+    def get(self, name):
+        """Lấy giá trị hiện tại của một cấu hình."""
+        return self.values[name]
+
+    @staticmethod
+    def validate(changes):
+        """
+        Kiểm tra các thay đổi.
+
+        Args:
+            changes (dict): {tên cấu hình: giá trị} (None = bỏ ghi đè)
+
+        Returns:
+            dict: Các giá trị đã chuẩn hóa
+
+        Raises:
+            ConfigError: Nếu có cấu hình không nạp lại được hoặc giá trị không hợp lệ
+        """
+        validated = {}
+        for name, value in changes.items():
+            if name not in RELOADABLE:
+                raise ConfigError(f"{name} không phải cấu hình nạp lại được (hợp lệ: {', '.join(RELOADABLE)})")
+            validated[name] = None if value is None else RELOADABLE[name](name, value)
+        return validated
+
+    def _effective(self, file_values, overrides):
+        """Gộp giá trị mặc định, tệp cấu hình và lệnh điều khiển."""
+        values = copy.deepcopy(self.defaults)
+        for layer in (file_values, overrides):
+            for name, value in layer.items():
+                if name in MERGED:
+                    values[name] = {**values[name], **copy.deepcopy(value)}
+                else:
+                    values[name] = value
+        return values
+
+    def _swap(self, file_values, overrides, source):
+        """Thay bảng cấu hình và báo cho các hàm đăng ký nếu có thay đổi."""
+        values = self._effective(file_values, overrides)
+        changed = {name for name in values if values[name] != self.values[name]}
+        self.file_values = file_values
+        self.overrides = overrides
+        if not changed:
+            return changed
+
+        self.values = MappingProxyType(values)
+        log_info(f"Đã nạp lại cấu hình từ {source}: " + ", ".join(f"{name}={values[name]}" for name in sorted(changed)))
+        for callback in self.listeners:
+            try:
+                callback(self.values, changed)
+            except Exception as e:
+                log_error(f"Lỗi khi áp dụng cấu hình mới: {str(e)}")
+        return changed
+
+    def update(self, **changes):
+        """
+        Ghi đè cấu hình (lệnh điều khiển config_set).
+
+        Args:
+            **changes: {tên cấu hình: giá trị} (None = bỏ ghi đè, trở về giá trị của tệp/mặc định)
+
+        Returns:
+            dict: {'changed': các khóa đã đổi}
+
+        Raises:
+            ConfigError: Nếu thay đổi không hợp lệ (không có giá trị nào được áp dụng)
+        """
+        if not changes:
+            raise ConfigError("Không có cấu hình nào được chỉ định")
+        overrides = dict(self.overrides)
+        for name, value in self.validate(changes).items():
+            if value is None:
+                overrides.pop(name, None)
+            else:
+                overrides[name] = value
+        return {'changed': sorted(self._swap(self.file_values, overrides, 'lệnh điều khiển'))}
+
+    def reload(self):
+        """
+        Đọc lại tệp cấu hình (tệp không tồn tại = không ghi đè).
+
+        Returns:
+            dict: {'changed': các khóa đã đổi}
+
+        Raises:
+            ConfigError: Nếu tệp không đọc được hoặc không hợp lệ (cấu hình hiện tại được giữ nguyên)
+        """
+        self._mtime = self._file_mtime()
+        if self._mtime is None:
+            file_values = {}
+        else:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                raise ConfigError(f"Không thể đọc tệp cấu hình {self.path}: {str(e)}")
+            if not isinstance(data, dict):
+                raise ConfigError(f"Tệp cấu hình {self.path} phải chứa một đối tượng JSON")
+            file_values = self.validate(data)
+            file_values = {name: value for name, value in file_values.items() if value is not None}
+        return {'changed': sorted(self._swap(file_values, self.overrides, self.path))}
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def check_file(self):
+        """
+        Nạp lại tệp cấu hình nếu tệp đã thay đổi.
+
+        Returns:
+            bool: True nếu tệp đã thay đổi
+        """
+        if self._file_mtime() == self._mtime:
+            return False
+        try:
+            self.reload()
+        except ConfigError as e:
+            log_error(f"{str(e)}; giữ nguyên cấu hình hiện tại")
+        return True
+
+    async def start(self):
+        """Nạp tệp cấu hình và bắt đầu theo dõi thay đổi."""
+        try:
+            self.reload()
+        except ConfigError as e:
+            log_error(f"{str(e)}; dùng cấu hình mặc định")
+        if self._task is None and self.poll_interval > 0:
+            self._task = asyncio.create_task(self._watch_loop())
+
+    async def _watch_loop(self):
+        """Kiểm tra tệp cấu hình định kỳ."""
+        while True:
+            await clock.async_sleep(self.poll_interval)
+            self.check_file()
+
+    async def stop(self):
+        """Dừng theo dõi tệp cấu hình."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
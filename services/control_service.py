@@ -0,0 +1,162 @@
+"""
+Service nhận lệnh điều khiển qua Unix socket khi bot đang chạy.
+"""
+import os
+import sys
+import json
+import socket
+import asyncio
+import argparse
+
+from utils.logger import log_info, log_warning
+from configs import CONTROL_SOCKET
+
+
+class ControlService:
+    """
+    Máy chủ lệnh điều khiển trên Unix socket.
+
+    Mỗi yêu cầu là một dòng JSON {"command": tên, ...tham số}, mỗi phản hồi là một
+    dòng JSON {"ok": true, "result": ...} hoặc {"ok": false, "error": thông báo}.
+    Các service đăng ký lệnh của mình qua register().
+    """
+
+    def __init__(self, path=CONTROL_SOCKET):
+        """
+        Khởi tạo service điều khiển.
+
+        Args:
+            path (str): Đường dẫn Unix socket
+        """
+        self.path = path
+        self.commands = {}  # {tên lệnh: (hàm xử lý, mô tả)}
+        self._server = None
+        self.register('help', self._help, "Liệt kê các lệnh")
+
+    def register(self, command, handler, description=''):
+        """
+        Đăng ký một lệnh điều khiển.
+
+        Args:
+            command (str): Tên lệnh
+            handler (callable): Hàm (đồng bộ hoặc coroutine) nhận các tham số của yêu cầu
+                dưới dạng tham số từ khóa và trả về kết quả có thể chuyển sang JSON
+            description (str): Mô tả lệnh
+        """
+        self.commands[command] = (handler, description)
+
+    def _help(self):
+        """Trả về danh sách lệnh và mô tả."""
+        return {command: description for command, (_, description) in sorted(self.commands.items())}
+
+    async def start(self):
+        """Mở Unix socket."""
+        if self._server is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle_client, self.path)
+        log_info(f"Nhận lệnh điều khiển tại {self.path}")
+
+    async def stop(self):
+        """Đóng Unix socket."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    async def execute(self, request):
+        """
+        Thực thi một yêu cầu.
+
+        Args:
+            request (dict): {"command": tên lệnh, ...tham số}
+
+        Returns:
+            dict: Phản hồi {"ok", "result"} hoặc {"ok", "error"}
+        """
+        params = dict(request)
+        command = params.pop('command', None)
+        if command not in self.commands:
+            return {'ok': False, 'error': f"Lệnh không hợp lệ: {command}"}
+
+        handler, _ = self.commands[command]
+        try:
+            result = handler(**params)
+            if asyncio.iscoroutine(result):
+                result = await result
+            return {'ok': True, 'result': result}
+        except Exception as e:
+            log_warning(f"Lệnh điều khiển {command} thất bại: {str(e)}")
+            return {'ok': False, 'error': str(e)}
+
+    async def _handle_client(self, reader, writer):
+        """Xử lý các yêu cầu của một kết nối."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("Yêu cầu phải là một đối tượng JSON")
+                except ValueError as e:
+                    response = {'ok': False, 'error': f"Yêu cầu không hợp lệ: {str(e)}"}
+                else:
+                    response = await self.execute(request)
+                writer.write(json.dumps(response, default=str).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def send_command(path, command, **params):
+    """
+    Gửi một lệnh tới service điều khiển (đồng bộ, dùng cho dòng lệnh).
+
+    Args:
+        path (str): Đường dẫn Unix socket
+        command (str): Tên lệnh
+        **params: Tham số của lệnh
+
+    Returns:
+        dict: Phản hồi của service
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(dict(params, command=command)).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as stream:
+            return json.loads(stream.readline())
+
+
+def main(argv=None):
+    """Gửi lệnh từ dòng lệnh: python -m services.control_service profile seconds=10"""
+    parser = argparse.ArgumentParser(description="Gửi lệnh điều khiển tới bot đang chạy")
+    parser.add_argument('command', help="Tên lệnh (help để liệt kê)")
+    parser.add_argument('params', nargs='*', help="Tham số dạng khóa=giá_trị (giá trị là JSON nếu hợp lệ)")
+    parser.add_argument('--socket', default=CONTROL_SOCKET or 'state/control.sock', help="Đường dẫn Unix socket")
+    args = parser.parse_args(argv)
+
+    params = {}
+    for item in args.params:
+        key, _, value = item.partition('=')
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+
+    response = send_command(args.socket, args.command, **params)
+    print(json.dumps(response, ensure_ascii=False, indent=2))
+    return 0 if response.get('ok') else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
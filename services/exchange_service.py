@@ -2,28 +2,56 @@
 Service quản lý tương tác với các sàn giao dịch.
 """
 import os
+import time
 import ccxt
 import ccxt.pro
 import asyncio
+from contextlib import contextmanager
 from datetime import datetime
 from dotenv import load_dotenv
 from utils.logger import log_info, log_error, log_debug
 from utils.exceptions import ExchangeError, InsufficientBalanceError, FuturesError
 from utils.helpers import calculate_average, extract_base_asset
+from utils import metrics
+from services.market_data_client import MarketDataClient
+from services.rate_limiter import RateLimiter, PRIORITY_POLL
+from configs import MARKET_DATA_SOCKET, MARKET_DATA_SHM, ENABLE_RATE_LIMITER
 
 # Tải biến môi trường
 load_dotenv()
 
+REST_LATENCY = metrics.histogram(
+    'arb_rest_request_seconds', 'Thời gian khứ hồi của lời gọi REST (nhóm order = đặt/hủy lệnh)',
+    ['exchange', 'endpoint']
+)
+CACHE_REQUESTS = metrics.counter('arb_cache_requests_total', 'Số lần tra bộ nhớ đệm', ['cache', 'result'])
+
 
 class ExchangeService:
     """
     Lớp dịch vụ tương tác với các sàn giao dịch cryptocurrency.
     """
     
-    def __init__(self):
-        """Khởi tạo dịch vụ sàn giao dịch."""
+    def __init__(self, market_data_socket=MARKET_DATA_SOCKET, market_data_shm=MARKET_DATA_SHM, rate_limiter=None):
+        """
+        Khởi tạo dịch vụ sàn giao dịch.
+        
+        Args:
+            market_data_socket (str, optional): Unix socket của daemon dữ liệu thị trường.
+                Nếu được đặt, sách lệnh được nhận từ daemon thay vì kết nối websocket riêng.
+            market_data_shm (str, optional): Tên vùng nhớ dùng chung do daemon ghi sách lệnh.
+            rate_limiter (RateLimiter, optional): Bộ giới hạn tốc độ gọi REST
+                (mặc định: tạo mới nếu ENABLE_RATE_LIMITER)
+        """
+        if rate_limiter is None and ENABLE_RATE_LIMITER:
+            rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter
         self.exchanges = {}
         self.exchange_instances = {}
+        self.pro_exchange_instances = {}  # Kết nối ccxt.pro dùng chung, tồn tại qua các phiên
+        self.market_data_client = (
+            MarketDataClient(market_data_socket, market_data_shm) if market_data_socket else None
+        )
         self._initialize_exchanges()
     
     def _initialize_exchanges(self):
@@ -97,10 +125,42 @@ class ExchangeService:
         
         return self.exchange_instances[exchange_id]
 
+    def throttle(self, exchange_id, endpoint, priority=None):
+        """
+        Chờ tới lượt gọi REST theo giới hạn tốc độ của sàn.
+        
+        Mọi lời gọi REST (kể cả từ các service khác dùng trực tiếp get_exchange)
+        phải đi qua hàm này để dùng chung hạn mức của sàn.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            endpoint (str): Nhóm endpoint ('order', 'account', 'market')
+            priority (int, optional): Làn ưu tiên (mặc định theo nhóm endpoint)
+        
+        Returns:
+            float: Thời gian đã chờ (giây)
+        """
+        if self.rate_limiter is None:
+            return 0.0
+        return self.rate_limiter.acquire(exchange_id, endpoint, priority=priority)
+
+    @contextmanager
+    def _request(self, exchange_id, endpoint, priority=None):
+        """Chờ giới hạn tốc độ rồi đo thời gian khứ hồi của một lời gọi REST."""
+        self.throttle(exchange_id, endpoint, priority)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            REST_LATENCY.labels(exchange_id, endpoint).observe(time.perf_counter() - started)
+
     async def get_pro_exchange(self, exchange_id):
         """
         Lấy đối tượng sàn giao dịch ccxt.pro theo id.
         
+        Đối tượng được tạo một lần và dùng chung cho mọi bot và mọi phiên, nên các
+        kết nối websocket và các đăng ký sách lệnh được giữ nguyên giữa các phiên.
+        
         Args:
             exchange_id (str): ID của sàn giao dịch
         
@@ -110,16 +170,58 @@ class ExchangeService:
         Raises:
             ExchangeError: Nếu sàn giao dịch không tồn tại hoặc không được hỗ trợ
         """
+        if exchange_id in self.pro_exchange_instances:
+            return self.pro_exchange_instances[exchange_id]
+        
+        # Nhận sách lệnh từ daemon dữ liệu thị trường dùng chung
+        if self.market_data_client:
+            self.pro_exchange_instances[exchange_id] = self.market_data_client.exchange(exchange_id)
+            return self.pro_exchange_instances[exchange_id]
+        
         if exchange_id not in self.exchanges:
             raise ExchangeError(exchange_id, "Sàn giao dịch không được hỗ trợ hoặc chưa được cấu hình")
         
         try:
             # Tạo đối tượng sàn giao dịch pro
             exchange_class = getattr(ccxt.pro, exchange_id)
-            return exchange_class(self.exchanges[exchange_id])
+            self.pro_exchange_instances[exchange_id] = exchange_class(self.exchanges[exchange_id])
+            return self.pro_exchange_instances[exchange_id]
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể khởi tạo sàn giao dịch pro: {str(e)}")
     
+    async def reset_pro_exchange(self, exchange_id):
+        """
+        Đóng kết nối ccxt.pro hiện tại của một sàn và tạo kết nối mới.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        
+        Returns:
+            object: Đối tượng sàn giao dịch ccxt.pro mới
+        """
+        pro_exchange = self.pro_exchange_instances.pop(exchange_id, None)
+        
+        if pro_exchange:
+            try:
+                await pro_exchange.close()
+            except Exception as e:
+                log_error(f"Lỗi khi đóng kết nối pro với {exchange_id}: {str(e)}")
+        
+        return await self.get_pro_exchange(exchange_id)
+    
+    async def close_pro_exchanges(self):
+        """Đóng tất cả các kết nối ccxt.pro đang mở."""
+        for exchange_id, pro_exchange in list(self.pro_exchange_instances.items()):
+            try:
+                await pro_exchange.close()
+            except Exception as e:
+                log_error(f"Lỗi khi đóng kết nối pro với {exchange_id}: {str(e)}")
+        
+        self.pro_exchange_instances = {}
+        
+        if self.market_data_client:
+            await self.market_data_client.close()
+    
     def get_balance(self, exchange_id, symbol):
         """
         Lấy số dư của một tài sản trên sàn giao dịch.
@@ -140,7 +242,8 @@ class ExchangeService:
             # Làm sạch symbol nếu nó có dạng BTC/USDT hoặc BTC:USDT
             clean_symbol = extract_base_asset(symbol) if symbol != 'USDT' else 'USDT'
             
-            balance = exchange.fetch_balance()
+            with self._request(exchange_id, 'account'):
+                balance = exchange.fetch_balance()
             
             if clean_symbol in balance['free'] and balance['free'][clean_symbol] != 0:
                 return balance['free'][clean_symbol]
@@ -165,10 +268,39 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            return exchange.fetch_ticker(symbol)
+            with self._request(exchange_id, 'market'):
+                return exchange.fetch_ticker(symbol)
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể lấy ticker cho {symbol}: {str(e)}")
     
+    def get_futures_symbol(self, exchange_id, symbol):
+        """
+        Lấy ký hiệu hợp đồng vĩnh viễn USDT (tuyến tính) của một cặp spot trên sàn futures.
+        
+        Args:
+            exchange_id (str): ID của sàn futures
+            symbol (str): Ký hiệu của cặp spot (vd: BTC/USDT)
+        
+        Returns:
+            str: Ký hiệu hợp nhất của hợp đồng (vd: BTC/USDT:USDT)
+        
+        Raises:
+            ExchangeError: Nếu không tải được danh sách thị trường
+        """
+        exchange = self.get_exchange(exchange_id)
+        base = extract_base_asset(symbol)
+        
+        try:
+            with self._request(exchange_id, 'market'):
+                markets = exchange.load_markets()
+        except Exception as e:
+            raise ExchangeError(exchange_id, f"Không thể tải danh sách thị trường: {str(e)}")
+        
+        for market in markets.values():
+            if market.get('swap') and market.get('linear') and market.get('base') == base and market.get('settle') == 'USDT':
+                return market['symbol']
+        return f"{base}/USDT:USDT"
+    
     def create_limit_buy_order(self, exchange_id, symbol, amount, price):
         """
         Tạo lệnh mua giới hạn.
@@ -188,7 +320,8 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            return exchange.create_limit_buy_order(symbol, amount, price)
+            with self._request(exchange_id, 'order'):
+                return exchange.create_limit_buy_order(symbol, amount, price)
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể tạo lệnh mua giới hạn cho {symbol}: {str(e)}")
     
@@ -211,7 +344,8 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            return exchange.create_limit_sell_order(symbol, amount, price)
+            with self._request(exchange_id, 'order'):
+                return exchange.create_limit_sell_order(symbol, amount, price)
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể tạo lệnh bán giới hạn cho {symbol}: {str(e)}")
     
@@ -235,7 +369,8 @@ class ExchangeService:
         params = params or {}
         
         try:
-            return exchange.create_market_buy_order(symbol, amount, params)
+            with self._request(exchange_id, 'order'):
+                return exchange.create_market_buy_order(symbol, amount, params)
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể tạo lệnh mua thị trường cho {symbol}: {str(e)}")
     
@@ -259,7 +394,8 @@ class ExchangeService:
         params = params or {}
         
         try:
-            return exchange.create_market_sell_order(symbol, amount, params)
+            with self._request(exchange_id, 'order'):
+                return exchange.create_market_sell_order(symbol, amount, params)
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể tạo lệnh bán thị trường cho {symbol}: {str(e)}")
     
@@ -280,7 +416,8 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            return exchange.fetch_open_orders(symbol)
+            with self._request(exchange_id, 'account', PRIORITY_POLL):
+                return exchange.fetch_open_orders(symbol)
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể lấy danh sách lệnh đang mở cho {symbol}: {str(e)}")
     
@@ -301,10 +438,34 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            return exchange.fetch_closed_orders(symbol)
+            with self._request(exchange_id, 'account', PRIORITY_POLL):
+                return exchange.fetch_closed_orders(symbol)
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể lấy danh sách lệnh đã đóng cho {symbol}: {str(e)}")
     
+    def fetch_order(self, exchange_id, order_id, symbol):
+        """
+        Lấy trạng thái một lệnh theo ID.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            order_id (str): ID của lệnh
+            symbol (str): Ký hiệu của cặp giao dịch
+        
+        Returns:
+            dict: Thông tin lệnh (trạng thái, lượng đã khớp)
+        
+        Raises:
+            ExchangeError: Nếu có lỗi khi lấy thông tin lệnh
+        """
+        exchange = self.get_exchange(exchange_id)
+        
+        try:
+            with self._request(exchange_id, 'account', PRIORITY_POLL):
+                return exchange.fetch_order(order_id, symbol)
+        except Exception as e:
+            raise ExchangeError(exchange_id, f"Không thể lấy thông tin lệnh {order_id} cho {symbol}: {str(e)}")
+    
     def cancel_order(self, exchange_id, order_id, symbol):
         """
         Hủy một lệnh.
@@ -323,7 +484,8 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            return exchange.cancel_order(order_id, symbol)
+            with self._request(exchange_id, 'order'):
+                return exchange.cancel_order(order_id, symbol)
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể hủy lệnh {order_id} cho {symbol}: {str(e)}")
     
@@ -345,7 +507,8 @@ class ExchangeService:
         
         try:
             if hasattr(exchange, 'cancel_all_orders'):
-                return exchange.cancel_all_orders(symbol)
+                with self._request(exchange_id, 'order'):
+                    return exchange.cancel_all_orders(symbol)
             else:
                 # Nếu sàn không hỗ trợ hủy tất cả, hủy từng lệnh một
                 orders = self.fetch_open_orders(exchange_id, symbol)
@@ -373,7 +536,13 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            markets = exchange.load_markets()
+            if exchange.markets:
+                CACHE_REQUESTS.labels('markets', 'hit').inc()
+                markets = exchange.load_markets()
+            else:
+                CACHE_REQUESTS.labels('markets', 'miss').inc()
+                with self._request(exchange_id, 'market'):
+                    markets = exchange.load_markets()
             if symbol in markets:
                 symbol_info = markets[symbol]
                 if 'limits' in symbol_info and 'price' in symbol_info['limits'] and 'min' in symbol_info['limits']['price']:
@@ -490,7 +659,8 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            result = exchange.transfer(asset, amount, from_account, to_account)
+            with self._request(exchange_id, 'account'):
+                result = exchange.transfer(asset, amount, from_account, to_account)
             log_info(f"Đã chuyển {amount} {asset} từ {from_account} sang {to_account} trên {exchange_id}")
             return result
         except Exception as e:
@@ -523,20 +693,21 @@ class ExchangeService:
                 symbol = f"{extract_base_asset(symbol)}:USDT"
             
             # Tạo lệnh futures
-            if type == 'market':
-                if side == 'buy':
-                    return exchange.create_market_buy_order(symbol, amount, params)
-                elif side == 'sell':
-                    return exchange.create_market_sell_order(symbol, amount, params)
-            elif type == 'limit':
-                price = params.pop('price', None)
-                if not price:
-                    raise FuturesError(exchange_id, "Giá bắt buộc phải có cho lệnh giới hạn")
+            with self._request(exchange_id, 'order'):
+                if type == 'market':
+                    if side == 'buy':
+                        return exchange.create_market_buy_order(symbol, amount, params)
+                    elif side == 'sell':
+                        return exchange.create_market_sell_order(symbol, amount, params)
+                elif type == 'limit':
+                    price = params.pop('price', None)
+                    if not price:
+                        raise FuturesError(exchange_id, "Giá bắt buộc phải có cho lệnh giới hạn")
                 
-                if side == 'buy':
-                    return exchange.create_limit_buy_order(symbol, amount, price, params)
-                elif side == 'sell':
-                    return exchange.create_limit_sell_order(symbol, amount, price, params)
+                    if side == 'buy':
+                        return exchange.create_limit_buy_order(symbol, amount, price, params)
+                    elif side == 'sell':
+                        return exchange.create_limit_sell_order(symbol, amount, price, params)
             
             raise FuturesError(exchange_id, f"Loại lệnh không hợp lệ: {type}")
             
@@ -0,0 +1,214 @@
+"""
+Service lấy phí giao dịch thực tế của tài khoản trên từng sàn.
+"""
+import os
+import json
+import asyncio
+from collections import Counter
+
+from services.state_store import atomic_write
+from utils import clock
+from utils.logger import log_info, log_warning, log_debug
+from utils import metrics
+from configs import EXCHANGE_FEES, FEE_CACHE_FILE, FEE_REFRESH_INTERVAL
+
+
+CACHE_REQUESTS = metrics.counter('arb_cache_requests_total', 'Số lần tra bộ nhớ đệm', ['cache', 'result'])
+
+
+class FeeService:
+    """
+    Lớp dịch vụ phí giao dịch: lấy bậc phí của tài khoản qua ccxt fetch_trading_fees,
+    lưu đệm xuống đĩa và làm mới định kỳ trong nền.
+
+    Phí được trả về cùng định dạng với EXCHANGE_FEES ({'sàn': {'give', 'receive'}})
+    để các bot dựng lại bảng ngưỡng hòa vốn khi phí thay đổi; vòng lặp xử lý sách
+    lệnh không tra cứu phí.
+    """
+
+    def __init__(self, exchange_service, cache_file=FEE_CACHE_FILE, refresh_interval=FEE_REFRESH_INTERVAL):
+        """
+        Khởi tạo dịch vụ phí giao dịch.
+
+        Args:
+            exchange_service (ExchangeService): Dịch vụ sàn giao dịch
+            cache_file (str): Tệp lưu đệm phí
+            refresh_interval (float): Khoảng thời gian giữa các lần làm mới (giây)
+        """
+        self.exchange_service = exchange_service
+        self.cache_file = cache_file
+        self.refresh_interval = refresh_interval
+        self.rates = {}  # {sàn: {'give', 'receive', 'maker', 'updated'}}
+        self.base_fees = EXCHANGE_FEES  # Phí trong cấu hình, dùng cho sàn chưa lấy được phí thực tế
+        self.listeners = []  # Các hàm được gọi với bảng phí mới khi phí thay đổi
+        self.exchanges = []
+        self._task = None
+        self._load_cache()
+
+    def _load_cache(self):
+        """Đọc phí đã lưu đệm từ đĩa."""
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self.rates = json.load(f)
+        except (OSError, ValueError) as e:
+            log_warning(f"Không thể đọc tệp đệm phí {self.cache_file}: {str(e)}")
+
+    def _save_cache(self):
+        """Ghi phí xuống đĩa."""
+        directory = os.path.dirname(self.cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        atomic_write(self.cache_file, json.dumps(self.rates, indent=2))
+
+    def add_listener(self, callback):
+        """
+        Đăng ký hàm nhận bảng phí mới.
+
+        Args:
+            callback (callable): Hàm nhận một tham số là bảng phí (định dạng EXCHANGE_FEES)
+        """
+        self.listeners.append(callback)
+
+    def set_base_fees(self, fees):
+        """
+        Thay phí trong cấu hình (khi cấu hình được nạp lại); phí thực tế đã lấy vẫn được ưu tiên.
+
+        Args:
+            fees (dict): {'sàn': {'give': phí mua, 'receive': phí bán}}
+        """
+        self.base_fees = fees
+
+    def get_fees(self):
+        """
+        Lấy bảng phí hiện tại: phí thực tế nếu có, ngược lại phí trong cấu hình.
+
+        Returns:
+            dict: {'sàn': {'give': phí mua, 'receive': phí bán}}
+        """
+        fees = {exchange: dict(rates) for exchange, rates in self.base_fees.items()}
+        for exchange, rates in self.rates.items():
+            fees[exchange] = {'give': rates['give'], 'receive': rates['receive']}
+        return fees
+
+    @staticmethod
+    def _select_rates(trading_fees):
+        """
+        Chọn phí của tài khoản từ kết quả fetch_trading_fees.
+
+        Sàn trả về phí theo từng cặp; bậc phí của tài khoản là mức phổ biến nhất.
+
+        Returns:
+            tuple: (phí taker, phí maker) hoặc None nếu không có dữ liệu
+        """
+        takers = Counter()
+        makers = Counter()
+        for fee in trading_fees.values():
+            if not isinstance(fee, dict) or fee.get('taker') is None:
+                continue
+            takers[float(fee['taker'])] += 1
+            if fee.get('maker') is not None:
+                makers[float(fee['maker'])] += 1
+
+        if not takers:
+            return None
+        taker = takers.most_common(1)[0][0]
+        maker = makers.most_common(1)[0][0] if makers else taker
+        return taker, maker
+
+    def fetch(self, exchange_id):
+        """
+        Lấy phí giao dịch của tài khoản trên một sàn (gọi REST đồng bộ).
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+
+        Returns:
+            dict: {'give', 'receive', 'maker', 'updated'} hoặc None nếu sàn không hỗ trợ
+        """
+        exchange = self.exchange_service.get_exchange(exchange_id)
+        if not exchange.has.get('fetchTradingFees'):
+            log_debug(f"Sàn {exchange_id} không hỗ trợ fetch_trading_fees, dùng phí trong cấu hình")
+            return None
+
+        self.exchange_service.throttle(exchange_id, 'account')
+        selected = self._select_rates(exchange.fetch_trading_fees())
+        if selected is None:
+            return None
+
+        taker, maker = selected
+        # Lệnh arbitrage khớp ngay với sách lệnh nên cả hai chiều chịu phí taker
+        return {'give': taker, 'receive': taker, 'maker': maker, 'updated': clock.time()}
+
+    async def refresh(self, exchanges=None, force=False):
+        """
+        Làm mới phí của các sàn đã quá hạn.
+
+        Args:
+            exchanges (list, optional): Danh sách sàn (mặc định: các sàn đã đăng ký)
+            force (bool): Làm mới cả khi phí lưu đệm còn hạn
+
+        Returns:
+            bool: True nếu bảng phí thay đổi
+        """
+        changed = False
+        now = clock.time()
+        for exchange_id in exchanges or self.exchanges:
+            cached = self.rates.get(exchange_id)
+            if not force and cached and now - cached.get('updated', 0) < self.refresh_interval:
+                CACHE_REQUESTS.labels('fees', 'hit').inc()
+                continue
+            CACHE_REQUESTS.labels('fees', 'miss').inc()
+            try:
+                rates = await asyncio.to_thread(self.fetch, exchange_id)
+            except Exception as e:
+                log_warning(f"Không thể lấy phí giao dịch trên {exchange_id}: {str(e)}")
+                continue
+            if rates is None:
+                continue
+
+            previous = self.rates.get(exchange_id, {})
+            self.rates[exchange_id] = rates
+            if (previous.get('give'), previous.get('receive')) != (rates['give'], rates['receive']):
+                changed = True
+                log_info(f"Phí giao dịch trên {exchange_id}: mua {rates['give']}, bán {rates['receive']}")
+
+        if changed:
+            self._save_cache()
+            fees = self.get_fees()
+            for callback in self.listeners:
+                callback(fees)
+        return changed
+
+    async def start(self, exchanges):
+        """
+        Lấy phí lần đầu và khởi động tác vụ làm mới nền.
+
+        Args:
+            exchanges (list): Danh sách sàn cần lấy phí
+        """
+        self.exchanges = list(dict.fromkeys(self.exchanges + list(exchanges or [])))
+        await self.refresh()
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        """Vòng lặp làm mới phí định kỳ."""
+        while True:
+            await clock.async_sleep(self.refresh_interval)
+            try:
+                await self.refresh(force=True)
+            except Exception as e:
+                log_warning(f"Lỗi khi làm mới phí giao dịch: {str(e)}")
+
+    async def stop(self):
+        """Dừng tác vụ làm mới nền."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
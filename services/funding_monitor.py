@@ -0,0 +1,268 @@
+"""
+Service theo dõi funding rate và basis perp–spot trên các sàn phái sinh.
+"""
+import asyncio
+from collections import deque
+
+from utils import clock
+from utils.logger import log_info, log_warning
+from utils.helpers import extract_base_asset
+from configs import (
+    FUTURES_EXCHANGES, DEFAULT_FUTURES_EXCHANGE, FUNDING_POLL_INTERVAL, FUNDING_HISTORY_SIZE,
+    FUNDING_SWITCH_THRESHOLD
+)
+
+
+# Số giờ trong một năm, dùng để quy đổi funding mỗi kỳ sang lãi suất năm
+HOURS_PER_YEAR = 365 * 24
+DEFAULT_FUNDING_INTERVAL_HOURS = 8
+
+
+class FundingHistory:
+    """
+    Lịch sử cuốn chiếu của funding rate và basis cho một (sàn, hợp đồng).
+
+    Tổng được cập nhật tăng dần khi thêm/bỏ mẫu nên trung bình luôn là O(1).
+    """
+
+    def __init__(self, size=FUNDING_HISTORY_SIZE):
+        """
+        Args:
+            size (int): Số mẫu tối đa được giữ
+        """
+        self.samples = deque(maxlen=size)  # (thời điểm, funding rate, số giờ mỗi kỳ, basis)
+        self.funding_apr_sum = 0.0
+        self.basis_sum = 0.0
+
+    def add(self, timestamp, funding_rate, interval_hours, basis):
+        """
+        Thêm một mẫu.
+
+        Args:
+            timestamp (float): Thời điểm (giây)
+            funding_rate (float): Funding rate mỗi kỳ (dương = vị thế short nhận funding)
+            interval_hours (float): Số giờ mỗi kỳ funding
+            basis (float): (giá mark - giá chỉ số) / giá chỉ số
+        """
+        if len(self.samples) == self.samples.maxlen:
+            _, old_rate, old_interval, old_basis = self.samples[0]
+            self.funding_apr_sum -= old_rate * HOURS_PER_YEAR / old_interval
+            self.basis_sum -= old_basis
+        self.samples.append((timestamp, funding_rate, interval_hours, basis))
+        self.funding_apr_sum += funding_rate * HOURS_PER_YEAR / interval_hours
+        self.basis_sum += basis
+
+    def carry(self):
+        """
+        Tính lãi suất năm trung bình của funding và basis trung bình.
+
+        Returns:
+            dict: {'funding_apr', 'basis', 'last_rate', 'samples'} hoặc None nếu chưa có mẫu
+        """
+        count = len(self.samples)
+        if not count:
+            return None
+        return {
+            'funding_apr': self.funding_apr_sum / count,
+            'basis': self.basis_sum / count,
+            'last_rate': self.samples[-1][1],
+            'samples': count,
+        }
+
+
+class FundingMonitor:
+    """
+    Định kỳ lấy funding rate, giá mark và giá chỉ số của hợp đồng vĩnh viễn trên các
+    sàn phái sinh, giữ lịch sử cuốn chiếu và chọn sàn phòng hộ rẻ nhất cho vị thế short
+    (sàn mà vị thế short nhận nhiều funding nhất).
+
+    Ghi chú: môi trường chạy không có numpy nên phép tính "vector hóa" được thay bằng
+    tổng cộng dồn trong FundingHistory; chi phí mỗi lần chọn sàn là O(số sàn).
+    """
+
+    def __init__(self, exchange_service, exchanges=None, poll_interval=FUNDING_POLL_INTERVAL,
+                 history_size=FUNDING_HISTORY_SIZE, switch_threshold=FUNDING_SWITCH_THRESHOLD):
+        """
+        Khởi tạo bộ theo dõi funding.
+
+        Args:
+            exchange_service (ExchangeService): Dịch vụ sàn giao dịch
+            exchanges (list, optional): Các sàn phái sinh (mặc định: FUTURES_EXCHANGES đã cấu hình khóa API)
+            poll_interval (float): Chu kỳ lấy dữ liệu (giây)
+            history_size (int): Số mẫu giữ cho mỗi (sàn, hợp đồng)
+            switch_threshold (float): Mức chênh lệch lãi suất năm tối thiểu để đổi sàn phòng hộ
+        """
+        self.exchange_service = exchange_service
+        if exchanges is None:
+            exchanges = [ex for ex in FUTURES_EXCHANGES if ex in exchange_service.exchanges]
+        self.exchanges = list(exchanges)
+        self.poll_interval = poll_interval
+        self.history_size = history_size
+        self.switch_threshold = switch_threshold
+        self.symbols = []
+        self.history = {}  # {(sàn, cặp spot): FundingHistory}
+        self.venues = {}  # {cặp spot: sàn phòng hộ đã chọn}
+        self._task = None
+
+    @staticmethod
+    def perpetual_symbol(symbol):
+        """Ký hiệu hợp nhất của hợp đồng vĩnh viễn USDT tương ứng với một cặp spot."""
+        return f"{extract_base_asset(symbol)}/USDT:USDT"
+
+    @staticmethod
+    def _interval_hours(funding):
+        """Lấy số giờ mỗi kỳ funding từ dữ liệu ccxt (vd: '8h')."""
+        interval = funding.get('interval')
+        if isinstance(interval, str) and interval.endswith('h'):
+            try:
+                return float(interval[:-1])
+            except ValueError:
+                pass
+        return DEFAULT_FUNDING_INTERVAL_HOURS
+
+    def fetch(self, exchange_id, symbol):
+        """
+        Lấy funding rate hiện tại của một hợp đồng (gọi REST đồng bộ).
+
+        Returns:
+            tuple: (funding rate, số giờ mỗi kỳ, basis) hoặc None nếu sàn không hỗ trợ
+        """
+        exchange = self.exchange_service.get_exchange(exchange_id)
+        if not exchange.has.get('fetchFundingRate'):
+            return None
+
+        self.exchange_service.throttle(exchange_id, 'market')
+        funding = exchange.fetch_funding_rate(self.perpetual_symbol(symbol))
+        if funding.get('fundingRate') is None:
+            return None
+
+        mark = funding.get('markPrice')
+        index = funding.get('indexPrice')
+        basis = (mark - index) / index if mark and index else 0.0
+        return float(funding['fundingRate']), self._interval_hours(funding), basis
+
+    def record(self, exchange_id, symbol, funding_rate, interval_hours, basis, timestamp=None):
+        """Thêm một mẫu vào lịch sử của (sàn, cặp)."""
+        history = self.history.get((exchange_id, symbol))
+        if history is None:
+            history = self.history[(exchange_id, symbol)] = FundingHistory(self.history_size)
+        history.add(clock.time() if timestamp is None else timestamp, funding_rate, interval_hours, basis)
+
+    async def refresh(self, symbols=None):
+        """
+        Lấy funding của mọi sàn phái sinh cho các cặp đang theo dõi.
+
+        Args:
+            symbols (list, optional): Danh sách cặp spot (mặc định: các cặp đã đăng ký)
+        """
+        for symbol in symbols or self.symbols:
+            for exchange_id in self.exchanges:
+                try:
+                    result = await asyncio.to_thread(self.fetch, exchange_id, symbol)
+                except Exception as e:
+                    log_warning(f"Không thể lấy funding rate {symbol} trên {exchange_id}: {str(e)}")
+                    continue
+                if result is not None:
+                    self.record(exchange_id, symbol, *result)
+
+    def carry(self, symbol):
+        """
+        Lấy funding/basis trung bình của một cặp trên từng sàn.
+
+        Returns:
+            dict: {'sàn': {'funding_apr', 'basis', 'last_rate', 'samples'}}
+        """
+        result = {}
+        for exchange_id in self.exchanges:
+            history = self.history.get((exchange_id, symbol))
+            carry = history.carry() if history else None
+            if carry is not None:
+                result[exchange_id] = carry
+        return result
+
+    def best_venue(self, symbol, current=None, candidates=None):
+        """
+        Chọn sàn phòng hộ cho vị thế short: sàn có lãi suất năm của funding cao nhất.
+
+        Sàn hiện tại chỉ bị thay khi sàn mới tốt hơn ít nhất switch_threshold, để không
+        đổi sàn liên tục vì dao động nhỏ.
+
+        Args:
+            symbol (str): Cặp spot
+            current (str, optional): Sàn phòng hộ hiện tại
+            candidates (list, optional): Chỉ chọn trong các sàn này (mặc định: mọi sàn được theo dõi)
+
+        Returns:
+            str: Sàn được chọn (mặc định DEFAULT_FUTURES_EXCHANGE nếu chưa có dữ liệu)
+        """
+        carry = self.carry(symbol)
+        if candidates is not None:
+            carry = {exchange_id: value for exchange_id, value in carry.items() if exchange_id in candidates}
+        if not carry:
+            return current or DEFAULT_FUTURES_EXCHANGE
+
+        best = max(carry, key=lambda exchange_id: carry[exchange_id]['funding_apr'])
+        if current in carry and carry[best]['funding_apr'] - carry[current]['funding_apr'] < self.switch_threshold:
+            return current
+        return best
+
+    def select_venue(self, symbol, default=DEFAULT_FUTURES_EXCHANGE, candidates=None):
+        """
+        Chọn sàn phòng hộ cho phiên mới của một cặp và ghi nhớ lựa chọn.
+
+        Lựa chọn được giữ giữa các phiên, nên sàn chỉ đổi khi funding của sàn khác tốt
+        hơn rõ rệt; vị thế đang mở không bị chuyển giữa phiên.
+
+        Args:
+            symbol (str): Cặp spot
+            default (str): Sàn dùng khi chưa chọn lần nào
+            candidates (list, optional): Các sàn mà bot giao dịch được (mặc định: mọi sàn được theo dõi)
+
+        Returns:
+            str: Sàn được chọn
+        """
+        current = self.venues.get(symbol, default)
+        if candidates is not None and current not in candidates:
+            current = default if default in candidates else candidates[0]
+        venue = self.best_venue(symbol, current, candidates)
+        if venue != current:
+            carry = self.carry(symbol)
+            log_info(f"Đổi sàn phòng hộ {symbol}: {current} -> {venue} "
+                     f"(funding năm {carry[venue]['funding_apr']:.2%})")
+        self.venues[symbol] = venue
+        return venue
+
+    async def start(self, symbols):
+        """
+        Đăng ký các cặp cần theo dõi, lấy dữ liệu lần đầu và khởi động tác vụ nền.
+
+        Args:
+            symbols (list): Danh sách cặp spot
+        """
+        new_symbols = [symbol for symbol in symbols if symbol not in self.symbols]
+        self.symbols.extend(new_symbols)
+        if new_symbols:
+            await self.refresh(new_symbols)
+
+        if self._task is None and self.exchanges:
+            self._task = asyncio.create_task(self._poll_loop())
+            log_info(f"Theo dõi funding rate trên {', '.join(self.exchanges)}")
+
+    async def _poll_loop(self):
+        """Vòng lặp lấy funding rate định kỳ."""
+        while True:
+            await clock.async_sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                log_warning(f"Lỗi khi làm mới funding rate: {str(e)}")
+
+    async def stop(self):
+        """Dừng tác vụ nền."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
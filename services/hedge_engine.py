@@ -0,0 +1,276 @@
+"""
+Bộ cân bằng vị thế phòng hộ futures cho chiến lược delta-neutral.
+"""
+import asyncio
+
+from utils import clock
+from utils.logger import log_info, log_error, log_warning
+from utils.helpers import extract_base_asset
+from utils.circuit_breaker import CircuitBreaker
+from utils import metrics
+from configs import HEDGE_BAND_USD, HEDGE_BATCH_INTERVAL, HEDGE_POLL_INTERVAL, HEDGE_RATIO, MIN_FUTURES_QUANTITY
+
+
+NET_DELTA = metrics.gauge('arb_hedge_net_delta', 'Delta ròng (spot + futures, đơn vị crypto)', ['symbol'])
+HEDGE_ADJUSTMENTS = metrics.counter('arb_hedge_adjustments_total', 'Số lệnh điều chỉnh vị thế phòng hộ', ['symbol', 'side'])
+
+
+class HedgeEngine:
+    """
+    Theo dõi delta ròng giữa lượng crypto spot và vị thế futures, và gửi lệnh futures
+    điều chỉnh khi độ lệch (định giá theo giá mark) vượt ngưỡng.
+
+    Vị thế futures và giá mark được nhận qua ccxt.pro (watch_positions, watch_ticker),
+    lượng spot được cập nhật tăng dần qua on_spot_fill() sau mỗi giao dịch. Vòng lặp
+    xử lý sách lệnh chỉ cộng một số và đặt một cờ; việc gom các thay đổi và gửi lệnh
+    diễn ra trong tác vụ nền, lệnh REST chạy trong luồng riêng. Việc cân bằng chỉ bắt
+    đầu sau khi đã nhận vị thế futures đầu tiên từ sàn.
+    """
+
+    def __init__(self, exchange_service, order_service, exchange_id, symbol, leverage=1,
+                 band_usd=HEDGE_BAND_USD, batch_interval=HEDGE_BATCH_INTERVAL, hedge_ratio=HEDGE_RATIO,
+                 min_quantity=MIN_FUTURES_QUANTITY, poll_interval=HEDGE_POLL_INTERVAL):
+        """
+        Khởi tạo bộ cân bằng.
+
+        Args:
+            exchange_service (ExchangeService): Dịch vụ sàn giao dịch
+            order_service (OrderService): Dịch vụ quản lý lệnh
+            exchange_id (str): Sàn futures
+            symbol (str): Cặp giao dịch spot (vd: BTC/USDT)
+            leverage (int): Đòn bẩy
+            band_usd (float): Độ lệch delta tối đa (USD theo giá mark) trước khi điều chỉnh
+            batch_interval (float): Thời gian gom các thay đổi trước khi gửi lệnh (giây)
+            hedge_ratio (float): Tỷ lệ phòng hộ mục tiêu (1 = trung hòa hoàn toàn)
+            min_quantity (float): Số hợp đồng tối thiểu mỗi lệnh
+            poll_interval (float): Chu kỳ hỏi vị thế qua REST khi sàn không hỗ trợ watch_positions
+        """
+        self.exchange_service = exchange_service
+        self.order_service = order_service
+        self.exchange_id = exchange_id
+        self.symbol = symbol
+        self.futures_symbol = f"{extract_base_asset(symbol)}/USDT:USDT"  # Ký hiệu hợp nhất của hợp đồng vĩnh viễn
+        self.leverage = leverage
+        self.band_usd = band_usd
+        self.batch_interval = batch_interval
+        self.hedge_ratio = hedge_ratio
+        self.min_quantity = min_quantity
+        self.poll_interval = poll_interval
+
+        self.spot_position = 0.0  # Lượng crypto spot
+        self.futures_position = 0.0  # Vị thế futures (đơn vị crypto, âm = short)
+        self.contract_size = 1.0  # Số crypto mỗi hợp đồng
+        self.mark_price = None
+        self.adjustments = 0
+        self._net_delta = NET_DELTA.labels(symbol)
+        self._drift = asyncio.Event()
+        self._position_ready = asyncio.Event()  # Đã nhận vị thế futures từ sàn
+        self._tasks = []
+
+    @property
+    def net_delta(self):
+        """float: Delta ròng so với mục tiêu (đơn vị crypto, dương = thừa long)."""
+        return self.spot_position * self.hedge_ratio + self.futures_position
+
+    @property
+    def short_contracts(self):
+        """float: Số hợp đồng đang short."""
+        return max(0.0, -self.futures_position / self.contract_size)
+
+    def set_positions(self, spot_position, short_quantity):
+        """
+        Đặt vị thế ban đầu (ước tính, được thay bằng vị thế của sàn khi start()).
+
+        Args:
+            spot_position (float): Lượng crypto spot
+            short_quantity (float): Lượng crypto đang short
+        """
+        self.spot_position = float(spot_position)
+        self.futures_position = -float(short_quantity)
+        self._check_drift()
+
+    def on_spot_fill(self, quantity):
+        """
+        Ghi nhận thay đổi lượng crypto spot sau một lần khớp lệnh (gọi trên đường xử lý nóng).
+
+        Args:
+            quantity (float): Thay đổi lượng crypto (dương = mua, âm = bán)
+        """
+        self.spot_position += quantity
+        self._check_drift()
+
+    def _check_drift(self):
+        """Cập nhật metric và báo cho tác vụ nền khi độ lệch vượt ngưỡng."""
+        net_delta = self.net_delta
+        self._net_delta.set(net_delta)
+        if self.mark_price is not None and abs(net_delta) * self.mark_price > self.band_usd:
+            self._drift.set()
+
+    def adjustment(self):
+        """
+        Tính lệnh điều chỉnh cần gửi.
+
+        Returns:
+            float: Số hợp đồng cần bán thêm (dương) hoặc mua lại (âm), 0 nếu trong ngưỡng
+        """
+        net_delta = self.net_delta
+        if self.mark_price is None or abs(net_delta) * self.mark_price <= self.band_usd:
+            return 0
+        contracts = int(abs(net_delta) / self.contract_size)
+        if contracts < self.min_quantity:
+            return 0
+        return contracts if net_delta > 0 else -contracts
+
+    async def rebalance(self):
+        """
+        Gửi một lệnh futures đưa delta ròng về trong ngưỡng.
+
+        Returns:
+            float: Số hợp đồng đã điều chỉnh (0 nếu không cần)
+        """
+        contracts = self.adjustment()
+        if not contracts:
+            return 0
+
+        if contracts > 0:
+            await asyncio.to_thread(
+                self.order_service.place_futures_short_order,
+                self.exchange_id, self.futures_symbol, contracts, self.leverage
+            )
+            side = 'sell'
+        else:
+            await asyncio.to_thread(
+                self.order_service.close_futures_short_order,
+                self.exchange_id, self.futures_symbol, -contracts, self.leverage
+            )
+            side = 'buy'
+
+        # Cập nhật ngay; luồng vị thế sẽ ghi đè bằng số liệu của sàn
+        self.futures_position -= contracts * self.contract_size
+        self.adjustments += 1
+        HEDGE_ADJUSTMENTS.labels(self.symbol, side).inc()
+        self._net_delta.set(self.net_delta)
+        log_info(f"Điều chỉnh phòng hộ {self.symbol} trên {self.exchange_id}: {side} {abs(contracts)} hợp đồng, "
+                 f"delta ròng {self.net_delta:.6f}")
+        return contracts
+
+    def update_position(self, position):
+        """
+        Cập nhật vị thế futures từ dữ liệu vị thế hợp nhất của ccxt.
+
+        Args:
+            position (dict): Vị thế ({'contracts', 'contractSize', 'side', 'markPrice', ...})
+        """
+        if position.get('contractSize'):
+            self.contract_size = float(position['contractSize'])
+        contracts = float(position.get('contracts') or 0)
+        sign = -1 if position.get('side') == 'short' else 1
+        self.futures_position = sign * contracts * self.contract_size
+        if position.get('markPrice'):
+            self.mark_price = float(position['markPrice'])
+        self._position_ready.set()
+        self._check_drift()
+
+    def _matches(self, position):
+        """Kiểm tra vị thế có thuộc hợp đồng đang phòng hộ hay không."""
+        return position.get('symbol') in (self.futures_symbol, f"{extract_base_asset(self.symbol)}:USDT")
+
+    async def start(self):
+        """
+        Lấy kích thước hợp đồng, vị thế futures hiện tại trên sàn và khởi động các tác vụ
+        theo dõi và cân bằng.
+        """
+        try:
+            exchange = self.exchange_service.get_exchange(self.exchange_id)
+            await asyncio.to_thread(exchange.load_markets)
+            market = exchange.market(self.futures_symbol)
+            if market.get('contractSize'):
+                self.contract_size = float(market['contractSize'])
+        except Exception as e:
+            log_warning(f"Không thể lấy kích thước hợp đồng {self.futures_symbol} trên {self.exchange_id}: {str(e)}")
+
+        try:
+            position = await asyncio.to_thread(
+                self.order_service.check_futures_position, self.exchange_id, self.futures_symbol
+            )
+            if position:
+                self.update_position(position)
+        except Exception as e:
+            log_warning(f"Không thể lấy vị thế futures {self.futures_symbol} trên {self.exchange_id}: {str(e)}")
+
+        if not self._position_ready.is_set():
+            log_warning(f"Chưa có vị thế futures {self.futures_symbol} trên {self.exchange_id}, "
+                        f"tạm dừng cân bằng cho đến khi nhận được vị thế đầu tiên")
+
+        self._tasks = [
+            asyncio.create_task(self._position_loop()),
+            asyncio.create_task(self._mark_price_loop()),
+            asyncio.create_task(self._rebalance_loop()),
+        ]
+
+    async def stop(self):
+        """Dừng các tác vụ nền."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def _rebalance_loop(self):
+        """Chờ độ lệch vượt ngưỡng, gom các thay đổi trong batch_interval rồi gửi một lệnh."""
+        await self._position_ready.wait()
+        while True:
+            await self._drift.wait()
+            await clock.async_sleep(self.batch_interval)
+            self._drift.clear()
+            try:
+                await self.rebalance()
+            except Exception as e:
+                log_error(f"Lỗi khi điều chỉnh phòng hộ {self.symbol}: {str(e)}")
+                await clock.async_sleep(self.poll_interval)
+                self._check_drift()
+
+    async def _position_loop(self):
+        """Nhận vị thế futures qua watch_positions (hoặc hỏi qua REST nếu sàn không hỗ trợ)."""
+        breaker = CircuitBreaker()
+        while True:
+            try:
+                pro_exchange = await self.exchange_service.get_pro_exchange(self.exchange_id)
+                if getattr(pro_exchange, 'has', {}).get('watchPositions'):
+                    positions = await pro_exchange.watch_positions([self.futures_symbol])
+                else:
+                    position = await asyncio.to_thread(
+                        self.order_service.check_futures_position, self.exchange_id, self.futures_symbol
+                    )
+                    positions = [position] if position else []
+                    await clock.async_sleep(self.poll_interval)
+                for position in positions:
+                    if self._matches(position):
+                        self.update_position(position)
+                breaker.record_success()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log_warning(f"Lỗi khi nhận vị thế futures trên {self.exchange_id}: {str(e)}")
+                await clock.async_sleep(breaker.record_failure())
+
+    async def _mark_price_loop(self):
+        """Nhận giá mark của hợp đồng qua watch_ticker."""
+        breaker = CircuitBreaker()
+        while True:
+            try:
+                pro_exchange = await self.exchange_service.get_pro_exchange(self.exchange_id)
+                ticker = await pro_exchange.watch_ticker(self.futures_symbol)
+                price = ticker.get('markPrice') or (ticker.get('info') or {}).get('markPrice') or ticker.get('last')
+                if price:
+                    self.mark_price = float(price)
+                    self._check_drift()
+                breaker.record_success()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log_warning(f"Lỗi khi nhận giá mark trên {self.exchange_id}: {str(e)}")
+                await clock.async_sleep(breaker.record_failure())
@@ -0,0 +1,308 @@
+"""
+Service ghi nhật ký giao dịch và cơ hội vào SQLite với ghi theo lô bất đồng bộ.
+"""
+import asyncio
+from collections import deque
+import aiosqlite
+
+from utils import clock
+from utils.logger import log_info, log_error
+from configs import JOURNAL_DB_FILE, JOURNAL_BATCH_SIZE, JOURNAL_FLUSH_INTERVAL, JOURNAL_MAX_PENDING
+
+
+# Cấu trúc cơ sở dữ liệu nhật ký
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS opportunities (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    buy_exchange TEXT NOT NULL,
+    sell_exchange TEXT NOT NULL,
+    ask_price REAL,
+    bid_price REAL,
+    amount REAL,
+    profit_usd REAL,
+    profit_pct REAL,
+    executed INTEGER NOT NULL DEFAULT 0,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_opportunities_ts ON opportunities (ts);
+CREATE INDEX IF NOT EXISTS idx_opportunities_symbol_ts ON opportunities (symbol, ts);
+CREATE INDEX IF NOT EXISTS idx_opportunities_buy_exchange_ts ON opportunities (buy_exchange, ts);
+CREATE INDEX IF NOT EXISTS idx_opportunities_sell_exchange_ts ON opportunities (sell_exchange, ts);
+
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    exchange TEXT NOT NULL,
+    order_id TEXT,
+    side TEXT NOT NULL,
+    type TEXT NOT NULL,
+    amount REAL,
+    price REAL,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_ts ON orders (ts);
+CREATE INDEX IF NOT EXISTS idx_orders_symbol_ts ON orders (symbol, ts);
+CREATE INDEX IF NOT EXISTS idx_orders_exchange_ts ON orders (exchange, ts);
+
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    exchange TEXT NOT NULL,
+    order_id TEXT,
+    side TEXT NOT NULL,
+    amount REAL,
+    price REAL
+);
+CREATE INDEX IF NOT EXISTS idx_fills_ts ON fills (ts);
+CREATE INDEX IF NOT EXISTS idx_fills_symbol_ts ON fills (symbol, ts);
+CREATE INDEX IF NOT EXISTS idx_fills_exchange_ts ON fills (exchange, ts);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    ts_start REAL NOT NULL,
+    ts_end REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    mode TEXT,
+    exchanges TEXT,
+    start_balance REAL,
+    end_balance REAL,
+    profit_pct REAL,
+    profit_usd REAL,
+    trades INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_ts ON sessions (ts_start);
+CREATE INDEX IF NOT EXISTS idx_sessions_symbol_ts ON sessions (symbol, ts_start);
+"""
+
+# Câu lệnh chèn cho từng bảng
+INSERT_STATEMENTS = {
+    'opportunities': (
+        "INSERT INTO opportunities (ts, symbol, buy_exchange, sell_exchange, ask_price, bid_price, "
+        "amount, profit_usd, profit_pct, executed, reason) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    ),
+    'orders': (
+        "INSERT INTO orders (ts, symbol, exchange, order_id, side, type, amount, price, status) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    ),
+    'fills': (
+        "INSERT INTO fills (ts, symbol, exchange, order_id, side, amount, price) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)"
+    ),
+    'sessions': (
+        "INSERT INTO sessions (ts_start, ts_end, symbol, mode, exchanges, start_balance, end_balance, "
+        "profit_pct, profit_usd, trades) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    ),
+}
+
+
+class JournalService:
+    """
+    Lớp dịch vụ ghi nhật ký cơ hội, lệnh, khớp lệnh và tổng kết phiên vào SQLite.
+
+    Các hàm record_* chỉ thêm bản ghi vào hàng đợi trong bộ nhớ; một tác vụ nền
+    ghi các bản ghi theo lô trong một giao dịch duy nhất (chế độ WAL).
+    """
+
+    def __init__(self, db_path=JOURNAL_DB_FILE, batch_size=JOURNAL_BATCH_SIZE, flush_interval=JOURNAL_FLUSH_INTERVAL,
+                 max_pending=JOURNAL_MAX_PENDING):
+        """
+        Khởi tạo dịch vụ nhật ký.
+
+        Args:
+            db_path (str): Đường dẫn tệp cơ sở dữ liệu SQLite
+            batch_size (int): Số bản ghi tối đa mỗi lần ghi
+            flush_interval (float): Khoảng thời gian giữa các lần ghi (giây)
+            max_pending (int): Số bản ghi tối đa trong hàng đợi
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = deque(maxlen=max_pending)  # Hàng đợi bản ghi (bảng, giá trị)
+        self.written = 0  # Tổng số bản ghi đã ghi
+        self.dropped = 0  # Số bản ghi bị bỏ do hàng đợi đầy
+        self._db = None
+        self._task = None
+
+    async def start(self):
+        """Mở cơ sở dữ liệu, tạo bảng và khởi động tác vụ ghi nền."""
+        if self._db is not None:
+            return
+
+        self._db = await aiosqlite.connect(self.db_path)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        await self._db.executescript(SCHEMA)
+
+        # Nhật ký tạo trước khi có cột reason
+        async with self._db.execute("PRAGMA table_info(opportunities)") as cursor:
+            columns = {row[1] for row in await cursor.fetchall()}
+        if 'reason' not in columns:
+            await self._db.execute("ALTER TABLE opportunities ADD COLUMN reason TEXT")
+        await self._db.commit()
+
+        self._task = asyncio.create_task(self._writer_loop())
+        log_info(f"Đã mở nhật ký giao dịch tại {self.db_path}")
+
+    async def stop(self):
+        """Dừng tác vụ ghi nền, ghi nốt các bản ghi còn lại và đóng cơ sở dữ liệu."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._db is not None:
+            # Dừng lại nếu không ghi được để không lặp mãi khi cơ sở dữ liệu lỗi
+            while self.pending and await self.flush():
+                pass
+            if self.pending:
+                log_error(f"Bỏ {len(self.pending)} bản ghi nhật ký chưa ghi được khi dừng")
+            await self._db.close()
+            self._db = None
+
+    async def _writer_loop(self):
+        """Vòng lặp ghi các bản ghi theo lô."""
+        while True:
+            await clock.async_sleep(self.flush_interval)
+
+            # Ghi liên tục nếu hàng đợi còn nhiều hơn một lô; dừng ở lô lỗi để thử lại ở lần sau
+            while self.pending:
+                if not await self.flush() or len(self.pending) < self.batch_size:
+                    break
+
+    async def flush(self):
+        """
+        Ghi một lô bản ghi đang chờ vào cơ sở dữ liệu.
+
+        Nếu ghi lỗi, lô được hoàn tác và đưa trở lại đầu hàng đợi để thử lại.
+
+        Returns:
+            int: Số bản ghi đã ghi (0 nếu ghi lỗi)
+        """
+        if self._db is None or not self.pending:
+            return 0
+
+        # Lấy một lô và nhóm theo bảng
+        records = []
+        while self.pending and len(records) < self.batch_size:
+            records.append(self.pending.popleft())
+
+        batch = {}
+        for table, values in records:
+            batch.setdefault(table, []).append(values)
+
+        try:
+            for table, rows in batch.items():
+                await self._db.executemany(INSERT_STATEMENTS[table], rows)
+            await self._db.commit()
+        except Exception as e:
+            log_error(f"Lỗi khi ghi nhật ký giao dịch: {str(e)}")
+            try:
+                await self._db.rollback()
+            except Exception:
+                pass
+            self._requeue(records)
+            return 0
+
+        self.written += len(records)
+        return len(records)
+
+    def _requeue(self, records):
+        """Đưa các bản ghi chưa ghi được trở lại đầu hàng đợi (bỏ bản ghi mới nhất nếu đầy)."""
+        overflow = len(self.pending) + len(records) - self.pending.maxlen if self.pending.maxlen else 0
+        if overflow > 0:
+            self.dropped += overflow
+        self.pending.extendleft(reversed(records))
+
+    def _enqueue(self, table, values):
+        """Thêm một bản ghi vào hàng đợi (bỏ bản ghi cũ nhất nếu đầy)."""
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        self.pending.append((table, values))
+
+    def record_opportunity(self, symbol, buy_exchange, sell_exchange, ask_price, bid_price, amount,
+                           profit_usd, profit_pct, executed=False, reason=None):
+        """
+        Ghi nhận một cơ hội đã được đánh giá.
+
+        Args:
+            symbol (str): Ký hiệu của cặp giao dịch
+            buy_exchange (str): Sàn mua
+            sell_exchange (str): Sàn bán
+            ask_price (float): Giá mua
+            bid_price (float): Giá bán
+            amount (float): Số lượng giao dịch
+            profit_usd (float): Lợi nhuận sau phí (USD)
+            profit_pct (float): Lợi nhuận sau phí (phần trăm)
+            executed (bool): Cơ hội có được thực hiện hay không
+            reason (str, optional): Lý do bỏ qua trước khi tính lợi nhuận (vd. below_break_even)
+        """
+        self._enqueue(
+            'opportunities',
+            (clock.time(), symbol, buy_exchange, sell_exchange, ask_price, bid_price,
+             amount, profit_usd, profit_pct, int(executed), reason)
+        )
+
+    def record_order(self, exchange, symbol, side, order_type, amount, price=None, order_id=None, status='open'):
+        """
+        Ghi nhận một lệnh đã gửi đến sàn.
+
+        Args:
+            exchange (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch
+            side (str): Hướng lệnh (buy, sell)
+            order_type (str): Loại lệnh (limit, market)
+            amount (float): Số lượng
+            price (float, optional): Giá đặt
+            order_id (str, optional): ID của lệnh trên sàn
+            status (str): Trạng thái lệnh
+        """
+        self._enqueue(
+            'orders',
+            (clock.time(), symbol, exchange, order_id, side, order_type, amount, price, status)
+        )
+
+    def record_fill(self, exchange, symbol, side, amount, price=None, order_id=None):
+        """
+        Ghi nhận một lệnh đã được khớp.
+
+        Args:
+            exchange (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch
+            side (str): Hướng lệnh (buy, sell)
+            amount (float): Số lượng đã khớp
+            price (float, optional): Giá khớp
+            order_id (str, optional): ID của lệnh trên sàn
+        """
+        self._enqueue(
+            'fills',
+            (clock.time(), symbol, exchange, order_id, side, amount, price)
+        )
+
+    def record_session(self, symbol, mode, exchanges, start_time, start_balance, end_balance,
+                       profit_pct, profit_usd, trades):
+        """
+        Ghi nhận tổng kết một phiên giao dịch.
+
+        Args:
+            symbol (str): Ký hiệu của cặp giao dịch
+            mode (str): Chế độ bot
+            exchanges (list): Danh sách các sàn giao dịch
+            start_time (float): Thời điểm bắt đầu phiên
+            start_balance (float): Số dư đầu phiên
+            end_balance (float): Số dư cuối phiên
+            profit_pct (float): Tổng lợi nhuận (phần trăm)
+            profit_usd (float): Tổng lợi nhuận (USD)
+            trades (int): Số giao dịch đã thực hiện
+        """
+        self._enqueue(
+            'sessions',
+            (start_time, clock.time(), symbol, mode, ','.join(exchanges), start_balance, end_balance,
+             profit_pct, profit_usd, trades)
+        )
@@ -0,0 +1,293 @@
+"""
+Client nhận sách lệnh từ daemon dữ liệu thị trường qua Unix domain socket.
+
+Định dạng khung (big-endian):
+    độ dài thân (uint32) | loại (uint8) | độ dài tên sàn (uint8) | độ dài cặp (uint8) | tên sàn | cặp | dữ liệu
+    SUBSCRIBE: không có dữ liệu
+    SUBSCRIBE_SHM: không có dữ liệu (daemon chỉ ghi vào bộ nhớ dùng chung, không gửi khung BOOK)
+    BOOK:      seq (uint64) | timestamp ms (float64) | số bid (uint8) | số ask (uint8) | các cặp (giá, lượng) float64
+    ERROR:     thông báo lỗi (utf-8)
+"""
+import struct
+import asyncio
+
+from services.shared_orderbook import SharedOrderBookReader
+from utils import clock
+from utils.exceptions import ExchangeError
+from configs import MARKET_DATA_SOCKET, MARKET_DATA_DEPTH, MARKET_DATA_SHM
+
+
+# Loại khung
+FRAME_SUBSCRIBE = 1
+FRAME_BOOK = 2
+FRAME_ERROR = 3
+FRAME_SUBSCRIBE_SHM = 4
+
+LENGTH = struct.Struct('!I')
+FRAME_HEADER = struct.Struct('!BBB')
+BOOK_HEADER = struct.Struct('!QdBB')
+
+
+def _encode(frame_type, exchange_id, symbol, payload=b''):
+    """Ghép một khung hoàn chỉnh (kèm độ dài)."""
+    exchange_bytes = exchange_id.encode('utf-8')
+    symbol_bytes = symbol.encode('utf-8')
+    body = FRAME_HEADER.pack(frame_type, len(exchange_bytes), len(symbol_bytes)) + exchange_bytes + symbol_bytes + payload
+    return LENGTH.pack(len(body)) + body
+
+
+def encode_subscribe(exchange_id, symbol, shared_memory=False):
+    """
+    Tạo khung đăng ký sách lệnh.
+
+    Args:
+        exchange_id (str): ID của sàn giao dịch
+        symbol (str): Ký hiệu của cặp giao dịch
+        shared_memory (bool): Nếu True, chỉ nhận sách lệnh qua bộ nhớ dùng chung
+
+    Returns:
+        bytes: Khung SUBSCRIBE hoặc SUBSCRIBE_SHM
+    """
+    return _encode(FRAME_SUBSCRIBE_SHM if shared_memory else FRAME_SUBSCRIBE, exchange_id, symbol)
+
+
+def encode_book(exchange_id, symbol, orderbook, depth=MARKET_DATA_DEPTH, seq=0):
+    """
+    Tạo khung sách lệnh top-K.
+
+    Args:
+        exchange_id (str): ID của sàn giao dịch
+        symbol (str): Ký hiệu của cặp giao dịch
+        orderbook (dict): Sách lệnh dạng ccxt ({'bids': [[giá, lượng], ...], 'asks': ...})
+        depth (int): Số mức giá tối đa mỗi phía
+        seq (int): Số thứ tự cập nhật
+
+    Returns:
+        bytes: Khung BOOK
+    """
+    bids = orderbook['bids'][:depth]
+    asks = orderbook['asks'][:depth]
+    timestamp = orderbook.get('timestamp') or clock.time() * 1000
+
+    levels = [value for level in bids for value in level[:2]] + [value for level in asks for value in level[:2]]
+    payload = BOOK_HEADER.pack(seq, float(timestamp), len(bids), len(asks)) + struct.pack(f'!{len(levels)}d', *levels)
+    return _encode(FRAME_BOOK, exchange_id, symbol, payload)
+
+
+def encode_error(exchange_id, symbol, message):
+    """
+    Tạo khung báo lỗi.
+
+    Returns:
+        bytes: Khung ERROR
+    """
+    return _encode(FRAME_ERROR, exchange_id, symbol, message.encode('utf-8'))
+
+
+def decode_frame(body):
+    """
+    Giải mã thân một khung (không gồm 4 byte độ dài).
+
+    Args:
+        body (bytes): Thân khung
+
+    Returns:
+        tuple: (loại, sàn, cặp, dữ liệu). Dữ liệu là sách lệnh dạng ccxt với khung BOOK,
+            thông báo lỗi với khung ERROR, None với khung SUBSCRIBE.
+    """
+    frame_type, exchange_len, symbol_len = FRAME_HEADER.unpack_from(body)
+    offset = FRAME_HEADER.size
+    exchange_id = body[offset:offset + exchange_len].decode('utf-8')
+    offset += exchange_len
+    symbol = body[offset:offset + symbol_len].decode('utf-8')
+    offset += symbol_len
+
+    if frame_type == FRAME_BOOK:
+        seq, timestamp, bid_count, ask_count = BOOK_HEADER.unpack_from(body, offset)
+        offset += BOOK_HEADER.size
+        values = struct.unpack_from(f'!{(bid_count + ask_count) * 2}d', body, offset)
+        levels = [[values[i], values[i + 1]] for i in range(0, len(values), 2)]
+        orderbook = {
+            'symbol': symbol,
+            'bids': levels[:bid_count],
+            'asks': levels[bid_count:],
+            'timestamp': int(timestamp),
+            'nonce': seq,
+        }
+        return frame_type, exchange_id, symbol, orderbook
+
+    if frame_type == FRAME_ERROR:
+        return frame_type, exchange_id, symbol, body[offset:].decode('utf-8')
+
+    return frame_type, exchange_id, symbol, None
+
+
+async def read_frame(reader):
+    """
+    Đọc một khung từ luồng.
+
+    Returns:
+        tuple: Kết quả của decode_frame
+
+    Raises:
+        asyncio.IncompleteReadError: Nếu kết nối bị đóng
+    """
+    header = await reader.readexactly(LENGTH.size)
+    body = await reader.readexactly(LENGTH.unpack(header)[0])
+    return decode_frame(body)
+
+
+class RemoteExchange:
+    """
+    Đối tượng thay thế client ccxt.pro của một sàn, nhận sách lệnh từ daemon.
+    """
+
+    def __init__(self, client, exchange_id):
+        self.client = client
+        self.id = exchange_id
+
+    async def watch_order_book(self, symbol, limit=None):
+        """
+        Chờ cập nhật sách lệnh tiếp theo (cùng cách dùng với ccxt.pro).
+
+        Args:
+            symbol (str): Ký hiệu của cặp giao dịch
+            limit (int, optional): Số mức giá mỗi phía
+
+        Returns:
+            dict: Sách lệnh dạng ccxt
+        """
+        orderbook = await self.client.watch_order_book(self.id, symbol)
+        if limit:
+            orderbook = dict(orderbook, bids=orderbook['bids'][:limit], asks=orderbook['asks'][:limit])
+        return orderbook
+
+    async def close(self):
+        """Kết nối tới daemon do MarketDataClient quản lý nên không cần đóng ở đây."""
+        pass
+
+
+class MarketDataClient:
+    """
+    Client của bot: một kết nối tới daemon dùng chung cho mọi sàn và cặp giao dịch.
+
+    Khi có vùng nhớ dùng chung, socket chỉ dùng để đăng ký; sách lệnh được đọc trực
+    tiếp từ vùng nhớ.
+    """
+
+    def __init__(self, path=MARKET_DATA_SOCKET, shared_memory=MARKET_DATA_SHM):
+        """
+        Khởi tạo client.
+
+        Args:
+            path (str): Đường dẫn Unix socket của daemon
+            shared_memory (str, optional): Tên vùng nhớ dùng chung do daemon ghi
+        """
+        self.path = path
+        self.shared_memory = shared_memory
+        self.shared_reader = None
+        self.books = {}  # {(sàn, cặp): sách lệnh mới nhất}
+        self._waiters = {}  # {(sàn, cặp): [future]}
+        self._subscribed = set()
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        self._connect_lock = asyncio.Lock()
+
+    def exchange(self, exchange_id):
+        """
+        Lấy đối tượng thay thế client ccxt.pro cho một sàn.
+
+        Returns:
+            RemoteExchange: Đối tượng có hàm watch_order_book
+        """
+        return RemoteExchange(self, exchange_id)
+
+    async def _ensure_connected(self):
+        """Kết nối (lại) tới daemon và đăng ký lại các cặp đã theo dõi."""
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+            for exchange_id, symbol in self._subscribed:
+                self._writer.write(encode_subscribe(exchange_id, symbol, bool(self.shared_memory)))
+            self._reader_task = asyncio.create_task(self._read_loop(self._reader))
+
+    async def watch_order_book(self, exchange_id, symbol):
+        """
+        Chờ cập nhật sách lệnh tiếp theo của (sàn, cặp).
+
+        Returns:
+            dict: Sách lệnh dạng ccxt
+
+        Raises:
+            ExchangeError: Nếu daemon báo lỗi hoặc mất kết nối tới daemon
+        """
+        try:
+            await self._ensure_connected()
+        except OSError as e:
+            raise ExchangeError(exchange_id, f"Không thể kết nối tới daemon dữ liệu thị trường: {str(e)}")
+
+        key = (exchange_id, symbol)
+        if key not in self._subscribed:
+            self._subscribed.add(key)
+            self._writer.write(encode_subscribe(exchange_id, symbol, bool(self.shared_memory)))
+            await self._writer.drain()
+
+        if self.shared_memory:
+            if self.shared_reader is None:
+                self.shared_reader = SharedOrderBookReader(self.shared_memory)
+            return await self.shared_reader.watch_order_book(exchange_id, symbol)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, []).append(waiter)
+        return await waiter
+
+    async def _read_loop(self, reader):
+        """Nhận các khung từ daemon và đánh thức các bot đang chờ."""
+        try:
+            while True:
+                frame_type, exchange_id, symbol, data = await read_frame(reader)
+                key = (exchange_id, symbol)
+                if frame_type == FRAME_BOOK:
+                    self.books[key] = data
+                    for waiter in self._waiters.pop(key, []):
+                        if not waiter.done():
+                            waiter.set_result(data)
+                elif frame_type == FRAME_ERROR:
+                    for waiter in self._waiters.pop(key, []):
+                        if not waiter.done():
+                            waiter.set_exception(ExchangeError(exchange_id, data))
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            # Lần gọi watch_order_book sau sẽ kết nối lại
+            self._disconnect(f"Mất kết nối tới daemon dữ liệu thị trường: {str(e)}")
+        except asyncio.CancelledError:
+            self._disconnect("Kết nối tới daemon dữ liệu thị trường đã đóng")
+            raise
+
+    def _disconnect(self, message):
+        """Đóng kết nối hiện tại và báo lỗi cho các bot đang chờ."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+        waiters, self._waiters = self._waiters, {}
+        for futures in waiters.values():
+            for waiter in futures:
+                if not waiter.done():
+                    waiter.set_exception(ExchangeError('market-data', message))
+
+    async def close(self):
+        """Đóng kết nối tới daemon."""
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        self._disconnect("Kết nối tới daemon dữ liệu thị trường đã đóng")
+        self._subscribed = set()
+        if self.shared_reader is not None:
+            self.shared_reader.close()
+            self.shared_reader = None
@@ -0,0 +1,202 @@
+"""
+Tiến trình dữ liệu thị trường dùng chung (fanout) qua Unix domain socket.
+
+Daemon giữ kết nối websocket duy nhất tới mỗi sàn và phát sách lệnh top-K đã chuẩn
+hóa tới các bot dưới dạng khung nhị phân (xem services/market_data_client.py). Các
+bot kết nối qua MarketDataClient khi biến môi trường MARKET_DATA_SOCKET được đặt.
+
+Với --shm, daemon còn ghi sách lệnh vào vùng nhớ dùng chung (xem
+services/shared_orderbook.py) để các bot trên cùng máy đọc không qua socket.
+
+Chạy: python -m services.market_data_daemon --socket state/market_data.sock [--shm arb_books]
+"""
+import os
+import asyncio
+import argparse
+
+from services.exchange_service import ExchangeService
+from services.market_data_client import FRAME_SUBSCRIBE, FRAME_SUBSCRIBE_SHM, encode_book, encode_error, read_frame
+from services.shared_orderbook import SharedOrderBookWriter
+from utils import clock
+from utils.logger import log_info, log_error, log_warning
+from configs import MARKET_DATA_SOCKET, MARKET_DATA_DEPTH, MARKET_DATA_MAX_BUFFER, MARKET_DATA_SHM
+
+
+class MarketDataDaemon:
+    """
+    Máy chủ phát sách lệnh: một tác vụ theo dõi cho mỗi (sàn, cặp), dùng chung cho mọi
+    bot đã đăng ký. Mỗi cập nhật được mã hóa một lần và ghi cho tất cả các bot.
+    """
+
+    def __init__(self, exchange_service=None, path=MARKET_DATA_SOCKET, depth=MARKET_DATA_DEPTH,
+                 max_buffer=MARKET_DATA_MAX_BUFFER, shared_memory=None):
+        """
+        Khởi tạo daemon.
+
+        Args:
+            exchange_service (ExchangeService, optional): Dịch vụ sàn giao dịch giữ kết nối websocket
+            path (str): Đường dẫn Unix socket
+            depth (int): Số mức giá mỗi phía được phát
+            max_buffer (int): Số byte tối đa đang chờ gửi cho một bot trước khi bỏ qua cập nhật
+            shared_memory (str, optional): Tên vùng nhớ dùng chung để ghi sách lệnh
+        """
+        # Daemon luôn kết nối trực tiếp tới sàn
+        self.exchange_service = exchange_service or ExchangeService(market_data_socket=None)
+        self.path = path
+        self.depth = depth
+        self.max_buffer = max_buffer
+        self.subscribers = {}  # {(sàn, cặp): set(writer)}
+        self.watchers = {}  # {(sàn, cặp): tác vụ theo dõi}
+        self.shared_only = set()  # Các bot chỉ đọc từ vùng nhớ dùng chung
+        self.seq = {}  # {(sàn, cặp): số thứ tự cập nhật}
+        self.published = 0  # Số khung đã gửi
+        self.dropped = 0  # Số khung bị bỏ qua do bot đọc chậm
+        self._server = None
+        self.shared_memory = shared_memory
+        self.shared_writer = None
+
+    async def start(self):
+        """Mở Unix socket và bắt đầu nhận kết nối."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Socket cũ từ lần chạy trước
+
+        if self.shared_memory and self.shared_writer is None:
+            self.shared_writer = SharedOrderBookWriter(self.shared_memory, self.depth)
+            log_info(f"Ghi sách lệnh vào vùng nhớ dùng chung {self.shared_writer.name}")
+
+        self._server = await asyncio.start_unix_server(self._handle_client, self.path)
+        log_info(f"Daemon dữ liệu thị trường đang lắng nghe tại {self.path} (top-{self.depth})")
+
+    async def serve_forever(self):
+        """Chạy daemon cho tới khi bị dừng."""
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """Dừng các tác vụ theo dõi, đóng các kết nối và socket."""
+        for task in self.watchers.values():
+            task.cancel()
+        await asyncio.gather(*self.watchers.values(), return_exceptions=True)
+        self.watchers = {}
+
+        for writers in self.subscribers.values():
+            for writer in writers:
+                writer.close()
+        self.subscribers = {}
+
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+        await self.exchange_service.close_pro_exchanges()
+
+        if self.shared_writer is not None:
+            self.shared_writer.close()
+            self.shared_writer = None
+
+    async def _handle_client(self, reader, writer):
+        """Nhận các yêu cầu đăng ký của một bot cho tới khi bot ngắt kết nối."""
+        try:
+            while True:
+                frame_type, exchange_id, symbol, _ = await read_frame(reader)
+                if frame_type == FRAME_SUBSCRIBE:
+                    self.subscribe(exchange_id, symbol, writer)
+                elif frame_type == FRAME_SUBSCRIBE_SHM:
+                    if self.shared_writer is None:
+                        writer.write(encode_error(exchange_id, symbol, "Daemon không bật vùng nhớ dùng chung"))
+                        continue
+                    self.shared_only.add(writer)
+                    self.subscribe(exchange_id, symbol, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            log_error(f"Lỗi khi xử lý kết nối bot: {str(e)}")
+        finally:
+            self.unsubscribe(writer)
+            self.shared_only.discard(writer)
+            writer.close()
+
+    def subscribe(self, exchange_id, symbol, writer):
+        """Đăng ký một bot nhận sách lệnh của (sàn, cặp)."""
+        key = (exchange_id, symbol)
+        self.subscribers.setdefault(key, set()).add(writer)
+        if key not in self.watchers:
+            self.watchers[key] = asyncio.create_task(self._watch(key))
+            log_info(f"Bắt đầu phát sách lệnh {symbol} trên {exchange_id}")
+
+    def unsubscribe(self, writer):
+        """Hủy mọi đăng ký của một bot; dừng theo dõi các cặp không còn ai đăng ký."""
+        for key in list(self.subscribers):
+            writers = self.subscribers[key]
+            writers.discard(writer)
+            if not writers:
+                del self.subscribers[key]
+                task = self.watchers.pop(key, None)
+                if task:
+                    task.cancel()
+
+    async def _watch(self, key):
+        """Theo dõi sách lệnh của một (sàn, cặp) và phát tới các bot đã đăng ký."""
+        exchange_id, symbol = key
+        while True:
+            try:
+                pro_exchange = await self.exchange_service.get_pro_exchange(exchange_id)
+                while True:
+                    orderbook = await pro_exchange.watch_order_book(symbol)
+                    self.seq[key] = self.seq.get(key, 0) + 1
+                    if self.shared_writer is not None:
+                        self.shared_writer.write(exchange_id, symbol, orderbook, self.seq[key])
+                    self.publish(key, encode_book(exchange_id, symbol, orderbook, self.depth, self.seq[key]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log_warning(f"Lỗi khi theo dõi {symbol} trên {exchange_id}: {str(e)}")
+                self.publish(key, encode_error(exchange_id, symbol, str(e)))
+                await clock.async_sleep(1)
+                try:
+                    await self.exchange_service.reset_pro_exchange(exchange_id)
+                except Exception:
+                    pass
+
+    def publish(self, key, frame):
+        """
+        Gửi một khung tới tất cả bot đã đăng ký (không chờ).
+
+        Bot đọc chậm bị bỏ qua cập nhật này thay vì làm chậm các bot khác; mỗi khung
+        là một bản chụp đầy đủ nên bot sẽ nhận lại trạng thái mới nhất ở khung sau.
+        """
+        for writer in list(self.subscribers.get(key, ())):
+            if writer.is_closing() or writer in self.shared_only:
+                continue
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                self.dropped += 1
+                continue
+            writer.write(frame)
+            self.published += 1
+
+
+async def main(path, shared_memory=None):
+    """Chạy daemon dữ liệu thị trường."""
+    daemon = MarketDataDaemon(path=path, shared_memory=shared_memory)
+    await daemon.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Daemon dữ liệu thị trường dùng chung cho các bot')
+    parser.add_argument('--socket', default=MARKET_DATA_SOCKET or 'state/market_data.sock', help='Đường dẫn Unix socket')
+    parser.add_argument('--shm', default=MARKET_DATA_SHM or None, help='Tên vùng nhớ dùng chung để ghi sách lệnh')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args.socket, args.shm))
+    except KeyboardInterrupt:
+        log_info("Daemon dữ liệu thị trường đã dừng.")
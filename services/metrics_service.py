@@ -0,0 +1,166 @@
+"""
+Service xuất metric của bot qua HTTP (định dạng văn bản Prometheus) trên cổng cục bộ.
+"""
+import asyncio
+
+from utils import clock
+from utils.logger import log_info, log_warning
+from utils import metrics
+from configs import METRICS_HOST, METRICS_PORT, METRICS_LAG_INTERVAL
+
+
+EVENT_LOOP_LAG = metrics.gauge('arb_event_loop_lag_seconds', 'Độ trễ gần nhất của vòng lặp sự kiện')
+EVENT_LOOP_LAG_HISTOGRAM = metrics.histogram(
+    'arb_event_loop_lag_distribution_seconds', 'Phân phối độ trễ của vòng lặp sự kiện'
+)
+RATE_LIMIT_QUEUE = metrics.gauge('arb_rate_limit_queue_depth', 'Số lời gọi REST đang chờ theo sàn', ['exchange'])
+RATE_LIMIT_WAIT = metrics.counter(
+    'arb_rate_limit_wait_seconds_total', 'Tổng thời gian chờ giới hạn tốc độ', ['exchange', 'endpoint']
+)
+RATE_LIMIT_REQUESTS = metrics.counter(
+    'arb_rate_limit_requests_total', 'Số lời gọi REST đã qua bộ giới hạn tốc độ', ['exchange', 'endpoint']
+)
+JOURNAL_QUEUE = metrics.gauge('arb_journal_queue_depth', 'Số bản ghi nhật ký đang chờ ghi')
+JOURNAL_DROPPED = metrics.counter('arb_journal_dropped_total', 'Số bản ghi nhật ký bị bỏ do hàng đợi đầy')
+BOT_STATS = metrics.gauge('arb_bot_stat', 'Thống kê của các bot đang chạy', ['symbol', 'mode', 'stat'])
+
+
+class MetricsService:
+    """
+    Máy chủ HTTP tối giản trả về registry metric tại /metrics, kèm tác vụ đo độ trễ
+    của vòng lặp sự kiện.
+
+    Các giá trị có sẵn ở nơi khác (hàng đợi của bộ giới hạn tốc độ, hàng đợi nhật ký,
+    thống kê của bot) được đọc tại thời điểm Prometheus lấy dữ liệu, không cập nhật
+    trên đường xử lý sách lệnh.
+    """
+
+    def __init__(self, runtime=None, host=METRICS_HOST, port=METRICS_PORT,
+                 lag_interval=METRICS_LAG_INTERVAL, registry=None):
+        """
+        Khởi tạo service metric.
+
+        Args:
+            runtime (BotRuntime, optional): Môi trường chạy cung cấp các service và bot
+            host (str): Địa chỉ lắng nghe
+            port (int): Cổng lắng nghe (0 = chọn cổng trống)
+            lag_interval (float): Chu kỳ đo độ trễ vòng lặp sự kiện (giây)
+            registry (MetricsRegistry, optional): Registry (mặc định: registry của tiến trình)
+        """
+        self.runtime = runtime
+        self.host = host
+        self.port = port
+        self.lag_interval = lag_interval
+        self.registry = registry or metrics.REGISTRY
+        self._server = None
+        self._lag_task = None
+        if runtime is not None:
+            self._register_collectors()
+
+    def _register_collectors(self):
+        """Đăng ký các giá trị đọc từ runtime tại thời điểm lấy dữ liệu."""
+        runtime = self.runtime
+        rate_limiter = getattr(runtime.exchange_service, 'rate_limiter', None)
+
+        if rate_limiter is not None:
+            RATE_LIMIT_QUEUE.set_function(
+                lambda: {exchange: stats['queued'] for exchange, stats in rate_limiter.stats().items()}
+            )
+            RATE_LIMIT_WAIT.set_function(lambda: self._limiter_values(rate_limiter, 'wait_total'))
+            RATE_LIMIT_REQUESTS.set_function(lambda: self._limiter_values(rate_limiter, 'count'))
+
+        if runtime.journal_service is not None:
+            JOURNAL_QUEUE.set_function(lambda: len(runtime.journal_service.pending))
+            JOURNAL_DROPPED.set_function(lambda: runtime.journal_service.dropped)
+
+        BOT_STATS.set_function(lambda: self._bot_stats(runtime.bots))
+
+    @staticmethod
+    def _limiter_values(rate_limiter, field):
+        """Lấy một trường thống kê của bộ giới hạn tốc độ theo (sàn, nhóm endpoint)."""
+        values = {}
+        for exchange, stats in rate_limiter.stats().items():
+            for endpoint, endpoint_stats in stats.items():
+                if endpoint != 'queued':
+                    values[(exchange, endpoint)] = endpoint_stats[field]
+        return values
+
+    @staticmethod
+    def _bot_stats(bots):
+        """Gom các bộ đếm stats/error_counts của các bot đang chạy."""
+        values = {}
+        for bot in list(bots):
+            counters = dict(getattr(bot, 'stats', {}))
+            counters.update({f"errors_{kind}": count for kind, count in getattr(bot, 'error_counts', {}).items()})
+            counters['opportunity_count'] = bot.opportunity_count
+            counters['profit_pct'] = bot.total_absolute_profit_pct
+            for stat, value in counters.items():
+                values[(bot.symbol, bot.mode, stat)] = value
+        return values
+
+    async def start(self):
+        """Mở cổng HTTP và khởi động tác vụ đo độ trễ vòng lặp sự kiện."""
+        if self._server is not None:
+            return
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._lag_task = asyncio.create_task(self._lag_loop())
+        log_info(f"Metric Prometheus tại http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        """Đóng cổng HTTP và dừng tác vụ đo độ trễ."""
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            try:
+                await self._lag_task
+            except asyncio.CancelledError:
+                pass
+            self._lag_task = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _lag_loop(self):
+        """Đo độ trễ giữa thời điểm hẹn và thời điểm vòng lặp sự kiện thực sự chạy lại."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await clock.async_sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - expected)
+            EVENT_LOOP_LAG.set(lag)
+            EVENT_LOOP_LAG_HISTOGRAM.observe(lag)
+
+    async def _handle_client(self, reader, writer):
+        """Trả lời một yêu cầu HTTP GET."""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5)
+            # Bỏ qua phần header
+            while True:
+                line = await asyncio.wait_for(reader.readline(), 5)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] in ('/metrics', '/'):
+                status = '200 OK'
+                body = self.registry.render().encode('utf-8')
+            else:
+                status = '404 Not Found'
+                body = b'Not Found\n'
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode('latin-1') + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            log_warning(f"Yêu cầu metric không hợp lệ: {str(e)}")
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
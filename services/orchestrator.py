@@ -0,0 +1,139 @@
+"""
+Điều phối nhiều cặp giao dịch chạy đồng thời trong cùng một event loop.
+"""
+import time
+import asyncio
+
+from utils import clock
+from utils.logger import log_info, log_error, log_warning
+from utils.exceptions import InsufficientBalanceError
+
+
+def allocate_budgets(total_amount, symbols, weights=None):
+    """
+    Chia tổng số vốn cho các cặp giao dịch.
+
+    Args:
+        total_amount (float): Tổng số USDT dùng để giao dịch
+        symbols (list): Danh sách các cặp giao dịch
+        weights (dict, optional): Trọng số vốn cho từng cặp (mặc định chia đều)
+
+    Returns:
+        dict: Số vốn USDT cho từng cặp giao dịch
+    """
+    if not symbols:
+        return {}
+
+    weights = weights or {}
+    symbol_weights = {symbol: float(weights.get(symbol, 1)) for symbol in symbols}
+    total_weight = sum(symbol_weights.values())
+    if total_weight <= 0:
+        raise ValueError("Tổng trọng số vốn phải lớn hơn 0")
+
+    return {
+        symbol: round(total_amount * weight / total_weight, 8)
+        for symbol, weight in symbol_weights.items()
+    }
+
+
+class MultiSymbolOrchestrator:
+    """
+    Chạy một bot cho mỗi cặp giao dịch trên cùng một event loop.
+
+    Các bot dùng chung dịch vụ và kết nối websocket của môi trường chạy (mỗi sàn chỉ
+    có một client ccxt.pro, các cặp được đăng ký trên cùng kết nối). Mỗi bot chỉ
+    giao dịch trong phần vốn được cấp và cộng lợi nhuận vào số dư chung theo phần
+    vốn đó.
+    """
+
+    # Chế độ hỗ trợ chạy nhiều cặp (delta-neutral mở vị thế futures cho cả tài khoản)
+    SUPPORTED_MODES = ('fake-money', 'classic')
+
+    def __init__(self, runtime):
+        """
+        Khởi tạo bộ điều phối.
+
+        Args:
+            runtime (BotRuntime): Môi trường chạy dùng chung
+        """
+        self.runtime = runtime
+        self.bots = {}  # {symbol: bot} của phiên hiện tại
+
+    async def run_session(self, mode, symbols, usdt_amount, renew_time, exchanges, dry_run=False, weights=None):
+        """
+        Chạy một phiên giao dịch đồng thời cho tất cả các cặp.
+
+        Args:
+            mode (str): Chế độ bot (fake-money, classic)
+            symbols (list): Danh sách các cặp giao dịch
+            usdt_amount (float): Tổng số USDT để giao dịch
+            renew_time (int): Thời gian làm mới (phút)
+            exchanges (list): Danh sách tên các sàn giao dịch
+            dry_run (bool): Nếu True, dùng bot mô phỏng
+            weights (dict, optional): Trọng số vốn cho từng cặp
+
+        Returns:
+            float: Tổng lợi nhuận (phần trăm) trên toàn bộ số vốn
+        """
+        if mode not in self.SUPPORTED_MODES and not dry_run:
+            log_error(f"Chế độ {mode} không hỗ trợ chạy nhiều cặp giao dịch")
+            return 0
+
+        runtime = self.runtime
+        await runtime.start(exchanges)
+        runtime.begin_session()
+
+        try:
+            budgets = allocate_budgets(usdt_amount, symbols, weights)
+            runtime.balance_service.initialize_balance_files(usdt_amount)
+
+            # Kiểm tra tổng số dư một lần cho tất cả các cặp
+            if mode == 'classic' and not dry_run:
+                try:
+                    runtime.balance_service.check_balances(
+                        exchanges, 'USDT', usdt_amount, runtime.notification_service
+                    )
+                except InsufficientBalanceError as e:
+                    log_error(f"Không đủ số dư cho {len(symbols)} cặp giao dịch: {str(e)}")
+                    return 0
+
+            timeout = renew_time * 60  # Chuyển đổi phút sang giây
+            self.bots = {}
+            for symbol, budget in budgets.items():
+                bot = runtime.create_bot(mode, dry_run)
+                bot.status_render_fps = 0  # Không vẽ bảng trạng thái chồng lên nhau
+                bot.configure(symbol, exchanges, timeout, budget, symbol)
+                self.bots[symbol] = bot
+
+            log_info(
+                f"Chạy đồng thời {len(self.bots)} cặp giao dịch: "
+                + ", ".join(f"{symbol} ({budget} USDT)" for symbol, budget in budgets.items())
+            )
+
+            start_time = clock.time()
+            results = await asyncio.gather(
+                *(bot.start() for bot in self.bots.values()),
+                return_exceptions=True
+            )
+            elapsed_time = time.strftime('%H:%M:%S', time.gmtime(clock.time() - start_time))
+
+            # Tổng hợp lợi nhuận theo trọng số vốn của từng cặp
+            total_profit_usd = 0
+            for (symbol, budget), result in zip(budgets.items(), results):
+                if isinstance(result, Exception):
+                    log_warning(f"Bot {symbol} dừng do lỗi: {str(result)}")
+                    continue
+                profit_usd = (result or 0) / 100 * budget
+                total_profit_usd += profit_usd
+                log_info(f"{symbol}: lợi nhuận {result:.4f}% ({profit_usd:.4f} USDT)")
+
+            profit_pct = total_profit_usd / usdt_amount * 100 if usdt_amount else 0
+            log_info(f"Phiên nhiều cặp đã kết thúc sau {elapsed_time}. Tổng lợi nhuận: {profit_pct:.4f}%")
+            return profit_pct
+
+        except Exception as e:
+            log_error(f"Lỗi khi chạy nhiều cặp giao dịch: {str(e)}")
+            return 0
+
+        finally:
+            runtime.end_session()
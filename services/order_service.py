@@ -1,27 +1,89 @@
 """
 Service quản lý các hoạt động đặt lệnh giao dịch.
 """
-import time
-import asyncio
+from utils import clock
 from utils.logger import log_info, log_error, log_warning
 from utils.exceptions import OrderError, OrderFillTimeoutError, FuturesError
-from configs import FIRST_ORDERS_FILL_TIMEOUT
+from configs import (
+    FIRST_ORDERS_FILL_TIMEOUT, ARBITRAGE_FILL_TIMEOUT, ARBITRAGE_POLL_INTERVAL, ARBITRAGE_POLL_MAX_INTERVAL,
+    ARBITRAGE_MIN_HEDGE_USD
+)
 from utils.helpers import extract_base_asset
 
+# Sai số tương đối khi so sánh lượng đã khớp của hai chân lệnh
+FILL_TOLERANCE = 1e-9
+
 
 class OrderService:
     """
     Lớp dịch vụ quản lý các lệnh giao dịch.
     """
     
-    def __init__(self, exchange_service):
+    def __init__(self, exchange_service, journal_service=None, state_store=None):
         """
         Khởi tạo dịch vụ quản lý lệnh.
         
         Args:
             exchange_service (ExchangeService): Dịch vụ sàn giao dịch
+            journal_service (JournalService, optional): Dịch vụ ghi nhật ký giao dịch
+            state_store (StateStore, optional): Kho trạng thái lưu các lệnh đang mở
         """
         self.exchange_service = exchange_service
+        self.journal_service = journal_service
+        self.state_store = state_store
+        # Thời gian chờ lệnh được điền (giây), cập nhật được khi đang chạy (xem ConfigService)
+        self.first_orders_fill_timeout = FIRST_ORDERS_FILL_TIMEOUT
+        self.arbitrage_fill_timeout = ARBITRAGE_FILL_TIMEOUT
+        self.arbitrage_poll_interval = ARBITRAGE_POLL_INTERVAL
+        self.arbitrage_poll_max_interval = ARBITRAGE_POLL_MAX_INTERVAL
+        self.arbitrage_min_hedge_usd = ARBITRAGE_MIN_HEDGE_USD
+    
+    def _journal_order(self, exchange_id, symbol, side, order_type, amount, price=None, order=None):
+        """Ghi nhận lệnh đã gửi vào nhật ký và kho trạng thái nếu được kích hoạt."""
+        order_id = order.get('id') if isinstance(order, dict) else None
+        
+        if self.journal_service:
+            self.journal_service.record_order(exchange_id, symbol, side, order_type, amount, price, order_id)
+        
+        # Chỉ lệnh giới hạn còn mở sau khi gửi
+        if self.state_store and order_type == 'limit':
+            self.state_store.add_open_order(exchange_id, order_id, symbol, side, amount, price)
+    
+    def _journal_fill(self, exchange_id, symbol, side, amount, price=None, order_id=None):
+        """Ghi nhận lệnh đã khớp vào nhật ký và xóa khỏi danh sách lệnh mở."""
+        if self.journal_service:
+            self.journal_service.record_fill(exchange_id, symbol, side, amount, price)
+        
+        self._untrack_order(exchange_id, order_id)
+    
+    def _untrack_order(self, exchange_id, order_id):
+        """Xóa một lệnh đã khớp hoặc đã hủy khỏi danh sách lệnh mở trong kho trạng thái."""
+        # Lệnh không có ID không được ghi nhận (xem StateStore.add_open_order)
+        if self.state_store and order_id is not None:
+            self.state_store.remove_open_orders(exchange_id, order_id=order_id)
+    
+    def recover_open_orders(self):
+        """
+        Hủy các lệnh còn mở từ phiên trước bị dừng đột ngột.
+        
+        Returns:
+            int: Số lệnh đã xử lý
+        """
+        if not self.state_store:
+            return 0
+        
+        orders = self.state_store.get_open_orders()
+        
+        for order in orders:
+            try:
+                self.exchange_service.cancel_order(order['exchange'], order['id'], order['symbol'])
+                log_warning(f"Đã hủy lệnh {order['id']} còn mở từ phiên trước trên {order['exchange']}.")
+            except Exception as e:
+                log_error(f"Không thể hủy lệnh {order['id']} từ phiên trước trên {order['exchange']}: {str(e)}")
+            
+            self.state_store.remove_open_orders(order['exchange'], order['symbol'], order['id'])
+        
+        return len(orders)
     
     def place_initial_orders(self, exchanges, symbol, amount_per_exchange, price, notification_service=None):
         """
@@ -42,11 +104,14 @@ class OrderService:
         """
         orders_filled = 0
         already_filled = []
+        order_ids = {}  # ID lệnh mua trên mỗi sàn
         
         # Đặt lệnh mua giới hạn trên tất cả các sàn
         for exchange_id in exchanges:
             try:
-                self.exchange_service.create_limit_buy_order(exchange_id, symbol, amount_per_exchange, price)
+                order = self.exchange_service.create_limit_buy_order(exchange_id, symbol, amount_per_exchange, price)
+                self._journal_order(exchange_id, symbol, 'buy', 'limit', amount_per_exchange, price, order)
+                order_ids[exchange_id] = order.get('id') if isinstance(order, dict) else None
                 log_info(f"Đặt lệnh giới hạn mua {round(amount_per_exchange, 3)} {extract_base_asset(symbol)} ở giá {price} gửi đến {exchange_id}.")
                 
                 if notification_service:
@@ -57,10 +122,10 @@ class OrderService:
         log_info("Tất cả các lệnh đã được gửi.")
         
         # Đợi cho đến khi tất cả các lệnh được điền hoặc hết thời gian chờ
-        timeout_seconds = FIRST_ORDERS_FILL_TIMEOUT  # Thời gian chờ tối đa (giây)
-        start_time = time.time()
+        timeout_seconds = self.first_orders_fill_timeout  # Thời gian chờ tối đa (giây)
+        start_time = clock.time()
         
-        while time.time() - start_time <= timeout_seconds and orders_filled != len(exchanges):
+        while clock.time() - start_time <= timeout_seconds and orders_filled != len(exchanges):
             for exchange_id in exchanges:
                 if exchange_id in already_filled:
                     continue
@@ -71,6 +136,7 @@ class OrderService:
                     
                     if not open_orders:  # Nếu không có lệnh mở, lệnh đã được điền
                         log_info(f"Lệnh trên {exchange_id} đã được điền.")
+                        self._journal_fill(exchange_id, symbol, 'buy', amount_per_exchange, price, order_ids.get(exchange_id))
                         
                         if notification_service:
                             notification_service.send_message(f"Lệnh trên {exchange_id} đã được điền.")
@@ -81,11 +147,11 @@ class OrderService:
                     log_error(f"Lỗi khi kiểm tra trạng thái lệnh trên {exchange_id}: {str(e)}")
                 
             # Dừng 1.8 giây để giảm số lượng request
-            time.sleep(1.8)
+            clock.sleep(1.8)
         
         # Kiểm tra nếu có lệnh nào chưa được điền sau khi hết thời gian chờ
-        if time.time() - start_time >= timeout_seconds and orders_filled != len(exchanges):
-            message = f"Một hoặc nhiều lệnh không được điền trong khoảng {FIRST_ORDERS_FILL_TIMEOUT // 60} phút. Hủy các lệnh và bán số lượng đã điền."
+        if clock.time() - start_time >= timeout_seconds and orders_filled != len(exchanges):
+            message = f"Một hoặc nhiều lệnh không được điền trong khoảng {timeout_seconds // 60:g} phút. Hủy các lệnh và bán số lượng đã điền."
             log_warning(message)
             
             if notification_service:
@@ -103,6 +169,7 @@ class OrderService:
                         
                         if open_orders:
                             self.exchange_service.cancel_order(exchange_id, open_orders[-1]['id'], symbol)
+                            self._untrack_order(exchange_id, open_orders[-1]['id'])
                             log_info(f"Đã hủy lệnh trên {exchange_id}.")
                     except Exception as e:
                         log_error(f"Lỗi khi hủy lệnh trên {exchange_id}: {str(e)}")
@@ -115,6 +182,14 @@ class OrderService:
         """
         Đặt các lệnh giao dịch chênh lệch giá.
         
+        Trạng thái hai chân lệnh được theo dõi theo ID lệnh; chu kỳ kiểm tra tăng gấp đôi
+        (tối đa arbitrage_poll_max_interval) khi hai lệnh không thay đổi. Khi một chân khớp
+        nhiều hơn chân kia (khớp hết, hoặc khớp một phần với chênh lệch từ
+        arbitrage_min_hedge_usd trở lên), lệnh còn mở của chân chậm hơn bị hủy, phần chênh
+        lệch được khớp bằng lệnh thị trường trên sàn của chân đó và phần còn lại được đặt lại
+        ở giá cũ. Hết thời gian chờ, các lệnh còn mở bị hủy và phần chênh lệch được cân bằng
+        theo cùng cách.
+        
         Args:
             min_ask_ex (str): Tên sàn có giá mua thấp nhất
             max_bid_ex (str): Tên sàn có giá bán cao nhất
@@ -125,19 +200,30 @@ class OrderService:
             notification_service (NotificationService, optional): Dịch vụ thông báo
             
         Returns:
-            bool: True nếu các lệnh đã được điền, ngược lại False
+            bool: True nếu cả hai chân đã khớp đủ số lượng, ngược lại False
             
         Raises:
             OrderError: Nếu có lỗi khi đặt lệnh
         """
         try:
             # Đặt lệnh bán giới hạn trên sàn có giá cao
-            self.exchange_service.create_limit_sell_order(max_bid_ex, symbol, amount, max_bid_price)
-            log_info(f"Lệnh bán giới hạn đã gửi đến {max_bid_ex} cho {amount} {extract_base_asset(symbol)} ở giá {max_bid_price}, đợi 3 phút để điền.")
+            sell_order = self.exchange_service.create_limit_sell_order(max_bid_ex, symbol, amount, max_bid_price)
+            self._journal_order(max_bid_ex, symbol, 'sell', 'limit', amount, max_bid_price, sell_order)
+            fill_timeout = self.arbitrage_fill_timeout
+            log_info(f"Lệnh bán giới hạn đã gửi đến {max_bid_ex} cho {amount} {extract_base_asset(symbol)} ở giá {max_bid_price}, đợi {fill_timeout:g} giây để điền.")
+            sell_leg = self._new_leg(max_bid_ex, 'sell', max_bid_price, sell_order, symbol)
             
             # Đặt lệnh mua giới hạn trên sàn có giá thấp
-            self.exchange_service.create_limit_buy_order(min_ask_ex, symbol, amount, min_ask_price)
-            log_info(f"Lệnh mua giới hạn đã gửi đến {min_ask_ex} cho {amount} {extract_base_asset(symbol)} ở giá {min_ask_price}, đợi 3 phút để điền.")
+            try:
+                buy_order = self.exchange_service.create_limit_buy_order(min_ask_ex, symbol, amount, min_ask_price)
+            except Exception as e:
+                # Chân mua bị từ chối: hủy chân bán và hoàn tác phần đã khớp
+                log_error(f"Lệnh mua trên {min_ask_ex} bị từ chối: {str(e)}. Hủy lệnh bán trên {max_bid_ex}...")
+                self._unwind_leg(sell_leg, symbol, notification_service)
+                raise
+            self._journal_order(min_ask_ex, symbol, 'buy', 'limit', amount, min_ask_price, buy_order)
+            log_info(f"Lệnh mua giới hạn đã gửi đến {min_ask_ex} cho {amount} {extract_base_asset(symbol)} ở giá {min_ask_price}, đợi {fill_timeout:g} giây để điền.")
+            buy_leg = self._new_leg(min_ask_ex, 'buy', min_ask_price, buy_order, symbol)
             
             if notification_service:
                 notification_service.send_message(
@@ -146,86 +232,230 @@ class OrderService:
                     f"- Mua giới hạn: {min_ask_ex} {amount} {extract_base_asset(symbol)} @ {min_ask_price}"
                 )
             
+            legs = [sell_leg, buy_leg]
+            tolerance = amount * FILL_TOLERANCE
             # Thiết lập thời gian chờ tối đa cho việc điền lệnh
-            cancel_order_timeout = time.time() + 180  # 3 phút
-            already_filled = []
+            cancel_order_timeout = clock.time() + fill_timeout
+            poll_interval = self.arbitrage_poll_interval
             
-            # Kiểm tra liên tục trạng thái lệnh
-            while time.time() < cancel_order_timeout:
-                time.sleep(2)
+            while True:
+                self._balance_legs(legs, symbol, amount, tolerance, notification_service)
+                if not any(leg['open'] for leg in legs):
+                    break
                 
-                # Kiểm tra lệnh mua
-                buy_orders = self.exchange_service.fetch_open_orders(min_ask_ex, symbol)
+                remaining_time = cancel_order_timeout - clock.time()
+                if remaining_time <= 0:
+                    log_warning(f"Lệnh chênh lệch giá không được điền hết trong {fill_timeout:g} giây. Đang hủy các lệnh còn mở...")
+                    for leg in legs:
+                        if leg['open']:
+                            self._cancel_leg(leg, symbol)
+                    self._balance_legs(legs, symbol, amount, tolerance, notification_service)
+                    break
                 
-                # Kiểm tra lệnh bán
-                sell_orders = self.exchange_service.fetch_open_orders(max_bid_ex, symbol)
+                clock.sleep(min(poll_interval, remaining_time))
                 
-                # Cập nhật danh sách lệnh đã điền
-                if not buy_orders and min_ask_ex not in already_filled:
-                    already_filled.append(min_ask_ex)
-                    log_info(f"Lệnh mua trên {min_ask_ex} đã được điền!")
-                    
-                    if notification_service:
-                        notification_service.send_message(f"Lệnh mua trên {min_ask_ex} đã được điền!")
-                
-                if not sell_orders and max_bid_ex not in already_filled:
-                    already_filled.append(max_bid_ex)
-                    log_info(f"Lệnh bán trên {max_bid_ex} đã được điền!")
-                    
-                    if notification_service:
-                        notification_service.send_message(f"Lệnh bán trên {max_bid_ex} đã được điền!")
+                # Kiểm tra trạng thái từng lệnh còn mở theo ID
+                previous = [(leg['open'], leg['order_filled']) for leg in legs]
+                for leg in legs:
+                    if leg['open']:
+                        try:
+                            order = self.exchange_service.fetch_order(leg['exchange'], leg['id'], symbol)
+                            self._update_leg(leg, order, symbol, notification_service)
+                        except Exception as e:
+                            log_error(f"Lỗi khi kiểm tra lệnh {leg['id']} trên {leg['exchange']}: {str(e)}")
                 
-                # Nếu cả hai lệnh đều đã điền thì thoát vòng lặp
-                if not buy_orders and not sell_orders:
-                    return True
+                # Giãn chu kỳ kiểm tra khi không có gì thay đổi, quay về chu kỳ ngắn khi có lệnh khớp
+                if [(leg['open'], leg['order_filled']) for leg in legs] == previous:
+                    poll_interval = min(poll_interval * 2, max(self.arbitrage_poll_max_interval, self.arbitrage_poll_interval))
+                else:
+                    poll_interval = self.arbitrage_poll_interval
             
-            # Xử lý trường hợp lệnh chưa được điền sau thời gian chờ
-            if buy_orders and not sell_orders:
-                # Lệnh mua chưa điền nhưng lệnh bán đã điền
-                log_warning(f"Lệnh mua trên {min_ask_ex} không được điền trong 3 phút.")
-                
-                # Hủy lệnh mua
-                self.exchange_service.cancel_order(min_ask_ex, buy_orders[0]['id'], symbol)
-                log_info(f"Đã hủy lệnh mua trên {min_ask_ex}.")
-                
-                # Tạo lệnh mua thị trường để cân bằng
-                log_info("Tạo lệnh mua thị trường ngược lại...")
-                last_orders = self.exchange_service.fetch_closed_orders(max_bid_ex, symbol)
-                
-                if last_orders:
-                    amount_filled = last_orders[-1]["filled"]
-                    self.exchange_service.create_market_buy_order(max_bid_ex, symbol, amount_filled)
-                    log_info(f"Đã tạo lệnh mua thị trường trên {max_bid_ex} cho {amount_filled} {extract_base_asset(symbol)}.")
-                
-            elif sell_orders and not buy_orders:
-                # Lệnh bán chưa điền nhưng lệnh mua đã điền
-                log_warning(f"Lệnh bán trên {max_bid_ex} không được điền trong 3 phút.")
-                
-                # Hủy lệnh bán
-                self.exchange_service.cancel_order(max_bid_ex, sell_orders[0]['id'], symbol)
-                log_info(f"Đã hủy lệnh bán trên {max_bid_ex}.")
-                
-                # Tạo lệnh bán thị trường để cân bằng
-                last_orders = self.exchange_service.fetch_closed_orders(min_ask_ex, symbol)
-                
-                if last_orders:
-                    amount_filled = last_orders[-1]["filled"]
-                    self.exchange_service.create_market_sell_order(min_ask_ex, symbol, amount_filled)
-                    log_info(f"Lệnh bán thị trường đã được điền trên {min_ask_ex}. Có thể có tổn thất nhỏ.")
-            
-            elif buy_orders and sell_orders:
-                # Cả hai lệnh đều chưa điền
-                log_warning("2 lệnh không được điền trong 120 giây. Đang hủy...")
+            return all(self._leg_filled(leg) >= amount - tolerance for leg in legs)
+            
+        except Exception as e:
+            raise OrderError(f"{min_ask_ex}/{max_bid_ex}", "arbitrage", str(e))
+    
+    def _new_leg(self, exchange_id, side, price, order, symbol):
+        """Tạo trạng thái của một chân lệnh chênh lệch giá từ lệnh vừa đặt."""
+        leg = {
+            'exchange': exchange_id,
+            'side': side,
+            'price': price,
+            'id': order.get('id') if isinstance(order, dict) else None,
+            'open': True,
+            'order_filled': 0.0,  # Lượng đã khớp của lệnh giới hạn hiện tại
+            'done': 0.0,  # Lượng đã khớp của các lệnh trước (lệnh đã hủy, lệnh thị trường)
+        }
+        if isinstance(order, dict):
+            self._update_leg(leg, order, symbol)
+        if leg['id'] is None:
+            self._resolve_leg(leg, symbol)
+        return leg
+    
+    @staticmethod
+    def _leg_filled(leg):
+        return leg['done'] + leg['order_filled']
+    
+    def _update_leg(self, leg, order, symbol, notification_service=None):
+        """Cập nhật lượng đã khớp và trạng thái của một chân theo thông tin lệnh."""
+        leg['order_filled'] = float(order.get('filled') or 0)
+        if leg['open'] and order.get('status') not in ('open', None):
+            leg['open'] = False
+            side = 'mua' if leg['side'] == 'buy' else 'bán'
+            if leg['order_filled'] > 0:
+                message = f"Lệnh {side} {leg['id']} trên {leg['exchange']} đã khớp {leg['order_filled']} {extract_base_asset(symbol)}."
+                log_info(message)
+                self._journal_fill(leg['exchange'], symbol, leg['side'], leg['order_filled'], leg['price'], leg['id'])
                 
-                # Hủy cả hai lệnh
-                self.exchange_service.cancel_order(min_ask_ex, buy_orders[0]['id'], symbol)
-                self.exchange_service.cancel_order(max_bid_ex, sell_orders[0]['id'], symbol)
-                log_info("Đã hủy cả hai lệnh.")
+                if notification_service:
+                    notification_service.send_message(message)
+            else:
+                self._untrack_order(leg['exchange'], leg['id'])
+    
+    def _resolve_leg(self, leg, symbol):
+        """
+        Tìm lệnh của một chân khi phản hồi đặt lệnh không có ID: lệnh đang mở cùng hướng và
+        cùng giá trên sàn. Không tìm thấy thì chân không còn được theo dõi (cần kiểm tra thủ công).
+        """
+        try:
+            open_orders = self.exchange_service.fetch_open_orders(leg['exchange'], symbol)
+        except Exception as e:
+            log_error(f"Lỗi khi tìm lệnh đang mở trên {leg['exchange']}: {str(e)}")
+            open_orders = []
+        
+        for order in open_orders:
+            if order.get('id') and order.get('side') == leg['side'] and order.get('price') == leg['price']:
+                leg['id'] = order['id']
+                self._update_leg(leg, order, symbol)
+                return
+        
+        leg['open'] = False
+        log_error(f"Không xác định được lệnh {'mua' if leg['side'] == 'buy' else 'bán'} trên {leg['exchange']} ở giá {leg['price']}, bỏ theo dõi chân này. Cần kiểm tra thủ công.")
+    
+    def _cancel_leg(self, leg, symbol):
+        """Hủy lệnh còn mở của một chân; lượng đã khớp cuối cùng được lấy theo ID lệnh."""
+        if leg['id'] is None:
+            # Không có ID thì không thể hủy hay kiểm tra theo ID
+            self._resolve_leg(leg, symbol)
+            if not leg['open']:
+                return
+        try:
+            order = self.exchange_service.cancel_order(leg['exchange'], leg['id'], symbol)
+        except Exception:
+            # Lệnh có thể vừa khớp hết ngay trước khi hủy
+            order = self.exchange_service.fetch_order(leg['exchange'], leg['id'], symbol)
+            if order.get('status') in ('open', None):
+                raise
+        else:
+            if not isinstance(order, dict) or order.get('status') in ('open', None) or order.get('filled') is None:
+                order = self.exchange_service.fetch_order(leg['exchange'], leg['id'], symbol)
+        if order.get('status') in ('open', None):
+            order = {**order, 'status': 'canceled'}
+        self._update_leg(leg, order, symbol)
+        # Lệnh do bot hủy (khác với lệnh bị sàn đóng): có thể đặt lại phần còn lại
+        leg['id'] = None
+        log_info(f"Đã hủy lệnh {'mua' if leg['side'] == 'buy' else 'bán'} trên {leg['exchange']}.")
+    
+    def _hedge_leg(self, leg, symbol, amount, notification_service=None):
+        """Khớp phần chênh lệch của một chân bằng lệnh thị trường trên sàn của chân đó."""
+        side = 'mua' if leg['side'] == 'buy' else 'bán'
+        if leg['side'] == 'buy':
+            order = self.exchange_service.create_market_buy_order(leg['exchange'], symbol, amount)
+        else:
+            order = self.exchange_service.create_market_sell_order(leg['exchange'], symbol, amount)
+        self._journal_order(leg['exchange'], symbol, leg['side'], 'market', amount, order=order)
+        leg['done'] += amount
+        
+        message = f"Đã tạo lệnh {side} thị trường trên {leg['exchange']} cho {amount} {extract_base_asset(symbol)} để cân bằng hai chân. Có thể có tổn thất nhỏ."
+        log_warning(message)
+        if notification_service:
+            notification_service.send_message(message)
+    
+    def _repost_leg(self, leg, symbol, amount):
+        """Đặt lại lệnh giới hạn cho phần còn lại của một chân ở giá cũ."""
+        if leg['side'] == 'buy':
+            order = self.exchange_service.create_limit_buy_order(leg['exchange'], symbol, amount, leg['price'])
+        else:
+            order = self.exchange_service.create_limit_sell_order(leg['exchange'], symbol, amount, leg['price'])
+        self._journal_order(leg['exchange'], symbol, leg['side'], 'limit', amount, leg['price'], order)
+        leg['done'] += leg['order_filled']
+        leg['order_filled'] = 0.0
+        leg['id'] = order.get('id') if isinstance(order, dict) else None
+        leg['open'] = True
+        log_info(f"Đặt lại lệnh {'mua' if leg['side'] == 'buy' else 'bán'} giới hạn trên {leg['exchange']} cho {amount} {extract_base_asset(symbol)} ở giá {leg['price']}.")
+        if isinstance(order, dict):
+            self._update_leg(leg, order, symbol)
+        if leg['id'] is None:
+            self._resolve_leg(leg, symbol)
+    
+    def _balance_legs(self, legs, symbol, amount, tolerance, notification_service=None):
+        """
+        Cân bằng lượng đã khớp của hai chân: chân chậm hơn bị hủy, khớp phần chênh lệch
+        bằng lệnh thị trường, rồi đặt lại phần còn lại nếu chân kia vẫn đang mở. Khi cả hai
+        lệnh còn mở, chênh lệch nhỏ hơn arbitrage_min_hedge_usd được chờ khớp tiếp. Nếu một
+        chân bị sàn đóng khi chưa khớp đủ, lệnh còn mở của chân kia bị hủy.
+        """
+        while True:
+            lead, lag = sorted(legs, key=self._leg_filled, reverse=True)
+            imbalance = self._leg_filled(lead) - self._leg_filled(lag)
             
-            return False
+            # Khớp một phần nhỏ khi cả hai lệnh còn mở: chờ thay vì hủy, khớp thị trường và đặt lại
+            settling = lead['open'] and lag['open'] and imbalance * lag['price'] < self.arbitrage_min_hedge_usd
             
+            if imbalance > tolerance and not settling:
+                if lag['open']:
+                    # Hủy trước khi cân bằng (lệnh có thể khớp thêm trong lúc hủy)
+                    self._cancel_leg(lag, symbol)
+                    continue
+                self._hedge_leg(lag, symbol, imbalance, notification_service)
+            
+            if lead['open'] == lag['open']:
+                return
+            
+            open_leg, closed_leg = (lead, lag) if lead['open'] else (lag, lead)
+            remaining = amount - self._leg_filled(closed_leg)
+            if closed_leg['id'] is None and remaining > tolerance:
+                self._repost_leg(closed_leg, symbol, remaining)
+                return
+            # Chân kia đã bị sàn đóng (hoặc đã đủ số lượng): không còn gì để khớp cùng
+            self._cancel_leg(open_leg, symbol)
+    
+    def _unwind_leg(self, leg, symbol, notification_service=None):
+        """Hủy một chân và đóng phần đã khớp bằng lệnh thị trường ngược chiều trên cùng sàn."""
+        if leg['open']:
+            self._cancel_leg(leg, symbol)
+        filled = self._leg_filled(leg)
+        if filled > 0:
+            reverse = {**leg, 'side': 'sell' if leg['side'] == 'buy' else 'buy'}
+            self._hedge_leg(reverse, symbol, filled, notification_service)
+    
+    def place_market_order(self, exchange_id, symbol, side, amount):
+        """
+        Đặt lệnh thị trường trên sàn spot.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch
+            side (str): Hướng đặt lệnh (buy, sell)
+            amount (float): Số lượng
+            
+        Returns:
+            dict: Thông tin lệnh
+            
+        Raises:
+            OrderError: Nếu có lỗi khi đặt lệnh
+        """
+        try:
+            if side == 'buy':
+                order = self.exchange_service.create_market_buy_order(exchange_id, symbol, amount)
+            else:
+                order = self.exchange_service.create_market_sell_order(exchange_id, symbol, amount)
+            self._journal_order(exchange_id, symbol, side, 'market', amount, order=order)
+            log_info(f"Đã đặt lệnh {side} thị trường trên {exchange_id} cho {amount} {extract_base_asset(symbol)}")
+            
+            return order
         except Exception as e:
-            raise OrderError(f"{min_ask_ex}/{max_bid_ex}", "arbitrage", str(e))
+            raise OrderError(exchange_id, f"market {side}", str(e))
     
     def emergency_sell(self, symbol, exchanges):
         """
@@ -270,6 +500,7 @@ class OrderService:
             # Đặt lệnh bán thị trường với đòn bẩy
             params = {'leverage': leverage}
             order = self.exchange_service.create_futures_order(exchange_id, symbol, 'market', 'sell', amount, params)
+            self._journal_order(exchange_id, symbol, 'sell', 'market', amount, order=order)
             log_info(f"Đã đặt lệnh short trên {exchange_id} cho {amount} {extract_base_asset(symbol)} với đòn bẩy {leverage}x")
             
             return order
@@ -300,6 +531,7 @@ class OrderService:
             # Đặt lệnh mua thị trường để đóng vị thế short
             params = {'leverage': leverage}
             order = self.exchange_service.create_futures_order(exchange_id, symbol, 'market', 'buy', amount, params)
+            self._journal_order(exchange_id, symbol, 'buy', 'market', amount, order=order)
             log_info(f"Đã đóng lệnh short trên {exchange_id} cho {amount} {extract_base_asset(symbol)} với đòn bẩy {leverage}x")
             
             return order
@@ -326,9 +558,9 @@ class OrderService:
             if not symbol.endswith(':USDT'):
                 symbol = f"{extract_base_asset(symbol)}:USDT"
             
-            start_time = time.time()
+            start_time = clock.time()
             
-            while time.time() - start_time < timeout:
+            while clock.time() - start_time < timeout:
                 # Kiểm tra các lệnh đang mở
                 open_orders = self.exchange_service.fetch_open_orders(exchange_id, symbol)
                 
@@ -338,7 +570,7 @@ class OrderService:
                     return True
                 
                 # Dừng 1 giây để giảm số lượng request
-                time.sleep(1)
+                clock.sleep(1)
             
             # Nếu vẫn còn lệnh đang mở sau khi hết thời gian chờ
             open_orders = self.exchange_service.fetch_open_orders(exchange_id, symbol)
@@ -412,6 +644,7 @@ class OrderService:
             exchange = self.exchange_service.get_exchange(exchange_id)
             
             if hasattr(exchange, 'fetch_positions'):
+                self.exchange_service.throttle(exchange_id, 'account')
                 positions = exchange.fetch_positions([symbol])
                 
                 if positions and len(positions) > 0:
@@ -446,6 +679,7 @@ class OrderService:
             exchange = self.exchange_service.get_exchange(exchange_id)
             
             if hasattr(exchange, 'fetch_balance'):
+                self.exchange_service.throttle(exchange_id, 'account')
                 balance = exchange.fetch_balance()
                 
                 if asset in balance['free']:
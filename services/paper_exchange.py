@@ -0,0 +1,722 @@
+"""
+Sàn giao dịch giấy: khớp lệnh mô phỏng trên sách lệnh L2 thực hoặc phát lại.
+"""
+import json
+import asyncio
+import itertools
+import threading
+import functools
+from collections import defaultdict
+
+import ccxt
+import ccxt.pro
+
+from utils import clock
+from utils.logger import log_info, log_error
+from utils.helpers import extract_base_asset
+from utils.fee_thresholds import DEFAULT_FEE_RATE
+from services.exchange_service import ExchangeService
+from services.book_archive import BookArchiveReader, is_archive
+from configs import EXCHANGE_FEES, PAPER_LATENCY, PAPER_BOOK_DEPTH, PAPER_QUOTE_BALANCE, PAPER_REPLAY_IDLE
+
+
+EPSILON = 1e-12
+
+
+def load_records(path, start=None, end=None):
+    """
+    Đọc tệp bản ghi sách lệnh JSONL hoặc kho nén (.bka, xem services.book_archive).
+
+    Mỗi dòng là một bản ghi {"ts": thời điểm (giây), "exchange": sàn, "symbol": cặp,
+    "bids": [[giá, lượng], ...], "asks": [[giá, lượng], ...]}.
+
+    Args:
+        path (str): Đường dẫn tệp
+        start (float, optional): Chỉ lấy bản ghi từ thời điểm này (giây)
+        end (float, optional): Chỉ lấy bản ghi trước thời điểm này (giây)
+
+    Returns:
+        list: Các bản ghi theo thứ tự trong tệp
+    """
+    if is_archive(path):
+        # Chỉ giải nén các khối chứa khoảng thời gian cần đọc
+        return list(BookArchiveReader(path).read(start, end))
+    with open(path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [
+        record for record in records
+        if (start is None or record['ts'] >= start) and (end is None or record['ts'] < end)
+    ]
+
+
+class PaperExchange:
+    """
+    Sàn giấy có cùng bề mặt phương thức với đối tượng sàn ccxt đồng bộ.
+
+    Lệnh chạm giá đối diện được khớp ngay theo từng mức giá của sách lệnh, có thể chỉ
+    khớp một phần; phần còn lại của lệnh giới hạn nằm chờ ở giá của lệnh, sau lượng đã
+    có sẵn ở mức giá đó (ước lượng vị trí hàng đợi). Mỗi lần sách lệnh cập nhật, lượng
+    giảm đi ở mức giá của lệnh được coi là khớp từ đầu hàng đợi: trước hết trừ vào lượng
+    đứng trước, phần vượt quá khớp vào lệnh. Lệnh cũng khớp khi giá đối diện đi xuyên qua
+    giá của lệnh. Mỗi lời gọi REST chờ thêm `latency` giây.
+    """
+
+    def __init__(self, exchange_id, balances=None, fees=None, latency=PAPER_LATENCY, depth=PAPER_BOOK_DEPTH,
+                 subscribe=None):
+        """
+        Khởi tạo sàn giấy.
+
+        Args:
+            exchange_id (str): ID của sàn
+            balances (dict, optional): Số dư ban đầu {'tài sản': lượng} (mặc định: PAPER_QUOTE_BALANCE USDT)
+            fees (dict, optional): Phí theo sàn {'sàn': {'give': phí mua, 'receive': phí bán}}
+            latency (float): Độ trễ mỗi lời gọi REST (giây)
+            depth (int): Số mức giá mỗi phía được giữ
+            subscribe (callable, optional): Hàm đăng ký nhận sách lệnh của một cặp khi cặp được dùng lần đầu,
+                trả về sách lệnh ban đầu (hoặc None)
+        """
+        fee = (EXCHANGE_FEES if fees is None else fees).get(exchange_id, {})
+        self.id = exchange_id
+        self.buy_fee = float(fee.get('give', DEFAULT_FEE_RATE))
+        self.sell_fee = float(fee.get('receive', DEFAULT_FEE_RATE))
+        self.latency = latency
+        self.depth = depth
+        self.subscribe = subscribe
+        self.has = {'cancelAllOrders': True, 'fetchOrder': True, 'fetchOpenOrders': True, 'fetchClosedOrders': True}
+        self.markets = {}
+
+        self.free = defaultdict(float, {'USDT': PAPER_QUOTE_BALANCE} if balances is None else balances)
+        self.used = defaultdict(float)
+        self.books = {}  # {cặp: {'bids': [[giá, lượng], ...], 'asks': [...]}}
+        self.last_prices = {}
+        self.orders = {}  # {id: lệnh}, theo thứ tự tạo
+        self.queue_ahead = {}  # {id lệnh đang chờ: lượng đứng trước trong hàng đợi}
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()  # Sách lệnh được cập nhật trên event loop, lệnh được gửi từ luồng khác
+
+    def load_markets(self, reload=False):
+        """Sàn giấy không có thông tin thị trường (giá trị mặc định được dùng)."""
+        return self.markets
+
+    def _delay(self):
+        """Mô phỏng độ trễ mạng của một lời gọi REST."""
+        if self.latency > 0:
+            clock.sleep(self.latency)
+
+    @staticmethod
+    def _assets(symbol):
+        """Tách tài sản cơ sở và tài sản định giá của một cặp (vd: BTC/USDT -> BTC, USDT)."""
+        quote = symbol.split('/')[1].split(':')[0] if '/' in symbol else 'USDT'
+        return extract_base_asset(symbol), quote
+
+    @staticmethod
+    def _level_amount(levels, price):
+        """Lượng tại một mức giá (0 nếu không có)."""
+        for level_price, amount in levels:
+            if level_price == price:
+                return amount
+        return 0.0
+
+    @staticmethod
+    def _visible(levels, price, side):
+        """Mức giá có nằm trong phần sách lệnh nhìn thấy được của phía lệnh hay không."""
+        if not levels:
+            return False
+        return price >= levels[-1][0] if side == 'buy' else price <= levels[-1][0]
+
+    def apply_book(self, symbol, orderbook):
+        """
+        Cập nhật sách lệnh của một cặp và khớp các lệnh đang chờ.
+
+        Args:
+            symbol (str): Cặp giao dịch
+            orderbook (dict): Sách lệnh {'bids': [[giá, lượng], ...], 'asks': [...]}
+
+        Returns:
+            dict: Bản sao sách lệnh được giữ
+        """
+        book = {
+            'bids': [[float(level[0]), float(level[1])] for level in orderbook['bids'][:self.depth]],
+            'asks': [[float(level[0]), float(level[1])] for level in orderbook['asks'][:self.depth]],
+        }
+        with self._lock:
+            previous = self.books.get(symbol)
+            self.books[symbol] = book
+            for order in list(self.orders.values()):
+                if order['status'] == 'open' and order['symbol'] == symbol:
+                    self._match_resting(order, previous, book)
+        return book
+
+    def order_book(self, symbol):
+        """
+        Lấy sách lệnh hiện tại (đã trừ lượng do lệnh của sàn giấy tiêu thụ).
+
+        Returns:
+            dict: Sách lệnh dạng ccxt
+        """
+        with self._lock:
+            book = self._book(symbol)
+            return {
+                'symbol': symbol,
+                'bids': [level[:] for level in book['bids']],
+                'asks': [level[:] for level in book['asks']],
+            }
+
+    def _book(self, symbol):
+        """Lấy sách lệnh của một cặp, đăng ký nhận sách lệnh nếu chưa có."""
+        book = self.books.get(symbol)
+        if book is None and self.subscribe is not None:
+            orderbook = self.subscribe(symbol)
+            if orderbook:
+                book = self.apply_book(symbol, orderbook)
+        if book is None or not book['bids'] or not book['asks']:
+            raise ccxt.ExchangeNotAvailable(f"{self.id}: chưa có sách lệnh cho {symbol}")
+        return book
+
+    def _match_resting(self, order, previous, book):
+        """Khớp một lệnh đang chờ theo sách lệnh mới."""
+        side, price = order['side'], order['price']
+
+        # Giá đối diện đi xuyên qua lệnh: lệnh được khớp ở giá của chính nó
+        opposite = book['asks'] if side == 'buy' else book['bids']
+        self._take(order, opposite, price, maker=True)
+        if order['status'] != 'open' or previous is None:
+            return
+
+        # Lượng giảm ở mức giá của lệnh được trừ vào hàng đợi phía trước rồi mới khớp vào lệnh
+        own = 'bids' if side == 'buy' else 'asks'
+        if not self._visible(previous[own], price, side):
+            return
+        before = self._level_amount(previous[own], price)
+        after = self._level_amount(book[own], price) if self._visible(book[own], price, side) else before
+        decrease = before - after
+        if decrease <= 0:
+            return
+
+        ahead = self.queue_ahead.get(order['id'], 0.0)
+        self.queue_ahead[order['id']] = max(0.0, ahead - decrease)
+        if decrease > ahead + EPSILON:
+            self._fill(order, min(decrease - ahead, order['remaining']), price)
+
+    def _take(self, order, levels, limit=None, maker=False):
+        """
+        Khớp lệnh với các mức giá đối diện không vượt quá giá giới hạn.
+
+        Args:
+            order (dict): Lệnh
+            levels (list): Các mức giá đối diện (bị trừ đi lượng đã khớp)
+            limit (float, optional): Giá giới hạn (None = lệnh thị trường)
+            maker (bool): Khớp ở giá của lệnh thay vì giá của mức đối diện
+        """
+        buy = order['side'] == 'buy'
+        while levels and order['remaining'] > EPSILON:
+            level_price, level_amount = levels[0]
+            if limit is not None and (level_price > limit if buy else level_price < limit):
+                break
+            amount = min(order['remaining'], level_amount)
+            self._fill(order, amount, limit if maker else level_price)
+            if level_amount - amount <= EPSILON:
+                levels.pop(0)
+            else:
+                levels[0][1] = level_amount - amount
+
+    def _fill(self, order, amount, price):
+        """Ghi nhận một lần khớp và cập nhật số dư."""
+        base, quote = self._assets(order['symbol'])
+        if order['side'] == 'buy':
+            if order['type'] == 'limit':
+                # Trả lại phần tiền đã giữ chênh lệch giữa giá giới hạn và giá khớp
+                self.used[quote] -= amount * order['price']
+                self.free[quote] += amount * (order['price'] - price)
+            else:
+                self.free[quote] -= amount * price
+            fee = amount * self.buy_fee
+            self.free[base] += amount - fee
+        else:
+            if order['type'] == 'limit':
+                self.used[base] -= amount
+            else:
+                self.free[base] -= amount
+            fee = amount * price * self.sell_fee
+            self.free[quote] += amount * price - fee
+
+        order['filled'] += amount
+        order['remaining'] = max(0.0, order['amount'] - order['filled'])
+        order['cost'] += amount * price
+        order['average'] = order['cost'] / order['filled']
+        order['fee']['cost'] += fee
+        order['lastTradeTimestamp'] = int(clock.time() * 1000)
+        self.last_prices[order['symbol']] = price
+        if order['remaining'] <= EPSILON:
+            order['remaining'] = 0.0
+            order['status'] = 'closed'
+            self.queue_ahead.pop(order['id'], None)
+
+    def _release(self, order):
+        """Trả lại phần số dư đang giữ cho lượng chưa khớp của một lệnh giới hạn."""
+        base, quote = self._assets(order['symbol'])
+        if order['side'] == 'buy':
+            amount = order['remaining'] * order['price']
+            self.used[quote] -= amount
+            self.free[quote] += amount
+        else:
+            self.used[base] -= order['remaining']
+            self.free[base] += order['remaining']
+
+    def _create(self, symbol, order_type, side, amount, price=None):
+        """
+        Tạo và khớp một lệnh.
+
+        Raises:
+            ccxt.InvalidOrder: Nếu số lượng hoặc giá không hợp lệ
+            ccxt.InsufficientFunds: Nếu không đủ số dư
+        """
+        self._delay()
+        amount = float(amount)
+        if amount <= 0 or (order_type == 'limit' and not price):
+            raise ccxt.InvalidOrder(f"{self.id}: lệnh không hợp lệ ({amount} @ {price})")
+
+        self._book(symbol)  # Đăng ký nhận sách lệnh (nếu cần) ngoài khóa
+        with self._lock:
+            book = self._book(symbol)
+            base, quote = self._assets(symbol)
+            buy = side == 'buy'
+            opposite = book['asks'] if buy else book['bids']
+
+            if order_type == 'limit':
+                price = float(price)
+                asset, reserve = (quote, amount * price) if buy else (base, amount)
+            else:
+                asset = quote if buy else base
+                reserve = sum(level_price * level_amount for level_price, level_amount in
+                              self._depth_for(opposite, amount)) if buy else amount
+            if self.free[asset] + EPSILON < reserve:
+                raise ccxt.InsufficientFunds(f"{self.id}: không đủ {asset} ({self.free[asset]} < {reserve})")
+            if order_type == 'limit':
+                self.free[asset] -= reserve
+                self.used[asset] += reserve
+
+            order = {
+                'id': str(next(self._ids)),
+                'clientOrderId': None,
+                'timestamp': int(clock.time() * 1000),
+                'lastTradeTimestamp': None,
+                'symbol': symbol,
+                'type': order_type,
+                'side': side,
+                'price': price,
+                'amount': amount,
+                'filled': 0.0,
+                'remaining': amount,
+                'cost': 0.0,
+                'average': None,
+                'status': 'open',
+                'fee': {'cost': 0.0, 'currency': base if buy else quote},
+            }
+            self.orders[order['id']] = order
+            self._take(order, opposite, price)
+
+            if order['status'] == 'open':
+                if order_type == 'market':
+                    # Không đủ thanh khoản trong phần sách lệnh nhìn thấy được: phần còn lại bị hủy
+                    order['status'] = 'closed' if order['filled'] > 0 else 'canceled'
+                else:
+                    self.queue_ahead[order['id']] = self._level_amount(book['bids'] if buy else book['asks'], price)
+            return dict(order)
+
+    @staticmethod
+    def _depth_for(levels, amount):
+        """Các mức giá (giá, lượng) cần để khớp một lượng (dùng để ước lượng chi phí lệnh thị trường)."""
+        result = []
+        for level_price, level_amount in levels:
+            if amount <= EPSILON:
+                break
+            taken = min(amount, level_amount)
+            result.append((level_price, taken))
+            amount -= taken
+        return result
+
+    def create_limit_buy_order(self, symbol, amount, price, params=None):
+        return self._create(symbol, 'limit', 'buy', amount, price)
+
+    def create_limit_sell_order(self, symbol, amount, price, params=None):
+        return self._create(symbol, 'limit', 'sell', amount, price)
+
+    def create_market_buy_order(self, symbol, amount, params=None):
+        return self._create(symbol, 'market', 'buy', amount)
+
+    def create_market_sell_order(self, symbol, amount, params=None):
+        return self._create(symbol, 'market', 'sell', amount)
+
+    def cancel_order(self, id, symbol=None, params=None):
+        """
+        Hủy một lệnh đang chờ.
+
+        Raises:
+            ccxt.OrderNotFound: Nếu lệnh không tồn tại hoặc đã đóng
+        """
+        self._delay()
+        with self._lock:
+            order = self.orders.get(str(id))
+            if order is None or order['status'] != 'open':
+                raise ccxt.OrderNotFound(f"{self.id}: lệnh {id} không tồn tại hoặc đã đóng")
+            self._release(order)
+            order['status'] = 'canceled'
+            self.queue_ahead.pop(order['id'], None)
+            return dict(order)
+
+    def cancel_all_orders(self, symbol=None, params=None):
+        """Hủy mọi lệnh đang chờ (của một cặp nếu được chỉ định)."""
+        self._delay()
+        with self._lock:
+            canceled = []
+            for order in self.orders.values():
+                if order['status'] == 'open' and symbol in (None, order['symbol']):
+                    self._release(order)
+                    order['status'] = 'canceled'
+                    self.queue_ahead.pop(order['id'], None)
+                    canceled.append(dict(order))
+            return canceled
+
+    def _orders(self, symbol, statuses):
+        """Bản sao các lệnh theo trạng thái."""
+        self._delay()
+        with self._lock:
+            return [
+                dict(order) for order in self.orders.values()
+                if order['status'] in statuses and symbol in (None, order['symbol'])
+            ]
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        return self._orders(symbol, ('open',))
+
+    def fetch_closed_orders(self, symbol=None, since=None, limit=None, params=None):
+        return self._orders(symbol, ('closed', 'canceled'))
+
+    def fetch_order(self, id, symbol=None, params=None):
+        """
+        Lấy trạng thái một lệnh.
+
+        Raises:
+            ccxt.OrderNotFound: Nếu lệnh không tồn tại
+        """
+        self._delay()
+        with self._lock:
+            order = self.orders.get(str(id))
+            if order is None:
+                raise ccxt.OrderNotFound(f"{self.id}: lệnh {id} không tồn tại")
+            return dict(order)
+
+    def fetch_balance(self, params=None):
+        """Số dư dạng ccxt ({'free', 'used', 'total'} và từng tài sản)."""
+        self._delay()
+        with self._lock:
+            assets = set(self.free) | set(self.used)
+            balance = {
+                'free': {asset: self.free[asset] for asset in assets},
+                'used': {asset: self.used[asset] for asset in assets},
+                'total': {asset: self.free[asset] + self.used[asset] for asset in assets},
+            }
+            for asset in assets:
+                balance[asset] = {key: balance[key][asset] for key in ('free', 'used', 'total')}
+            return balance
+
+    def fetch_ticker(self, symbol, params=None):
+        """Ticker từ sách lệnh hiện tại (giá cuối là giá khớp gần nhất hoặc giá giữa)."""
+        self._delay()
+        with self._lock:
+            book = self._book(symbol)
+            bid, ask = book['bids'][0][0], book['asks'][0][0]
+            return {
+                'symbol': symbol,
+                'timestamp': int(clock.time() * 1000),
+                'bid': bid,
+                'ask': ask,
+                'last': self.last_prices.get(symbol, (bid + ask) / 2),
+            }
+
+    def fetch_order_book(self, symbol, limit=None, params=None):
+        self._delay()
+        return self.order_book(symbol)
+
+
+class PaperFeed:
+    """
+    Kết nối "ccxt.pro" của một sàn giấy: trả sách lệnh mới nhất sau khi bộ khớp lệnh
+    đã xử lý nó.
+    """
+
+    has = {'watchOrderBook': True}
+
+    def __init__(self, service, exchange_id):
+        """
+        Args:
+            service (PaperExchangeService): Dịch vụ sàn giấy
+            exchange_id (str): ID của sàn
+        """
+        self.service = service
+        self.id = exchange_id
+
+    async def watch_order_book(self, symbol, limit=None, params=None):
+        return await self.service.next_book(self.id, symbol)
+
+    async def close(self):
+        """Nguồn dữ liệu được đóng bởi PaperExchangeService."""
+
+
+class LiveBookSource:
+    """Sách lệnh thực qua websocket công khai của ccxt.pro (không cần khóa API)."""
+
+    def __init__(self):
+        self.pro_exchanges = {}
+        self.rest_exchanges = {}
+
+    async def watch_order_book(self, exchange_id, symbol):
+        pro_exchange = self.pro_exchanges.get(exchange_id)
+        if pro_exchange is None:
+            pro_exchange = self.pro_exchanges[exchange_id] = getattr(ccxt.pro, exchange_id)()
+        return await pro_exchange.watch_order_book(symbol)
+
+    def snapshot(self, exchange_id, symbol):
+        """Lấy sách lệnh qua REST công khai (dùng trước khi nhận được cập nhật websocket)."""
+        exchange = self.rest_exchanges.get(exchange_id)
+        if exchange is None:
+            exchange = self.rest_exchanges[exchange_id] = getattr(ccxt, exchange_id)()
+        return exchange.fetch_order_book(symbol)
+
+    async def close(self):
+        for exchange_id, pro_exchange in list(self.pro_exchanges.items()):
+            try:
+                await pro_exchange.close()
+            except Exception as e:
+                log_error(f"Lỗi khi đóng kết nối công khai với {exchange_id}: {str(e)}")
+        self.pro_exchanges = {}
+
+
+class ReplayBookSource:
+    """
+    Phát lại các bản ghi sách lệnh (xem load_records) theo thứ tự thời gian.
+
+    Khoảng cách giữa các bản ghi được giữ theo tỷ lệ `speed` so với thời gian thực và
+    mỗi lần đọc trả về sách lệnh mới nhất của cặp (như watch_order_book của ccxt.pro).
+    Khi hết dữ liệu, sách lệnh cuối cùng được trả lại sau mỗi `idle_interval` giây.
+    """
+
+    def __init__(self, records, speed=1.0, idle_interval=PAPER_REPLAY_IDLE):
+        """
+        Args:
+            records (list): Các bản ghi sách lệnh
+            speed (float): Tốc độ phát lại (1 = thời gian thực, <= 0 = không chờ giữa các bản ghi)
+            idle_interval (float): Chu kỳ trả lại sách lệnh cuối khi hết dữ liệu (giây)
+        """
+        self.records = sorted(records, key=lambda record: record['ts'])
+        self.speed = speed
+        self.idle_interval = idle_interval
+        self.done = False
+        self._pending = {}  # {(sàn, cặp): bản ghi chưa được đọc}
+        self._last = {}  # {(sàn, cặp): bản ghi cuối cùng}
+        self._events = {}  # {(sàn, cặp): báo có bản ghi mới}
+        self._task = None
+
+    @staticmethod
+    def _orderbook(record):
+        """Chuyển bản ghi thành sách lệnh dạng ccxt."""
+        return {
+            'symbol': record['symbol'],
+            'timestamp': int(record['ts'] * 1000),
+            'bids': record['bids'],
+            'asks': record['asks'],
+        }
+
+    def snapshot(self, exchange_id, symbol):
+        """Sách lệnh đầu tiên của một cặp trong dữ liệu phát lại (None nếu không có)."""
+        for record in self.records:
+            if record['exchange'] == exchange_id and record['symbol'] == symbol:
+                return self._orderbook(record)
+        return None
+
+    def _event(self, key):
+        if key not in self._events:
+            self._events[key] = asyncio.Event()
+        return self._events[key]
+
+    async def _pump(self):
+        """Phát các bản ghi theo thứ tự thời gian."""
+        previous_ts = None
+        for record in self.records:
+            if self.speed > 0 and previous_ts is not None and record['ts'] > previous_ts:
+                await clock.async_sleep((record['ts'] - previous_ts) / self.speed)
+            previous_ts = record['ts']
+
+            key = (record['exchange'], record['symbol'])
+            self._pending[key] = record
+            self._last[key] = record
+            self._event(key).set()
+
+        self.done = True
+        log_info("Đã phát lại hết dữ liệu sách lệnh")
+        for event in self._events.values():
+            event.set()
+
+    async def watch_order_book(self, exchange_id, symbol):
+        """
+        Chờ sách lệnh tiếp theo của một cặp.
+
+        Raises:
+            ccxt.ExchangeNotAvailable: Nếu dữ liệu phát lại không có cặp này
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._pump())
+
+        key = (exchange_id, symbol)
+        event = self._event(key)
+        while key not in self._pending and not self.done:
+            event.clear()
+            await event.wait()
+
+        record = self._pending.pop(key, None)
+        if record is None:
+            await clock.async_sleep(self.idle_interval)
+            record = self._last.get(key)
+            if record is None:
+                raise ccxt.ExchangeNotAvailable(f"Không có dữ liệu phát lại cho {symbol} trên {exchange_id}")
+        return self._orderbook(record)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class PaperExchangeService(ExchangeService):
+    """
+    ExchangeService dùng các sàn giấy: mọi lệnh được khớp mô phỏng, không có lời gọi
+    nào cần khóa API. Bot và OrderService chạy không cần sửa đổi.
+
+    Mỗi cặp được dùng trên một sàn có một tác vụ nền đọc sách lệnh từ nguồn dữ liệu và
+    đưa vào bộ khớp lệnh, nên lệnh đang chờ vẫn được khớp khi bot không theo dõi sách lệnh
+    (vd: khi đang chờ lệnh mua ban đầu được điền).
+    """
+
+    def __init__(self, exchanges, source=None, balances=None, fees=None, latency=PAPER_LATENCY,
+                 depth=PAPER_BOOK_DEPTH):
+        """
+        Khởi tạo dịch vụ sàn giấy.
+
+        Args:
+            exchanges (list): Các sàn mô phỏng
+            source (LiveBookSource|ReplayBookSource, optional): Nguồn sách lệnh (mặc định: sách lệnh thực)
+            balances (dict, optional): Số dư ban đầu theo sàn {'sàn': {'tài sản': lượng}}
+            fees (dict, optional): Phí theo sàn (mặc định: EXCHANGE_FEES)
+            latency (float): Độ trễ mỗi lời gọi REST (giây)
+            depth (int): Số mức giá mỗi phía được giữ
+        """
+        # Không gọi ExchangeService.__init__: không tạo kết nối ccxt có xác thực
+        self.rate_limiter = None
+        self.market_data_client = None
+        self.source = source or LiveBookSource()
+        balances = balances or {}
+        self.exchanges = {exchange_id: {} for exchange_id in exchanges}
+        self.exchange_instances = {
+            exchange_id: PaperExchange(
+                exchange_id, balances.get(exchange_id), fees, latency, depth,
+                subscribe=functools.partial(self._subscribe, exchange_id)
+            )
+            for exchange_id in exchanges
+        }
+        self.pro_exchange_instances = {}
+        self.loop = None
+        self.feeders = {}  # {(sàn, cặp): tác vụ đưa sách lệnh vào bộ khớp lệnh}
+        self.updates = {}  # {(sàn, cặp): báo có sách lệnh mới}
+        log_info(f"Giao dịch giấy trên {', '.join(exchanges)} (độ trễ {latency * 1000:.0f} ms)")
+
+    async def get_pro_exchange(self, exchange_id):
+        """
+        Lấy kết nối sách lệnh của một sàn giấy.
+
+        Raises:
+            ExchangeError: Nếu sàn không có trong môi trường giao dịch giấy
+        """
+        if exchange_id not in self.pro_exchange_instances:
+            self.get_exchange(exchange_id)
+            self.pro_exchange_instances[exchange_id] = PaperFeed(self, exchange_id)
+        return self.pro_exchange_instances[exchange_id]
+
+    def _subscribe(self, exchange_id, symbol):
+        """
+        Bắt đầu đưa sách lệnh của một cặp vào bộ khớp lệnh (gọi được từ mọi luồng).
+
+        Returns:
+            dict: Sách lệnh ban đầu (hoặc None)
+        """
+        try:
+            self.loop = asyncio.get_running_loop()
+            self._start_feeder(exchange_id, symbol)
+        except RuntimeError:
+            # Lời gọi từ luồng gửi lệnh: tác vụ được tạo trên event loop
+            if self.loop is not None and not self.loop.is_closed():
+                self.loop.call_soon_threadsafe(self._start_feeder, exchange_id, symbol)
+        return self.source.snapshot(exchange_id, symbol)
+
+    def _start_feeder(self, exchange_id, symbol):
+        key = (exchange_id, symbol)
+        if key not in self.feeders:
+            self.feeders[key] = asyncio.create_task(self._feed(exchange_id, symbol))
+
+    async def _feed(self, exchange_id, symbol):
+        """Đọc sách lệnh từ nguồn dữ liệu, khớp lệnh và báo cho các bot đang chờ."""
+        exchange = self.get_exchange(exchange_id)
+        key = (exchange_id, symbol)
+        while True:
+            orderbook = await self.source.watch_order_book(exchange_id, symbol)
+            exchange.apply_book(symbol, orderbook)
+            event = self.updates.pop(key, None)
+            if event:
+                event.set()
+
+    async def next_book(self, exchange_id, symbol):
+        """
+        Chờ sách lệnh tiếp theo của một cặp sau khi bộ khớp lệnh đã xử lý nó.
+
+        Returns:
+            dict: Sách lệnh (đã trừ lượng do lệnh của sàn giấy tiêu thụ)
+
+        Raises:
+            Exception: Lỗi của nguồn dữ liệu
+        """
+        self.loop = asyncio.get_running_loop()
+        self._start_feeder(exchange_id, symbol)
+        key = (exchange_id, symbol)
+        feeder = self.feeders[key]
+        event = self.updates.setdefault(key, asyncio.Event())
+
+        waiter = asyncio.ensure_future(event.wait())
+        try:
+            await asyncio.wait({waiter, feeder}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+        if feeder.done():
+            # Tác vụ được tạo lại ở lần đọc sau
+            del self.feeders[key]
+            feeder.result()
+        return self.get_exchange(exchange_id).order_book(symbol)
+
+    async def close_pro_exchanges(self):
+        """Dừng các tác vụ đọc sách lệnh và đóng nguồn dữ liệu."""
+        for feeder in self.feeders.values():
+            feeder.cancel()
+        for feeder in self.feeders.values():
+            try:
+                await feeder
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                log_error(f"Lỗi nguồn sách lệnh giấy: {str(e)}")
+        self.feeders = {}
+        self.updates = {}
+        self.pro_exchange_instances = {}
+        await self.source.close()
@@ -0,0 +1,192 @@
+"""
+Bộ giới hạn tốc độ gọi REST dùng chung cho mọi service, theo từng sàn và từng nhóm endpoint.
+"""
+import time
+import heapq
+import itertools
+import threading
+
+from configs import RATE_LIMIT_DEFAULT, RATE_LIMITS
+
+
+# Làn ưu tiên (số nhỏ hơn được phục vụ trước)
+PRIORITY_ORDER = 0  # Đặt lệnh, hủy lệnh
+PRIORITY_ACCOUNT = 1  # Số dư, chuyển tiền
+PRIORITY_POLL = 2  # Thăm dò trạng thái lệnh, ticker, thông tin thị trường
+
+# Làn ưu tiên mặc định của từng nhóm endpoint
+ENDPOINT_PRIORITIES = {
+    'order': PRIORITY_ORDER,
+    'account': PRIORITY_ACCOUNT,
+    'market': PRIORITY_POLL,
+}
+
+
+class TokenBucket:
+    """
+    Thùng token: nạp lại `rate` token mỗi giây, chứa tối đa `burst` token.
+    """
+
+    def __init__(self, rate, burst):
+        """
+        Tạo thùng token đầy.
+
+        Args:
+            rate (float): Số token nạp lại mỗi giây
+            burst (float): Số token tối đa
+        """
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def delay(self, cost, now):
+        """
+        Tính thời gian chờ tới khi đủ token.
+
+        Returns:
+            float: Số giây cần chờ (0 nếu đủ token ngay)
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def take(self, cost):
+        """Lấy token (gọi sau khi delay() trả về 0)."""
+        self.tokens -= cost
+
+
+class RateLimiter:
+    """
+    Bộ giới hạn tốc độ theo sàn: mỗi sàn có một thùng token chung ('total') và một
+    thùng cho từng nhóm endpoint ('order', 'account', 'market').
+
+    Các lời gọi REST của ccxt là đồng bộ và chạy trong luồng riêng (asyncio.to_thread),
+    nên bộ giới hạn an toàn luồng: các yêu cầu đang chờ của một sàn được xếp hàng theo
+    (làn ưu tiên, thứ tự đến) và chỉ yêu cầu đứng đầu được lấy token. Lệnh đặt/hủy
+    vì vậy luôn vượt lên trước các yêu cầu thăm dò trong lúc giao dịch dồn dập.
+    """
+
+    def __init__(self, limits=None, default=None):
+        """
+        Khởi tạo bộ giới hạn tốc độ.
+
+        Args:
+            limits (dict, optional): Giới hạn riêng theo sàn {'sàn': {'nhóm': (token/giây, burst)}}
+            default (dict, optional): Giới hạn mặc định cho sàn không có trong limits
+        """
+        self.limits = RATE_LIMITS if limits is None else limits
+        self.default = RATE_LIMIT_DEFAULT if default is None else default
+        self._condition = threading.Condition()
+        self._buckets = {}  # {(sàn, nhóm): TokenBucket}
+        self._queues = {}  # {sàn: heap [(ưu tiên, thứ tự)]}
+        self._sequence = itertools.count()
+        self._stats = {}  # {(sàn, nhóm): {'count', 'wait_total', 'wait_max'}}
+
+    def _bucket(self, exchange_id, endpoint):
+        """Lấy (hoặc tạo) thùng token của một sàn và một nhóm endpoint."""
+        key = (exchange_id, endpoint)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            limits = self.limits.get(exchange_id, {})
+            rate, burst = limits.get(endpoint, self.default.get(endpoint, self.default['total']))
+            bucket = self._buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    def _delay(self, exchange_id, endpoint, cost, now):
+        """Tính thời gian chờ tới khi cả thùng chung và thùng của nhóm đều đủ token."""
+        return max(
+            self._bucket(exchange_id, 'total').delay(cost, now),
+            self._bucket(exchange_id, endpoint).delay(cost, now),
+        )
+
+    def _take(self, exchange_id, endpoint, cost):
+        """Lấy token từ thùng chung và thùng của nhóm."""
+        self._bucket(exchange_id, 'total').take(cost)
+        self._bucket(exchange_id, endpoint).take(cost)
+
+    def _record(self, exchange_id, endpoint, wait):
+        """Ghi nhận thời gian chờ của một yêu cầu."""
+        stats = self._stats.setdefault((exchange_id, endpoint), {'count': 0, 'wait_total': 0.0, 'wait_max': 0.0})
+        stats['count'] += 1
+        stats['wait_total'] += wait
+        stats['wait_max'] = max(stats['wait_max'], wait)
+
+    def try_acquire(self, exchange_id, endpoint='market', cost=1):
+        """
+        Lấy token nếu có ngay và không có yêu cầu nào đang chờ trên sàn.
+
+        Returns:
+            bool: True nếu đã lấy được token
+        """
+        with self._condition:
+            if self._queues.get(exchange_id):
+                return False
+            if self._delay(exchange_id, endpoint, cost, time.monotonic()) > 0:
+                return False
+            self._take(exchange_id, endpoint, cost)
+            self._record(exchange_id, endpoint, 0.0)
+            return True
+
+    def acquire(self, exchange_id, endpoint='market', cost=1, priority=None):
+        """
+        Chờ tới lượt và lấy token cho một lời gọi REST (chặn luồng hiện tại).
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            endpoint (str): Nhóm endpoint ('order', 'account', 'market')
+            cost (float): Số token của lời gọi (trọng số của endpoint)
+            priority (int, optional): Làn ưu tiên (mặc định theo nhóm endpoint)
+
+        Returns:
+            float: Thời gian đã chờ (giây)
+        """
+        if priority is None:
+            priority = ENDPOINT_PRIORITIES.get(endpoint, PRIORITY_POLL)
+
+        start = time.monotonic()
+        entry = (priority, next(self._sequence))
+
+        with self._condition:
+            queue = self._queues.setdefault(exchange_id, [])
+            heapq.heappush(queue, entry)
+            # Yêu cầu ưu tiên cao hơn vừa vào hàng: đánh thức yêu cầu đang đứng đầu
+            self._condition.notify_all()
+            try:
+                while True:
+                    if queue[0] is entry:
+                        delay = self._delay(exchange_id, endpoint, cost, time.monotonic())
+                        if delay <= 0:
+                            self._take(exchange_id, endpoint, cost)
+                            break
+                        self._condition.wait(delay)
+                    else:
+                        self._condition.wait()
+            finally:
+                if queue[0] is entry:
+                    heapq.heappop(queue)
+                else:
+                    queue.remove(entry)
+                    heapq.heapify(queue)
+                self._condition.notify_all()
+
+            wait = time.monotonic() - start
+            self._record(exchange_id, endpoint, wait)
+        return wait
+
+    def stats(self):
+        """
+        Lấy thống kê thời gian chờ theo sàn và nhóm endpoint.
+
+        Returns:
+            dict: {'sàn': {'queued': số yêu cầu đang chờ,
+                           'nhóm': {'count', 'wait_total', 'wait_avg', 'wait_max'}}}
+        """
+        with self._condition:
+            result = {}
+            for (exchange_id, endpoint), stats in self._stats.items():
+                exchange_stats = result.setdefault(exchange_id, {'queued': len(self._queues.get(exchange_id, ()))})
+                exchange_stats[endpoint] = dict(stats, wait_avg=stats['wait_total'] / stats['count'])
+            return result
@@ -0,0 +1,264 @@
+"""
+Môi trường chạy dài hạn giữ các dịch vụ và kết nối qua nhiều phiên giao dịch.
+"""
+import signal
+import asyncio
+import weakref
+
+from services.exchange_service import ExchangeService
+from services.balance_service import BalanceService
+from services.order_service import OrderService
+from services.notification_service import NotificationService
+from services.journal_service import JournalService
+from services.fee_service import FeeService
+from services.funding_monitor import FundingMonitor
+from services.state_store import StateStore
+from services.metrics_service import MetricsService
+from services.control_service import ControlService
+from services.config_service import ConfigService
+from bots.basis_bot import BasisBot
+from bots.classic_bot import ClassicBot
+from bots.delta_neutral_bot import DeltaNeutralBot
+from bots.fake_money_bot import FakeMoneyBot
+from utils import clock
+from utils.logger import log_info, log_error
+from utils.profiler import SamplingProfiler
+from configs import (
+    ENABLE_TELEGRAM, ENABLE_JOURNAL, ENABLE_FEE_SERVICE, ENABLE_FUNDING_MONITOR, METRICS_PORT, CONTROL_SOCKET,
+    PROFILE_DURATION
+)
+
+
+class BotRuntime:
+    """
+    Giữ các dịch vụ (sàn giao dịch, số dư, lệnh, thông báo, nhật ký) và các kết nối
+    websocket trong suốt vòng đời chương trình. Mỗi phiên chỉ tạo một bot mới, nên
+    chỉ trạng thái chiến lược được làm mới giữa các phiên.
+    """
+
+    def __init__(self, state_store=None, metrics_port=METRICS_PORT, control_socket=CONTROL_SOCKET,
+                 exchange_service=None):
+        """
+        Khởi tạo môi trường chạy.
+
+        Args:
+            state_store (StateStore, optional): Kho lưu trạng thái phiên
+            metrics_port (int): Cổng HTTP xuất metric Prometheus (0 = tắt)
+            control_socket (str): Unix socket nhận lệnh điều khiển (để trống = tắt)
+            exchange_service (ExchangeService, optional): Dịch vụ sàn thay thế (vd: PaperExchangeService)
+        """
+        self.state_store = state_store or StateStore()
+        self.exchange_service = exchange_service or ExchangeService()
+        self.balance_service = BalanceService(self.exchange_service, self.state_store)
+        self.notification_service = NotificationService(ENABLE_TELEGRAM)
+        self.journal_service = JournalService() if ENABLE_JOURNAL else None
+        self.order_service = OrderService(self.exchange_service, self.journal_service, self.state_store)
+        self.fee_service = FeeService(self.exchange_service) if ENABLE_FEE_SERVICE else None
+        self.funding_monitor = FundingMonitor(self.exchange_service) if ENABLE_FUNDING_MONITOR else None
+        self.bots = weakref.WeakSet()  # Các bot đã tạo, nhận bảng phí mới khi phí thay đổi
+        if self.fee_service:
+            self.fee_service.add_listener(self._apply_fees)
+        self.config_service = ConfigService()
+        self.config_service.add_listener(self._apply_config)
+        self.metrics_service = MetricsService(self, port=metrics_port) if metrics_port else None
+        self.profiler = SamplingProfiler()
+        self.control_service = ControlService(control_socket) if control_socket else None
+        if self.control_service:
+            self.control_service.register(
+                'profile', self.start_profile, "Lấy mẫu CPU trong N giây (seconds=N), ghi tệp .folded"
+            )
+            self.control_service.register(
+                'config', lambda: dict(self.config_service.values), "Xem cấu hình nạp lại được"
+            )
+            self.control_service.register(
+                'config_set', self.config_service.update,
+                "Ghi đè cấu hình (vd: PROFIT_CRITERIA_PCT=0.2, giá trị null = bỏ ghi đè)"
+            )
+            self.control_service.register(
+                'config_reload', self.config_service.reload, "Đọc lại tệp cấu hình"
+            )
+        self.started = False
+        self.session_count = 0
+        self.last_session_end = None
+
+    async def start(self, exchanges=None):
+        """
+        Khởi động các dịch vụ nền và mở trước kết nối tới các sàn.
+
+        Args:
+            exchanges (list, optional): Danh sách sàn cần mở kết nối trước
+        """
+        # Lấy phí của các sàn mới (phí còn hạn được dùng lại từ tệp đệm)
+        if self.fee_service:
+            await self.fee_service.start(exchanges or [])
+
+        if self.started:
+            return
+
+        if self.journal_service:
+            await self.journal_service.start()
+
+        await self.config_service.start()
+
+        if self.metrics_service:
+            try:
+                await self.metrics_service.start()
+            except OSError as e:
+                log_error(f"Không thể mở cổng metric {self.metrics_service.port}: {str(e)}")
+
+        if self.control_service:
+            try:
+                await self.control_service.start()
+            except OSError as e:
+                log_error(f"Không thể mở socket điều khiển {self.control_service.path}: {str(e)}")
+
+        # kill -USR1 <pid>: lấy mẫu CPU trong PROFILE_DURATION giây
+        if hasattr(signal, 'SIGUSR1'):
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, self._profile_signal)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+
+        # Hủy các lệnh còn mở nếu phiên trước bị dừng đột ngột
+        await asyncio.to_thread(self.order_service.recover_open_orders)
+
+        # Mở trước kết nối để phiên đầu tiên không phải chờ
+        for exchange_id in exchanges or []:
+            try:
+                await self.exchange_service.get_pro_exchange(exchange_id)
+            except Exception as e:
+                log_error(f"Không thể mở trước kết nối tới {exchange_id}: {str(e)}")
+
+        self.started = True
+
+    def create_bot(self, mode, dry_run=False):
+        """
+        Tạo bot mới dùng chung các dịch vụ của môi trường chạy.
+
+        Args:
+            mode (str): Chế độ bot (fake-money, classic, delta-neutral, basis)
+            dry_run (bool): Nếu True, dùng bot mô phỏng
+
+        Returns:
+            BaseBot: Bot đã tạo, hoặc None nếu chế độ không hợp lệ
+        """
+        services = (
+            self.exchange_service, self.balance_service, self.order_service,
+            self.notification_service, self.journal_service
+        )
+
+        if mode == "fake-money" or dry_run:
+            bot = FakeMoneyBot(*services)
+        elif mode == "classic":
+            bot = ClassicBot(*services)
+        elif mode == "delta-neutral":
+            bot = DeltaNeutralBot(*services)
+            bot.funding_monitor = self.funding_monitor
+        elif mode == "basis":
+            bot = BasisBot(*services)
+            bot.funding_monitor = self.funding_monitor
+            # Đòn bẩy mới chỉ áp dụng cho vị thế mở trong phiên mới
+            bot.leverage = self.config_service.get('DEFAULT_LEVERAGE')
+        else:
+            return None
+
+        bot.set_fees(self._current_fees(), *self._profit_criteria())
+        self.bots.add(bot)
+        return bot
+
+    def start_profile(self, seconds=PROFILE_DURATION):
+        """
+        Lấy mẫu CPU của tiến trình trong một khoảng thời gian.
+
+        Args:
+            seconds (float): Thời gian lấy mẫu (giây)
+
+        Returns:
+            dict: {'file': tệp kết quả, 'seconds': thời gian lấy mẫu}
+        """
+        seconds = float(seconds)
+        if seconds <= 0:
+            raise ValueError("Thời gian lấy mẫu phải lớn hơn 0")
+        return {'file': self.profiler.start(seconds), 'seconds': seconds}
+
+    def _profile_signal(self):
+        """Xử lý SIGUSR1: bắt đầu lấy mẫu CPU."""
+        try:
+            self.start_profile()
+        except RuntimeError as e:
+            log_error(str(e))
+
+    def _current_fees(self):
+        """Bảng phí hiện tại: phí thực tế (nếu có) trên nền phí trong cấu hình."""
+        if self.fee_service:
+            return self.fee_service.get_fees()
+        return self.config_service.get('EXCHANGE_FEES')
+
+    def _profit_criteria(self):
+        """Tiêu chí lợi nhuận hiện tại (%, USD)."""
+        return self.config_service.get('PROFIT_CRITERIA_PCT'), self.config_service.get('PROFIT_CRITERIA_USD')
+
+    def _apply_fees(self, fees):
+        """Cập nhật bảng phí mới cho các bot đang chạy."""
+        for bot in list(self.bots):
+            bot.set_fees(fees, *self._profit_criteria())
+
+    def _apply_config(self, values, changed):
+        """
+        Áp dụng cấu hình mới: thời gian chờ và chu kỳ kiểm tra lệnh cho dịch vụ lệnh, phí và tiêu chí lợi nhuận
+        cho các bot đang chạy (dựng lại bảng ngưỡng). Đòn bẩy chỉ áp dụng cho phiên mới.
+        """
+        if self.fee_service:
+            self.fee_service.set_base_fees(values['EXCHANGE_FEES'])
+        self.order_service.first_orders_fill_timeout = values['FIRST_ORDERS_FILL_TIMEOUT']
+        self.order_service.arbitrage_fill_timeout = values['ARBITRAGE_FILL_TIMEOUT']
+        self.order_service.arbitrage_poll_interval = values['ARBITRAGE_POLL_INTERVAL']
+        self.order_service.arbitrage_poll_max_interval = values['ARBITRAGE_POLL_MAX_INTERVAL']
+        self.order_service.arbitrage_min_hedge_usd = values['ARBITRAGE_MIN_HEDGE_USD']
+        if changed & {'EXCHANGE_FEES', 'PROFIT_CRITERIA_PCT', 'PROFIT_CRITERIA_USD'}:
+            self._apply_fees(self._current_fees())
+
+    def begin_session(self):
+        """Ghi nhận bắt đầu một phiên và khoảng nghỉ kể từ phiên trước."""
+        self.session_count += 1
+        if self.last_session_end is not None:
+            gap_ms = (clock.time() - self.last_session_end) * 1000
+            log_info(f"Bắt đầu phiên #{self.session_count} sau {gap_ms:.1f} ms (khởi động nóng)")
+
+    def end_session(self):
+        """Ghi nhận kết thúc một phiên."""
+        self.last_session_end = clock.time()
+
+    async def close(self):
+        """Đóng tất cả kết nối, ghi nốt nhật ký và tạo bản chụp trạng thái cuối cùng."""
+        await self.exchange_service.close_pro_exchanges()
+
+        if self.fee_service:
+            await self.fee_service.stop()
+
+        await self.config_service.stop()
+
+        if self.funding_monitor:
+            await self.funding_monitor.stop()
+
+        if self.metrics_service:
+            await self.metrics_service.stop()
+
+        if self.control_service:
+            await self.control_service.stop()
+
+        if self.profiler.running:
+            self.profiler.stop()
+
+        if hasattr(signal, 'SIGUSR1'):
+            try:
+                asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR1)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+
+        if self.journal_service:
+            await self.journal_service.stop()
+
+        await asyncio.to_thread(self.balance_service.flush_ledgers)
+        self.state_store.close()
+        self.started = False
@@ -0,0 +1,278 @@
+"""
+Sách lệnh top-K trong bộ nhớ dùng chung giữa các tiến trình (seqlock).
+
+Daemon dữ liệu thị trường ghi mỗi (sàn, cặp) vào một ô có bố cục cố định; các bot
+trên cùng máy đọc trực tiếp từ vùng nhớ, không qua socket và không gọi hệ thống.
+
+Bố cục vùng nhớ (little-endian):
+    tiêu đề:  magic (8 byte) | depth (uint32) | số ô (uint32) | kích thước ô (uint32) | đệm
+    danh mục: số ô x 64 byte tên khóa "sàn|cặp" (utf-8, đệm 0)
+    các ô:    seq (uint64) | nonce (uint64) | timestamp ms (float64) | số bid (uint32) | số ask (uint32)
+              | depth x (giá, lượng) bid | depth x (giá, lượng) ask (float64)
+
+seq là bộ đếm seqlock: người ghi tăng lên số lẻ trước khi ghi và lên số chẵn sau khi
+ghi xong. Người đọc chỉ chấp nhận bản sao khi seq chẵn và không đổi trong lúc đọc.
+"""
+import struct
+from multiprocessing import shared_memory, resource_tracker
+
+from configs import MARKET_DATA_DEPTH, MARKET_DATA_SHM_SLOTS, MARKET_DATA_SHM_POLL
+from utils import clock
+
+
+MAGIC = b'ARBSHM01'
+HEADER = struct.Struct('<8sIII')
+HEADER_SIZE = 32
+KEY_SIZE = 64
+SEQ = struct.Struct('<Q')
+SLOT_HEADER = struct.Struct('<QQdII')
+
+# Số lần đọc lại tối đa khi người ghi đang cập nhật ô
+MAX_READ_RETRIES = 100
+
+# Các vùng nhớ do tiến trình này tạo (resource_tracker đã theo dõi để xóa khi thoát)
+_owned_segments = set()
+
+
+def _slot_size(depth):
+    return SLOT_HEADER.size + depth * 4 * 8
+
+
+def _encode_key(exchange_id, symbol):
+    key = f"{exchange_id}|{symbol}".encode('utf-8')
+    if len(key) > KEY_SIZE:
+        raise ValueError(f"Tên khóa quá dài: {exchange_id}|{symbol}")
+    return key.ljust(KEY_SIZE, b'\0')
+
+
+class SharedOrderBookWriter:
+    """
+    Người ghi duy nhất (daemon dữ liệu thị trường) của vùng nhớ sách lệnh.
+    """
+
+    def __init__(self, name, depth=MARKET_DATA_DEPTH, slots=MARKET_DATA_SHM_SLOTS):
+        """
+        Tạo vùng nhớ dùng chung.
+
+        Args:
+            name (str): Tên vùng nhớ
+            depth (int): Số mức giá mỗi phía
+            slots (int): Số (sàn, cặp) tối đa
+        """
+        self.depth = depth
+        self.slots = slots
+        self.slot_size = _slot_size(depth)
+        self.levels = struct.Struct(f'<{depth * 4}d')
+        self.index = {}  # {(sàn, cặp): số thứ tự ô}
+
+        size = HEADER_SIZE + slots * KEY_SIZE + slots * self.slot_size
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Vùng nhớ còn sót lại từ lần chạy trước
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        self.name = self.shm.name
+        _owned_segments.add(self.shm._name)
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, depth, slots, self.slot_size)
+
+    def _slot(self, exchange_id, symbol):
+        """Lấy (hoặc cấp mới) vị trí ô của một (sàn, cặp)."""
+        key = (exchange_id, symbol)
+        offset = self.index.get(key)
+        if offset is not None:
+            return offset
+
+        slot = len(self.index)
+        if slot >= self.slots:
+            raise ValueError(f"Vùng nhớ sách lệnh đã đầy ({self.slots} ô)")
+
+        offset = HEADER_SIZE + self.slots * KEY_SIZE + slot * self.slot_size
+        # Ô đã được xóa về 0 (seq = 0: chưa có dữ liệu) trước khi tên khóa xuất hiện
+        key_offset = HEADER_SIZE + slot * KEY_SIZE
+        self.shm.buf[key_offset:key_offset + KEY_SIZE] = _encode_key(exchange_id, symbol)
+        self.index[key] = offset
+        return offset
+
+    def write(self, exchange_id, symbol, orderbook, nonce=0):
+        """
+        Ghi sách lệnh top-K của một (sàn, cặp).
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch
+            orderbook (dict): Sách lệnh dạng ccxt
+            nonce (int): Số thứ tự cập nhật
+        """
+        offset = self._slot(exchange_id, symbol)
+        buf = self.shm.buf
+        bids = orderbook['bids'][:self.depth]
+        asks = orderbook['asks'][:self.depth]
+
+        values = [0.0] * (self.depth * 4)
+        for i, level in enumerate(bids):
+            values[i * 2] = level[0]
+            values[i * 2 + 1] = level[1]
+        base = self.depth * 2
+        for i, level in enumerate(asks):
+            values[base + i * 2] = level[0]
+            values[base + i * 2 + 1] = level[1]
+
+        seq = SEQ.unpack_from(buf, offset)[0]
+        SEQ.pack_into(buf, offset, seq + 1)  # Số lẻ: đang ghi
+        self.levels.pack_into(buf, offset + SLOT_HEADER.size, *values)
+        timestamp = float(orderbook.get('timestamp') or clock.time() * 1000)
+        SLOT_HEADER.pack_into(buf, offset, seq + 1, nonce, timestamp, len(bids), len(asks))
+        SEQ.pack_into(buf, offset, seq + 2)  # Số chẵn: đã ghi xong
+
+    def close(self):
+        """Đóng và xóa vùng nhớ."""
+        if self.shm is None:
+            return
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        _owned_segments.discard(self.shm._name)
+        self.shm = None
+
+
+class SharedOrderBookReader:
+    """
+    Người đọc vùng nhớ sách lệnh (chỉ đọc, không bao giờ ghi vào vùng nhớ).
+    """
+
+    def __init__(self, name, poll_interval=MARKET_DATA_SHM_POLL):
+        """
+        Gắn vào vùng nhớ dùng chung đã được daemon tạo.
+
+        Args:
+            name (str): Tên vùng nhớ
+            poll_interval (float): Khoảng thời gian chờ giữa các lần kiểm tra cập nhật (giây)
+        """
+        self.shm = shared_memory.SharedMemory(name=name)
+        # Tiến trình đọc không sở hữu vùng nhớ: không để resource_tracker xóa nó khi thoát
+        if self.shm._name not in _owned_segments:
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+
+        magic, self.depth, self.slots, self.slot_size = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC:
+            self.shm.close()
+            raise ValueError(f"Vùng nhớ {name} không phải sách lệnh dùng chung")
+
+        self.poll_interval = poll_interval
+        self.levels = struct.Struct(f'<{self.depth * 4}d')
+        self.index = {}  # {(sàn, cặp): vị trí ô}
+        self.last_seq = {}  # {(sàn, cặp): seq đã trả về ở lần watch trước}
+
+    def _find(self, exchange_id, symbol):
+        """Tìm vị trí ô của một (sàn, cặp) trong danh mục."""
+        key = (exchange_id, symbol)
+        offset = self.index.get(key)
+        if offset is not None:
+            return offset
+
+        wanted = _encode_key(exchange_id, symbol)
+        buf = self.shm.buf
+        for slot in range(self.slots):
+            key_offset = HEADER_SIZE + slot * KEY_SIZE
+            if buf[key_offset:key_offset + KEY_SIZE] == wanted:
+                offset = HEADER_SIZE + self.slots * KEY_SIZE + slot * self.slot_size
+                self.index[key] = offset
+                return offset
+        return None
+
+    def seq(self, exchange_id, symbol):
+        """
+        Lấy bộ đếm seqlock hiện tại của một (sàn, cặp).
+
+        Returns:
+            int: seq, hoặc 0 nếu chưa có dữ liệu
+        """
+        offset = self._find(exchange_id, symbol)
+        return SEQ.unpack_from(self.shm.buf, offset)[0] if offset is not None else 0
+
+    def read_best(self, exchange_id, symbol):
+        """
+        Đọc giá mua và bán tốt nhất (đường đọc nhanh, không dựng sách lệnh).
+
+        Returns:
+            tuple: (giá bid, giá ask, seq), hoặc None nếu chưa có dữ liệu
+        """
+        offset = self._find(exchange_id, symbol)
+        if offset is None:
+            return None
+
+        buf = self.shm.buf
+        ask_offset = offset + SLOT_HEADER.size + self.depth * 2 * 8
+        for _ in range(MAX_READ_RETRIES):
+            seq = SEQ.unpack_from(buf, offset)[0]
+            if seq == 0:
+                return None
+            if seq & 1:
+                continue
+            bid = struct.unpack_from('<d', buf, offset + SLOT_HEADER.size)[0]
+            ask = struct.unpack_from('<d', buf, ask_offset)[0]
+            if SEQ.unpack_from(buf, offset)[0] == seq:
+                return bid, ask, seq
+        return None
+
+    def read(self, exchange_id, symbol):
+        """
+        Đọc bản chụp nhất quán của sách lệnh.
+
+        Returns:
+            dict: Sách lệnh dạng ccxt (nonce = seq của daemon), hoặc None nếu chưa có dữ liệu
+        """
+        offset = self._find(exchange_id, symbol)
+        if offset is None:
+            return None
+
+        buf = self.shm.buf
+        for _ in range(MAX_READ_RETRIES):
+            seq, nonce, timestamp, bid_count, ask_count = SLOT_HEADER.unpack_from(buf, offset)
+            if seq == 0:
+                return None
+            if seq & 1:
+                continue
+            values = self.levels.unpack_from(buf, offset + SLOT_HEADER.size)
+            if SEQ.unpack_from(buf, offset)[0] != seq:
+                continue
+
+            base = self.depth * 2
+            return {
+                'symbol': symbol,
+                'bids': [[values[i * 2], values[i * 2 + 1]] for i in range(bid_count)],
+                'asks': [[values[base + i * 2], values[base + i * 2 + 1]] for i in range(ask_count)],
+                'timestamp': int(timestamp),
+                'nonce': nonce,
+                'seq': seq,
+            }
+        return None
+
+    async def watch_order_book(self, exchange_id, symbol):
+        """
+        Chờ tới khi ô của (sàn, cặp) có cập nhật mới rồi trả về bản chụp.
+
+        Returns:
+            dict: Sách lệnh dạng ccxt
+        """
+        key = (exchange_id, symbol)
+        last_seq = self.last_seq.get(key, 0)
+        while True:
+            if self.seq(exchange_id, symbol) > last_seq:
+                orderbook = self.read(exchange_id, symbol)
+                if orderbook is not None and orderbook['seq'] > last_seq:
+                    self.last_seq[key] = orderbook['seq']
+                    return orderbook
+            await clock.async_sleep(self.poll_interval)
+
+    def close(self):
+        """Tách khỏi vùng nhớ (không xóa vùng nhớ)."""
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
@@ -0,0 +1,394 @@
+"""
+Kho lưu trạng thái phiên giao dịch an toàn khi bị dừng đột ngột.
+
+Trạng thái được lưu dưới dạng một bản chụp (snapshot) JSON ghi nguyên tử cùng với
+một nhật ký ghi thêm (append log). Mỗi giao dịch là một dòng trong nhật ký, có mã
+kiểm tra CRC32 để bỏ qua dòng bị ghi dở khi khôi phục. Các bảng cập nhật thường xuyên
+(sổ cái ảo, lệnh đang mở) chỉ ghi phần thay đổi dưới dạng JSON Merge Patch.
+"""
+import os
+import json
+import zlib
+import threading
+from contextlib import contextmanager
+
+from utils.logger import log_info, log_warning
+from configs import (
+    STATE_SNAPSHOT_FILE, STATE_LOG_FILE, STATE_COMPACT_EVERY,
+    BALANCE_FILE, START_BALANCE_FILE, SYMBOL_FILE
+)
+
+
+def _fsync_dir(path):
+    """Đồng bộ thư mục chứa tệp để thao tác đổi tên được ghi xuống đĩa."""
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def merge_patch(target, patch):
+    """
+    Áp dụng một JSON Merge Patch (RFC 7396): khóa có giá trị None bị xóa, bảng con được
+    gộp đệ quy. Không sửa `target`; các bảng trên đường gộp được sao chép.
+
+    Args:
+        target: Giá trị hiện tại
+        patch: Phần thay đổi
+
+    Returns:
+        Giá trị mới
+    """
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def atomic_write(path, content):
+    """
+    Ghi nội dung vào tệp một cách nguyên tử (ghi tệp tạm, fsync rồi đổi tên).
+
+    Args:
+        path (str): Đường dẫn tệp đích
+        content (str): Nội dung cần ghi
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+
+
+class StateStore:
+    """
+    Kho trạng thái dạng khóa/giá trị với giao dịch nguyên tử.
+
+    Các khóa được sử dụng:
+        balance, start_balance: Số dư hiện tại và số dư đầu phiên (USDT)
+        symbol: Cặp giao dịch đang hoạt động
+        ledgers: Sổ cái ảo {symbol: {'usd': {sàn: số dư}, 'crypto': {sàn: số dư}, 'mode': chế độ bot}}
+        open_orders: Các lệnh đang mở {"sàn:order_id": thông tin lệnh}
+    """
+
+    def __init__(self, snapshot_file=STATE_SNAPSHOT_FILE, log_file=STATE_LOG_FILE, compact_every=STATE_COMPACT_EVERY):
+        """
+        Khởi tạo kho trạng thái và khôi phục dữ liệu từ đĩa.
+
+        Args:
+            snapshot_file (str): Đường dẫn tệp bản chụp
+            log_file (str): Đường dẫn tệp nhật ký ghi thêm
+            compact_every (int): Số giao dịch trong nhật ký trước khi tạo bản chụp mới
+        """
+        self.snapshot_file = snapshot_file
+        self.log_file = log_file
+        self.compact_every = compact_every
+        self.data = {}
+        self.seq = 0  # Số thứ tự giao dịch cuối cùng đã áp dụng
+        self.log_entries = 0  # Số giao dịch trong nhật ký kể từ bản chụp gần nhất
+        self._lock = threading.RLock()
+        self._log = None
+
+        for path in (snapshot_file, log_file):
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self._load()
+        self._log = open(self.log_file, 'ab')
+
+        if not self.data:
+            self._import_legacy_files()
+
+    def _load(self):
+        """Khôi phục trạng thái từ bản chụp và phát lại nhật ký."""
+        if os.path.exists(self.snapshot_file):
+            try:
+                with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+                self.data = snapshot.get('data', {})
+                self.seq = snapshot.get('seq', 0)
+            except (OSError, ValueError) as e:
+                log_warning(f"Không thể đọc bản chụp trạng thái {self.snapshot_file}: {str(e)}")
+
+        if not os.path.exists(self.log_file):
+            return
+
+        valid_size = 0
+        with open(self.log_file, 'rb') as f:
+            for raw_line in f:
+                record = self._decode_line(raw_line)
+                if record is None:
+                    # Dòng bị ghi dở hoặc hỏng: bỏ qua phần còn lại của nhật ký
+                    log_warning(f"Bỏ qua phần nhật ký trạng thái bị hỏng trong {self.log_file}")
+                    break
+
+                valid_size += len(raw_line)
+                if record['seq'] <= self.seq:
+                    continue  # Đã có trong bản chụp
+
+                self._apply(record['ops'])
+                self.seq = record['seq']
+                self.log_entries += 1
+
+        # Cắt bỏ phần hỏng để các giao dịch mới được ghi nối tiếp phần hợp lệ
+        if valid_size < os.path.getsize(self.log_file):
+            with open(self.log_file, 'r+b') as f:
+                f.truncate(valid_size)
+
+    @staticmethod
+    def _decode_line(raw_line):
+        """
+        Giải mã một dòng nhật ký dạng "<crc32> <json>".
+
+        Returns:
+            dict: Bản ghi giao dịch, hoặc None nếu dòng không hợp lệ
+        """
+        if not raw_line.endswith(b'\n'):
+            return None
+        try:
+            checksum, payload = raw_line.rstrip(b'\n').split(b' ', 1)
+            if int(checksum, 16) != zlib.crc32(payload):
+                return None
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+    def _apply(self, ops):
+        """Áp dụng các thao tác của một giao dịch vào trạng thái trong bộ nhớ."""
+        for op, key, value in ops:
+            if op == 'set':
+                self.data[key] = value
+            elif op == 'delete':
+                self.data.pop(key, None)
+            elif op == 'merge':
+                self.data[key] = merge_patch(self.data.get(key), value)
+
+    def _import_legacy_files(self):
+        """Nhập dữ liệu từ các tệp văn bản cũ (balance.txt, start_balance.txt, symbol.txt)."""
+        values = {}
+        for key, path, convert in (
+            ('balance', BALANCE_FILE, float),
+            ('start_balance', START_BALANCE_FILE, float),
+            ('symbol', SYMBOL_FILE, str),
+        ):
+            try:
+                with open(path, 'r') as f:
+                    content = f.read().strip()
+                if content:
+                    values[key] = convert(content)
+            except (OSError, ValueError):
+                continue
+
+        if values:
+            self.update(values)
+            log_info(f"Đã nhập trạng thái từ các tệp cũ: {', '.join(values)}")
+
+    def get(self, key, default=None):
+        """
+        Lấy giá trị của một khóa.
+
+        Args:
+            key (str): Tên khóa
+            default: Giá trị mặc định nếu khóa không tồn tại
+
+        Returns:
+            Giá trị của khóa
+        """
+        with self._lock:
+            return self.data.get(key, default)
+
+    def set(self, key, value):
+        """Ghi giá trị cho một khóa (một giao dịch)."""
+        self.commit([('set', key, value)])
+
+    def update(self, values):
+        """
+        Ghi nhiều khóa trong cùng một giao dịch nguyên tử.
+
+        Args:
+            values (dict): Các cặp khóa/giá trị cần ghi
+        """
+        self.commit([('set', key, value) for key, value in values.items()])
+
+    def adjust(self, key, delta, ndigits=3):
+        """
+        Cộng thêm một lượng vào giá trị số của một khóa (đọc-sửa-ghi nguyên tử).
+        
+        Args:
+            key (str): Tên khóa
+            delta (float): Lượng cần cộng thêm
+            ndigits (int): Số chữ số thập phân khi làm tròn
+            
+        Returns:
+            float: Giá trị mới
+        """
+        with self._lock:
+            value = round(float(self.data.get(key, 0)) + delta, ndigits)
+            self.set(key, value)
+            return value
+    
+    def delete(self, key):
+        """Xóa một khóa (một giao dịch)."""
+        self.commit([('delete', key, None)])
+
+    def merge(self, key, patch):
+        """
+        Gộp phần thay đổi vào giá trị dạng bảng của một khóa (một giao dịch).
+
+        Args:
+            key (str): Tên khóa
+            patch (dict): JSON Merge Patch (giá trị None = xóa khóa con)
+        """
+        self.commit([('merge', key, patch)])
+
+    @contextmanager
+    def transaction(self):
+        """
+        Gom nhiều thao tác thành một giao dịch nguyên tử.
+
+        Yields:
+            list: Danh sách thao tác (op, key, value) sẽ được ghi khi kết thúc khối with
+        """
+        ops = []
+        yield ops
+        if ops:
+            self.commit(ops)
+
+    def commit(self, ops):
+        """
+        Ghi một giao dịch vào nhật ký (fsync) rồi áp dụng vào bộ nhớ.
+
+        Args:
+            ops (list): Danh sách thao tác (op, key, value)
+        """
+        with self._lock:
+            record = {'seq': self.seq + 1, 'ops': [list(op) for op in ops]}
+            payload = json.dumps(record, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+            line = f"{zlib.crc32(payload):08x} ".encode('ascii') + payload + b'\n'
+
+            self._log.write(line)
+            self._log.flush()
+            os.fsync(self._log.fileno())
+
+            self._apply(record['ops'])
+            self.seq = record['seq']
+            self.log_entries += 1
+
+            if self.log_entries >= self.compact_every:
+                self.compact()
+
+    def compact(self):
+        """Ghi bản chụp nguyên tử của toàn bộ trạng thái và làm rỗng nhật ký."""
+        with self._lock:
+            snapshot = json.dumps({'seq': self.seq, 'data': self.data}, ensure_ascii=False)
+            atomic_write(self.snapshot_file, snapshot)
+
+            # Bản chụp đã an toàn trên đĩa, có thể làm rỗng nhật ký
+            self._log.close()
+            self._log = open(self.log_file, 'wb')
+            os.fsync(self._log.fileno())
+            self.log_entries = 0
+
+    def close(self):
+        """Tạo bản chụp cuối cùng và đóng nhật ký."""
+        with self._lock:
+            if self._log is None:
+                return
+            if self.log_entries:
+                self.compact()
+            self._log.close()
+            self._log = None
+
+    def set_ledgers(self, symbol, usd, crypto, mode=None):
+        """
+        Lưu sổ cái ảo usd/crypto theo sàn cho một cặp giao dịch; chỉ các số dư đã thay
+        đổi được ghi vào nhật ký.
+
+        Args:
+            symbol (str): Ký hiệu của cặp giao dịch
+            usd (dict): Số dư USDT ảo trên mỗi sàn
+            crypto (dict): Số dư crypto ảo trên mỗi sàn
+            mode (str, optional): Chế độ của bot sở hữu sổ cái
+        """
+        with self._lock:
+            current = self.data.get('ledgers', {}).get(symbol, {})
+            patch = {}
+            for side, balances in (('usd', usd), ('crypto', crypto)):
+                previous = current.get(side, {})
+                changes = {exchange: value for exchange, value in balances.items() if previous.get(exchange) != value}
+                changes.update({exchange: None for exchange in previous if exchange not in balances})
+                if changes:
+                    patch[side] = changes
+            if mode is not None and current.get('mode') != mode:
+                patch['mode'] = mode
+            if patch:
+                self.merge('ledgers', {symbol: patch})
+
+    def delete_ledgers(self, symbol):
+        """Xóa sổ cái ảo của một cặp giao dịch (phiên đã kết thúc bình thường)."""
+        with self._lock:
+            if symbol in self.data.get('ledgers', {}):
+                self.merge('ledgers', {symbol: None})
+
+    def get_ledgers(self, symbol):
+        """
+        Lấy sổ cái ảo của một cặp giao dịch.
+
+        Returns:
+            dict: {'usd': {...}, 'crypto': {...}} hoặc None nếu chưa có
+        """
+        return self.get('ledgers', {}).get(symbol)
+
+    def add_open_order(self, exchange_id, order_id, symbol, side, amount, price=None):
+        """Ghi nhận một lệnh đang mở."""
+        if order_id is None:
+            return
+        self.merge('open_orders', {
+            f"{exchange_id}:{order_id}": {
+                'exchange': exchange_id, 'id': order_id, 'symbol': symbol,
+                'side': side, 'amount': amount, 'price': price
+            }
+        })
+
+    def remove_open_orders(self, exchange_id, symbol=None, order_id=None):
+        """
+        Xóa các lệnh đang mở đã được khớp hoặc hủy.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str, optional): Chỉ xóa lệnh của cặp giao dịch này
+            order_id (str, optional): Chỉ xóa lệnh có ID này
+        """
+        with self._lock:
+            removed = {
+                key: None for key, order in self.data.get('open_orders', {}).items()
+                if order['exchange'] == exchange_id
+                and (symbol is None or order['symbol'] == symbol)
+                and (order_id is None or order['id'] == order_id)
+            }
+            if removed:
+                self.merge('open_orders', removed)
+
+    def get_open_orders(self):
+        """
+        Lấy danh sách các lệnh đang mở đã ghi nhận.
+
+        Returns:
+            list: Danh sách thông tin lệnh
+        """
+        return list(self.get('open_orders', {}).values())
@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Quét tham số chiến lược trên các phiên sách lệnh đã ghi (xem services/book_recorder.py).
+
+Mỗi cấu hình (PROFIT_CRITERIA_PCT, PROFIT_CRITERIA_USD, tỷ lệ crypto mỗi giao dịch)
+được phát lại qua logic quyết định của bot (BaseBot.process_orderbook) với sổ cái ảo
+như chế độ fake-money. Các cấu hình được chia cho một ProcessPoolExecutor dùng mọi
+lõi CPU; kết quả được xếp hạng theo lợi nhuận.
+
+Chạy:
+    python sweep.py data/books.jsonl --grid profit_pct=0,0.05,0.1 --grid size=0.5,0.99
+    python sweep.py data/*.jsonl --random 200 --range profit_pct=0:0.3 --range profit_usd=0:2
+"""
+import os
+import csv
+import sys
+import random
+import signal
+import asyncio
+import argparse
+import itertools
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from bots.base_bot import BaseBot
+from services.paper_exchange import load_records
+from utils.fee_thresholds import BreakEvenTable
+from utils.logger import log_info, log_error
+from configs import EXCHANGE_FEES, PROFIT_CRITERIA_PCT, PROFIT_CRITERIA_USD
+
+
+# Các tham số được quét và giá trị mặc định (giá trị của bot khi chạy thực)
+PARAMETERS = {
+    'profit_pct': PROFIT_CRITERIA_PCT,  # Lợi nhuận tối thiểu sau phí (%)
+    'profit_usd': PROFIT_CRITERIA_USD,  # Lợi nhuận tối thiểu sau phí (USD)
+    'size': 0.99,  # Phần crypto trung bình mỗi sàn dùng cho một giao dịch
+}
+DEFAULT_AMOUNT = 1000.0
+
+
+class _NoLedger:
+    """Sổ cái ảo của bot phát lại không được lưu."""
+
+    def save_ledgers(self, symbol, usd, crypto, mode=None):
+        pass
+
+
+class ReplayBot(BaseBot):
+    """
+    Bot phát lại: dùng nguyên logic quyết định của BaseBot, giao dịch được khớp ngay
+    ở giá tốt nhất trên sổ cái ảo (như FakeMoneyBot) mà không in báo cáo.
+    """
+
+    mode = 'sweep'
+
+    def __init__(self, symbol, exchanges, fees, profit_pct, profit_usd, size, amount_usd):
+        """
+        Args:
+            symbol (str): Cặp giao dịch
+            exchanges (list): Các sàn có trong dữ liệu
+            fees (dict): Phí theo sàn
+            profit_pct (float): Lợi nhuận tối thiểu sau phí (%)
+            profit_usd (float): Lợi nhuận tối thiểu sau phí (USD)
+            size (float): Phần crypto trung bình mỗi sàn dùng cho một giao dịch
+            amount_usd (float): Vốn của phiên (USDT)
+        """
+        # Bot phát lại không hỏi bán crypto khi nhấn Ctrl+C
+        handler = signal.getsignal(signal.SIGINT)
+        super().__init__(None, _NoLedger(), None, None, {'fees': fees})
+        signal.signal(signal.SIGINT, handler)
+
+        self.symbol = symbol
+        self.exchanges = exchanges
+        self.howmuchusd = float(amount_usd)
+        self.size = size
+        self.status_render_fps = 0
+        self.fee_table = BreakEvenTable(exchanges, fees, profit_pct, profit_usd)
+
+    def open(self, average_price):
+        """Chia vốn như khi bắt đầu phiên: một nửa USDT, một nửa crypto, đều cho các sàn."""
+        count = len(self.exchanges)
+        self.usd = {exchange: self.howmuchusd / 2 / count for exchange in self.exchanges}
+        self.crypto = {exchange: self.howmuchusd / 2 / average_price / count for exchange in self.exchanges}
+        self._update_transaction_amount()
+
+    async def _execute_trade(self, min_ask_ex, max_bid_ex, profit_with_fees_pct, profit_with_fees_usd):
+        self.opportunity_count += 1
+        self._update_balances_after_trade(min_ask_ex, max_bid_ex)
+        self.total_absolute_profit_pct += profit_with_fees_pct
+        self.prec_ask_price = self.min_ask_price
+        self.prec_bid_price = self.max_bid_price
+        self._update_transaction_amount()
+        return True
+
+    def _update_transaction_amount(self):
+        self.crypto_per_transaction = sum(self.crypto.values()) / len(self.exchanges) * self.size
+
+    def equity(self, price):
+        """Giá trị sổ cái ảo (USDT) ở một mức giá."""
+        return sum(self.usd.values()) + sum(self.crypto.values()) * price
+
+
+def split_sessions(records, name=''):
+    """
+    Tách các bản ghi thành phiên theo cặp giao dịch.
+
+    Returns:
+        list: [(tên phiên, cặp, bản ghi theo thời gian)]
+    """
+    by_symbol = defaultdict(list)
+    for record in records:
+        if record['bids'] and record['asks']:
+            by_symbol[record['symbol']].append(record)
+    return [
+        (f"{name}:{symbol}" if name else symbol, symbol, sorted(items, key=lambda record: record['ts']))
+        for symbol, items in sorted(by_symbol.items())
+    ]
+
+
+async def _replay(bot, records):
+    """Phát lại một phiên, trả về (lợi nhuận USDT, số giao dịch, sụt giảm lớn nhất %)."""
+    mids = {}
+    first = {}
+    for record in records:
+        first.setdefault(record['exchange'], record)
+        if len(first) == len(bot.exchanges):
+            break
+    bot.open(sum((r['bids'][0][0] + r['asks'][0][0]) / 2 for r in first.values()) / len(first))
+
+    initial = bot.howmuchusd
+    peak = initial
+    max_drawdown = 0.0
+    for record in records:
+        exchange_id = record['exchange']
+        mids[exchange_id] = (record['bids'][0][0] + record['asks'][0][0]) / 2
+        await bot.process_orderbook(exchange_id, record)
+
+        # Sổ cái được định giá ở giá giữa trung bình của các sàn
+        equity = bot.equity(sum(mids.values()) / len(mids))
+        peak = max(peak, equity)
+        max_drawdown = max(max_drawdown, (peak - equity) / peak)
+
+    return equity - initial, bot.opportunity_count, max_drawdown * 100
+
+
+def run_session(symbol, records, params, amount_usd=DEFAULT_AMOUNT, fees=None):
+    """
+    Phát lại một phiên với một cấu hình.
+
+    Args:
+        symbol (str): Cặp giao dịch
+        records (list): Bản ghi sách lệnh của cặp, theo thời gian
+        params (dict): Giá trị các tham số trong PARAMETERS
+        amount_usd (float): Vốn của phiên (USDT)
+        fees (dict, optional): Phí theo sàn (mặc định: EXCHANGE_FEES)
+
+    Returns:
+        tuple: (lợi nhuận USDT, số giao dịch, sụt giảm lớn nhất %)
+    """
+    exchanges = sorted({record['exchange'] for record in records})
+    if len(exchanges) < 2:
+        return 0.0, 0, 0.0
+    params = {**PARAMETERS, **params}
+    bot = ReplayBot(
+        symbol, exchanges, EXCHANGE_FEES if fees is None else fees,
+        params['profit_pct'], params['profit_usd'], params['size'], amount_usd
+    )
+    return asyncio.run(_replay(bot, records))
+
+
+# Dữ liệu của tiến trình worker (nạp một lần khi khởi tạo)
+_sessions = []
+_amount_usd = DEFAULT_AMOUNT
+_fees = None
+
+
+def _init_worker(paths, amount_usd, fees):
+    """Nạp các phiên ghi sẵn vào tiến trình worker."""
+    global _sessions, _amount_usd, _fees
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C được xử lý ở tiến trình chính
+    _sessions = [session for path in paths for session in split_sessions(load_records(path), os.path.basename(path))]
+    _amount_usd = amount_usd
+    _fees = fees
+
+
+def evaluate(params, sessions=None, amount_usd=None, fees=None):
+    """
+    Đánh giá một cấu hình trên mọi phiên.
+
+    Args:
+        params (dict): Giá trị các tham số
+        sessions (list, optional): Các phiên (mặc định: các phiên đã nạp vào worker)
+        amount_usd (float, optional): Vốn mỗi phiên
+        fees (dict, optional): Phí theo sàn
+
+    Returns:
+        dict: Tham số kèm pnl_usd, pnl_pct, trades, max_drawdown_pct
+    """
+    sessions = _sessions if sessions is None else sessions
+    amount_usd = amount_usd or _amount_usd
+    fees = _fees if fees is None else fees
+
+    pnl = 0.0
+    trades = 0
+    drawdown = 0.0
+    for _, symbol, records in sessions:
+        session_pnl, session_trades, session_drawdown = run_session(symbol, records, params, amount_usd, fees)
+        pnl += session_pnl
+        trades += session_trades
+        drawdown = max(drawdown, session_drawdown)
+
+    capital = amount_usd * max(len(sessions), 1)
+    return {
+        **params,
+        'pnl_usd': pnl,
+        'pnl_pct': pnl / capital * 100,
+        'trades': trades,
+        'max_drawdown_pct': drawdown,
+    }
+
+
+def _parse_value(name, value):
+    if name not in PARAMETERS:
+        raise ValueError(f"Tham số không hợp lệ: {name} (hợp lệ: {', '.join(PARAMETERS)})")
+    return float(value)
+
+
+def build_grid(specs):
+    """
+    Tạo lưới cấu hình từ các chuỗi "tên=a,b,c".
+
+    Returns:
+        list: Các cấu hình (tích Descartes của các giá trị)
+
+    Raises:
+        ValueError: Nếu tên tham số hoặc giá trị không hợp lệ
+    """
+    axes = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        axes[name] = [_parse_value(name, value) for value in values.split(',') if value.strip()]
+    if not axes:
+        return [{}]
+    names = list(axes)
+    return [dict(zip(names, combination)) for combination in itertools.product(*(axes[name] for name in names))]
+
+
+def sample_random(specs, count, seed=None):
+    """
+    Lấy mẫu ngẫu nhiên đều các cấu hình từ các chuỗi "tên=thấp:cao".
+
+    Returns:
+        list: `count` cấu hình
+
+    Raises:
+        ValueError: Nếu tên tham số hoặc khoảng không hợp lệ
+    """
+    rng = random.Random(seed)
+    ranges = {}
+    for spec in specs:
+        name, _, bounds = spec.partition('=')
+        low, _, high = bounds.partition(':')
+        ranges[name] = (_parse_value(name, low), _parse_value(name, high))
+    return [{name: rng.uniform(low, high) for name, (low, high) in ranges.items()} for _ in range(count)]
+
+
+def rank(results):
+    """Xếp hạng theo lợi nhuận, rồi sụt giảm nhỏ hơn."""
+    return sorted(results, key=lambda result: (-result['pnl_usd'], result['max_drawdown_pct']))
+
+
+def run_sweep(paths, configs, workers=None, amount_usd=DEFAULT_AMOUNT, fees=None):
+    """
+    Đánh giá các cấu hình song song trên các tiến trình worker.
+
+    Args:
+        paths (list): Các tệp sách lệnh JSONL
+        configs (list): Các cấu hình cần đánh giá
+        workers (int, optional): Số tiến trình (mặc định: số lõi CPU)
+        amount_usd (float): Vốn mỗi phiên (USDT)
+        fees (dict, optional): Phí theo sàn (mặc định: EXCHANGE_FEES)
+
+    Returns:
+        list: Kết quả đã xếp hạng
+    """
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(configs) // (workers * 4))
+    fees = EXCHANGE_FEES if fees is None else fees
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(paths, amount_usd, fees)) as executor:
+        return rank(executor.map(evaluate, configs, chunksize=chunksize))
+
+
+def write_report(results, path):
+    """Ghi kết quả ra tệp CSV."""
+    columns = list(PARAMETERS) + ['pnl_usd', 'pnl_pct', 'trades', 'max_drawdown_pct']
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for result in results:
+            writer.writerow({**PARAMETERS, **result})
+
+
+def print_report(results, top):
+    """In bảng xếp hạng."""
+    print(f"{'#':>4} {'profit_pct':>10} {'profit_usd':>10} {'size':>6} {'pnl_usd':>12} {'pnl_%':>8} {'trades':>7} {'max_dd_%':>9}")
+    for index, result in enumerate(results[:top], 1):
+        result = {**PARAMETERS, **result}
+        print(
+            f"{index:>4} {result['profit_pct']:>10.4f} {result['profit_usd']:>10.4f} {result['size']:>6.3f} "
+            f"{result['pnl_usd']:>12.4f} {result['pnl_pct']:>8.4f} {result['trades']:>7} {result['max_drawdown_pct']:>9.4f}"
+        )
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description='Quét tham số chiến lược trên các phiên sách lệnh đã ghi')
+    parser.add_argument('paths', nargs='+', help='Các tệp sách lệnh JSONL')
+    parser.add_argument('--grid', action='append', default=[], metavar='NAME=A,B,C', help=f"Lưới giá trị ({', '.join(PARAMETERS)})")
+    parser.add_argument('--random', type=int, default=0, metavar='N', help='Lấy mẫu ngẫu nhiên N cấu hình thay cho lưới')
+    parser.add_argument('--range', action='append', default=[], metavar='NAME=LOW:HIGH', help='Khoảng lấy mẫu ngẫu nhiên')
+    parser.add_argument('--seed', type=int, help='Hạt giống lấy mẫu ngẫu nhiên')
+    parser.add_argument('--workers', type=int, help='Số tiến trình (mặc định: số lõi CPU)')
+    parser.add_argument('--amount', type=float, default=DEFAULT_AMOUNT, help='Vốn mỗi phiên (USDT)')
+    parser.add_argument('--top', type=int, default=20, help='Số cấu hình in ra')
+    parser.add_argument('--out', help='Ghi toàn bộ kết quả ra tệp CSV')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    try:
+        configs = sample_random(args.range, args.random, args.seed) if args.random else build_grid(args.grid)
+    except ValueError as e:
+        log_error(str(e))
+        sys.exit(2)
+
+    log_info(f"Quét {len(configs)} cấu hình trên {len(args.paths)} tệp với {args.workers or os.cpu_count()} tiến trình")
+    results = run_sweep(args.paths, configs, args.workers, args.amount)
+    print_report(results, args.top)
+    if args.out:
+        write_report(results, args.out)
+        log_info(f"Đã ghi kết quả vào {args.out}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
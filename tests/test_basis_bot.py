@@ -0,0 +1,111 @@
+"""
+Unit tests for bots/basis_bot.py
+"""
+import asyncio
+from unittest.mock import MagicMock
+
+from bots.basis_bot import BasisBot
+
+
+def book(bid, ask):
+    return {"bids": [[bid, 1.0]], "asks": [[ask, 1.0]]}
+
+
+def make_bot(fees=None):
+    order_service = MagicMock()
+    bot = BasisBot(MagicMock(), MagicMock(), order_service, None)
+    bot.configure("BTC/USDT", ["binance", "okx"], 60, 2000)
+    bot.set_fees(fees or {
+        "binance": {"give": 0.0005, "receive": 0.0005},
+        "okx": {"give": 0.0005, "receive": 0.0005},
+        "kucoinfutures": {"give": 0.0005, "receive": 0.0005},
+    })
+    bot.status_render_fps = 0
+    bot.position_usd = 1000
+    bot.contract_size = 0.001
+    bot.usd = {"binance": 1000.0, "okx": 1000.0}
+    bot.crypto = {"binance": 0, "okx": 0}
+    return bot, order_service
+
+
+class TestBasisBot:
+    def test_entry_edge_accounts_for_fees_and_funding(self):
+        bot, _ = make_bot()
+        edge = bot.entry_edge_pct("binance", 100.0, 100.5)
+        # 0.5% basis - 0.02% expected exit basis - 4 x 0.05% fees
+        assert abs(edge - 0.28) < 1e-9
+
+        bot.funding_monitor = MagicMock()
+        bot.funding_monitor.carry.return_value = {"kucoinfutures": {"funding_apr": 0.1095}}
+        assert abs(bot.entry_edge_pct("binance", 100.0, 100.5) - (0.28 + 0.01)) < 1e-9
+
+    def test_opens_and_closes_paired_position(self):
+        bot, order_service = make_bot()
+
+        async def scenario():
+            await bot.process_orderbook("okx", book(99.9, 100.1))
+            await bot.process_orderbook("binance", book(99.9, 100.0))
+            # Perp trades at a 0.1% premium: not enough after fees
+            assert not await bot.process_perp_orderbook("kucoinfutures", book(100.1, 100.2))
+            assert bot.position is None
+
+            assert await bot.process_perp_orderbook("kucoinfutures", book(100.6, 100.7))
+            assert bot.position["spot_exchange"] == "binance"
+            assert bot.position["contracts"] == 10000
+
+            # Spot catches up with the perp: basis has converged, both legs are closed
+            assert await bot.process_orderbook("binance", book(100.8, 100.9))
+
+        asyncio.run(scenario())
+
+        order_service.place_market_order.assert_any_call("binance", "BTC/USDT", "buy", 10.0)
+        order_service.place_futures_short_order.assert_called_once_with("kucoinfutures", "BTC/USDT:USDT", 10000, 1)
+        order_service.place_market_order.assert_called_with("binance", "BTC/USDT", "sell", 10.0)
+        order_service.close_futures_short_order.assert_called_once_with("kucoinfutures", "BTC/USDT:USDT", 10000, 1)
+        assert bot.position is None
+        assert bot.total_absolute_profit_pct > 0
+
+    def test_failed_leg_is_unwound(self):
+        bot, order_service = make_bot()
+        order_service.place_futures_short_order.side_effect = Exception("margin")
+
+        async def scenario():
+            await bot.process_orderbook("binance", book(99.9, 100.0))
+            return await bot.process_perp_orderbook("kucoinfutures", book(100.6, 100.7))
+
+        assert not asyncio.run(scenario())
+        order_service.place_market_order.assert_called_with("binance", "BTC/USDT", "sell", 10.0)
+        order_service.close_futures_short_order.assert_not_called()
+        assert bot.position is None
+        assert bot.stats["failed_trades"] == 1
+
+    def test_leg_that_cannot_be_unwound_is_kept_and_retried(self):
+        bot, order_service = make_bot()
+        order_service.place_futures_short_order.side_effect = Exception("margin")
+        # The spot buy succeeds, the unwinding sell fails once
+        order_service.place_market_order.side_effect = [{"id": "buy"}, Exception("network"), {"id": "sell"}]
+
+        async def scenario():
+            await bot.process_orderbook("binance", book(99.9, 100.0))
+            assert not await bot.process_perp_orderbook("kucoinfutures", book(100.6, 100.7))
+            # The naked spot leg is remembered instead of being forgotten
+            assert bot.position["legs"] == {"spot"}
+            assert bot.position["unwind"] is True
+
+            # Updates during the backoff do not hammer the exchange
+            for _ in range(5):
+                await bot.process_orderbook("binance", book(99.9, 100.0))
+            assert order_service.place_market_order.call_count == 2
+            assert bot.close_breaker.failures == 1
+
+            # Once the backoff expires, the next update retries the unwind regardless of the basis
+            bot.close_retry_at -= bot.close_breaker.max_delay
+            await bot.process_orderbook("binance", book(99.9, 100.0))
+
+        asyncio.run(scenario())
+        assert order_service.place_market_order.call_count == 3
+        order_service.place_market_order.assert_called_with("binance", "BTC/USDT", "sell", 10.0)
+        order_service.close_futures_short_order.assert_not_called()
+        assert bot.position is None
+        assert bot.total_absolute_profit_pct == 0
+        assert bot.close_breaker.failures == 0
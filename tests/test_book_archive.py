@@ -0,0 +1,83 @@
+"""
+Unit tests for services/book_archive.py
+"""
+import os
+import json
+
+import pytest
+
+from services.book_archive import BookArchiveReader, BookArchiveWriter, pack
+from services.book_recorder import BookRecorder
+from services.paper_exchange import load_records
+
+
+def make_records(count):
+    records = []
+    for t in range(count):
+        for exchange in ("binance", "okx"):
+            mid = 100 + (t % 7) * 0.1
+            records.append({
+                "ts": 1000.0 + t, "exchange": exchange, "symbol": "BTC/USDT",
+                "bids": [[round(mid - 0.1 * i, 2), 1.0 + (t + i) % 3] for i in range(1, 6)],
+                "asks": [[round(mid + 0.1 * i, 2), 1.0 + (t * i) % 4] for i in range(1, 6)],
+            })
+    return records
+
+
+def write_archive(path, records, **kwargs):
+    writer = BookArchiveWriter(str(path), **kwargs)
+    for record in records:
+        writer.record(record["exchange"], record["symbol"], record, record["ts"])
+    writer.close()
+    return str(path)
+
+
+class TestBookArchive:
+    def test_round_trip_and_seek(self, tmp_path):
+        records = make_records(300)
+        path = write_archive(tmp_path / "books.bka", records, chunk_seconds=30)
+        reader = BookArchiveReader(path)
+
+        assert len(reader.index) == 10
+        assert reader.time_range() == (1000.0, 1299.0)
+        assert list(reader.read()) == records
+
+        # Seeking decompresses only the chunks from the one holding the start time
+        decoded = []
+        original = reader._chunk
+        reader._chunk = lambda f, entry: decoded.append(entry["ts"]) or original(f, entry)
+        window = list(reader.read(1145.5, 1160))
+        assert window == [r for r in records if 1145.5 <= r["ts"] < 1160]
+        assert decoded == [1120.0, 1150.0]
+
+        assert load_records(path, start=1290) == records[-20:]
+
+    def test_smaller_than_jsonl_and_index_is_rebuilt(self, tmp_path):
+        records = make_records(600)
+        recorder = BookRecorder(str(tmp_path / "books.jsonl"))
+        for record in records:
+            recorder.record(record["exchange"], record["symbol"], record, record["ts"])
+        recorder.close()
+
+        path = str(tmp_path / "books.bka")
+        assert pack(str(tmp_path / "books.jsonl"), path) == len(records)
+        assert os.path.getsize(path) < os.path.getsize(tmp_path / "books.jsonl") / 5
+
+        index = BookArchiveReader(path).index
+        os.remove(path + ".idx")
+        assert BookArchiveReader(path).index == index
+        with open(path + ".idx", encoding="utf-8") as f:
+            assert [json.loads(line) for line in f] == index
+
+        # Appending starts new self-contained chunks
+        write_archive(path, make_records(2))
+        assert len(list(BookArchiveReader(path).read())) == len(records) + 4
+
+    def test_deltas_remove_levels(self, tmp_path):
+        path = write_archive(tmp_path / "books.bka", [
+            {"ts": 1, "exchange": "okx", "symbol": "ETH/USDT", "bids": [[10, 1], [9, 2]], "asks": [[11, 1], [12, 3]]},
+            {"ts": 2, "exchange": "okx", "symbol": "ETH/USDT", "bids": [[9, 2.5]], "asks": [[11, 1], [12, 3], [13, 1]]},
+        ])
+        assert [r["bids"] for r in BookArchiveReader(path).read()] == [[[10, 1], [9, 2]], [[9, 2.5]]]
+        with pytest.raises(StopIteration):
+            next(BookArchiveReader(path).read(start=5))
@@ -85,3 +85,99 @@ class TestBaseBotZeroDivision:
         # Should not raise ZeroDivisionError
         result = asyncio.run(bot.process_orderbook("kucoin", orderbook))
         assert result is False
+
+
+class TestClassicBotTradeInFlight:
+    """Test that the in-flight guard is released after each trade."""
+
+    def test_consecutive_trades_are_executed(self):
+        """Regression test: trade_in_flight was never reset, so only the first trade ran."""
+        import asyncio
+        from unittest.mock import MagicMock
+        from bots.classic_bot import ClassicBot
+
+        order_service = MagicMock()
+        order_service.place_arbitrage_orders.return_value = True
+        bot = ClassicBot(MagicMock(), MagicMock(), order_service, MagicMock())
+        bot.symbol = "BTC/USDT"
+        bot.exchanges = ["binance", "okx"]
+        bot.usd = {"binance": 1000.0, "okx": 1000.0}
+        bot.crypto = {"binance": 1.0, "okx": 1.0}
+        bot.crypto_per_transaction = 0.01
+        bot.min_ask_price = 100.0
+        bot.max_bid_price = 101.0
+
+        async def two_trades():
+            first = await bot._execute_trade("binance", "okx", 0.5, 0.005)
+            second = await bot._execute_trade("binance", "okx", 0.5, 0.005)
+            return first, second
+
+        assert asyncio.run(two_trades()) == (True, True)
+        assert order_service.place_arbitrage_orders.call_count == 2
+        assert bot.trade_in_flight is False
+
+    def test_previous_prices_come_from_the_traded_snapshot(self):
+        """Regression test: prec prices were read after the threaded order call, from live prices."""
+        import asyncio
+        from unittest.mock import MagicMock
+        from bots.classic_bot import ClassicBot
+
+        bot = ClassicBot(MagicMock(), MagicMock(), MagicMock(), MagicMock())
+        bot.symbol = "BTC/USDT"
+        bot.exchanges = ["binance", "okx"]
+        bot.usd = {"binance": 1000.0, "okx": 1000.0}
+        bot.crypto = {"binance": 1.0, "okx": 1.0}
+        bot.crypto_per_transaction = 0.01
+        bot.min_ask_price = 100.0
+        bot.max_bid_price = 101.0
+
+        def place_orders(*args):
+            # Price loops keep running while the orders are placed
+            bot.min_ask_price, bot.max_bid_price = 105.0, 106.0
+            return True
+
+        bot.order_service.place_arbitrage_orders.side_effect = place_orders
+        asyncio.run(bot._execute_trade("binance", "okx", 0.5, 0.005))
+
+        assert (bot.prec_ask_price, bot.prec_bid_price) == (100.0, 101.0)
+
+
+class TestBaseBotTradeInFlight:
+    """Test that BaseBot does not open a second trade while orders are still being placed."""
+
+    def test_ticks_during_pending_orders_do_not_trade(self):
+        """Regression test: every tick during the threaded order call started another trade."""
+        import asyncio
+        import threading
+        from unittest.mock import MagicMock
+        from bots.base_bot import BaseBot
+
+        release = threading.Event()
+        order_service = MagicMock()
+        order_service.place_arbitrage_orders.side_effect = lambda *args: release.wait(5)
+        fees = {"binance": {"give": 0.001, "receive": 0.001}, "okx": {"give": 0.001, "receive": 0.001}}
+        bot = BaseBot(MagicMock(), MagicMock(), order_service, None, {"fees": fees})
+        bot.configure("BTC/USDT", ["binance", "okx"], 60, 1000)
+        bot.usd = {"binance": 1000.0, "okx": 1000.0}
+        bot.crypto = {"binance": 1.0, "okx": 1.0}
+        bot.crypto_per_transaction = 0.01
+
+        async def ticks():
+            await bot.process_orderbook("binance", {"bids": [[50000, 1]], "asks": [[50010, 1]]})
+            first = asyncio.create_task(
+                bot.process_orderbook("okx", {"bids": [[50300, 1]], "asks": [[50310, 1]]})
+            )
+            await asyncio.sleep(0.05)
+            # Same prices, then new profitable prices, while the first orders are pending
+            await bot.process_orderbook("okx", {"bids": [[50300, 1]], "asks": [[50310, 1]]})
+            await bot.process_orderbook("okx", {"bids": [[50400, 1]], "asks": [[50410, 1]]})
+            release.set()
+            await first
+
+        asyncio.run(ticks())
+
+        assert order_service.place_arbitrage_orders.call_count == 1
+        assert order_service.place_arbitrage_orders.call_args.args[4:6] == (50010, 50300)
+        assert bot.opportunity_count == 1
+        assert bot.prec_ask_price == 50010 and bot.prec_bid_price == 50300
+        assert bot.trade_in_flight is False
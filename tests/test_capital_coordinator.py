@@ -0,0 +1,80 @@
+"""
+Unit tests for services/capital_coordinator.py
+"""
+import time
+
+import pytest
+
+from services.capital_coordinator import CapitalLedger, CapitalCoordinator, CapitalClient
+from services.state_store import StateStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = StateStore(str(tmp_path / "state.json"), str(tmp_path / "state.log"))
+    store.set("balance", 1000.0)
+    return store
+
+
+class TestCapitalLedger:
+    def test_reservations_never_exceed_balance(self, store):
+        ledger = CapitalLedger(store)
+
+        first = ledger.reserve("shard-0", 600)
+        second = ledger.reserve("shard-1", 600)
+
+        assert first["amount"] == 600
+        assert second["amount"] == 400  # Only what is left is granted
+        assert ledger.reserve("shard-2", 100) is None
+        assert ledger.available == 0
+
+    def test_release_books_profit(self, store):
+        ledger = CapitalLedger(store)
+        reservation = ledger.reserve("shard-0", 500)
+
+        assert ledger.release(reservation["id"], 12.5) == 1012.5
+        assert ledger.release(reservation["id"], 12.5) is None  # Released only once
+        assert ledger.reserved == 0
+        assert store.get("balance") == 1012.5
+
+    def test_release_worker(self, store):
+        ledger = CapitalLedger(store)
+        ledger.reserve("shard-0", 300)
+        ledger.reserve("shard-1", 300)
+
+        ledger.release_worker("shard-0")
+        assert ledger.reserved == 300
+
+
+class TestCapitalCoordinator:
+    def test_client_roundtrip(self, store, tmp_path):
+        coordinator = CapitalCoordinator(store, str(tmp_path / "capital.sock"))
+        coordinator.start()
+        client = CapitalClient("shard-0", coordinator.address, coordinator.authkey)
+        try:
+            reservation = client.reserve(250)
+            assert reservation["amount"] == 250
+            assert client.status()["available"] == 750
+
+            assert client.release(reservation["id"], -5) == 995
+            assert client.status()["reserved"] == 0
+        finally:
+            client.close()
+            coordinator.stop()
+
+    def test_disconnect_frees_reservations(self, store, tmp_path):
+        coordinator = CapitalCoordinator(store, str(tmp_path / "capital.sock"))
+        coordinator.start()
+        try:
+            client = CapitalClient("shard-0", coordinator.address, coordinator.authkey)
+            client.reserve(400)
+            client.close()
+
+            deadline = time.time() + 2
+            while coordinator.ledger.reserved and time.time() < deadline:
+                time.sleep(0.01)
+            assert coordinator.ledger.reserved == 0
+            assert store.get("balance") == 1000.0
+        finally:
+            coordinator.stop()
@@ -0,0 +1,97 @@
+"""
+Unit tests for utils/circuit_breaker.py
+"""
+import asyncio
+import random
+from unittest.mock import AsyncMock, MagicMock
+
+import ccxt.pro
+
+from bots.base_bot import BaseBot
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class TestCircuitBreaker:
+    def test_backoff_grows_with_jitter(self):
+        breaker = CircuitBreaker(failure_threshold=10, base_delay=1, max_delay=8, rng=random.Random(1))
+        delays = [breaker.record_failure(now=0) for _ in range(6)]
+
+        for failures, delay in enumerate(delays, start=1):
+            expected = min(8, 2 ** (failures - 1))
+            assert expected / 2 <= delay <= expected
+        assert breaker.state == CLOSED
+
+    def test_trips_and_half_open_probe(self):
+        breaker = CircuitBreaker(failure_threshold=2, base_delay=1, max_delay=60)
+        breaker.record_failure(now=0)
+        assert not breaker.is_open
+        delay = breaker.record_failure(now=0)
+        assert breaker.state == OPEN and breaker.trips == 1
+
+        assert not breaker.allow_request(now=delay / 2)
+        assert breaker.allow_request(now=delay)
+        assert breaker.state == HALF_OPEN
+
+        # Failed probe: open again with a longer wait
+        retry = breaker.record_failure(now=delay)
+        assert breaker.state == OPEN and breaker.trips == 1
+        assert breaker.open_until == delay + retry
+
+        breaker.allow_request(now=breaker.open_until)
+        assert breaker.record_success()
+        assert breaker.state == CLOSED and breaker.failures == 0
+
+
+class FlappingExchange:
+    """watch_order_book fails a fixed number of times, then returns books."""
+
+    def __init__(self, failures):
+        self.failures = failures
+
+    async def watch_order_book(self, symbol):
+        if self.failures:
+            self.failures -= 1
+            raise ccxt.pro.NetworkError("connection reset")
+        await asyncio.sleep(0)
+        return {"bids": [[50100, 1]], "asks": [[50110, 1]]}
+
+
+class TestExchangeLoopBreaker:
+    def make_bot(self, exchange):
+        exchange_service = MagicMock()
+        exchange_service.get_pro_exchange = AsyncMock(return_value=exchange)
+        exchange_service.reset_pro_exchange = AsyncMock(return_value=exchange)
+        bot = BaseBot(exchange_service, MagicMock(), MagicMock(), MagicMock(), {"fees": {}})
+        bot.configure("BTC/USDT", ["binance", "okx"], 60, 1000)
+        bot.circuit_breakers["okx"] = CircuitBreaker(failure_threshold=2, base_delay=0.001, max_delay=0.002)
+        return bot
+
+    def test_tripped_venue_is_removed_then_restored(self):
+        bot = self.make_bot(FlappingExchange(failures=3))
+        bot.bid_prices = {"binance": 50000, "okx": 50200}
+        bot.ask_prices = {"binance": 50010, "okx": 50210}
+        seen = []
+
+        async def process_orderbook(exchange_id, orderbook):
+            seen.append(dict(bot.bid_prices))
+            bot.timeout = 0  # Stop after the first book
+
+        async def scenario():
+            bot.process_orderbook = process_orderbook
+            await bot._exchange_loop("okx")
+
+        asyncio.run(scenario())
+
+        assert bot.exchange_service.reset_pro_exchange.await_count == 1
+        assert seen == [{"binance": 50000}]  # okx was skipped until the probe succeeded
+        assert bot.circuit_breakers["okx"].state == CLOSED
+
+    def test_balance_adjustment_skips_tripped_venue(self):
+        bot = self.make_bot(FlappingExchange(failures=0))
+        bot.usd = {"binance": 250.0, "okx": 250.0}
+        bot.crypto = {"binance": 0.01, "okx": 0.0}  # okx would be forced as the buy venue
+        bot.crypto_per_transaction = 0.001
+
+        asyncio.run(bot.process_orderbook("binance", {"bids": [[50000, 1]], "asks": [[50010, 1]]}))
+
+        assert bot.best_opportunity[:2] == ("binance", "binance")
@@ -0,0 +1,127 @@
+"""
+Unit tests for utils/clock.py
+"""
+import time
+import asyncio
+
+import pytest
+
+from bots.classic_bot import ClassicBot
+from services.balance_service import BalanceService
+from services.order_service import OrderService
+from services.paper_exchange import PaperExchangeService, ReplayBookSource
+from services.state_store import StateStore
+from utils import clock
+
+FEES = {"binance": {"give": 0.001, "receive": 0.001}, "okx": {"give": 0.001, "receive": 0.001}}
+
+
+class NeverFills:
+    """Exchange service whose limit orders stay open forever."""
+
+    def __init__(self):
+        self.calls = []
+        self.canceled = []
+
+    def create_limit_buy_order(self, exchange_id, symbol, amount, price):
+        return {"id": f"{exchange_id}-buy"}
+
+    def create_limit_sell_order(self, exchange_id, symbol, amount, price):
+        return {"id": f"{exchange_id}-sell"}
+
+    def fetch_open_orders(self, exchange_id, symbol):
+        self.calls.append(clock.time())
+        return [{"id": f"{exchange_id}-open"}]
+
+    def fetch_order(self, exchange_id, order_id, symbol):
+        self.calls.append(clock.time())
+        return {"id": order_id, "status": "canceled" if order_id in self.canceled else "open", "filled": 0.0}
+
+    def cancel_order(self, exchange_id, order_id, symbol):
+        self.canceled.append(order_id)
+
+
+@pytest.fixture
+def virtual_clock():
+    virtual = clock.VirtualClock()
+    previous = clock.set_clock(virtual)
+    yield virtual
+    clock.set_clock(previous)
+
+
+class TestVirtualClock:
+    def test_order_fill_timeouts_take_no_wall_time(self, virtual_clock):
+        exchange_service = NeverFills()
+        order_service = OrderService(exchange_service)
+        started = time.perf_counter()
+
+        assert order_service.place_initial_orders(["binance", "okx"], "BTC/USDT", 0.1, 100) is False
+        assert virtual_clock.monotonic() == pytest.approx(order_service.first_orders_fill_timeout, abs=2)
+
+        mark = virtual_clock.monotonic()
+        assert order_service.place_arbitrage_orders("binance", "okx", "BTC/USDT", 0.1, 100, 101) is False
+        assert virtual_clock.monotonic() - mark == pytest.approx(order_service.arbitrage_fill_timeout)
+        assert exchange_service.canceled[-2:] == ["okx-sell", "binance-buy"]
+        assert time.perf_counter() - started < 5
+
+    def test_event_loop_and_threads_share_the_timeline(self):
+        virtual = clock.VirtualClock()
+        events = []
+
+        def worker():
+            for _ in range(3):
+                clock.sleep(2.5)
+                events.append(("thread", clock.time() - virtual.start))
+
+        async def ticker():
+            for _ in range(8):
+                await clock.async_sleep(1)
+                events.append(("loop", clock.time() - virtual.start))
+
+        async def scenario():
+            await asyncio.gather(asyncio.to_thread(worker), ticker())
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(asyncio.Event().wait(), 3600)
+            return clock.time() - virtual.start
+
+        started = time.perf_counter()
+        assert clock.run(scenario(), virtual) == pytest.approx(8 + 3600)
+        assert time.perf_counter() - started < 5
+        assert sorted(events, key=lambda event: event[1]) == events
+        assert [t for source, t in events if source == "thread"] == [2.5, 5.0, 7.5]
+        # The shared clock is restored afterwards
+        assert isinstance(clock.get_clock(), clock.SystemClock)
+
+    def test_hour_long_replay_session_runs_in_seconds(self, tmp_path):
+        records = []
+        for t in range(40):
+            # One book a minute: sellers come down to the initial bid, then okx trades 1% above binance
+            ask = 99.95 if 2 <= t < 5 else 100.0
+            premium = 1.01 if 10 <= t < 30 else 1.0
+            for exchange, factor in (("binance", 1.0), ("okx", premium)):
+                records.append({"ts": t * 60, "exchange": exchange, "symbol": "BTC/USDT",
+                                "bids": [[99.9 * factor, 5]], "asks": [[ask * factor, 5]]})
+        exchanges = ["binance", "okx"]
+        exchange_service = PaperExchangeService(
+            exchanges, ReplayBookSource(records, speed=1, idle_interval=1),
+            balances={ex: {"USDT": 1000.0} for ex in exchanges}, fees=FEES, latency=0.05
+        )
+        state_store = StateStore(str(tmp_path / "state.json"), str(tmp_path / "state.log"))
+        bot = ClassicBot(exchange_service, BalanceService(exchange_service, state_store), OrderService(exchange_service), None)
+        bot.status_render_fps = 0
+
+        async def scenario():
+            bot.configure("BTC/USDT", exchanges, 3600, 1000)
+            bot.set_fees(FEES)
+            try:
+                await bot.start()
+            finally:
+                await exchange_service.close_pro_exchanges()
+
+        virtual = clock.VirtualClock()
+        started = time.perf_counter()
+        clock.run(scenario(), virtual)
+
+        assert virtual.monotonic() >= 3600
+        assert time.perf_counter() - started < 30
+        assert bot.stats["trades_executed"] >= 1
@@ -0,0 +1,90 @@
+"""
+Unit tests for services/config_service.py
+"""
+import json
+import os
+
+import pytest
+
+from services.config_service import ConfigService
+from services.runtime import BotRuntime
+from services.state_store import StateStore
+from utils.exceptions import ConfigError
+
+
+def write_config(path, data, mtime):
+    path.write_text(json.dumps(data))
+    # Force a distinct mtime so the change is seen regardless of filesystem resolution
+    os.utime(path, ns=(mtime, mtime))
+
+
+class TestConfigService:
+    def test_invalid_changes_are_rejected_atomically(self, tmp_path):
+        service = ConfigService(str(tmp_path / "config.json"))
+        before = service.values
+
+        with pytest.raises(ConfigError):
+            service.update(PROFIT_CRITERIA_PCT=0.5, DEFAULT_LEVERAGE=0)
+        with pytest.raises(ConfigError):
+            service.update(EXCHANGE_FEES={"binance": {"give": 0.5, "receive": 0.001}})
+        with pytest.raises(ConfigError):
+            service.update(MAX_ORDER_USD=100)
+        assert service.values is before
+
+        assert service.update(PROFIT_CRITERIA_PCT=0.5) == {"changed": ["PROFIT_CRITERIA_PCT"]}
+        assert service.get("PROFIT_CRITERIA_PCT") == 0.5
+        with pytest.raises(TypeError):
+            service.values["PROFIT_CRITERIA_PCT"] = 1
+
+    def test_file_changes_are_picked_up_and_overridden(self, tmp_path):
+        path = tmp_path / "config.json"
+        service = ConfigService(str(path))
+        default_okx = service.get("EXCHANGE_FEES").get("okx")
+        events = []
+        service.add_listener(lambda values, changed: events.append(changed))
+
+        write_config(path, {"ARBITRAGE_FILL_TIMEOUT": 30, "EXCHANGE_FEES": {"binance": {"give": 0.0005, "receive": 0.0005}}}, 10**18)
+        assert service.check_file()
+        assert not service.check_file()
+        assert service.get("ARBITRAGE_FILL_TIMEOUT") == 30
+        # Fee tables are merged per exchange
+        assert service.get("EXCHANGE_FEES")["binance"] == {"give": 0.0005, "receive": 0.0005}
+        assert service.get("EXCHANGE_FEES").get("okx") == default_okx
+        assert events == [{"ARBITRAGE_FILL_TIMEOUT", "EXCHANGE_FEES"}]
+
+        # Control-socket overrides win over the file until cleared
+        service.update(ARBITRAGE_FILL_TIMEOUT=60)
+        write_config(path, {"ARBITRAGE_FILL_TIMEOUT": 45}, 2 * 10**18)
+        service.check_file()
+        assert service.get("ARBITRAGE_FILL_TIMEOUT") == 60
+        service.update(ARBITRAGE_FILL_TIMEOUT=None)
+        assert service.get("ARBITRAGE_FILL_TIMEOUT") == 45
+
+        # A broken file keeps the current configuration
+        path.write_text("{not json")
+        os.utime(path, ns=(3 * 10**18, 3 * 10**18))
+        assert service.check_file()
+        assert service.get("ARBITRAGE_FILL_TIMEOUT") == 45
+
+    def test_runtime_rebuilds_thresholds_of_running_bots(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        runtime = BotRuntime(StateStore(str(tmp_path / "state.json"), str(tmp_path / "state.log")))
+        runtime.fee_service = None
+        bot = runtime.create_bot("classic")
+        bot.configure("BTC/USDT", ["binance", "okx"], 1, 1000)
+        table = bot.fee_table
+
+        runtime.config_service.update(
+            PROFIT_CRITERIA_PCT=0.3, FIRST_ORDERS_FILL_TIMEOUT=600, ARBITRAGE_POLL_INTERVAL=2,
+            EXCHANGE_FEES={"binance": {"give": 0.002, "receive": 0.002}}
+        )
+
+        assert bot.fee_table is not table
+        assert bot.fee_table.profit_pct == 0.3
+        assert bot.config["fees"]["binance"] == {"give": 0.002, "receive": 0.002}
+        assert runtime.order_service.first_orders_fill_timeout == 600
+        assert runtime.order_service.arbitrage_poll_interval == 2
+        # New sessions start from the reloaded configuration
+        assert runtime.create_bot("classic").fee_table.profit_pct == 0.3
+        runtime.config_service.update(DEFAULT_LEVERAGE=3)
+        assert runtime.create_bot("basis").leverage == 3
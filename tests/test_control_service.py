@@ -0,0 +1,109 @@
+"""
+Unit tests for services/control_service.py and utils/profiler.py
+"""
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from services.control_service import ControlService, send_command
+from services.runtime import BotRuntime
+from services.state_store import StateStore
+from utils.profiler import SamplingProfiler
+
+
+def busy_work(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+class TestSamplingProfiler:
+    def test_folded_output_contains_worker_stacks(self, tmp_path):
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_work, args=(stop,), name="worker")
+        worker.start()
+        profiler = SamplingProfiler(str(tmp_path), interval=0.001)
+        try:
+            path = profiler.start(0.05)
+            profiler._thread.join(2)
+        finally:
+            stop.set()
+            worker.join()
+
+        lines = open(path, encoding="utf-8").read().splitlines()
+        assert lines
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) > 0
+        assert any(line.startswith("worker;") and "busy_work (" in line for line in lines)
+        assert not any("sampling-profiler" in line for line in lines)
+
+    def test_only_one_run_at_a_time(self, tmp_path):
+        profiler = SamplingProfiler(str(tmp_path), interval=0.001)
+        profiler.start(5)
+        try:
+            with pytest.raises(RuntimeError):
+                profiler.start(1)
+        finally:
+            profiler.stop()
+        assert not profiler.running
+
+
+class TestControlService:
+    def test_commands_over_socket(self, tmp_path):
+        path = str(tmp_path / "control.sock")
+        service = ControlService(path)
+        service.register("echo", lambda value: value, "Echo")
+
+        async def double(value):
+            return value * 2
+
+        service.register("double", double)
+
+        async def scenario():
+            await service.start()
+            try:
+                reader, writer = await asyncio.open_unix_connection(path)
+                responses = []
+                for request in ({"command": "echo", "value": "x"}, {"command": "double", "value": 4},
+                                {"command": "missing"}, {"command": "echo"}):
+                    writer.write(json.dumps(request).encode() + b"\n")
+                    responses.append(json.loads(await reader.readline()))
+                writer.close()
+                help_response = await asyncio.to_thread(send_command, path, "help")
+                return responses, help_response
+            finally:
+                await service.stop()
+
+        responses, help_response = asyncio.run(scenario())
+        assert responses[0] == {"ok": True, "result": "x"}
+        assert responses[1] == {"ok": True, "result": 8}
+        assert not responses[2]["ok"] and "missing" in responses[2]["error"]
+        assert not responses[3]["ok"]
+        assert set(help_response["result"]) == {"help", "echo", "double"}
+
+
+class TestRuntimeProfileCommand:
+    def test_profile_command_writes_file(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        path = str(tmp_path / "control.sock")
+        runtime = BotRuntime(StateStore(str(tmp_path / "state.json"), str(tmp_path / "state.log")),
+                             metrics_port=0, control_socket=path)
+        runtime.profiler.output_dir = str(tmp_path / "profiles")
+        runtime.profiler.interval = 0.001
+
+        async def scenario():
+            await runtime.control_service.start()
+            try:
+                response = await asyncio.to_thread(send_command, path, "profile", seconds=0.05)
+                deadline = time.monotonic() + 2
+                while runtime.profiler.running and time.monotonic() < deadline:
+                    await asyncio.sleep(0.01)
+                return response
+            finally:
+                await runtime.control_service.stop()
+
+        response = asyncio.run(scenario())
+        assert response["ok"]
+        assert open(response["result"]["file"], encoding="utf-8").read()
@@ -0,0 +1,76 @@
+"""
+Unit tests for services/fee_service.py
+"""
+import asyncio
+import json
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from bots.base_bot import BaseBot
+from configs import EXCHANGE_FEES
+from services.fee_service import FeeService
+
+
+def make_exchange_service(trading_fees, supported=True):
+    exchange = MagicMock()
+    exchange.has = {"fetchTradingFees": supported}
+    exchange.fetch_trading_fees.return_value = trading_fees
+    exchange_service = MagicMock()
+    exchange_service.get_exchange.return_value = exchange
+    return exchange_service, exchange
+
+
+TRADING_FEES = {
+    "BTC/USDT": {"maker": 0.0002, "taker": 0.0004},
+    "ETH/USDT": {"maker": 0.0002, "taker": 0.0004},
+    "DOGE/USDT": {"maker": 0.0, "taker": 0.001},
+}
+
+
+class TestFeeService:
+    def test_refresh_uses_account_tier_and_caches(self, tmp_path):
+        exchange_service, _ = make_exchange_service(TRADING_FEES)
+        service = FeeService(exchange_service, str(tmp_path / "fees.json"))
+        received = []
+        service.add_listener(received.append)
+
+        assert asyncio.run(service.refresh(["binance"]))
+
+        fees = service.get_fees()
+        assert fees["binance"] == {"give": 0.0004, "receive": 0.0004}
+        assert fees["okx"] == EXCHANGE_FEES["okx"]  # Not fetched: config value
+        assert received == [fees]
+        assert json.loads((tmp_path / "fees.json").read_text())["binance"]["maker"] == 0.0002
+
+    def test_fresh_cache_skips_fetch(self, tmp_path):
+        cache = {"binance": {"give": 0.0005, "receive": 0.0005, "maker": 0.0001, "updated": time.time()}}
+        (tmp_path / "fees.json").write_text(json.dumps(cache))
+        exchange_service, exchange = make_exchange_service(TRADING_FEES)
+
+        service = FeeService(exchange_service, str(tmp_path / "fees.json"))
+        assert not asyncio.run(service.refresh(["binance"]))
+        exchange.fetch_trading_fees.assert_not_called()
+        assert service.get_fees()["binance"]["give"] == 0.0005
+
+    def test_unsupported_or_failing_exchange_keeps_config(self, tmp_path):
+        exchange_service, _ = make_exchange_service(TRADING_FEES, supported=False)
+        service = FeeService(exchange_service, str(tmp_path / "fees.json"))
+        assert not asyncio.run(service.refresh(["kucoin"]))
+
+        exchange_service.get_exchange.side_effect = RuntimeError("no credentials")
+        assert not asyncio.run(service.refresh(["kucoin"], force=True))
+        assert service.get_fees()["kucoin"] == EXCHANGE_FEES["kucoin"]
+
+
+class TestBotFeeUpdate:
+    def test_set_fees_rebuilds_threshold_table(self):
+        bot = BaseBot(MagicMock(), MagicMock(), MagicMock(), MagicMock(), {"fees": EXCHANGE_FEES})
+        bot.configure("BTC/USDT", ["binance", "okx"], 60, 1000)
+        before = bot.fee_table.ratio("binance", "okx")
+
+        bot.set_fees({"binance": {"give": 0.0004, "receive": 0.0004}, "okx": {"give": 0.0004, "receive": 0.0004}})
+
+        assert bot.fee_table.ratio("binance", "okx") == pytest.approx(1.0004 / 0.9996)
+        assert bot.fee_table.ratio("binance", "okx") < before
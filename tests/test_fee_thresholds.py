@@ -0,0 +1,80 @@
+"""
+Unit tests for utils/fee_thresholds.py
+"""
+import asyncio
+import random
+from unittest.mock import MagicMock
+
+import pytest
+
+from bots.base_bot import BaseBot
+from utils.fee_thresholds import BreakEvenTable, DEFAULT_FEE_RATE
+
+
+FEES = {
+    "binance": {"give": 0.001, "receive": 0.001},
+    "okx": {"give": 0.0008, "receive": 0.001},
+}
+
+
+class TestBreakEvenTable:
+    def test_ratio_matrix(self):
+        table = BreakEvenTable(fees=FEES)
+        assert table.ratio("okx", "binance") == pytest.approx(1.0008 / 0.999)
+        assert table.ratio("binance", "okx") == pytest.approx(1.001 / 0.999)
+
+    def test_unknown_exchange_uses_default_fee(self):
+        table = BreakEvenTable(fees=FEES)
+        assert table.ratio("bybit", "okx") == pytest.approx((1 + DEFAULT_FEE_RATE) / 0.999)
+        assert table.buy_fee["bybit"] == DEFAULT_FEE_RATE
+
+    def test_prefilter_matches_full_profit(self):
+        table = BreakEvenTable(["binance", "okx"], FEES)
+        rng = random.Random(42)
+        for _ in range(2000):
+            ask = rng.uniform(99, 101)
+            bid = ask * rng.uniform(0.997, 1.003)
+            buy, sell = rng.choice([("binance", "okx"), ("okx", "binance")])
+            profit = table.net_profit_usd(buy, sell, ask, bid, 0.5)
+            assert table.is_candidate(buy, sell, ask, bid) == (profit > 0)
+
+    def test_negative_criteria_disable_prefilter(self):
+        table = BreakEvenTable(fees=FEES, profit_pct=0, profit_usd=-1)
+        assert not table.prefilter
+        assert table.is_candidate("binance", "okx", 100, 99)
+        assert table.meets_criteria(-0.5, 0.1)
+        assert not table.meets_criteria(-1.5, 0.1)
+
+
+class TestProcessOrderbookThreshold:
+    def make_bot(self):
+        bot = BaseBot(MagicMock(), MagicMock(), MagicMock(), MagicMock(), {"fees": FEES}, journal_service=MagicMock())
+        bot.configure("BTC/USDT", ["binance", "okx"], 60, 1000)
+        bot.usd = {"binance": 250.0, "okx": 250.0}
+        bot.crypto = {"binance": 0.01, "okx": 0.01}
+        bot.crypto_per_transaction = 0.001
+        return bot
+
+    def test_spread_below_break_even_skips_pnl(self):
+        bot = self.make_bot()
+        asyncio.run(bot.process_orderbook("binance", {"bids": [[50000, 1]], "asks": [[50010, 1]]}))
+        asyncio.run(bot.process_orderbook("okx", {"bids": [[50020, 1]], "asks": [[50030, 1]]}))
+
+        # 10 USD spread on 50000 is below 0.18% of fees: not a candidate
+        assert bot.best_opportunity == ("binance", "okx", None)
+        # Still journaled, with no PnL and the rejection reason
+        bot.journal_service.record_opportunity.assert_called_with(
+            "BTC/USDT", "binance", "okx", 50010, 50020, 0.001, None, None, False, reason="below_break_even"
+        )
+
+    def test_candidate_is_evaluated(self):
+        bot = self.make_bot()
+        bot._execute_trade = MagicMock(side_effect=lambda *args: asyncio.sleep(0))
+        asyncio.run(bot.process_orderbook("binance", {"bids": [[50000, 1]], "asks": [[50010, 1]]}))
+        asyncio.run(bot.process_orderbook("okx", {"bids": [[50300, 1]], "asks": [[50310, 1]]}))
+
+        buy, sell, profit = bot.best_opportunity
+        assert (buy, sell) == ("binance", "okx")
+        assert profit == pytest.approx(0.001 * (50300 - 50010) - 0.001 * (50010 * 0.001 + 50300 * 0.001))
+        assert bot.journal_service.record_opportunity.call_args.args[-1] is True
+        bot._execute_trade.assert_called_once()
@@ -0,0 +1,123 @@
+"""
+Unit tests for services/funding_monitor.py
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from bots.delta_neutral_bot import DeltaNeutralBot
+from services.exchange_service import ExchangeService
+from services.funding_monitor import FundingHistory, FundingMonitor, HOURS_PER_YEAR
+
+
+def make_monitor(rates, **kwargs):
+    exchange_service = MagicMock()
+    exchanges = {}
+    for exchange_id, funding in rates.items():
+        exchange = MagicMock()
+        exchange.has = {"fetchFundingRate": True}
+        exchange.fetch_funding_rate.side_effect = lambda symbol, funding=funding: dict(funding)
+        exchanges[exchange_id] = exchange
+    exchange_service.get_exchange.side_effect = exchanges.__getitem__
+    monitor = FundingMonitor(exchange_service, exchanges=list(rates), **kwargs)
+    return monitor, exchanges
+
+
+class TestFundingHistory:
+    def test_rolling_window_annualizes_per_interval(self):
+        history = FundingHistory(size=2)
+        history.add(0, 0.0001, 8, 0.001)
+        history.add(1, 0.0002, 4, 0.002)
+        history.add(2, 0.0003, 8, 0.003)  # Drops the first sample
+
+        carry = history.carry()
+        expected = (0.0002 * HOURS_PER_YEAR / 4 + 0.0003 * HOURS_PER_YEAR / 8) / 2
+        assert carry["samples"] == 2
+        assert abs(carry["funding_apr"] - expected) < 1e-12
+        assert abs(carry["basis"] - 0.0025) < 1e-12
+        assert carry["last_rate"] == 0.0003
+
+
+class TestFundingMonitor:
+    def test_refresh_and_venue_selection_with_hysteresis(self):
+        monitor, exchanges = make_monitor({
+            "kucoinfutures": {"fundingRate": 0.0001, "interval": "8h", "markPrice": 101.0, "indexPrice": 100.0},
+            "okx": {"fundingRate": 0.00012, "interval": "8h", "markPrice": 100.0, "indexPrice": 100.0},
+        }, switch_threshold=0.05)
+
+        asyncio.run(monitor.refresh(["BTC/USDT"]))
+        exchanges["okx"].fetch_funding_rate.assert_called_once_with("BTC/USDT:USDT")
+        carry = monitor.carry("BTC/USDT")
+        assert abs(carry["kucoinfutures"]["basis"] - 0.01) < 1e-12
+
+        # okx pays ~2.2% more a year: not enough to leave the current venue
+        assert monitor.best_venue("BTC/USDT") == "okx"
+        assert monitor.select_venue("BTC/USDT", "kucoinfutures") == "kucoinfutures"
+
+        exchanges["okx"].fetch_funding_rate.side_effect = lambda symbol: {"fundingRate": 0.0005, "interval": "8h"}
+        for _ in range(3):
+            asyncio.run(monitor.refresh(["BTC/USDT"]))
+        assert monitor.select_venue("BTC/USDT") == "okx"
+
+    def test_unsupported_and_failing_venues_are_skipped(self):
+        monitor, exchanges = make_monitor({
+            "kucoinfutures": {"fundingRate": 0.0001},
+            "bybit": {"fundingRate": 0.0003},
+            "okx": {"fundingRate": 0.0002},
+        })
+        exchanges["bybit"].has = {}
+        exchanges["okx"].fetch_funding_rate.side_effect = Exception("timeout")
+
+        asyncio.run(monitor.refresh(["BTC/USDT"]))
+
+        assert set(monitor.carry("BTC/USDT")) == {"kucoinfutures"}
+        assert monitor.best_venue("ETH/USDT", "okx") == "okx"
+
+    def run_delta_neutral_session(self, configured):
+        monitor, _ = make_monitor({
+            "kucoinfutures": {"fundingRate": 0.0001},
+            "okx": {"fundingRate": 0.001},
+        })
+        exchange_service = MagicMock()
+        exchange_service.exchanges = {exchange_id: {} for exchange_id in configured}
+        exchange_service.get_global_average_price = AsyncMock(return_value=50000.0)
+        exchange_service.get_futures_symbol.side_effect = lambda exchange_id, symbol: f"{exchange_id}:BTC-PERP"
+        balance_service = MagicMock()
+        balance_service.get_balance.return_value = 0
+        balance_service.initialize_crypto_balances.return_value = {"binance": 0.001, "kucoin": 0.001}
+        order_service = MagicMock()
+        order_service.place_initial_orders.return_value = True
+        order_service.wait_for_futures_order_fill.return_value = False  # End the session after the short
+
+        bot = DeltaNeutralBot(exchange_service, balance_service, order_service, None)
+        bot.configure("BTC/USDT", ["binance", "kucoin"], 60, 300)
+        bot.funding_monitor = monitor
+        assert asyncio.run(bot.start()) == 0
+        return bot, balance_service, order_service
+
+    def test_delta_neutral_bot_hedges_on_the_cheapest_configured_venue(self):
+        bot, balance_service, order_service = self.run_delta_neutral_session(["binance", "kucoin", "kucoinfutures", "okx"])
+
+        # okx pays far more funding; its unified account needs no spot -> futures transfer
+        assert bot.futures_exchange == "okx"
+        balance_service.transfer_between_accounts.assert_not_called()
+        assert order_service.place_futures_short_order.call_args.args[:2] == ("okx", "okx:BTC-PERP")
+
+    def test_delta_neutral_bot_only_uses_venues_with_credentials(self):
+        bot, balance_service, order_service = self.run_delta_neutral_session(["binance", "kucoin", "kucoinfutures"])
+
+        assert bot.futures_exchange == "kucoinfutures"
+        balance_service.transfer_between_accounts.assert_called_once_with("kucoin", "USDT", 100.0, "spot", "future")
+        assert order_service.place_futures_short_order.call_args.args[:2] == ("kucoinfutures", "kucoinfutures:BTC-PERP")
+
+    def test_futures_symbol_is_resolved_from_the_venue_markets(self):
+        service = ExchangeService(rate_limiter=MagicMock())
+        exchange = MagicMock()
+        exchange.load_markets.return_value = {
+            "BTC/USDT": {"symbol": "BTC/USDT", "base": "BTC", "spot": True},
+            "BTC/USD:BTC": {"symbol": "BTC/USD:BTC", "base": "BTC", "swap": True, "linear": False, "settle": "BTC"},
+            "BTC/USDT:USDT": {"symbol": "BTC/USDT:USDT", "base": "BTC", "swap": True, "linear": True, "settle": "USDT"},
+        }
+        service.exchange_instances["okx"] = exchange
+
+        assert service.get_futures_symbol("okx", "BTC/USDT") == "BTC/USDT:USDT"
+        assert service.get_futures_symbol("okx", "ETH/USDT") == "ETH/USDT:USDT"
@@ -0,0 +1,152 @@
+"""
+Unit tests for services/hedge_engine.py
+"""
+import asyncio
+from unittest.mock import MagicMock
+
+from bots.delta_neutral_bot import DeltaNeutralBot
+from services.hedge_engine import HedgeEngine
+
+
+class FakeProExchange:
+    has = {"watchPositions": True}
+
+    def __init__(self):
+        self.positions = asyncio.Queue()
+
+    async def watch_positions(self, symbols):
+        return await self.positions.get()
+
+    async def watch_ticker(self, symbol):
+        await asyncio.sleep(3600)
+
+
+def make_engine(**kwargs):
+    exchange_service = MagicMock()
+    exchange_service.get_exchange.return_value.market.return_value = {"contractSize": 0.1}
+    order_service = MagicMock()
+    order_service.check_futures_position.return_value = None
+    options = dict(band_usd=50, batch_interval=0.01, min_quantity=1)
+    options.update(kwargs)
+    engine = HedgeEngine(exchange_service, order_service, "kucoinfutures", "BTC/USDT", **options)
+    return engine, exchange_service, order_service
+
+
+class TestHedgeEngine:
+    def test_adjustment_respects_band_and_lot_size(self):
+        engine, _, _ = make_engine()
+        engine.contract_size = 0.1
+        engine.mark_price = 100.0
+        engine.set_positions(spot_position=10.0, short_quantity=10.0)
+        assert engine.net_delta == 0
+        assert engine.adjustment() == 0
+
+        engine.on_spot_fill(0.4)  # 40 USD of drift: inside the band
+        assert engine.adjustment() == 0
+        engine.on_spot_fill(0.35)  # 75 USD: sell 7 more contracts
+        assert engine.adjustment() == 7
+
+        engine.on_spot_fill(-1.5)  # Too short now: buy back
+        assert engine.adjustment() == -7
+
+    def test_position_stream_and_batched_rebalance(self):
+        engine, exchange_service, order_service = make_engine()
+        pro_exchange = FakeProExchange()
+
+        async def get_pro_exchange(exchange_id):
+            return pro_exchange
+
+        exchange_service.get_pro_exchange = get_pro_exchange
+
+        async def scenario():
+            engine.set_positions(spot_position=1.0, short_quantity=1.0)
+            await engine.start()
+            assert engine.contract_size == 0.1
+            pro_exchange.positions.put_nowait([{
+                "symbol": "BTC/USDT:USDT", "side": "short", "contracts": 10, "contractSize": 0.1, "markPrice": 1000.0,
+            }])
+            await asyncio.sleep(0.01)
+            assert engine.mark_price == 1000.0
+
+            # Several fills inside one batch window produce a single order
+            for _ in range(5):
+                engine.on_spot_fill(0.02)
+            await asyncio.sleep(0.1)
+            await engine.stop()
+
+        asyncio.run(scenario())
+
+        order_service.place_futures_short_order.assert_called_once_with("kucoinfutures", "BTC/USDT:USDT", 1, 1)
+        assert engine.short_contracts == 11
+        assert engine.adjustments == 1
+
+    def test_start_seeds_position_from_exchange(self):
+        engine, exchange_service, order_service = make_engine()
+        order_service.check_futures_position.return_value = {
+            "symbol": "BTC/USDT:USDT", "side": "short", "contracts": 10, "contractSize": 0.1, "markPrice": 1000.0,
+        }
+        pro_exchange = FakeProExchange()
+
+        async def get_pro_exchange(exchange_id):
+            return pro_exchange
+
+        exchange_service.get_pro_exchange = get_pro_exchange
+
+        async def scenario():
+            # The bot's estimate is in coin units and must not be rescaled by the contract size
+            engine.set_positions(spot_position=1.0, short_quantity=1.0)
+            await engine.start()
+            assert engine.short_contracts == 10
+            assert engine.net_delta == 0
+            await asyncio.sleep(0.05)
+            await engine.stop()
+
+        asyncio.run(scenario())
+
+        order_service.place_futures_short_order.assert_not_called()
+        order_service.close_futures_short_order.assert_not_called()
+
+    def test_rebalance_waits_for_first_position(self):
+        engine, exchange_service, order_service = make_engine()
+        pro_exchange = FakeProExchange()
+
+        async def get_pro_exchange(exchange_id):
+            return pro_exchange
+
+        exchange_service.get_pro_exchange = get_pro_exchange
+
+        async def scenario():
+            engine.set_positions(spot_position=1.0, short_quantity=0.0)
+            engine.mark_price = 1000.0
+            await engine.start()
+            await asyncio.sleep(0.05)
+            order_service.place_futures_short_order.assert_not_called()
+
+            # The exchange already holds the full short: nothing to do
+            pro_exchange.positions.put_nowait([{
+                "symbol": "BTC/USDT:USDT", "side": "short", "contracts": 10, "contractSize": 0.1,
+            }])
+            await asyncio.sleep(0.05)
+            await engine.stop()
+
+        asyncio.run(scenario())
+
+        order_service.place_futures_short_order.assert_not_called()
+        assert engine.net_delta == 0
+
+
+class TestDeltaNeutralBotHedge:
+    def test_fills_update_spot_delta(self):
+        bot = DeltaNeutralBot(MagicMock(), MagicMock(), MagicMock(), MagicMock())
+        bot.configure("BTC/USDT", ["binance", "okx"], 60, 1000)
+        bot.usd = {"binance": 500.0, "okx": 500.0}
+        bot.crypto = {"binance": 0.01, "okx": 0.01}
+        bot.crypto_per_transaction = 0.005
+        bot.min_ask_price = bot.max_bid_price = 50000
+        bot.hedge_engine = MagicMock()
+
+        before = sum(bot.crypto.values())
+        bot._update_balances_after_trade("binance", "okx")
+
+        quantity = bot.hedge_engine.on_spot_fill.call_args.args[0]
+        assert abs(quantity - (sum(bot.crypto.values()) - before)) < 1e-12
@@ -0,0 +1,130 @@
+"""
+Unit tests for services/journal_service.py
+"""
+import asyncio
+import sqlite3
+from unittest.mock import AsyncMock
+
+from services.journal_service import JournalService
+
+
+def run_journal(db_path, batch_size=2, records=None):
+    async def scenario():
+        journal = JournalService(str(db_path), batch_size=batch_size, flush_interval=0.01)
+        await journal.start()
+        for record in records or []:
+            record(journal)
+        await asyncio.sleep(0.05)
+        await journal.stop()
+        return journal
+
+    return asyncio.run(scenario())
+
+
+class TestJournalService:
+    def test_records_are_written_in_batches(self, tmp_path):
+        db_path = tmp_path / "journal.db"
+        records = [
+            lambda j: j.record_opportunity("BTC/USDT", "binance", "kucoin", 100.0, 101.0, 0.1, 0.05, 0.01, True),
+            lambda j: j.record_opportunity("BTC/USDT", "okx", "kucoin", 100.5, 100.8, 0.1, -0.02, -0.001),
+            lambda j: j.record_order("binance", "BTC/USDT", "buy", "limit", 0.1, 100.0, "abc"),
+            lambda j: j.record_fill("binance", "BTC/USDT", "buy", 0.1, 100.0, "abc"),
+            lambda j: j.record_session("BTC/USDT", "classic", ["binance", "kucoin"], 0.0, 1000, 1001, 0.1, 1.0, 1),
+        ]
+
+        journal = run_journal(db_path, records=records)
+
+        assert journal.written == 5
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM opportunities").fetchone()[0] == 2
+            assert conn.execute("SELECT executed FROM opportunities WHERE buy_exchange='binance'").fetchone()[0] == 1
+            assert conn.execute("SELECT order_id FROM orders").fetchone()[0] == "abc"
+            assert conn.execute("SELECT COUNT(*) FROM fills").fetchone()[0] == 1
+            assert conn.execute("SELECT exchanges FROM sessions").fetchone()[0] == "binance,kucoin"
+
+    def test_wal_mode_and_indexes(self, tmp_path):
+        db_path = tmp_path / "journal.db"
+        run_journal(db_path)
+
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        assert "idx_opportunities_ts" in indexes
+        assert "idx_orders_exchange_ts" in indexes
+        assert "idx_fills_symbol_ts" in indexes
+
+    def test_stop_flushes_everything_pending(self, tmp_path):
+        db_path = tmp_path / "journal.db"
+
+        async def scenario():
+            journal = JournalService(str(db_path), batch_size=3, flush_interval=60)
+            await journal.start()
+            for i in range(10):
+                journal.record_fill("okx", "ETH/USDT", "sell", i, 2000.0)
+            await journal.stop()
+            return journal
+
+        journal = asyncio.run(scenario())
+        assert journal.written == 10
+        assert not journal.pending
+
+    def test_failed_flush_keeps_the_batch(self, tmp_path):
+        db_path = tmp_path / "journal.db"
+
+        async def scenario():
+            journal = JournalService(str(db_path), batch_size=10, flush_interval=60)
+            await journal.start()
+            for i in range(3):
+                journal.record_fill("okx", "ETH/USDT", "sell", i, 2000.0)
+            executemany = journal._db.executemany
+            journal._db.executemany = AsyncMock(side_effect=sqlite3.OperationalError("disk I/O error"))
+            assert await journal.flush() == 0
+            assert [values[5] for _, values in journal.pending] == [0, 1, 2]
+            journal._db.executemany = executemany
+            await journal.stop()
+            return journal
+
+        journal = asyncio.run(scenario())
+        assert journal.written == 3
+        with sqlite3.connect(db_path) as conn:
+            assert [row[0] for row in conn.execute("SELECT amount FROM fills ORDER BY id")] == [0, 1, 2]
+
+    def test_stop_gives_up_when_the_database_keeps_failing(self, tmp_path):
+        async def scenario():
+            journal = JournalService(str(tmp_path / "journal.db"), flush_interval=60)
+            await journal.start()
+            journal.record_fill("okx", "ETH/USDT", "sell", 1, 2000.0)
+            journal._db.executemany = AsyncMock(side_effect=sqlite3.OperationalError("database is locked"))
+            await asyncio.wait_for(journal.stop(), 1)
+            return journal
+
+        journal = asyncio.run(scenario())
+        assert journal.written == 0
+        assert len(journal.pending) == 1
+
+    def test_full_queue_drops_the_oldest_records(self, tmp_path):
+        journal = JournalService(str(tmp_path / "journal.db"), max_pending=2)
+        for i in range(5):
+            journal.record_fill("okx", "ETH/USDT", "sell", i, 2000.0)
+
+        assert journal.dropped == 3
+        assert [values[5] for _, values in journal.pending] == [3, 4]
+
+    def test_rejected_opportunity_reason_and_old_schema(self, tmp_path):
+        db_path = tmp_path / "journal.db"
+        with sqlite3.connect(db_path) as conn:
+            # Journal created before the reason column existed
+            conn.execute(
+                "CREATE TABLE opportunities (id INTEGER PRIMARY KEY, ts REAL NOT NULL, symbol TEXT NOT NULL, "
+                "buy_exchange TEXT NOT NULL, sell_exchange TEXT NOT NULL, ask_price REAL, bid_price REAL, "
+                "amount REAL, profit_usd REAL, profit_pct REAL, executed INTEGER NOT NULL DEFAULT 0)"
+            )
+
+        run_journal(db_path, records=[
+            lambda j: j.record_opportunity("BTC/USDT", "binance", "okx", 100.0, 100.1, 0.1, None, None,
+                                           reason="below_break_even"),
+        ])
+
+        with sqlite3.connect(db_path) as conn:
+            row = conn.execute("SELECT profit_usd, executed, reason FROM opportunities").fetchone()
+        assert row == (None, 0, "below_break_even")
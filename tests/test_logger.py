@@ -0,0 +1,91 @@
+"""
+Unit tests for utils/logger.py
+"""
+import gzip
+import logging
+import os
+import queue
+import subprocess
+import sys
+
+import utils.logger
+from utils.logger import RateSampler, RotatingLogHandler, setup_file_logging
+
+
+def make_record(message):
+    return logging.LogRecord("arbitrage_bot", logging.INFO, __file__, 0, message, None, None)
+
+
+class TestRotatingLogHandler:
+    def test_size_rollover_compresses_and_prunes(self, tmp_path):
+        handler = RotatingLogHandler(str(tmp_path), prefix="bot", max_bytes=200, backup_count=2)
+        try:
+            for index in range(40):
+                handler.emit(make_record(f"line {index:03d} " + "x" * 40))
+            handler.compressor.join()
+        finally:
+            handler.close()
+
+        names = sorted(os.listdir(tmp_path))
+        active = [name for name in names if name.endswith(".log")]
+        archived = [name for name in names if name.endswith(".log.gz")]
+        assert active == [os.path.basename(handler.baseFilename)]
+        assert len(archived) == 2
+        assert os.path.getsize(handler.baseFilename) < 200 + 60
+
+        # The newest archive holds the lines written just before the active file
+        newest = max(archived, key=lambda name: os.path.getmtime(tmp_path / name))
+        with gzip.open(tmp_path / newest, "rt", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        with open(handler.baseFilename, encoding="utf-8") as f:
+            first_active = f.readline()
+        assert lines and int(lines[-1].split()[1]) + 1 == int(first_active.split()[1])
+
+    def test_leftover_files_from_previous_days_are_compressed(self, tmp_path):
+        (tmp_path / "bot_2020-01-01.log").write_text("old\n")
+        handler = RotatingLogHandler(str(tmp_path), prefix="bot", backup_count=0)
+        handler.close()
+
+        assert not (tmp_path / "bot_2020-01-01.log").exists()
+        with gzip.open(tmp_path / "bot_2020-01-01.log.gz", "rt") as f:
+            assert f.read() == "old\n"
+
+
+class TestSetupFileLogging:
+    def test_import_does_not_touch_log_files(self, tmp_path):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=root)
+        subprocess.run([sys.executable, "-c", "import utils.logger"], cwd=tmp_path, env=env, check=True)
+        assert os.listdir(tmp_path) == []
+
+    def test_worker_records_are_written_by_the_parent_handler(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(utils.logger, "file_handler", None)
+        log_queue = queue.Queue()
+        handler = setup_file_logging(log_queue)
+        try:
+            utils.logger.log_info("from worker", print_to_console=False)
+        finally:
+            utils.logger.logger.removeHandler(handler)
+
+        parent = RotatingLogHandler(str(tmp_path), prefix="bot", compress=False)
+        parent.setFormatter(utils.logger.formatter)
+        parent.handle(log_queue.get_nowait())
+        parent.close()
+
+        with open(parent.baseFilename, encoding="utf-8") as f:
+            line = f.read().strip()
+        assert line.endswith(" - arbitrage_bot - INFO - from worker")
+        assert line.count("arbitrage_bot") == 1
+
+
+class TestRateSampler:
+    def test_limits_each_key_and_reports_dropped(self):
+        sampler = RateSampler(rate=3, interval=1.0)
+
+        results = [sampler.allow("loop:binance", now=0.1 * i) for i in range(8)]
+        assert [allowed for allowed, _ in results] == [True] * 3 + [False] * 5
+        # Other keys are counted separately
+        assert sampler.allow("loop:okx", now=0.5) == (True, 0)
+        # The next window reports what was dropped in the previous one
+        assert sampler.allow("loop:binance", now=1.2) == (True, 5)
+        assert sampler.allow("loop:binance", now=1.3) == (True, 0)
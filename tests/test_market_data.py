@@ -0,0 +1,114 @@
+"""
+Unit tests for services/market_data_client.py and services/market_data_daemon.py
+"""
+import asyncio
+
+from services.exchange_service import ExchangeService
+from services.market_data_client import (
+    FRAME_BOOK, FRAME_ERROR, LENGTH, MarketDataClient, decode_frame, encode_book, encode_error
+)
+from services.market_data_daemon import MarketDataDaemon
+
+
+BOOK = {
+    "bids": [[100.0, 1.5], [99.5, 2.0], [99.0, 3.0]],
+    "asks": [[100.5, 0.5], [101.0, 1.0]],
+    "timestamp": 1700000000000,
+}
+
+
+class FakeProExchange:
+    """Emits a new book every time watch_order_book is awaited."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def watch_order_book(self, symbol):
+        self.calls += 1
+        await asyncio.sleep(0.005)
+        return dict(BOOK, bids=[[100.0 + self.calls, 1.0]])
+
+    async def close(self):
+        pass
+
+
+class FakeExchangeService:
+    def __init__(self):
+        self.pro_exchange = FakeProExchange()
+        self.created = 0
+
+    async def get_pro_exchange(self, exchange_id):
+        self.created += 1
+        return self.pro_exchange
+
+    async def reset_pro_exchange(self, exchange_id):
+        return self.pro_exchange
+
+    async def close_pro_exchanges(self):
+        pass
+
+
+class TestFrames:
+    def test_book_roundtrip_is_truncated_to_depth(self):
+        frame = encode_book("binance", "BTC/USDT", BOOK, depth=2, seq=7)
+        assert LENGTH.unpack(frame[:4])[0] == len(frame) - 4
+
+        frame_type, exchange_id, symbol, book = decode_frame(frame[4:])
+        assert (frame_type, exchange_id, symbol) == (FRAME_BOOK, "binance", "BTC/USDT")
+        assert book["bids"] == [[100.0, 1.5], [99.5, 2.0]]
+        assert book["asks"] == [[100.5, 0.5], [101.0, 1.0]]
+        assert book["timestamp"] == 1700000000000
+        assert book["nonce"] == 7
+
+    def test_error_roundtrip(self):
+        frame = encode_error("okx", "ETH/USDT", "timeout")
+        assert decode_frame(frame[4:]) == (FRAME_ERROR, "okx", "ETH/USDT", "timeout")
+
+
+class TestMarketDataDaemon:
+    def test_clients_share_one_exchange_watcher(self, tmp_path):
+        path = str(tmp_path / "md.sock")
+
+        async def scenario():
+            upstream = FakeExchangeService()
+            daemon = MarketDataDaemon(upstream, path, depth=5)
+            await daemon.start()
+
+            first = ExchangeService(market_data_socket=path)
+            second = MarketDataClient(path)
+            try:
+                remote = await first.get_pro_exchange("binance")
+                book_a = await remote.watch_order_book("BTC/USDT")
+                book_b = await second.watch_order_book("binance", "BTC/USDT")
+                book_c = await remote.watch_order_book("BTC/USDT")
+                watchers = len(daemon.watchers)
+            finally:
+                await first.close_pro_exchanges()
+                await second.close()
+                await asyncio.sleep(0.01)
+                await daemon.stop()
+            return upstream, daemon, (book_a, book_b, book_c), watchers
+
+        upstream, daemon, books, watchers = asyncio.run(scenario())
+
+        assert watchers == 1
+        assert upstream.created == 1
+        assert all(book["asks"] == BOOK["asks"] for book in books)
+        assert books[2]["nonce"] > books[0]["nonce"]
+        assert daemon.published >= 3
+
+    def test_disconnect_stops_unused_watcher(self, tmp_path):
+        path = str(tmp_path / "md.sock")
+
+        async def scenario():
+            daemon = MarketDataDaemon(FakeExchangeService(), path)
+            await daemon.start()
+            client = MarketDataClient(path)
+            await client.watch_order_book("kucoin", "ETH/USDT")
+            await client.close()
+            await asyncio.sleep(0.05)
+            remaining = dict(daemon.watchers)
+            await daemon.stop()
+            return remaining
+
+        assert asyncio.run(scenario()) == {}
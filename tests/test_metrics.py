@@ -0,0 +1,100 @@
+"""
+Unit tests for utils/metrics.py and services/metrics_service.py
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from bots.base_bot import BaseBot
+from services.metrics_service import MetricsService
+from services.rate_limiter import RateLimiter
+from utils import metrics
+from utils.metrics import MetricsRegistry
+
+
+class TestRegistry:
+    def test_render_counter_gauge_histogram(self):
+        registry = MetricsRegistry()
+        updates = registry.counter("updates_total", "Updates", ["exchange"])
+        depth = registry.gauge("queue_depth", "Queue depth")
+        latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+
+        updates.labels("binance").inc()
+        updates.labels("binance").inc(2)
+        depth.set(5)
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(3)
+
+        text = registry.render()
+        assert '# TYPE updates_total counter' in text
+        assert 'updates_total{exchange="binance"} 3.0' in text
+        assert 'queue_depth 5.0' in text
+        assert 'latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{le="1.0"} 2' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+        assert 'latency_seconds_count 3' in text
+
+    def test_function_values_and_redeclaration(self):
+        registry = MetricsRegistry()
+        gauge = registry.gauge("depth", "Depth", ["exchange"])
+        gauge.set_function(lambda: {"okx": 2, ("kucoin",): 1})
+
+        assert registry.gauge("depth", "Depth", ["exchange"]) is gauge
+        with pytest.raises(ValueError):
+            registry.counter("depth", "Depth", ["exchange"])
+
+        text = registry.render()
+        assert 'depth{exchange="kucoin"} 1.0' in text
+        assert 'depth{exchange="okx"} 2.0' in text
+
+    def test_label_count_is_checked(self):
+        registry = MetricsRegistry()
+        with pytest.raises(ValueError):
+            registry.counter("c", "C", ["a", "b"]).labels("x")
+
+
+class TestMetricsService:
+    def test_scrape_over_http(self):
+        bot = BaseBot(MagicMock(), MagicMock(), MagicMock(), MagicMock(), {"fees": {}})
+        bot.configure("BTC/USDT", ["binance", "okx"], 60, 1000)
+        bot.stats = {"trades_executed": 4}
+        bot.usd = {"binance": 500.0}
+        rate_limiter = RateLimiter(limits={})
+        rate_limiter.acquire("binance", "order")
+        runtime = SimpleNamespace(
+            exchange_service=SimpleNamespace(rate_limiter=rate_limiter),
+            journal_service=SimpleNamespace(pending=[1, 2, 3], dropped=2),
+            bots=[bot],
+        )
+
+        async def scenario():
+            service = MetricsService(runtime, port=0, lag_interval=0.01)
+            await service.start()
+            try:
+                await bot.process_orderbook("binance", {"bids": [[100, 1]], "asks": [[101, 1]]})
+                await asyncio.sleep(0.03)
+                reader, writer = await asyncio.open_connection("127.0.0.1", service.port)
+                writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+                response = await reader.read()
+                writer.close()
+                return response.decode("utf-8")
+            finally:
+                await service.stop()
+
+        response = asyncio.run(scenario())
+        assert response.startswith("HTTP/1.1 200 OK")
+        assert 'arb_orderbook_updates_total{exchange="binance"}' in response
+        assert "arb_decision_seconds_count" in response
+        assert 'arb_rate_limit_requests_total{exchange="binance",endpoint="order"} 1.0' in response
+        assert "arb_journal_queue_depth 3.0" in response
+        assert "arb_journal_dropped_total 2.0" in response
+        assert 'arb_bot_stat{symbol="BTC/USDT",mode="None",stat="trades_executed"} 4.0' in response
+        assert "arb_event_loop_lag_seconds " in response
+
+        # Unbind the runtime collectors from the process-wide registry
+        for name in ("arb_rate_limit_queue_depth", "arb_rate_limit_wait_seconds_total",
+                     "arb_rate_limit_requests_total", "arb_journal_queue_depth", "arb_journal_dropped_total", "arb_bot_stat"):
+            metrics.REGISTRY.metrics[name].set_function(None)
@@ -0,0 +1,75 @@
+"""
+Unit tests for services/orchestrator.py
+"""
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from bots.fake_money_bot import FakeMoneyBot
+from services.balance_service import BalanceService
+from services.orchestrator import MultiSymbolOrchestrator, allocate_budgets
+from services.runtime import BotRuntime
+from services.state_store import StateStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return StateStore(str(tmp_path / "state.json"), str(tmp_path / "state.log"))
+
+
+class TestAllocateBudgets:
+    def test_equal_split(self):
+        assert allocate_budgets(900, ["BTC/USDT", "ETH/USDT", "SOL/USDT"]) == {
+            "BTC/USDT": 300.0, "ETH/USDT": 300.0, "SOL/USDT": 300.0
+        }
+
+    def test_weighted_split(self):
+        budgets = allocate_budgets(1000, ["BTC/USDT", "ETH/USDT"], {"BTC/USDT": 3})
+        assert budgets == {"BTC/USDT": 750.0, "ETH/USDT": 250.0}
+
+    def test_invalid_weights(self):
+        assert allocate_budgets(1000, []) == {}
+        with pytest.raises(ValueError):
+            allocate_budgets(1000, ["BTC/USDT"], {"BTC/USDT": 0})
+
+
+class TestMultiSymbolOrchestrator:
+    def test_profit_is_weighted_by_budget(self, store, monkeypatch):
+        runtime = BotRuntime(store)
+        runtime.journal_service = None
+        profits = {"BTC/USDT": 2.0, "ETH/USDT": -1.0}
+
+        async def fake_start(bot):
+            bot.total_absolute_profit_pct = profits[bot.symbol]
+            return await bot.stop()
+
+        monkeypatch.setattr(FakeMoneyBot, "start", fake_start)
+        orchestrator = MultiSymbolOrchestrator(runtime)
+
+        profit_pct = asyncio.run(orchestrator.run_session(
+            "fake-money", ["BTC/USDT", "ETH/USDT"], 1000, 1, ["binance", "kucoin", "okx"],
+            weights={"BTC/USDT": 3}
+        ))
+
+        # 2% on 750 USDT and -1% on 250 USDT
+        assert profit_pct == pytest.approx(1.25)
+        assert store.get("balance") == pytest.approx(1012.5)
+        assert all(bot.status_render_fps == 0 for bot in orchestrator.bots.values())
+
+    def test_delta_neutral_is_rejected(self, store):
+        orchestrator = MultiSymbolOrchestrator(BotRuntime(store))
+        result = asyncio.run(orchestrator.run_session(
+            "delta-neutral", ["BTC/USDT", "ETH/USDT"], 1000, 1, ["binance", "kucoin", "okx"]
+        ))
+        assert result == 0
+
+
+class TestBalanceProfitOnBudget:
+    def test_profit_applied_to_budget_only(self, store):
+        service = BalanceService(MagicMock(), store)
+        service.initialize_balance_files(1000)
+
+        assert service.update_balance_with_profit(2.0, 500) == 1010.0
+        assert service.update_balance_with_profit(1.0, 500) == 1015.0
@@ -0,0 +1,56 @@
+"""
+Unit tests for order_benchmark.py
+"""
+import ccxt
+import pytest
+
+import order_benchmark
+from order_benchmark import ScriptedExchange, SCENARIOS, run_case
+from utils import clock
+
+
+class TestScriptedExchange:
+    def test_orders_follow_the_fill_timeline(self):
+        virtual = clock.VirtualClock()
+        previous = clock.set_clock(virtual)
+        try:
+            exchange = ScriptedExchange("binance", SCENARIOS["delayed"])
+            order = exchange.create_limit_buy_order("BTC/USDT", 1.0, 100)
+            virtual.advance(20)
+            assert exchange.fetch_order(order["id"])["filled"] == pytest.approx(0.5)
+            assert len(exchange.fetch_open_orders("BTC/USDT")) == 1
+            virtual.advance(25)
+            assert exchange.fetch_order(order["id"])["status"] == "closed"
+            assert exchange.fetch_balance()["free"]["BTC"] == pytest.approx(2.0)
+        finally:
+            clock.set_clock(previous)
+
+        with pytest.raises(ccxt.InvalidOrder):
+            ScriptedExchange("okx", SCENARIOS["rejected"]).create_limit_buy_order("BTC/USDT", 1.0, 100)
+
+
+class TestOrderBenchmark:
+    def test_polling_detection_latency_and_call_counts(self):
+        immediate = run_case("arbitrage", "immediate")
+        assert immediate["outcome"] == "True"
+        # Fills reported in the order responses need no polling at all
+        assert immediate["detect_s"] == pytest.approx(0.0)
+        assert immediate["calls"] == {"create_order": 2}
+
+        # The partially filled buy leg is cancelled and hedged as soon as the sell leg fills
+        partial = run_case("arbitrage", "partial")
+        assert partial["outcome"] == "True"
+        assert partial["elapsed_s"] == pytest.approx(0.0)
+        assert partial["calls"] == {"cancel_order": 1, "create_order": 3}
+
+        rejected = run_case("initial", "rejected")
+        assert rejected["outcome"] == "OrderError"
+        assert rejected["rest_calls"] == 1
+
+    def test_report(self, tmp_path):
+        results = order_benchmark.run_benchmark(["emergency"], ["immediate", "delayed"])
+        assert [r["unsettled"] for r in results] == [0, 2]
+        order_benchmark.write_report(results, str(tmp_path / "bench.csv"))
+        lines = (tmp_path / "bench.csv").read_text().splitlines()
+        assert lines[0].startswith("path,scenario,outcome")
+        assert len(lines) == 3
@@ -0,0 +1,114 @@
+"""
+Unit tests for services/order_service.py
+"""
+import pytest
+
+from order_benchmark import REJECTED, ScriptedExchangeService
+from services.order_service import OrderService
+from utils import clock
+from utils.exceptions import OrderError
+
+
+@pytest.fixture
+def virtual_clock():
+    virtual = clock.VirtualClock()
+    previous = clock.set_clock(virtual)
+    yield virtual
+    clock.set_clock(previous)
+
+
+def scripted(buy, sell):
+    exchange_service = ScriptedExchangeService(["binance", "okx"], {"buy": buy, "sell": sell})
+    return exchange_service, OrderService(exchange_service)
+
+
+def orders_by_side(exchange_service, exchange_id):
+    orders = exchange_service.get_exchange(exchange_id).orders.values()
+    # Market orders in the scripted exchange follow the limit script, so only limit statuses matter here
+    return [
+        (order["type"], order["side"], pytest.approx(order["amount"]), order["status"] if order["type"] == "limit" else None)
+        for order in orders
+    ]
+
+
+class TestArbitrageHedging:
+    def test_filled_leg_triggers_hedge_of_the_other_leg_by_order_id(self, virtual_clock):
+        # Each sell order fills completely 5 s after it is placed; buy fills 30% after 3 s and then stalls
+        exchange_service, order_service = scripted(buy=((3, 0.3),), sell=((5, 1.0),))
+
+        assert order_service.place_arbitrage_orders("binance", "okx", "BTC/USDT", 1.0, 100, 101) is True
+        # Polls back off (0.5, 1.5, 3.5 s); the partial buy fill seen at 3.5 s resets the interval, and the
+        # re-posted sell (filled at 8.5 s) is seen on the backed-off poll at 11 s, not after the 180 s timeout
+        assert virtual_clock.monotonic() == pytest.approx(11.0)
+
+        # The 30% fill on buy first hedged 0.3 of the still-open sell leg and re-posted the rest
+        assert orders_by_side(exchange_service, "okx") == [
+            ("limit", "sell", 1.0, "canceled"),
+            ("market", "sell", 0.3, None),
+            ("limit", "sell", 0.7, "closed"),
+        ]
+        # Once the re-posted sell filled, the stalled buy leg was cancelled and hedged at market
+        assert orders_by_side(exchange_service, "binance") == [
+            ("limit", "buy", 1.0, "canceled"),
+            ("market", "buy", 0.7, None),
+        ]
+        assert exchange_service.calls()["fetch_open_orders"] == 0
+        assert exchange_service.calls()["fetch_closed_orders"] == 0
+
+    def test_small_partial_fill_waits_for_the_other_leg(self, virtual_clock):
+        # 5% of the buy (5 USD, below ARBITRAGE_MIN_HEDGE_USD) fills after 1 s; both legs fill after 4 s
+        exchange_service, order_service = scripted(buy=((1, 0.05), (4, 1.0)), sell=((4, 1.0),))
+
+        assert order_service.place_arbitrage_orders("binance", "okx", "BTC/USDT", 1.0, 100, 101) is True
+        # No cancel, market hedge or re-post for the small imbalance
+        assert exchange_service.calls()["create_order"] == 2
+        assert exchange_service.calls()["cancel_order"] == 0
+
+    def test_unchanged_legs_are_polled_less_often(self, virtual_clock):
+        exchange_service, order_service = scripted(buy=((1000, 1.0),), sell=((1000, 1.0),))
+
+        assert order_service.place_arbitrage_orders("binance", "okx", "BTC/USDT", 1.0, 100, 101) is False
+        # A fixed 0.5 s interval would fetch each leg 360 times over the 180 s timeout
+        polls = (180 - 7.5) / order_service.arbitrage_poll_max_interval + 4
+        assert exchange_service.calls()["fetch_order"] <= 2 * polls + 4
+
+    def test_leg_without_order_id_is_found_in_open_orders(self, virtual_clock):
+        exchange_service, order_service = scripted(buy=((3, 1.0),), sell=((3, 1.0),))
+        create_limit_buy_order = exchange_service.create_limit_buy_order
+
+        def create_without_response(*args):
+            create_limit_buy_order(*args)
+
+        exchange_service.create_limit_buy_order = create_without_response
+
+        assert order_service.place_arbitrage_orders("binance", "okx", "BTC/USDT", 1.0, 100, 101) is True
+        assert exchange_service.calls()["fetch_open_orders"] == 1
+        # The buy leg is polled by the id found in the open orders, never by None
+        (buy,) = exchange_service.get_exchange("binance").orders.values()
+        assert buy["status"] == "closed"
+        assert exchange_service.get_exchange("binance").calls["fetch_order"] > 0
+
+    def test_unknown_leg_is_not_cancelled_by_id(self, virtual_clock):
+        exchange_service, order_service = scripted(buy=((3, 1.0),), sell=((3, 1.0),))
+        order_service.exchange_service.fetch_open_orders = lambda exchange_id, symbol: []
+        leg = {"exchange": "binance", "side": "buy", "price": 100, "id": None, "open": True,
+               "order_filled": 0.0, "done": 0.0}
+
+        order_service._cancel_leg(leg, "BTC/USDT")
+
+        assert leg["open"] is False
+        assert exchange_service.calls()["cancel_order"] == 0
+        assert exchange_service.calls()["fetch_order"] == 0
+
+    def test_rejected_second_leg_unwinds_the_first(self, virtual_clock):
+        # The sell leg fills 40% at once; every buy order (limit and market) is rejected
+        exchange_service, order_service = scripted(buy=REJECTED, sell=((0, 0.4),))
+
+        with pytest.raises(OrderError):
+            order_service.place_arbitrage_orders("binance", "okx", "BTC/USDT", 1.0, 100, 101)
+
+        # The sell leg is not left open, and buying back its filled part was attempted on okx
+        (sell,) = exchange_service.get_exchange("okx").orders.values()
+        assert sell["status"] == "canceled" and sell["filled"] == pytest.approx(0.4)
+        assert exchange_service.get_exchange("okx").calls["create_order"] == 2
+        assert exchange_service.get_exchange("binance").calls["create_order"] == 1
@@ -0,0 +1,162 @@
+"""
+Unit tests for services/paper_exchange.py
+"""
+import json
+import time
+import asyncio
+
+import ccxt
+import pytest
+
+from bots.classic_bot import ClassicBot
+from services.balance_service import BalanceService
+from services.order_service import OrderService
+from services.paper_exchange import PaperExchange, PaperExchangeService, ReplayBookSource, load_records
+from services.state_store import StateStore
+
+FEES = {"binance": {"give": 0.001, "receive": 0.001}, "okx": {"give": 0.001, "receive": 0.001}}
+
+
+def book(bids, asks):
+    return {"bids": [list(level) for level in bids], "asks": [list(level) for level in asks]}
+
+
+def make_exchange(balances=None):
+    exchange = PaperExchange("binance", balances or {"USDT": 1000.0, "BTC": 1.0}, FEES, latency=0)
+    exchange.apply_book("BTC/USDT", book([(99, 1), (98, 2)], [(101, 1), (102, 2)]))
+    return exchange
+
+
+class TestPaperExchange:
+    def test_market_order_walks_the_book(self):
+        exchange = make_exchange()
+        order = exchange.create_market_buy_order("BTC/USDT", 2.0)
+
+        assert order["status"] == "closed"
+        assert order["filled"] == 2.0
+        assert order["average"] == pytest.approx((101 + 102) / 2)
+        balance = exchange.fetch_balance()
+        assert balance["USDT"]["free"] == pytest.approx(1000 - 203)
+        assert balance["BTC"]["free"] == pytest.approx(1 + 2 * 0.999)
+        # Liquidity taken by the order is gone until the next book update
+        assert exchange.fetch_order_book("BTC/USDT")["asks"] == [[102.0, 1.0]]
+
+    def test_crossing_limit_order_fills_partially_then_rests(self):
+        exchange = make_exchange()
+        order = exchange.create_limit_buy_order("BTC/USDT", 2.0, 101)
+
+        assert order["status"] == "open"
+        assert order["filled"] == 1.0
+        assert [o["id"] for o in exchange.fetch_open_orders("BTC/USDT")] == [order["id"]]
+        balance = exchange.fetch_balance()
+        assert balance["USDT"]["used"] == pytest.approx(101)
+        assert balance["USDT"]["free"] == pytest.approx(1000 - 202)
+
+        exchange.cancel_order(order["id"], "BTC/USDT")
+        assert exchange.fetch_balance()["USDT"]["used"] == pytest.approx(0)
+        assert exchange.fetch_order(order["id"])["status"] == "canceled"
+        with pytest.raises(ccxt.OrderNotFound):
+            exchange.cancel_order(order["id"])
+
+    def test_resting_order_fills_after_the_queue_ahead(self):
+        exchange = make_exchange()
+        order = exchange.create_limit_sell_order("BTC/USDT", 0.5, 101)
+        assert exchange.queue_ahead[order["id"]] == 1.0
+
+        # 0.8 traded at 101: all of it was ahead of us
+        exchange.apply_book("BTC/USDT", book([(99, 1)], [(101, 0.2), (102, 2)]))
+        assert exchange.fetch_order(order["id"])["filled"] == 0
+
+        # 0.8 joins behind us, then 0.5 trades: 0.2 clears the queue, 0.3 fills our order
+        exchange.apply_book("BTC/USDT", book([(99, 1)], [(101, 1.0), (102, 2)]))
+        exchange.apply_book("BTC/USDT", book([(99, 1)], [(101, 0.5), (102, 2)]))
+        assert exchange.fetch_order(order["id"])["filled"] == pytest.approx(0.3)
+
+        # A bid through our price fills the rest at our price
+        exchange.apply_book("BTC/USDT", book([(101.2, 1)], [(101.5, 1)]))
+        filled = exchange.fetch_order(order["id"])
+        assert filled["status"] == "closed"
+        assert filled["average"] == pytest.approx(101)
+        assert exchange.fetch_balance()["USDT"]["free"] == pytest.approx(1000 + 0.5 * 101 * 0.999)
+
+    def test_insufficient_funds_and_missing_book(self):
+        exchange = make_exchange({"USDT": 50.0})
+        with pytest.raises(ccxt.InsufficientFunds):
+            exchange.create_limit_buy_order("BTC/USDT", 1.0, 100)
+        with pytest.raises(ccxt.ExchangeNotAvailable):
+            exchange.fetch_ticker("ETH/USDT")
+
+
+class TestReplay:
+    def write_records(self, path, records):
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        return load_records(path)
+
+    def test_replay_feeds_the_matching_engine(self, tmp_path):
+        records = self.write_records(tmp_path / "books.jsonl", [
+            {"ts": t, "exchange": "binance", "symbol": "BTC/USDT", "bids": [[99.0, 1]], "asks": [[101.0 - t, 1]]}
+            for t in range(3)
+        ])
+        exchange_service = PaperExchangeService(
+            ["binance"], ReplayBookSource(records, speed=100, idle_interval=0.01),
+            balances={"binance": {"USDT": 1000.0}}, fees=FEES, latency=0
+        )
+
+        async def scenario():
+            # The first book comes from the replay's snapshot, before anything is watched
+            order = exchange_service.create_limit_buy_order("binance", "BTC/USDT", 1.0, 99.5)
+            assert order["status"] == "open"
+            # The resting order fills in the background once the ask comes down to it
+            await asyncio.sleep(0.1)
+            feed = await exchange_service.get_pro_exchange("binance")
+            orderbook = await feed.watch_order_book("BTC/USDT")
+            await exchange_service.close_pro_exchanges()
+            return order, orderbook
+
+        order, orderbook = asyncio.run(scenario())
+        filled = exchange_service.get_exchange("binance").fetch_order(order["id"])
+        assert filled["status"] == "closed"
+        assert filled["average"] == pytest.approx(99.5)
+        assert orderbook["asks"] == [[99.0, 1.0]]
+
+    def test_classic_bot_runs_unmodified_on_replay(self, tmp_path, monkeypatch):
+        records = []
+        for t in range(40):
+            # Sellers come down to the initial bid early on, then okx trades 1% above binance
+            ask = 99.95 if 2 <= t < 5 else 100.0
+            premium = 1.01 if 10 <= t < 30 else 1.0
+            records.append({"ts": t, "exchange": "binance", "symbol": "BTC/USDT",
+                            "bids": [[99.9, 5]], "asks": [[ask, 5]]})
+            records.append({"ts": t, "exchange": "okx", "symbol": "BTC/USDT",
+                            "bids": [[99.9 * premium, 5]], "asks": [[ask * premium, 5]]})
+        exchanges = ["binance", "okx"]
+        exchange_service = PaperExchangeService(
+            exchanges, ReplayBookSource(records, speed=40, idle_interval=0.01),
+            balances={ex: {"USDT": 1000.0} for ex in exchanges}, fees=FEES, latency=0
+        )
+        state_store = StateStore(str(tmp_path / "state.json"), str(tmp_path / "state.log"))
+        order_service = OrderService(exchange_service)
+        bot = ClassicBot(exchange_service, BalanceService(exchange_service, state_store), order_service, None)
+        bot.configure("BTC/USDT", exchanges, 2, 1000)
+        bot.set_fees(FEES)
+        bot.status_render_fps = 0
+        # Order polling sleeps between checks; the fills themselves happen on the event loop
+        monkeypatch.setattr(time, "sleep", lambda seconds: None)
+
+        async def scenario():
+            try:
+                return await bot.start()
+            finally:
+                await exchange_service.close_pro_exchanges()
+
+        asyncio.run(scenario())
+
+        assert bot.stats["trades_executed"] >= 1
+        orders = [order for ex in exchanges for order in exchange_service.get_exchange(ex).orders.values()]
+        assert any(order["side"] == "sell" and order["type"] == "limit" and order["status"] == "closed" for order in orders)
+        # Everything but the 1% kept by emergency_convert was sold back to USDT
+        for ex in exchanges:
+            assert not exchange_service.fetch_open_orders(ex, "BTC/USDT")
+            assert exchange_service.get_balance(ex, "BTC") < 0.05
@@ -0,0 +1,80 @@
+"""
+Unit tests for services/rate_limiter.py
+"""
+import threading
+import time
+from unittest.mock import MagicMock
+
+from services.exchange_service import ExchangeService
+from services.rate_limiter import PRIORITY_ORDER, PRIORITY_POLL, RateLimiter
+
+
+LIMITS = {"binance": {"total": (50, 1), "order": (50, 1), "account": (50, 1), "market": (50, 1)}}
+
+
+class TestRateLimiter:
+    def test_burst_then_wait(self):
+        limiter = RateLimiter(limits={}, default={"total": (1000, 100), "market": (20, 2)})
+        assert limiter.acquire("okx", "market") < 0.01
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.acquire("okx", "market")
+        # Burst of 2 is used up: the remaining calls are spaced at 1/20 s
+        assert time.monotonic() - start >= 0.08
+
+    def test_exchanges_are_independent(self):
+        limiter = RateLimiter(limits=LIMITS)
+        limiter.acquire("binance", "market")
+        assert not limiter.try_acquire("binance", "market")
+        assert limiter.try_acquire("kucoin", "market")
+
+    def test_orders_jump_ahead_of_polling(self):
+        limiter = RateLimiter(limits=LIMITS)
+        limiter.acquire("binance", "market")  # Drain the bucket
+        served = []
+
+        def call(name, endpoint, priority):
+            limiter.acquire("binance", endpoint, priority=priority)
+            served.append(name)
+
+        polls = [threading.Thread(target=call, args=(f"poll{i}", "account", PRIORITY_POLL)) for i in range(3)]
+        for thread in polls:
+            thread.start()
+        time.sleep(0.005)
+        order = threading.Thread(target=call, args=("order", "order", PRIORITY_ORDER))
+        order.start()
+        for thread in polls + [order]:
+            thread.join(2)
+
+        assert served[0] == "order"
+        assert sorted(served[1:]) == ["poll0", "poll1", "poll2"]
+
+    def test_stats_expose_waits(self):
+        limiter = RateLimiter(limits=LIMITS)
+        limiter.acquire("binance", "order")
+        limiter.acquire("binance", "order")
+
+        stats = limiter.stats()["binance"]
+        assert stats["queued"] == 0
+        assert stats["order"]["count"] == 2
+        assert stats["order"]["wait_max"] >= 0.01
+        assert stats["order"]["wait_avg"] == stats["order"]["wait_total"] / 2
+
+
+class TestExchangeServiceThrottle:
+    def test_rest_calls_are_throttled_by_endpoint(self):
+        limiter = MagicMock()
+        service = ExchangeService(rate_limiter=limiter)
+        exchange = MagicMock()
+        service.exchange_instances["binance"] = exchange
+
+        service.create_limit_buy_order("binance", "BTC/USDT", 0.1, 50000)
+        service.fetch_open_orders("binance", "BTC/USDT")
+        service.get_ticker("binance", "BTC/USDT")
+
+        calls = [call.args + (call.kwargs.get("priority"),) for call in limiter.acquire.call_args_list]
+        assert calls == [
+            ("binance", "order", None),
+            ("binance", "account", PRIORITY_POLL),
+            ("binance", "market", None),
+        ]
@@ -0,0 +1,49 @@
+"""
+Unit tests for services/runtime.py
+"""
+import asyncio
+
+import pytest
+
+from bots.classic_bot import ClassicBot
+from bots.fake_money_bot import FakeMoneyBot
+from services.runtime import BotRuntime
+from services.state_store import StateStore
+
+
+@pytest.fixture
+def runtime(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return BotRuntime(StateStore(str(tmp_path / "state.json"), str(tmp_path / "state.log")))
+
+
+class TestBotRuntime:
+    def test_bots_share_runtime_services(self, runtime):
+        first = runtime.create_bot("classic")
+        second = runtime.create_bot("fake-money")
+
+        assert isinstance(first, ClassicBot)
+        assert isinstance(second, FakeMoneyBot)
+        assert first.exchange_service is second.exchange_service
+        assert first.order_service is second.order_service
+        assert first.journal_service is runtime.journal_service
+
+    def test_dry_run_and_invalid_mode(self, runtime):
+        assert isinstance(runtime.create_bot("classic", dry_run=True), FakeMoneyBot)
+        assert runtime.create_bot("unknown") is None
+
+    def test_pro_exchange_survives_sessions(self, runtime):
+        exchange_service = runtime.exchange_service
+        exchange_service.exchanges["binance"] = {}
+
+        async def scenario():
+            first = await exchange_service.get_pro_exchange("binance")
+            second = await exchange_service.get_pro_exchange("binance")
+            reset = await exchange_service.reset_pro_exchange("binance")
+            await exchange_service.close_pro_exchanges()
+            return first, second, reset
+
+        first, second, reset = asyncio.run(scenario())
+        assert first is second
+        assert reset is not first
+        assert exchange_service.pro_exchange_instances == {}
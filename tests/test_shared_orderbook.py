@@ -0,0 +1,99 @@
+"""
+Unit tests for services/shared_orderbook.py
+"""
+import asyncio
+import os
+
+import pytest
+
+from services.market_data_client import MarketDataClient
+from services.market_data_daemon import MarketDataDaemon
+from services.shared_orderbook import SEQ, SharedOrderBookReader, SharedOrderBookWriter
+from tests.test_market_data import FakeExchangeService
+
+
+BOOK = {"bids": [[100.0, 1.0], [99.0, 2.0]], "asks": [[101.0, 0.5]], "timestamp": 1700000000000}
+
+
+@pytest.fixture
+def writer():
+    writer = SharedOrderBookWriter(f"arb_test_{os.getpid()}", depth=3, slots=4)
+    yield writer
+    writer.close()
+
+
+class TestSharedOrderBook:
+    def test_reader_sees_latest_book(self, writer):
+        reader = SharedOrderBookReader(writer.name)
+        try:
+            assert reader.read("binance", "BTC/USDT") is None
+
+            writer.write("binance", "BTC/USDT", BOOK, nonce=1)
+            writer.write("kucoin", "BTC/USDT", dict(BOOK, asks=[[100.5, 1.0]]), nonce=1)
+
+            book = reader.read("binance", "BTC/USDT")
+            assert book["bids"] == BOOK["bids"]
+            assert book["asks"] == BOOK["asks"]
+            assert book["timestamp"] == BOOK["timestamp"]
+            assert reader.read_best("kucoin", "BTC/USDT") == (100.0, 100.5, 2)
+        finally:
+            reader.close()
+
+    def test_write_in_progress_is_not_returned(self, writer):
+        reader = SharedOrderBookReader(writer.name)
+        try:
+            writer.write("binance", "BTC/USDT", BOOK)
+            offset = writer.index[("binance", "BTC/USDT")]
+
+            # Odd sequence number: the writer is in the middle of an update
+            SEQ.pack_into(writer.shm.buf, offset, 3)
+            assert reader.read("binance", "BTC/USDT") is None
+            assert reader.read_best("binance", "BTC/USDT") is None
+        finally:
+            reader.close()
+
+    def test_slots_are_bounded(self, writer):
+        for i in range(4):
+            writer.write("binance", f"C{i}/USDT", BOOK)
+        with pytest.raises(ValueError):
+            writer.write("binance", "C4/USDT", BOOK)
+
+    def test_watch_waits_for_new_update(self, writer):
+        reader = SharedOrderBookReader(writer.name, poll_interval=0.001)
+
+        async def scenario():
+            writer.write("okx", "ETH/USDT", BOOK, nonce=1)
+            first = await reader.watch_order_book("okx", "ETH/USDT")
+            pending = asyncio.create_task(reader.watch_order_book("okx", "ETH/USDT"))
+            await asyncio.sleep(0.01)
+            assert not pending.done()
+            writer.write("okx", "ETH/USDT", dict(BOOK, bids=[[102.0, 1.0]]), nonce=2)
+            return first, await asyncio.wait_for(pending, 1)
+
+        try:
+            first, second = asyncio.run(scenario())
+            assert first["nonce"] == 1
+            assert second["bids"] == [[102.0, 1.0]]
+        finally:
+            reader.close()
+
+
+class TestDaemonSharedMemory:
+    def test_client_reads_from_shared_memory(self, tmp_path):
+        path = str(tmp_path / "md.sock")
+        name = f"arb_daemon_{os.getpid()}"
+
+        async def scenario():
+            daemon = MarketDataDaemon(FakeExchangeService(), path, depth=5, shared_memory=name)
+            await daemon.start()
+            client = MarketDataClient(path, shared_memory=name)
+            try:
+                book = await asyncio.wait_for(client.exchange("binance").watch_order_book("BTC/USDT"), 1)
+                return book, daemon.published
+            finally:
+                await client.close()
+                await daemon.stop()
+
+        book, published = asyncio.run(scenario())
+        assert book["asks"] == [[100.5, 0.5], [101.0, 1.0]]
+        assert published == 0  # Nothing was sent over the socket
@@ -0,0 +1,170 @@
+"""
+Unit tests for services/state_store.py
+"""
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.state_store import StateStore
+from services.balance_service import BalanceService
+from bots.fake_money_bot import FakeMoneyBot
+
+
+@pytest.fixture(autouse=True)
+def isolated_cwd(tmp_path, monkeypatch):
+    # Keep legacy balance.txt / symbol.txt of the working tree out of the store
+    monkeypatch.chdir(tmp_path)
+
+
+def make_store(tmp_path, **kwargs):
+    return StateStore(str(tmp_path / "state.json"), str(tmp_path / "state.log"), **kwargs)
+
+
+class TestStateStore:
+    def test_values_survive_reopen(self, tmp_path):
+        store = make_store(tmp_path)
+        store.update({"balance": 1000.0, "start_balance": 1000.0})
+        store.set("symbol", "ETH/USDT")
+        store.set_ledgers("ETH/USDT", {"binance": 250.0}, {"binance": 0.1})
+
+        reopened = make_store(tmp_path)
+        assert reopened.get("balance") == 1000.0
+        assert reopened.get("symbol") == "ETH/USDT"
+        assert reopened.get_ledgers("ETH/USDT") == {"usd": {"binance": 250.0}, "crypto": {"binance": 0.1}}
+
+    def test_ledger_updates_append_only_changed_balances(self, tmp_path):
+        store = make_store(tmp_path)
+        store.set_ledgers("ETH/USDT", {"binance": 250.0, "okx": 250.0}, {"binance": 0.1, "okx": 0.1})
+        store.set_ledgers("ETH/USDT", {"binance": 240.0, "okx": 250.0}, {"binance": 0.1, "okx": 0.1})
+        store.set_ledgers("ETH/USDT", {"binance": 240.0, "okx": 250.0}, {"binance": 0.1, "okx": 0.1})
+
+        lines = (tmp_path / "state.log").read_bytes().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[1].split(b" ", 1)[1])["ops"] == [["merge", "ledgers", {"ETH/USDT": {"usd": {"binance": 240.0}}}]]
+        assert make_store(tmp_path).get_ledgers("ETH/USDT") == {
+            "usd": {"binance": 240.0, "okx": 250.0}, "crypto": {"binance": 0.1, "okx": 0.1}
+        }
+
+        store.delete_ledgers("ETH/USDT")
+        assert make_store(tmp_path).get_ledgers("ETH/USDT") is None
+
+    def test_open_orders_are_removed_by_id(self, tmp_path):
+        store = make_store(tmp_path)
+        store.add_open_order("binance", "1", "ETH/USDT", "buy", 0.1, 2000.0)
+        store.add_open_order("binance", "2", "ETH/USDT", "sell", 0.1, 2010.0)
+        store.remove_open_orders("binance", order_id="1")
+
+        assert [order["id"] for order in make_store(tmp_path).get_open_orders()] == ["2"]
+
+    def test_torn_log_line_is_ignored(self, tmp_path):
+        store = make_store(tmp_path)
+        store.set("balance", 1000.0)
+        store.set("balance", 1010.0)
+
+        # Simulate a crash in the middle of appending the next transaction
+        with open(tmp_path / "state.log", "ab") as f:
+            f.write(b'deadbeef {"seq":3,"ops":[["set","bal')
+
+        reopened = make_store(tmp_path)
+        assert reopened.get("balance") == 1010.0
+        assert reopened.seq == 2
+
+        # New transactions are appended after the valid part of the log
+        reopened.set("balance", 1020.0)
+        assert make_store(tmp_path).get("balance") == 1020.0
+
+    def test_corrupted_checksum_stops_replay(self, tmp_path):
+        store = make_store(tmp_path)
+        store.set("balance", 1000.0)
+        store.set("balance", 2000.0)
+
+        lines = (tmp_path / "state.log").read_bytes().splitlines(keepends=True)
+        (tmp_path / "state.log").write_bytes(lines[0] + lines[1].replace(b"2000", b"9000"))
+
+        assert make_store(tmp_path).get("balance") == 1000.0
+
+    def test_compaction_writes_snapshot_and_empties_log(self, tmp_path):
+        store = make_store(tmp_path, compact_every=3)
+        for i in range(3):
+            store.set("balance", float(i))
+
+        snapshot = json.loads((tmp_path / "state.json").read_text())
+        assert snapshot == {"seq": 3, "data": {"balance": 2.0}}
+        assert (tmp_path / "state.log").read_bytes() == b""
+        assert make_store(tmp_path).get("balance") == 2.0
+
+    def test_log_entries_already_in_snapshot_are_skipped(self, tmp_path):
+        store = make_store(tmp_path)
+        store.set("balance", 1.0)
+        log_before_compaction = (tmp_path / "state.log").read_bytes()
+        store.set("symbol", "BTC/USDT")
+        store.compact()
+
+        # Crash after the snapshot was written but before the log was emptied
+        (tmp_path / "state.log").write_bytes(log_before_compaction)
+
+        reopened = make_store(tmp_path)
+        assert reopened.seq == 2
+        assert reopened.get("symbol") == "BTC/USDT"
+
+    def test_open_orders(self, tmp_path):
+        store = make_store(tmp_path)
+        store.add_open_order("binance", "1", "BTC/USDT", "buy", 0.1, 50000)
+        store.add_open_order("kucoin", "2", "BTC/USDT", "sell", 0.1, 50100)
+        store.remove_open_orders("binance", "BTC/USDT")
+
+        orders = make_store(tmp_path).get_open_orders()
+        assert [order["id"] for order in orders] == ["2"]
+
+    def test_imports_legacy_files(self, tmp_path):
+        (tmp_path / "balance.txt").write_text("1234.5")
+        (tmp_path / "symbol.txt").write_text("SOL/USDT")
+
+        store = StateStore("state/state.json", "state/state.log")
+        assert store.get("balance") == 1234.5
+        assert store.get("symbol") == "SOL/USDT"
+
+
+class TestBalanceServiceWithStateStore:
+    def test_update_balance_with_profit(self, tmp_path):
+        service = BalanceService(MagicMock(), make_store(tmp_path))
+        service.initialize_balance_files(1000)
+
+        assert service.update_balance_with_profit(1.5) == 1015.0
+        assert make_store(tmp_path).get("balance") == 1015.0
+        assert service.get_current_balance() == 1015.0
+
+    def test_save_ledgers_does_not_write_on_caller_thread(self, tmp_path):
+        store = make_store(tmp_path)
+        store.set_ledgers = MagicMock()
+        service = BalanceService(MagicMock(), store)
+        service._ledger_write_lock.acquire()  # Hold the background writer
+
+        service.save_ledgers("ETH/USDT", {"binance": 100.0}, {"binance": 0.1})
+        service.save_ledgers("ETH/USDT", {"binance": 200.0}, {"binance": 0.2})
+        store.set_ledgers.assert_not_called()
+
+        service._ledger_write_lock.release()
+        service.flush_ledgers()
+        store.set_ledgers.assert_called_once_with("ETH/USDT", {"binance": 200.0}, {"binance": 0.2}, None)
+
+    def test_ledgers_are_restored_only_for_the_same_mode(self, tmp_path):
+        service = BalanceService(MagicMock(), make_store(tmp_path))
+        service.save_ledgers("ETH/USDT", {"binance": 200.0}, {"binance": 0.2}, "fake-money")
+        service.flush_ledgers()
+
+        # A restart reads what was persisted
+        restarted = BalanceService(MagicMock(), make_store(tmp_path))
+        assert restarted.load_ledgers("ETH/USDT", "classic") is None
+        assert restarted.load_ledgers("ETH/USDT", "fake-money")["usd"] == {"binance": 200.0}
+
+        bot = FakeMoneyBot(MagicMock(), restarted, MagicMock(), None)
+        bot.configure("ETH/USDT", ["binance"], 1, 1000)
+        assert bot._restore_ledgers()
+        assert (bot.usd, bot.crypto) == ({"binance": 200.0}, {"binance": 0.2})
+        bot.configure("ETH/USDT", ["binance", "okx"], 1, 1000)
+        assert not bot._restore_ledgers()
+
+        restarted.clear_ledgers("ETH/USDT")
+        assert BalanceService(MagicMock(), make_store(tmp_path)).load_ledgers("ETH/USDT", "fake-money") is None
@@ -0,0 +1,123 @@
+"""
+Unit tests for utils/status_renderer.py
+"""
+import io
+import asyncio
+from unittest.mock import MagicMock
+
+from bots.base_bot import BaseBot
+from utils import logger
+from utils.status_renderer import StatusRenderer
+
+
+def make_bot():
+    bot = BaseBot(
+        exchange_service=MagicMock(),
+        balance_service=MagicMock(),
+        order_service=MagicMock(),
+        notification_service=MagicMock(),
+    )
+    bot.symbol = "BTC/USDT"
+    bot.exchanges = ["binance", "kucoin"]
+    bot.usd = {"binance": 250.0, "kucoin": 250.0}
+    bot.crypto = {"binance": 0.005, "kucoin": 0.005}
+    bot.crypto_per_transaction = 0.001
+    return bot
+
+
+class TestStatusRenderer:
+    def test_process_orderbook_does_not_write_stdout(self, capsys):
+        bot = make_bot()
+        orderbook = {"bids": [[50000, 1]], "asks": [[50100, 1]]}
+        asyncio.run(bot.process_orderbook("binance", orderbook))
+        asyncio.run(bot.process_orderbook("kucoin", orderbook))
+
+        assert capsys.readouterr().out == ""
+        assert bot.update_counts == {"binance": 1, "kucoin": 1}
+        assert bot.best_opportunity is not None
+
+    def test_render_includes_every_venue(self):
+        bot = make_bot()
+        bot.bid_prices = {"binance": 50000, "kucoin": 50010}
+        bot.ask_prices = {"binance": 50100, "kucoin": 50110}
+        bot.best_opportunity = ("binance", "kucoin", -1.5)
+
+        lines = StatusRenderer(bot, fps=10).render()
+
+        assert len(lines) == 2 + len(bot.exchanges)
+        assert "binance" in lines[1] and "kucoin" in lines[1]
+        assert any("50010" in line for line in lines)
+
+    def test_feed_rates(self):
+        bot = make_bot()
+        renderer = StatusRenderer(bot, fps=10)
+
+        bot.update_counts = {"binance": 10}
+        renderer.update_feed_rates(now=100.0)
+        bot.update_counts = {"binance": 30, "kucoin": 5}
+        rates = renderer.update_feed_rates(now=102.0)
+
+        assert rates == {"binance": 10.0, "kucoin": 2.5}
+
+    def test_draw_overwrites_previous_frame(self):
+        bot = make_bot()
+        stream = io.StringIO()
+        renderer = StatusRenderer(bot, fps=10, stream=stream)
+
+        renderer.draw()
+        first = stream.getvalue()
+        renderer.draw()
+        second = stream.getvalue()[len(first):]
+
+        assert not first.startswith("\033[F")
+        assert second.startswith("\033[F\033[K" * (2 + len(bot.exchanges)))
+
+    def test_clear_resets_frame(self):
+        bot = make_bot()
+        stream = io.StringIO()
+        renderer = StatusRenderer(bot, fps=10, stream=stream)
+
+        renderer.draw()
+        renderer.clear()
+        position = len(stream.getvalue())
+        renderer.draw()
+
+        assert not stream.getvalue()[position:].startswith("\033[F")
+
+    def test_print_above_keeps_the_frame_below_the_line(self):
+        bot = make_bot()
+        stream = io.StringIO()
+        renderer = StatusRenderer(bot, fps=10, stream=stream)
+        frame_lines = 2 + len(bot.exchanges)
+
+        renderer.draw()
+        position = len(stream.getvalue())
+        renderer.print_above("order placed")
+        output = stream.getvalue()[position:]
+
+        # The frame is erased, the line is printed, and the same frame is drawn again below it
+        assert output.startswith("\033[F\033[K" * frame_lines + "order placed\033[K\n")
+        assert output.count("\n") == 1 + frame_lines
+
+        # The next frame overwrites the redrawn frame, not the printed line
+        position = len(stream.getvalue())
+        renderer.draw()
+        assert stream.getvalue()[position:].startswith("\033[F\033[K" * frame_lines + "\033[2m")
+
+    def test_console_logs_are_routed_through_the_running_renderer(self, capsys):
+        bot = make_bot()
+        stream = io.StringIO()
+        renderer = StatusRenderer(bot, fps=10, stream=stream)
+
+        async def scenario():
+            renderer.start()
+            await asyncio.sleep(0)
+            assert logger.console_overlay is renderer
+            logger.log_info("hedge sent")
+            await renderer.stop()
+
+        asyncio.run(scenario())
+
+        assert logger.console_overlay is None
+        assert "hedge sent" in stream.getvalue()
+        assert "hedge sent" not in capsys.readouterr().out
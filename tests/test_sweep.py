@@ -0,0 +1,61 @@
+"""
+Unit tests for sweep.py and services/book_recorder.py
+"""
+import pytest
+
+import sweep
+from services.book_recorder import BookRecorder
+from services.paper_exchange import load_records
+
+FEES = {"binance": {"give": 0.001, "receive": 0.001}, "okx": {"give": 0.001, "receive": 0.001}}
+
+
+def record_session(path):
+    recorder = BookRecorder(str(path))
+    for t in range(20):
+        # okx trades ~1% above binance every other update, and is back in line at the end
+        premium = 1.01 + t * 0.0001 if t % 2 and t < 19 else 1.0
+        recorder.record("binance", "BTC/USDT", {"bids": [[99.9, 5]], "asks": [[100.0, 5]]}, ts=t)
+        recorder.record("okx", "BTC/USDT", {"bids": [[99.9 * premium, 5]], "asks": [[100.0 * premium, 5]]}, ts=t + 0.5)
+    recorder.close()
+    return str(path)
+
+
+class TestSweep:
+    def test_grid_and_random_configs(self):
+        grid = sweep.build_grid(["profit_pct=0,0.1", "size=0.5,0.99"])
+        assert len(grid) == 4
+        assert {"profit_pct": 0.1, "size": 0.5} in grid
+
+        samples = sweep.sample_random(["profit_usd=0:2"], 5, seed=1)
+        assert len(samples) == 5 and all(0 <= s["profit_usd"] <= 2 for s in samples)
+        assert samples == sweep.sample_random(["profit_usd=0:2"], 5, seed=1)
+
+        with pytest.raises(ValueError):
+            sweep.build_grid(["leverage=1,2"])
+
+    def test_stricter_criteria_trade_less(self, tmp_path):
+        path = record_session(tmp_path / "books.jsonl")
+        assert len(load_records(path)) == 40
+        sessions = sweep.split_sessions(load_records(path))
+
+        loose = sweep.evaluate({"profit_pct": 0, "size": 0.5}, sessions, 1000, FEES)
+        strict = sweep.evaluate({"profit_pct": 1.0, "size": 0.5}, sessions, 1000, FEES)
+
+        assert loose["trades"] > 0
+        assert loose["pnl_usd"] > 0
+        assert loose["max_drawdown_pct"] >= 0
+        assert strict["trades"] == 0
+        assert sweep.rank([strict, loose])[0] is loose
+
+    def test_process_pool_report(self, tmp_path):
+        path = record_session(tmp_path / "books.jsonl")
+        configs = sweep.build_grid(["profit_pct=0,1.0", "size=0.5"])
+
+        results = sweep.run_sweep([path], configs, workers=2, fees=FEES)
+
+        assert [r["profit_pct"] for r in results] == [0, 1.0]
+        sweep.write_report(results, str(tmp_path / "report.csv"))
+        lines = (tmp_path / "report.csv").read_text().splitlines()
+        assert lines[0].startswith("profit_pct,profit_usd,size,pnl_usd")
+        assert len(lines) == 3
@@ -0,0 +1,104 @@
+"""
+Cầu dao (circuit breaker) với thời gian chờ tăng dần có nhiễu cho kết nối tới từng sàn.
+"""
+import random
+
+from configs import BREAKER_FAILURE_THRESHOLD, BREAKER_BASE_DELAY, BREAKER_MAX_DELAY
+from utils import clock
+
+
+# Trạng thái cầu dao
+CLOSED = 'closed'  # Hoạt động bình thường
+OPEN = 'open'  # Đã ngắt: sàn bị loại khỏi việc chọn cơ hội cho tới khi hết thời gian chờ
+HALF_OPEN = 'half-open'  # Đang thử lại: một yêu cầu thăm dò quyết định đóng hay ngắt lại
+
+
+class CircuitBreaker:
+    """
+    Cầu dao cho một kết nối.
+
+    Mỗi lỗi liên tiếp nhân đôi thời gian chờ (từ base_delay tới max_delay), với nhiễu
+    ngẫu nhiên trong nửa trên của khoảng chờ để các kết nối không thử lại cùng lúc.
+    Sau failure_threshold lỗi liên tiếp cầu dao ngắt (OPEN); hết thời gian chờ thì chuyển
+    sang HALF_OPEN và yêu cầu tiếp theo là yêu cầu thăm dò: thành công thì đóng lại,
+    thất bại thì ngắt lại với thời gian chờ dài hơn.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, base_delay=BREAKER_BASE_DELAY,
+                 max_delay=BREAKER_MAX_DELAY, rng=None):
+        """
+        Tạo cầu dao ở trạng thái đóng.
+
+        Args:
+            failure_threshold (int): Số lỗi liên tiếp trước khi ngắt
+            base_delay (float): Thời gian chờ sau lỗi đầu tiên (giây)
+            max_delay (float): Thời gian chờ tối đa (giây)
+            rng (random.Random, optional): Bộ sinh số ngẫu nhiên (dùng trong kiểm thử)
+        """
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+        self.state = CLOSED
+        self.failures = 0  # Số lỗi liên tiếp
+        self.trips = 0  # Số lần đã ngắt
+        self.open_until = 0.0
+
+    def backoff(self):
+        """
+        Tính thời gian chờ cho số lỗi liên tiếp hiện tại.
+
+        Returns:
+            float: Số giây cần chờ (trong khoảng [d/2, d] với d = base * 2^(lỗi - 1))
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** max(self.failures - 1, 0))
+        return delay / 2 + self.rng.uniform(0, delay / 2)
+
+    def record_failure(self, now=None):
+        """
+        Ghi nhận một lỗi.
+
+        Returns:
+            float: Số giây cần chờ trước lần thử tiếp theo
+        """
+        now = clock.monotonic() if now is None else now
+        self.failures += 1
+        delay = self.backoff()
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state == CLOSED:
+                self.trips += 1
+            self.state = OPEN
+            self.open_until = now + delay
+        return delay
+
+    def record_success(self):
+        """
+        Ghi nhận một yêu cầu thành công và đóng cầu dao.
+
+        Returns:
+            bool: True nếu cầu dao vừa được đóng lại sau khi ngắt
+        """
+        recovered = self.state != CLOSED
+        self.state = CLOSED
+        self.failures = 0
+        return recovered
+
+    def allow_request(self, now=None):
+        """
+        Kiểm tra có được gửi yêu cầu hay không; chuyển OPEN sang HALF_OPEN khi hết thời gian chờ.
+
+        Returns:
+            bool: True nếu được gửi yêu cầu (bình thường hoặc thăm dò)
+        """
+        if self.state != OPEN:
+            return True
+        now = clock.monotonic() if now is None else now
+        if now >= self.open_until:
+            self.state = HALF_OPEN
+            return True
+        return False
+
+    @property
+    def is_open(self):
+        """bool: True nếu cầu dao đang ngắt hoặc đang thăm dò."""
+        return self.state != CLOSED
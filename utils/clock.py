@@ -0,0 +1,268 @@
+"""
+Đồng hồ dùng chung cho bots/ và services/: thời gian hiện tại, sleep và asyncio.sleep.
+
+Mặc định là đồng hồ hệ thống. Kiểm thử thay bằng VirtualClock và chạy coroutine trên
+VirtualTimeEventLoop (xem run): khi không còn việc gì sẵn sàng, vòng lặp nhảy thẳng tới
+hẹn giờ kế tiếp thay vì chờ, nên hàng giờ giao dịch mô phỏng chạy xong trong vài giây
+và cho cùng một kết quả ở mọi lần chạy.
+
+Dùng: `from utils import clock` rồi `clock.time()`, `clock.sleep(1)`, `await clock.async_sleep(1)`.
+Đo độ trễ xử lý (time.perf_counter) vẫn dùng đồng hồ thật.
+"""
+import time as _time
+import asyncio
+import selectors
+import threading
+
+POLL_INTERVAL = 0.001  # Chờ thật (giây) khi còn việc đang chạy trong luồng
+
+
+class SystemClock:
+    """Đồng hồ hệ thống."""
+
+    def time(self):
+        return _time.time()
+
+    def monotonic(self):
+        return _time.monotonic()
+
+    def sleep(self, seconds):
+        _time.sleep(seconds)
+
+    async def async_sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    Đồng hồ ảo: thời gian chỉ tiến khi có lời gọi sleep hoặc khi VirtualTimeEventLoop
+    nhảy tới thời điểm kế tiếp có việc.
+
+    Khi một VirtualTimeEventLoop đang chạy, sleep trong luồng khác (asyncio.to_thread) chờ
+    tới khi vòng lặp đưa thời gian tới hạn, nên luồng và các tác vụ của vòng lặp thấy
+    cùng một dòng thời gian. Ngoài ra (mã đồng bộ, hoặc ngay trong luồng của vòng lặp)
+    sleep chỉ cho thời gian tiến và trả về ngay.
+    """
+
+    def __init__(self, start=1_700_000_000.0):
+        """
+        Args:
+            start (float): Thời điểm bắt đầu (giây, epoch)
+        """
+        self.start = start
+        self.loop_thread = None  # Luồng của VirtualTimeEventLoop đang chạy
+        # Thời gian đã trôi (giây); giữ riêng với start để phép cộng không mất độ chính xác
+        self._elapsed = 0.0
+        self._sleepers = []  # Hạn (theo monotonic) của các luồng đang chờ trong sleep
+        self._condition = threading.Condition()
+
+    def time(self):
+        return self.start + self._elapsed
+
+    def monotonic(self):
+        return self._elapsed
+
+    @property
+    def sleepers(self):
+        """Số luồng đang chờ trong sleep."""
+        return len(self._sleepers)
+
+    def next_wakeup(self):
+        """Hạn sớm nhất của các luồng đang chờ (None nếu không có)."""
+        with self._condition:
+            return min(self._sleepers, default=None)
+
+    def advance_to(self, when):
+        """Cho thời gian tiến tới `when` (theo monotonic) và đánh thức các luồng đã tới hạn."""
+        with self._condition:
+            if when > self._elapsed:
+                self._elapsed = when
+            self._sleepers = [deadline for deadline in self._sleepers if deadline > self._elapsed]
+            self._condition.notify_all()
+
+    def advance(self, seconds):
+        """Cho thời gian tiến thêm `seconds` giây."""
+        if seconds > 0:
+            self.advance_to(self._elapsed + seconds)
+
+    def sleep(self, seconds):
+        seconds = max(seconds, 0)
+        with self._condition:
+            if self.loop_thread is None or self.loop_thread == threading.get_ident():
+                self._elapsed += seconds
+                return
+            deadline = self._elapsed + seconds
+            self._sleepers.append(deadline)
+            while self._elapsed < deadline:
+                self._condition.wait()
+
+    async def async_sleep(self, seconds):
+        # Hẹn giờ của VirtualTimeEventLoop chạy theo thời gian ảo
+        await asyncio.sleep(seconds)
+
+
+_clock = SystemClock()
+
+
+def get_clock():
+    """Lấy đồng hồ đang dùng."""
+    return _clock
+
+
+def set_clock(clock):
+    """
+    Thay đồng hồ dùng chung.
+
+    Args:
+        clock (SystemClock | VirtualClock): Đồng hồ mới
+
+    Returns:
+        Đồng hồ trước đó (để khôi phục)
+    """
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+def time():
+    """Thời điểm hiện tại (giây, epoch) theo đồng hồ đang dùng."""
+    return _clock.time()
+
+
+def monotonic():
+    """Thời gian đơn điệu (giây) theo đồng hồ đang dùng."""
+    return _clock.monotonic()
+
+
+def sleep(seconds):
+    """Dừng (chặn) `seconds` giây theo đồng hồ đang dùng."""
+    _clock.sleep(seconds)
+
+
+async def async_sleep(seconds):
+    """Dừng (không chặn) `seconds` giây theo đồng hồ đang dùng."""
+    await _clock.async_sleep(seconds)
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """
+    Selector của VirtualTimeEventLoop: khi không có sự kiện I/O và mọi việc trong luồng
+    đều đang chờ trong sleep, thời gian ảo nhảy tới hẹn giờ hoặc hạn sleep sớm nhất.
+    """
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.loop = None
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+
+        clock = self.clock
+        if clock.sleepers < self.loop._executor_pending:
+            # Còn luồng đang chạy: chờ thật một chút, không cho thời gian ảo tiến
+            return super().select(POLL_INTERVAL)
+
+        deadlines = [clock.monotonic() + timeout] if timeout is not None else []
+        wakeup = clock.next_wakeup()
+        if wakeup is not None:
+            deadlines.append(wakeup)
+        if not deadlines:
+            # Không còn gì để chờ ngoài I/O thật (hoặc call_soon_threadsafe)
+            return super().select(None)
+        clock.advance_to(min(deadlines))
+        return events
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """
+    Vòng lặp sự kiện chạy theo VirtualClock: loop.time() là thời gian ảo, nên
+    asyncio.sleep, asyncio.wait_for và call_later không chờ thật.
+    """
+
+    def __init__(self, clock):
+        """
+        Args:
+            clock (VirtualClock): Đồng hồ ảo
+        """
+        selector = _VirtualSelector(clock)
+        super().__init__(selector)
+        selector.loop = self
+        self.clock = clock
+        self._executor_pending = 0  # Số việc đang chạy trong luồng (asyncio.to_thread)
+
+    def time(self):
+        return self.clock.monotonic()
+
+    def run_forever(self):
+        self.clock.loop_thread = threading.get_ident()
+        try:
+            super().run_forever()
+        finally:
+            self.clock.loop_thread = None
+
+    def run_in_executor(self, executor, func, *args):
+        future = super().run_in_executor(executor, func, *args)
+        self._executor_pending += 1
+        future.add_done_callback(self._executor_done)
+        return future
+
+    def _executor_done(self, future):
+        self._executor_pending -= 1
+
+    async def shutdown_default_executor(self, *args, **kwargs):
+        # Chờ thật các luồng kết thúc, không để hẹn giờ chờ của asyncio hết hạn theo thời gian ảo
+        self._executor_pending += 1
+        try:
+            await super().shutdown_default_executor(*args, **kwargs)
+        finally:
+            self._executor_pending -= 1
+
+
+def run(main, clock=None):
+    """
+    Chạy coroutine trên VirtualTimeEventLoop với VirtualClock làm đồng hồ dùng chung
+    (tương đương asyncio.run).
+
+    Args:
+        main (coroutine): Coroutine cần chạy
+        clock (VirtualClock, optional): Đồng hồ ảo (mặc định: tạo mới)
+
+    Returns:
+        Kết quả của coroutine
+    """
+    clock = clock or VirtualClock()
+    previous = set_clock(clock)
+    # Dựng vòng lặp thủ công (asyncio.Runner chỉ có từ Python 3.11)
+    loop = VirtualTimeEventLoop(clock)
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            _cancel_all_tasks(loop)
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+            set_clock(previous)
+
+
+def _cancel_all_tasks(loop):
+    """Hủy các tác vụ còn lại của vòng lặp (như asyncio.run)."""
+    tasks = asyncio.all_tasks(loop)
+    if not tasks:
+        return
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            loop.call_exception_handler({
+                'message': 'Lỗi chưa được xử lý trong tác vụ khi dừng clock.run()',
+                'exception': task.exception(),
+                'task': task,
+            })
@@ -0,0 +1,118 @@
+"""
+Bảng ngưỡng hòa vốn sau phí tính trước cho từng cặp (sàn mua, sàn bán).
+"""
+from configs import EXCHANGE_FEES, PROFIT_CRITERIA_PCT, PROFIT_CRITERIA_USD
+
+
+# Phí mặc định khi sàn không có trong cấu hình phí
+DEFAULT_FEE_RATE = 0.001
+
+
+class BreakEvenTable:
+    """
+    Ma trận tỷ lệ giá hòa vốn theo (sàn mua, sàn bán).
+
+    Mua q crypto ở giá ask và bán ở giá bid có lợi nhuận sau phí:
+        q * (bid * (1 - phí bán) - ask * (1 + phí mua))
+    nên giao dịch chỉ có lãi khi bid > ask * ratio với
+        ratio = (1 + phí mua) / (1 - phí bán).
+
+    Vòng lặp xử lý sách lệnh chỉ cần một phép nhân và một phép so sánh; lợi nhuận
+    đầy đủ và tiêu chí lợi nhuận (PROFIT_CRITERIA_*) chỉ được tính cho các ứng viên
+    vượt ngưỡng này.
+
+    Tỷ lệ chỉ gồm phí, không gộp tiêu chí lợi nhuận: PROFIT_CRITERIA_PCT tính trên tổng
+    vốn USDT của phiên và PROFIT_CRITERIA_USD là số tuyệt đối, nên ngưỡng giá tương ứng
+    phụ thuộc khối lượng giao dịch và số dư hiện tại, không phải hằng số theo cặp sàn.
+    Vì vậy ratio là điều kiện cần (lợi nhuận > 0), còn meets_criteria() vẫn quyết định;
+    tiêu chí chỉ ảnh hưởng tới việc bật bộ lọc (prefilter).
+    """
+
+    def __init__(self, exchanges=None, fees=None, profit_pct=PROFIT_CRITERIA_PCT, profit_usd=PROFIT_CRITERIA_USD):
+        """
+        Tạo bảng ngưỡng.
+
+        Args:
+            exchanges (list, optional): Danh sách sàn (mặc định: các sàn trong cấu hình phí)
+            fees (dict, optional): Phí theo sàn {'sàn': {'give': phí mua, 'receive': phí bán}}
+            profit_pct (float): Lợi nhuận tối thiểu sau phí (phần trăm trên số vốn)
+            profit_usd (float): Lợi nhuận tối thiểu sau phí (USD)
+        """
+        self.fees = EXCHANGE_FEES if fees is None else fees
+        self.profit_pct = float(profit_pct)
+        self.profit_usd = float(profit_usd)
+        self.buy_fee = {}  # {sàn: phí mua}
+        self.sell_fee = {}  # {sàn: phí bán}
+        self.ratios = {}  # {sàn mua: {sàn bán: tỷ lệ hòa vốn}}
+
+        # Ngưỡng hòa vốn chỉ là điều kiện cần khi tiêu chí lợi nhuận không âm;
+        # nếu tiêu chí âm (chấp nhận lỗ) mọi cơ hội đều phải được tính đầy đủ
+        self.prefilter = self.profit_pct >= 0 and self.profit_usd >= 0
+
+        for exchange in set(self.fees) | set(exchanges or []):
+            self._add_exchange(exchange)
+
+    def _add_exchange(self, exchange):
+        """Thêm một sàn và tính lại hàng/cột tương ứng của ma trận."""
+        fee = self.fees.get(exchange, {})
+        self.buy_fee[exchange] = float(fee.get('give', DEFAULT_FEE_RATE))
+        self.sell_fee[exchange] = float(fee.get('receive', DEFAULT_FEE_RATE))
+
+        for buy in self.buy_fee:
+            row = self.ratios.setdefault(buy, {})
+            for sell in self.sell_fee:
+                row[sell] = (1 + self.buy_fee[buy]) / (1 - self.sell_fee[sell])
+
+    def ratio(self, buy_exchange, sell_exchange):
+        """
+        Lấy tỷ lệ hòa vốn của (sàn mua, sàn bán).
+
+        Returns:
+            float: Tỷ lệ bid/ask tối thiểu để có lãi sau phí
+        """
+        try:
+            return self.ratios[buy_exchange][sell_exchange]
+        except KeyError:
+            for exchange in (buy_exchange, sell_exchange):
+                if exchange not in self.buy_fee:
+                    self._add_exchange(exchange)
+            return self.ratios[buy_exchange][sell_exchange]
+
+    def is_candidate(self, buy_exchange, sell_exchange, ask_price, bid_price):
+        """
+        Kiểm tra nhanh chênh lệch giá có vượt ngưỡng hòa vốn sau phí hay không.
+
+        Returns:
+            bool: True nếu cần tính lợi nhuận đầy đủ
+        """
+        if not self.prefilter:
+            return True
+        return bid_price > ask_price * self.ratio(buy_exchange, sell_exchange)
+
+    def fee_usd(self, buy_exchange, sell_exchange, ask_price, bid_price, amount):
+        """
+        Tính tổng phí (USD) của một giao dịch mua/bán.
+
+        Returns:
+            float: Phí mua + phí bán
+        """
+        return amount * (ask_price * self.buy_fee[buy_exchange] + bid_price * self.sell_fee[sell_exchange])
+
+    def net_profit_usd(self, buy_exchange, sell_exchange, ask_price, bid_price, amount):
+        """
+        Tính lợi nhuận sau phí (USD) của một giao dịch mua/bán.
+
+        Returns:
+            float: Lợi nhuận sau phí
+        """
+        self.ratio(buy_exchange, sell_exchange)  # Đảm bảo phí của hai sàn đã có trong bảng
+        return amount * (bid_price - ask_price) - self.fee_usd(buy_exchange, sell_exchange, ask_price, bid_price, amount)
+
+    def meets_criteria(self, profit_usd, profit_pct):
+        """
+        Kiểm tra tiêu chí lợi nhuận tối thiểu.
+
+        Returns:
+            bool: True nếu lợi nhuận vượt cả hai tiêu chí
+        """
+        return profit_usd > self.profit_usd and profit_pct > self.profit_pct
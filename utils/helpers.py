@@ -4,11 +4,12 @@ Các hàm tiện ích dùng chung cho toàn bộ ứng dụng.
 import time
 from datetime import datetime
 from colorama import Style
+from utils import clock
 
 
 def show_time():
     """Trả về thời gian hiện tại định dạng HH:MM:SS."""
-    return time.strftime('%H:%M:%S', time.gmtime(time.time()))
+    return time.strftime('%H:%M:%S', time.gmtime(clock.time()))
 
 
 def format_message(message):
@@ -1,36 +1,262 @@
 """
 Module quản lý ghi log của ứng dụng.
+
+Tệp log `logs/arbitrage_bot_<ngày>.log` được xoay vòng khi qua ngày hoặc khi vượt
+LOG_MAX_BYTES; tệp cũ được nén gzip trên một luồng nền và chỉ giữ LOG_BACKUP_COUNT tệp
+nén gần nhất. Handler ghi tệp chỉ được tạo khi gọi setup_file_logging() lúc khởi động
+(không tạo khi import); các worker gửi bản ghi về tiến trình chính qua hàng đợi để chỉ
+một tiến trình ghi và xoay vòng tệp. Thông điệp lặp lại nhiều (vd: lỗi trong vòng lặp của một sàn) được truyền
+`key` để giới hạn LOG_SAMPLE_RATE dòng mỗi giây cho mỗi khóa.
 """
 import os
+import sys
+import glob
+import gzip
+import queue
+import shutil
 import logging
-from datetime import datetime
+import threading
+import logging.handlers
+from datetime import datetime, timedelta
 from colorama import Fore, Style
+from utils import clock
 from utils.helpers import show_time
+from configs import LOG_DIR, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_COMPRESS, LOG_SAMPLE_RATE
+
+
+class _GzipWorker:
+    """Luồng nền nén các tệp log đã xoay vòng (không chặn luồng ghi log)."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, path, done=None):
+        """
+        Đưa một tệp vào hàng đợi nén.
+
+        Args:
+            path (str): Tệp cần nén (được thay bằng path + '.gz')
+            done (callable, optional): Hàm gọi sau khi nén xong
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='log-gzip', daemon=True)
+                self._thread.start()
+        self.queue.put((path, done))
+
+    def _run(self):
+        while True:
+            path, done = self.queue.get()
+            try:
+                with open(path, 'rb') as source, gzip.open(path + '.gz', 'wb') as target:
+                    shutil.copyfileobj(source, target)
+                os.remove(path)
+                if done:
+                    done()
+            except OSError as e:
+                # Không ghi vào chính logger đang được nén
+                print(f"Không thể nén tệp log {path}: {str(e)}", file=sys.stderr)
+            finally:
+                self.queue.task_done()
+
+    def join(self):
+        """Chờ nén xong mọi tệp trong hàng đợi."""
+        self.queue.join()
+
+
+class RotatingLogHandler(logging.handlers.BaseRotatingHandler):
+    """
+    Ghi log vào `<thư mục>/<tiền tố>_<ngày>.log`, xoay vòng khi qua ngày hoặc khi tệp
+    vượt `max_bytes`. Tệp đã xoay vòng (`<tiền tố>_<ngày>.<giờ>.log` nếu xoay vì kích
+    thước) được nén gzip trên luồng nền, chỉ giữ `backup_count` tệp gần nhất.
+    """
 
-# Tạo thư mục logs nếu chưa tồn tại
-os.makedirs('logs', exist_ok=True)
+    def __init__(self, directory=LOG_DIR, prefix='arbitrage_bot', max_bytes=LOG_MAX_BYTES,
+                 backup_count=LOG_BACKUP_COUNT, compress=LOG_COMPRESS):
+        """
+        Args:
+            directory (str): Thư mục chứa tệp log
+            prefix (str): Tiền tố tên tệp
+            max_bytes (int): Kích thước tối đa của một tệp (byte, 0 = không giới hạn)
+            backup_count (int): Số tệp đã xoay vòng được giữ lại (0 = giữ tất cả)
+            compress (bool): Nén gzip các tệp đã xoay vòng
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compressor = _GzipWorker() if compress else None
+        self.day = datetime.now().date()
+        super().__init__(self._path(self.day), 'a', encoding='utf-8')
+        self.rollover_at = self._next_midnight()
+        # Tệp của các ngày trước (vd: lần chạy trước dừng giữa chừng) chưa được nén
+        for path in sorted(glob.glob(os.path.join(directory, f'{prefix}_*.log'))):
+            if os.path.abspath(path) != self.baseFilename:
+                self._archive(path)
+
+    def _path(self, day):
+        return os.path.join(self.directory, f'{self.prefix}_{day.isoformat()}.log')
+
+    def _next_midnight(self):
+        return (datetime.combine(self.day, datetime.min.time()) + timedelta(days=1)).timestamp()
+
+    def shouldRollover(self, record):
+        if record.created >= self.rollover_at:
+            return True
+        if self.max_bytes > 0 and self.stream is not None:
+            return self.stream.tell() >= self.max_bytes
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        today = datetime.now().date()
+        rotated = self.baseFilename
+        if today == self.day and os.path.exists(rotated):
+            # Xoay vòng vì kích thước: đổi tên để tệp của ngày được mở lại từ đầu
+            rotated = os.path.join(self.directory, f"{self.prefix}_{today.isoformat()}.{datetime.now():%H%M%S%f}.log")
+            os.replace(self.baseFilename, rotated)
+
+        self.day = today
+        self.rollover_at = self._next_midnight()
+        self.baseFilename = os.path.abspath(self._path(today))
+        self.stream = self._open()
+        if os.path.exists(rotated):
+            self._archive(rotated)
+
+    def _archive(self, path):
+        if self.compressor:
+            self.compressor.submit(path, self._prune)
+        else:
+            self._prune()
+
+    def _prune(self):
+        """Xóa các tệp đã xoay vòng cũ nhất, giữ `backup_count` tệp."""
+        if self.backup_count <= 0:
+            return
+        suffix = '.log.gz' if self.compressor else '.log'
+        rotated = [
+            path for path in glob.glob(os.path.join(self.directory, f'{self.prefix}_*{suffix}'))
+            if os.path.abspath(path) != self.baseFilename
+        ]
+        rotated.sort(key=os.path.getmtime)
+        for path in rotated[:-self.backup_count]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self):
+        super().close()
+        if self.compressor:
+            self.compressor.join()
+
+
+class RateSampler:
+    """
+    Giới hạn số dòng log mỗi khoảng thời gian cho từng khóa thông điệp; số dòng bị bỏ
+    qua được báo kèm dòng tiếp theo của khóa đó.
+    """
+
+    def __init__(self, rate=LOG_SAMPLE_RATE, interval=1.0):
+        """
+        Args:
+            rate (int): Số dòng tối đa mỗi khoảng cho một khóa (0 = không giới hạn)
+            interval (float): Độ dài khoảng (giây)
+        """
+        self.rate = rate
+        self.interval = interval
+        self._windows = {}  # {khóa: [bắt đầu khoảng, số dòng đã ghi, số dòng bị bỏ qua]}
+        self._lock = threading.Lock()
+
+    def allow(self, key, now=None):
+        """
+        Kiểm tra một dòng log của khóa có được ghi hay không.
+
+        Returns:
+            tuple: (được ghi hay không, số dòng đã bỏ qua trước đó cần báo)
+        """
+        if self.rate <= 0:
+            return True, 0
+        now = clock.monotonic() if now is None else now
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                dropped = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                return True, dropped
+            if window[1] < self.rate:
+                window[1] += 1
+                dropped, window[2] = window[2], 0
+                return True, dropped
+            window[2] += 1
+            return False, 0
 
-# Cấu hình logging
-today = datetime.now().strftime('%Y-%m-%d')
-log_file = f'logs/arbitrage_bot_{today}.log'
 
 # Tạo logger
 logger = logging.getLogger('arbitrage_bot')
 logger.setLevel(logging.DEBUG)
-
-# Tạo file handler để lưu log vào tệp tin
-file_handler = logging.FileHandler(log_file, encoding='utf-8')
-file_handler.setLevel(logging.DEBUG)
+# Không truyền lên root: main.setup_logging dùng chung file_handler cho root
+logger.propagate = False
 
 # Định dạng log
 formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
 
-# Thêm handler vào logger
-logger.addHandler(file_handler)
+# Handler ghi tệp, được tạo bởi setup_file_logging()
+file_handler = None
+
+sampler = RateSampler()
+
+# Bảng trạng thái đang hiển thị trên console (xem set_console_overlay)
+console_overlay = None
+
+
+def set_console_overlay(overlay):
+    """
+    Chuyển các dòng log ra console qua một bảng trạng thái đang được vẽ lại, để dòng
+    log được in phía trên bảng thay vì bị khung hình tiếp theo ghi đè.
+
+    Args:
+        overlay (StatusRenderer, optional): Bảng trạng thái có print_above(), None để in trực tiếp
+    """
+    global console_overlay
+    console_overlay = overlay
 
 
-def log_and_print(message, level='info', print_to_console=True, telegram=None):
+def setup_file_logging(log_queue=None):
+    """
+    Tạo handler ghi tệp và gắn vào logger (chỉ tạo một lần mỗi tiến trình).
+    
+    Tiến trình chính ghi trực tiếp vào tệp xoay vòng. Worker truyền `log_queue`: bản ghi
+    đã định dạng nội dung được gửi về tiến trình chính, nơi QueueListener chuyển chúng
+    cho handler xoay vòng.
+    
+    Args:
+        log_queue (multiprocessing.Queue, optional): Hàng đợi tới tiến trình chính
+        
+    Returns:
+        logging.Handler: Handler ghi tệp của tiến trình
+    """
+    global file_handler
+    if file_handler is None:
+        if log_queue is not None:
+            file_handler = logging.handlers.QueueHandler(log_queue)
+            # Chỉ gộp nội dung; thời gian, tên và cấp độ do handler của tiến trình chính thêm vào
+            file_handler.setFormatter(logging.Formatter('%(message)s'))
+        else:
+            file_handler = RotatingLogHandler()
+            file_handler.setFormatter(formatter)
+        file_handler.setLevel(logging.DEBUG)
+        logger.addHandler(file_handler)
+    return file_handler
+
+
+def log_and_print(message, level='info', print_to_console=True, telegram=None, key=None):
     """
     Ghi log và hiển thị thông báo ra màn hình console.
     
@@ -39,43 +265,55 @@ def log_and_print(message, level='info', print_to_console=True, telegram=None):
         level (str): Cấp độ log (debug, info, warning, error, critical)
         print_to_console (bool): Có hiển thị ra màn hình không
         telegram (NotiticationService, optional): Dịch vụ gửi thông báo Telegram
+        key (str, optional): Khóa giới hạn tần suất cho thông điệp lặp lại (mặc định: không giới hạn)
     """
+    if key is not None:
+        allowed, dropped = sampler.allow(key)
+        if not allowed:
+            return
+        if dropped:
+            message = f"{message} (đã bỏ qua {dropped} dòng tương tự)"
+
     # Ghi log vào tệp
     getattr(logger, level.lower())(message)
     
     # Hiển thị ra màn hình nếu được yêu cầu
     if print_to_console:
         console_message = f"{Style.DIM}[{show_time()}]{Style.RESET_ALL} {message}"
-        print(console_message)
+        overlay = console_overlay
+        if overlay is not None:
+            overlay.print_above(console_message)
+        else:
+            print(console_message)
     
     # Gửi thông báo qua Telegram nếu có
     if telegram:
         telegram.send_message(message)
 
 
-def log_debug(message, print_to_console=False, telegram=None):
+def log_debug(message, print_to_console=False, telegram=None, key=None):
     """Log và in thông báo debug."""
-    log_and_print(message, 'debug', print_to_console, telegram)
+    log_and_print(message, 'debug', print_to_console, telegram, key)
 
 
-def log_info(message, print_to_console=True, telegram=None):
+def log_info(message, print_to_console=True, telegram=None, key=None):
     """Log và in thông báo thông tin."""
-    log_and_print(message, 'info', print_to_console, telegram)
+    log_and_print(message, 'info', print_to_console, telegram, key)
 
 
-def log_warning(message, print_to_console=True, telegram=None):
+def log_warning(message, print_to_console=True, telegram=None, key=None):
     """Log và in thông báo cảnh báo."""
-    log_and_print(f"{Fore.YELLOW}{message}{Style.RESET_ALL}", 'warning', print_to_console, telegram)
+    log_and_print(f"{Fore.YELLOW}{message}{Style.RESET_ALL}", 'warning', print_to_console, telegram, key)
 
 
-def log_error(message, print_to_console=True, telegram=None):
+def log_error(message, print_to_console=True, telegram=None, key=None):
     """Log và in thông báo lỗi."""
-    log_and_print(f"{Fore.RED}{message}{Style.RESET_ALL}", 'error', print_to_console, telegram)
+    log_and_print(f"{Fore.RED}{message}{Style.RESET_ALL}", 'error', print_to_console, telegram, key)
 
 
-def log_critical(message, print_to_console=True, telegram=None):
+def log_critical(message, print_to_console=True, telegram=None, key=None):
     """Log và in thông báo lỗi nghiêm trọng."""
-    log_and_print(f"{Fore.RED}{Style.BRIGHT}{message}{Style.RESET_ALL}", 'critical', print_to_console, telegram)
+    log_and_print(f"{Fore.RED}{Style.BRIGHT}{message}{Style.RESET_ALL}", 'critical', print_to_console, telegram, key)
 
 
 def log_profit(message, profit_pct, profit_usd, print_to_console=True, telegram=None):
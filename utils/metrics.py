@@ -0,0 +1,294 @@
+"""
+Bộ đếm, gauge và histogram trong bộ nhớ, xuất ra định dạng văn bản của Prometheus.
+"""
+import math
+import bisect
+import threading
+
+
+# Ngưỡng mặc định của histogram (giây): từ 0.5 ms tới 10 s
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    """Định dạng một giá trị theo cú pháp Prometheus."""
+    value = float(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(value)
+
+
+def _escape(value):
+    """Thoát các ký tự đặc biệt trong giá trị nhãn."""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    """Định dạng danh sách (tên, giá trị) nhãn."""
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _CounterChild:
+    """Giá trị của một bộ đếm với một bộ nhãn."""
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """Tăng bộ đếm (amount không âm)."""
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    """Giá trị của một gauge với một bộ nhãn."""
+
+    def set(self, value):
+        """Đặt giá trị."""
+        self.value = float(value)
+
+    def dec(self, amount=1):
+        """Giảm giá trị."""
+        with self._lock:
+            self.value -= amount
+
+
+class _HistogramChild:
+    """Phân phối của một histogram với một bộ nhãn."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Phần tử cuối: vượt ngưỡng lớn nhất (+Inf)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Ghi nhận một giá trị."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _Metric:
+    """Lớp cơ sở của một metric có nhãn."""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        """
+        Tạo metric.
+
+        Args:
+            name (str): Tên metric
+            documentation (str): Mô tả (dòng HELP)
+            labelnames (tuple): Tên các nhãn
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        self._function = None
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """
+        Lấy giá trị của metric với một bộ nhãn (tạo mới nếu chưa có).
+
+        Nên giữ lại kết quả khi gọi trên đường xử lý nóng.
+
+        Raises:
+            ValueError: Nếu số nhãn không khớp
+        """
+        child = self._children.get(values)
+        if child is not None:
+            return child
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"Metric {self.name} cần các nhãn {self.labelnames}")
+        key = tuple(str(value) for value in values)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+            self._children[values] = child
+        return child
+
+    def set_function(self, function):
+        """
+        Lấy giá trị từ một hàm tại thời điểm đọc thay vì cập nhật trực tiếp.
+
+        Args:
+            function (callable): Hàm trả về một số (metric không nhãn) hoặc
+                {(giá trị nhãn, ...): số}
+        """
+        self._function = function
+
+    def _collect(self):
+        """Lấy {bộ nhãn: giá trị} hiện tại."""
+        if self._function is None:
+            with self._lock:
+                return {key: child for key, child in self._children.items()
+                        if all(isinstance(value, str) for value in key)}
+        values = self._function()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return {tuple(str(label) for label in (key if isinstance(key, tuple) else (key,))): value
+                for key, value in values.items()}
+
+    def _samples(self, key, child):
+        """Sinh các mẫu (hậu tố tên, nhãn bổ sung, giá trị) của một bộ nhãn."""
+        yield '', (), child if isinstance(child, (int, float)) else child.value
+
+    def render(self):
+        """
+        Xuất metric theo định dạng văn bản Prometheus.
+
+        Returns:
+            list: Các dòng văn bản
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for key, child in sorted(self._collect().items()):
+            labels = list(zip(self.labelnames, key))
+            for suffix, extra, value in self._samples(key, child):
+                lines.append(f"{self.name}{suffix}{_format_labels(labels + list(extra))} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Bộ đếm chỉ tăng."""
+
+    type = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        """Tăng bộ đếm không nhãn."""
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """Giá trị có thể tăng hoặc giảm."""
+
+    type = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        """Đặt giá trị của gauge không nhãn."""
+        self.labels().set(value)
+
+    def inc(self, amount=1):
+        """Tăng giá trị của gauge không nhãn."""
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        """Giảm giá trị của gauge không nhãn."""
+        self.labels().dec(amount)
+
+
+class Histogram(_Metric):
+    """Phân phối giá trị theo các ngưỡng cố định (thường là thời gian, giây)."""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def set_function(self, function):
+        raise TypeError("Histogram không hỗ trợ lấy giá trị từ hàm")
+
+    def observe(self, value):
+        """Ghi nhận một giá trị vào histogram không nhãn."""
+        self.labels().observe(value)
+
+    def _samples(self, key, child):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), child.counts):
+            cumulative += count
+            yield '_bucket', (('le', _format_value(bound)),), cumulative
+        yield '_sum', (), child.sum
+        yield '_count', (), child.count
+
+
+class MetricsRegistry:
+    """
+    Tập hợp các metric của tiến trình.
+
+    Metric được khai báo ở cấp module tại nơi dùng; khai báo lại cùng tên trả về
+    metric đã có.
+    """
+
+    def __init__(self):
+        self.metrics = {}  # {tên: metric}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} đã được khai báo với kiểu hoặc nhãn khác")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Khai báo (hoặc lấy) một bộ đếm."""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        """Khai báo (hoặc lấy) một gauge."""
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Khai báo (hoặc lấy) một histogram."""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """
+        Xuất tất cả metric theo định dạng văn bản Prometheus.
+
+        Returns:
+            str: Nội dung trả về cho Prometheus
+        """
+        lines = []
+        for name in sorted(self.metrics):
+            try:
+                lines.extend(self.metrics[name].render())
+            except Exception as e:
+                lines.append(f"# Không thể đọc metric {name}: {_escape(e)}")
+        return '\n'.join(lines) + '\n'
+
+
+# Registry mặc định của tiến trình
+REGISTRY = MetricsRegistry()
+
+
+def counter(name, documentation, labelnames=()):
+    """Khai báo (hoặc lấy) một bộ đếm trong registry mặc định."""
+    return REGISTRY.counter(name, documentation, labelnames)
+
+
+def gauge(name, documentation, labelnames=()):
+    """Khai báo (hoặc lấy) một gauge trong registry mặc định."""
+    return REGISTRY.gauge(name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Khai báo (hoặc lấy) một histogram trong registry mặc định."""
+    return REGISTRY.histogram(name, documentation, labelnames, buckets)
@@ -0,0 +1,129 @@
+"""
+Bộ lấy mẫu ngăn xếp (sampling profiler) bật/tắt khi đang chạy, xuất định dạng folded stack cho flamegraph.
+"""
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+from utils.logger import log_info, log_error
+from configs import PROFILE_DIR, PROFILE_INTERVAL
+
+
+class SamplingProfiler:
+    """
+    Lấy mẫu ngăn xếp của mọi luồng trong tiến trình theo chu kỳ cố định.
+
+    Luồng của vòng lặp sự kiện cho thấy coroutine đang chạy (_exchange_loop,
+    process_orderbook, ...), các luồng của asyncio.to_thread cho thấy các lời gọi
+    REST của OrderService. Mỗi ngăn xếp được ghi một dòng "luồng;hàm;...;hàm số_mẫu"
+    (định dạng folded của flamegraph.pl, speedscope, inferno).
+    """
+
+    def __init__(self, output_dir=PROFILE_DIR, interval=PROFILE_INTERVAL):
+        """
+        Khởi tạo bộ lấy mẫu.
+
+        Args:
+            output_dir (str): Thư mục ghi kết quả
+            interval (float): Chu kỳ lấy mẫu (giây)
+        """
+        self.output_dir = output_dir
+        self.interval = interval
+        self.samples = Counter()  # {ngăn xếp folded: số mẫu}
+        self.output_file = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._labels = {}  # {code object: nhãn hàm}
+
+    @property
+    def running(self):
+        """bool: True nếu đang lấy mẫu."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration):
+        """
+        Bắt đầu lấy mẫu trong một khoảng thời gian; kết quả được ghi khi kết thúc.
+
+        Args:
+            duration (float): Thời gian lấy mẫu (giây)
+
+        Returns:
+            str: Đường dẫn tệp kết quả
+
+        Raises:
+            RuntimeError: Nếu đang lấy mẫu
+        """
+        if self.running:
+            raise RuntimeError(f"Đang lấy mẫu, kết quả sẽ được ghi vào {self.output_file}")
+
+        self.samples = Counter()
+        self.output_file = os.path.join(
+            self.output_dir, f"profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.folded"
+        )
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(duration,), name="sampling-profiler", daemon=True)
+        self._thread.start()
+        log_info(f"Bắt đầu lấy mẫu CPU trong {duration}s, kết quả: {self.output_file}")
+        return self.output_file
+
+    def stop(self):
+        """Dừng lấy mẫu sớm và ghi kết quả."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _label(self, code):
+        """Tạo nhãn của một hàm: 'tên (tệp:dòng)'."""
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(os.getcwd()):
+                filename = os.path.relpath(filename)
+            else:
+                filename = os.path.basename(filename)
+            label = self._labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        return label
+
+    def sample(self):
+        """Lấy một mẫu ngăn xếp của mọi luồng (trừ luồng lấy mẫu)."""
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def _run(self, duration):
+        """Vòng lặp lấy mẫu chạy trong luồng riêng."""
+        deadline = time.monotonic() + duration
+        try:
+            while time.monotonic() < deadline and not self._stop.is_set():
+                self.sample()
+                self._stop.wait(self.interval)
+            self.write()
+        except Exception as e:
+            log_error(f"Lỗi khi lấy mẫu CPU: {str(e)}")
+
+    def write(self):
+        """
+        Ghi kết quả theo định dạng folded stack.
+
+        Returns:
+            str: Đường dẫn tệp kết quả
+        """
+        directory = os.path.dirname(self.output_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.output_file, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        log_info(f"Đã ghi {sum(self.samples.values())} mẫu CPU vào {self.output_file}")
+        return self.output_file
@@ -0,0 +1,184 @@
+"""
+Bảng trạng thái hiển thị trên console, vẽ lại với tần suất khung hình cố định.
+"""
+import sys
+import asyncio
+import threading
+from colorama import Fore, Style
+
+from utils import clock, logger
+from utils.helpers import show_time, extract_base_asset
+
+
+class StatusRenderer:
+    """
+    Vẽ lại bảng trạng thái nhiều dòng từ trạng thái hiện tại của bot.
+
+    Vòng lặp xử lý sách lệnh chỉ cập nhật trạng thái trong bộ nhớ, việc ghi ra
+    stdout được thực hiện duy nhất bởi tác vụ này với tần suất cố định. Khi đang chạy,
+    các dòng log ra console (kể cả từ luồng đặt lệnh) được in phía trên bảng qua
+    print_above() thay vì bị khung hình tiếp theo ghi đè.
+    """
+
+    def __init__(self, bot, fps=2, stream=None):
+        """
+        Khởi tạo bảng trạng thái.
+
+        Args:
+            bot (BaseBot): Bot cần hiển thị trạng thái
+            fps (float): Số khung hình mỗi giây
+            stream (file, optional): Luồng ghi (mặc định là sys.stdout)
+        """
+        self.bot = bot
+        self.interval = 1.0 / fps
+        self.stream = stream or sys.stdout
+        self._task = None
+        self._lines_drawn = 0
+        self._frame = []  # Các dòng của khung hình đang hiển thị
+        self._lock = threading.Lock()  # Log có thể được in từ luồng khác
+        self._last_counts = {}
+        self._last_time = None
+        self.feed_rates = {}
+
+    def start(self):
+        """Bắt đầu tác vụ vẽ bảng trạng thái trên event loop hiện tại."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.set_console_overlay(self)
+
+    async def stop(self):
+        """Dừng tác vụ vẽ và vẽ khung hình cuối cùng."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self.draw()
+            if logger.console_overlay is self:
+                logger.set_console_overlay(None)
+
+    async def _run(self):
+        """Vòng lặp vẽ bảng trạng thái."""
+        while True:
+            self.draw()
+            await clock.async_sleep(self.interval)
+
+    def update_feed_rates(self, now=None):
+        """
+        Tính tốc độ cập nhật sách lệnh (lần/giây) của từng sàn kể từ khung hình trước.
+
+        Args:
+            now (float, optional): Thời điểm hiện tại (giây)
+
+        Returns:
+            dict: Tốc độ cập nhật theo sàn
+        """
+        now = now if now is not None else clock.time()
+        counts = dict(self.bot.update_counts)
+
+        if self._last_time is not None and now > self._last_time:
+            elapsed = now - self._last_time
+            self.feed_rates = {
+                exchange: (count - self._last_counts.get(exchange, 0)) / elapsed
+                for exchange, count in counts.items()
+            }
+
+        self._last_counts = counts
+        self._last_time = now
+        return self.feed_rates
+
+    def render(self):
+        """
+        Tạo nội dung bảng trạng thái.
+
+        Returns:
+            list: Danh sách các dòng cần hiển thị
+        """
+        bot = self.bot
+        base_asset = extract_base_asset(bot.symbol) if bot.symbol else ''
+        lines = [f"{Style.DIM}[{show_time()}]{Style.RESET_ALL} {bot.symbol} - cơ hội #{bot.opportunity_count}"]
+
+        # Cơ hội tốt nhất hiện tại
+        opportunity = bot.best_opportunity
+        if opportunity:
+            min_ask_ex, max_bid_ex, profit_with_fees_usd = opportunity
+            if profit_with_fees_usd is None:
+                # Cơ hội dưới ngưỡng hòa vốn: lợi nhuận chỉ được tính khi cần hiển thị
+                profit_with_fees_usd = bot.fee_table.net_profit_usd(
+                    min_ask_ex, max_bid_ex, bot.min_ask_price, bot.max_bid_price, bot.crypto_per_transaction
+                )
+            if profit_with_fees_usd < 0:
+                color = Fore.RED
+            elif profit_with_fees_usd > 0:
+                color = Fore.GREEN
+            else:
+                color = Fore.WHITE
+
+            lines.append(
+                f"Cơ hội tốt nhất: {color}{round(profit_with_fees_usd, 4)} USD{Style.RESET_ALL} (sau phí)   "
+                f"mua: {min_ask_ex} ở {bot.min_ask_price}   bán: {max_bid_ex} ở {bot.max_bid_price}"
+            )
+        else:
+            lines.append("Cơ hội tốt nhất: đang chờ dữ liệu sách lệnh...")
+
+        # Giá, số dư và tốc độ cập nhật trên từng sàn
+        for exchange in bot.exchanges:
+            bid = bot.bid_prices.get(exchange, '-')
+            ask = bot.ask_prices.get(exchange, '-')
+            rate = self.feed_rates.get(exchange, 0)
+            breaker = bot.circuit_breakers.get(exchange)
+            state = f"   [{breaker.state}]" if breaker is not None and breaker.is_open else ""
+            lines.append(
+                f"➝ {exchange:<14} bid {bid:<12} ask {ask:<12} "
+                f"{round(bot.crypto.get(exchange, 0), 4)} {base_asset} / {round(bot.usd.get(exchange, 0), 2)} USDT   "
+                f"{rate:.1f} upd/s{state}"
+            )
+
+        return lines
+
+    def draw(self):
+        """Vẽ lại bảng trạng thái, ghi đè khung hình trước đó."""
+        self.update_feed_rates()
+        lines = self.render()
+
+        with self._lock:
+            # Di chuyển con trỏ lên và xóa các dòng của khung hình trước
+            self._write("\033[F\033[K" * self._lines_drawn + self._format(lines))
+            self._frame = lines
+            self._lines_drawn = len(lines)
+
+    def print_above(self, text):
+        """
+        In một dòng phía trên bảng trạng thái: xóa khung hình, in dòng đó rồi vẽ lại
+        khung hình hiện tại bên dưới.
+
+        Args:
+            text (str): Nội dung cần in
+        """
+        with self._lock:
+            frame = self._frame if self._lines_drawn else []
+            self._write("\033[F\033[K" * self._lines_drawn + f"{text}\033[K\n" + self._format(frame))
+            self._lines_drawn = len(frame)
+
+    def clear(self):
+        """
+        Xóa bảng trạng thái hiện tại để nội dung khác có thể được in ra.
+        Khung hình tiếp theo sẽ được vẽ bên dưới nội dung đó.
+        """
+        with self._lock:
+            if self._lines_drawn:
+                self._write("\033[F\033[K" * self._lines_drawn)
+            self._lines_drawn = 0
+
+    @staticmethod
+    def _format(lines):
+        """Ghép các dòng của một khung hình (xóa phần còn lại của mỗi dòng)."""
+        return "".join(f"{line}\033[K\n" for line in lines)
+
+    def _write(self, buffer):
+        """Ghi một lần và đẩy ra luồng ghi."""
+        if buffer:
+            self.stream.write(buffer)
+            self.stream.flush()